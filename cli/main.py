@@ -1919,6 +1919,41 @@ def examples():
     logger.info(f"3. 推荐从中文版本开始 | Recommended to start with Chinese version")
 
 
+@app.command(
+    name="progress",
+    help="跟踪Web分析进度 | Follow the progress of a web analysis"
+)
+def progress(
+    analysis_id: Optional[str] = typer.Argument(None, help="分析ID，默认为最新的分析 | Analysis ID, defaults to the latest"),
+    timeout: float = typer.Option(1800, "--timeout", "-t", help="最长跟踪时间（秒） | Maximum follow time in seconds")
+):
+    """
+    增量显示分析进度，直到分析完成或失败
+    Stream incremental progress updates until the analysis completes or fails
+    """
+    from tradingagents.utils.progress_store import follow_progress, get_progress_store
+
+    analysis_id = analysis_id or get_progress_store().latest_analysis_id()
+    if not analysis_id:
+        logger.error("[red]❌ 没有找到分析进度 | No analysis progress found[/red]")
+        return
+
+    last_message = None
+    state = None
+    for state in follow_progress(analysis_id, timeout=timeout):
+        if state.get('last_message') != last_message:
+            last_message = state.get('last_message')
+            console.print(f"[cyan]{state.get('progress_percentage', 0):5.1f}%[/cyan] "
+                          f"{state.get('current_step_name', '')} | {last_message}")
+
+    if state is None:
+        logger.error(f"[red]❌ 没有找到分析进度: {analysis_id} | No progress for {analysis_id}[/red]")
+    elif state.get('status') == 'completed':
+        console.print(f"[green]✅ 分析完成 | Analysis completed: {analysis_id}[/green]")
+    elif state.get('status') == 'failed':
+        console.print(f"[red]❌ {state.get('last_message', '分析失败')}[/red]")
+
+
 @app.command(
     name="test",
     help="运行测试 | Run tests"
@@ -359,6 +359,14 @@ def main():
         if etf_data is not None:
             syncer.sync_to_mongodb(etf_data)
         
+        # 增量刷新本地证券主数据（分析时的代码校验和名称解析直接查本地）
+        try:
+            from tradingagents.dataflows.security_master import get_security_master
+            changed = get_security_master().refresh_from_syncer(syncer)
+            logger.info(f"📇 本地证券主数据已刷新: {changed} 条变化")
+        except Exception as e:
+            logger.warning(f"⚠️ 刷新本地证券主数据失败: {e}")
+        
         # 显示统计信息
         logger.info(f"\n📊 同步统计信息:")
         stats = syncer.get_sync_statistics()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+缓存元数据目录测试
+验证StockDataCache的查找、TTL、统计和过期清理走SQLite索引，并能从已有 *_meta.json 重建
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from tradingagents.dataflows.cache_manager import StockDataCache
+
+
+def _age_entry(cache, cache_key, hours):
+    """把条目的缓存时间向前推，同时更新JSON与目录"""
+    metadata = cache._load_metadata(cache_key)
+    metadata['cached_at'] = (datetime.now() - timedelta(hours=hours)).isoformat()
+    cache._save_metadata(cache_key, metadata, keep_cached_at=True)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return StockDataCache(cache_dir=str(tmp_path), storage_format="csv")
+
+
+def test_partial_match_prefers_newest_valid_entry(cache):
+    old_key = cache.save_stock_data("000001", "old", "2024-01-01", "2024-01-31", "tushare")
+    new_key = cache.save_stock_data("000001", "new", "2024-02-01", "2024-02-29", "tushare")
+    cache.save_stock_data("000002", "other", "2024-02-01", "2024-02-29", "tushare")
+    _age_entry(cache, old_key, 0.5)
+
+    assert cache.find_cached_stock_data("000001", "2023-01-01", "2023-12-31", "tushare") == new_key
+    assert cache.find_cached_stock_data("000001", "2023-01-01", "2023-12-31", "akshare") is None
+
+    _age_entry(cache, new_key, 2)
+    assert cache.find_cached_stock_data("000001", "2023-01-01", "2023-12-31") == old_key
+
+
+def test_fundamentals_lookup_respects_ttl(cache):
+    key = cache.save_fundamentals_data("AAPL", "fundamentals report", "openai")
+    assert cache.find_cached_fundamentals_data("AAPL", "openai") == key
+
+    _age_entry(cache, key, 48)
+    assert cache.find_cached_fundamentals_data("AAPL", "openai") is None
+    # 过期条目仍可作为备用数据查到
+    assert cache.find_cache_keys("AAPL", "fundamentals", "us") == [key]
+
+
+def test_stats_and_expiry_sweep(cache):
+    keep = cache.save_stock_data("AAPL", "a" * 2048, "2024-01-01", "2024-01-31", "yfinance")
+    expired = cache.save_news_data("AAPL", "news", "2024-01-01", "2024-01-31", "finnhub")
+    _age_entry(cache, expired, 24 * 10)
+
+    stats = cache.get_cache_stats()
+    assert stats['total_files'] == 2
+    assert stats['stock_data_count'] == 1 and stats['news_count'] == 1
+    assert stats['skipped_count'] == 0
+
+    cache.clear_old_cache(max_age_days=7)
+    assert cache._load_metadata(expired) is None
+    assert not cache._get_metadata_path(expired).exists()
+    assert cache.load_stock_data(keep) == "a" * 2048
+    assert cache.get_cache_stats()['total_files'] == 1
+
+
+def test_catalog_rebuilds_from_existing_metadata_files(tmp_path):
+    """已有的 *_meta.json 在首次启动时被收录"""
+    cache = StockDataCache(cache_dir=str(tmp_path), storage_format="csv")
+    key = cache.save_stock_data("600519", "data", "2024-01-01", "2024-01-31", "akshare")
+    cache.catalog.close()
+    os.remove(cache.metadata_dir / "catalog.sqlite3")
+
+    rebuilt = StockDataCache(cache_dir=str(tmp_path), storage_format="csv")
+    assert rebuilt.find_cache_keys("600519", "stock_data", "china") == [key]
+    assert rebuilt.find_cached_stock_data("600519", "2023-01-01", "2023-01-31", "akshare") == key
+
+
+def test_metadata_written_outside_catalog_is_picked_up(cache):
+    """目录外写入的元数据文件在按键读取时补录"""
+    cache_key = "AAPL_stock_data_manual00001"
+    metadata = {
+        'symbol': 'AAPL', 'data_type': 'stock_data', 'market_type': 'us',
+        'data_source': 'yfinance', 'file_path': '', 'file_format': 'txt',
+        'cached_at': datetime.now().isoformat(),
+    }
+    with open(cache._get_metadata_path(cache_key), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f)
+
+    assert cache.catalog.get(cache_key) is None
+    assert cache.is_cache_valid(cache_key, symbol='AAPL', data_type='stock_data')
+    assert cache.catalog.get(cache_key)['data_source'] == 'yfinance'
+
+
+@pytest.mark.skipif(
+    not os.getenv("ENABLE_PERFORMANCE_TESTS"),
+    reason="性能测试已禁用，使用 ENABLE_PERFORMANCE_TESTS=1 启用"
+)
+def test_catalog_miss_performance(tmp_path):
+    run_benchmark(str(tmp_path))
+
+
+def run_benchmark(cache_dir, entries=20000):
+    """在大量缓存条目下测量一次未命中查找的耗时"""
+    cache = StockDataCache(cache_dir=cache_dir, storage_format="csv")
+    for i in range(entries):
+        cache.save_news_data(f"{i:06d}", "news", "2024-01-01", "2024-01-31", "eastmoney")
+
+    start = time.perf_counter()
+    cache.find_cached_stock_data("999999", "2024-01-01", "2024-01-31", "tushare")
+    miss_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    cache.get_cache_stats()
+    stats_ms = (time.perf_counter() - start) * 1000
+    print(f"\n⚡ {entries}个缓存条目: 未命中查找 {miss_ms:.2f}ms | 统计 {stats_ms:.2f}ms")
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        run_benchmark(tmp_dir)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+StockDataCache列式存储测试
+验证parquet/feather格式的类型保真、旧CSV缓存的透明迁移，并对比各格式的读取延迟与磁盘占用
+"""
+
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from tradingagents.dataflows.cache_manager import StockDataCache, PYARROW_AVAILABLE
+
+requires_pyarrow = pytest.mark.skipif(not PYARROW_AVAILABLE, reason="pyarrow未安装")
+
+
+def _make_history(symbol="000001", days=250, seed=0):
+    """生成一段A股日线历史"""
+    rng = np.random.default_rng(seed)
+    close = 10 + np.cumsum(rng.normal(0, 0.1, days))
+    return pd.DataFrame({
+        "ts_code": f"{symbol}.SZ",
+        "trade_date": pd.bdate_range("2024-01-02", periods=days),
+        "open": close,
+        "high": close + 0.2,
+        "low": close - 0.2,
+        "close": close,
+        "vol": rng.integers(10_000, 500_000, days),
+        "amount": close * 1000.0,
+    })
+
+
+@requires_pyarrow
+@pytest.mark.parametrize("storage_format", ["parquet", "feather"])
+def test_columnar_round_trip_keeps_dtypes(tmp_path, storage_format):
+    """列式格式读回的数据与原数据完全一致，包括日期与整数类型"""
+    cache = StockDataCache(cache_dir=str(tmp_path), storage_format=storage_format)
+    data = _make_history()
+    cache_key = cache.save_stock_data("000001", data, "2024-01-02", "2024-12-31", "tushare")
+
+    metadata = cache._load_metadata(cache_key)
+    assert metadata["file_format"] == storage_format
+    assert metadata["file_path"].endswith(f".{storage_format}")
+
+    loaded = cache.load_stock_data(cache_key)
+    pd.testing.assert_frame_equal(loaded, data)
+
+
+@requires_pyarrow
+def test_feather_keeps_named_index(tmp_path):
+    cache = StockDataCache(cache_dir=str(tmp_path), storage_format="feather")
+    data = _make_history().set_index("trade_date")
+    cache_key = cache.save_stock_data("000001", data, "2024-01-02", "2024-12-31", "tushare")
+    pd.testing.assert_frame_equal(cache.load_stock_data(cache_key), data)
+
+
+@requires_pyarrow
+def test_csv_entry_migrates_on_read(tmp_path):
+    """旧CSV缓存在首次读取时迁移为parquet，且保留原缓存时间"""
+    data = _make_history()
+    legacy = StockDataCache(cache_dir=str(tmp_path), storage_format="csv")
+    cache_key = legacy.save_stock_data("000001", data, "2024-01-02", "2024-12-31", "tushare")
+    csv_path = legacy._load_metadata(cache_key)["file_path"]
+    cached_at = legacy._load_metadata(cache_key)["cached_at"]
+
+    cache = StockDataCache(cache_dir=str(tmp_path), storage_format="parquet")
+    first = cache.load_stock_data(cache_key)
+    assert first is not None
+
+    metadata = cache._load_metadata(cache_key)
+    assert metadata["file_format"] == "parquet"
+    assert metadata["cached_at"] == cached_at
+    assert not os.path.exists(csv_path)
+
+    second = cache.load_stock_data(cache_key)
+    pd.testing.assert_frame_equal(second, first)
+
+
+def test_text_and_csv_formats_unchanged(tmp_path):
+    """字符串数据仍按txt保存，csv格式行为与原实现一致"""
+    cache = StockDataCache(cache_dir=str(tmp_path), storage_format="csv")
+    key_txt = cache.save_stock_data("AAPL", "report text", "2024-01-01", "2024-01-31", "yfinance")
+    assert cache.load_stock_data(key_txt) == "report text"
+
+    key_csv = cache.save_stock_data("AAPL", _make_history("AAPL"), "2024-01-01", "2024-01-31", "yfinance")
+    with open(cache._get_metadata_path(key_csv), encoding="utf-8") as f:
+        assert json.load(f)["file_format"] == "csv"
+    assert len(cache.load_stock_data(key_csv)) == 250
+
+
+@pytest.mark.skipif(
+    not os.getenv("ENABLE_PERFORMANCE_TESTS"),
+    reason="性能测试已禁用，使用 ENABLE_PERFORMANCE_TESTS=1 启用"
+)
+@requires_pyarrow
+def test_storage_format_performance(tmp_path):
+    run_benchmark(str(tmp_path))
+
+
+def run_benchmark(base_dir, histories=2000, days=750):
+    """对比csv/parquet/feather在数千只A股历史上的读取延迟与磁盘占用"""
+    print(f"\n⚡ 缓存存储格式对比 ({histories}只股票 × {days}个交易日)")
+    frames = [(f"{i:06d}", _make_history(f"{i:06d}", days, seed=i)) for i in range(histories)]
+
+    for storage_format in ("csv", "parquet", "feather"):
+        cache_dir = os.path.join(base_dir, storage_format)
+        cache = StockDataCache(cache_dir=cache_dir, storage_format=storage_format)
+        keys = [cache.save_stock_data(symbol, frame, "2021-01-01", "2023-12-31", "tushare")
+                for symbol, frame in frames]
+
+        start = time.perf_counter()
+        for key in keys:
+            cache.load_stock_data(key)
+        load_ms = (time.perf_counter() - start) * 1000 / len(keys)
+
+        size_mb = sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, names in os.walk(cache.china_stock_dir) for name in names
+        ) / (1024 * 1024)
+        print(f"  {storage_format:>7}: 平均读取 {load_ms:6.2f}ms/只 | 磁盘 {size_mb:8.1f}MB")
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        run_benchmark(tmp_dir)
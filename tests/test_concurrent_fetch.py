@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+并发数据获取测试
+验证结果顺序确定、单个慢接口超时后降级为部分数据、同源并发上限，
+以及 get_fundamentals_finnhub 与 FundamentalsDataCollector 的并发模式
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from tradingagents.dataflows import concurrent_fetch
+from tradingagents.dataflows.concurrent_fetch import FetchTask, fetch_concurrently, get_fetch_stats
+
+
+def _sleeper(value, seconds):
+    def fn():
+        time.sleep(seconds)
+        return value
+    return fn
+
+
+def test_results_in_task_order_and_run_concurrently():
+    tasks = [FetchTask(f"t{i}", _sleeper(i, 0.3 - i * 0.1), source=f"s{i}") for i in range(3)]
+    start = time.perf_counter()
+    results = fetch_concurrently(tasks)
+    assert time.perf_counter() - start < 0.5
+    assert list(results) == ["t0", "t1", "t2"]
+    assert [r.value for r in results.values()] == [0, 1, 2]
+
+
+def test_slow_task_times_out_without_blocking():
+    def boom():
+        raise ConnectionError("refused")
+
+    start = time.perf_counter()
+    results = fetch_concurrently([
+        FetchTask("fast", _sleeper("ok", 0.01), source="timeout_test"),
+        FetchTask("slow", _sleeper("late", 2.0), source="timeout_test", timeout=0.2),
+        FetchTask("broken", boom, source="timeout_test"),
+    ])
+    assert time.perf_counter() - start < 1.0
+    assert results["fast"].ok and results["fast"].value == "ok"
+    assert results["slow"].timed_out and results["slow"].value is None
+    assert isinstance(results["broken"].error, ConnectionError)
+
+    stats = get_fetch_stats()["timeout_test"]
+    assert stats["calls"] == 3 and stats["timeouts"] == 1 and stats["errors"] == 1
+
+
+def test_source_concurrency_limit(monkeypatch):
+    monkeypatch.setenv("FETCH_CONCURRENCY_LIMITED", "2")
+    monkeypatch.setattr(concurrent_fetch, "_source_semaphores", {})
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def tracked():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+
+    fetch_concurrently([FetchTask(f"t{i}", tracked, source="limited") for i in range(6)])
+    assert peak[0] == 2
+
+
+def test_finnhub_fundamentals_partial_on_timeout(monkeypatch):
+    finnhub = pytest.importorskip("finnhub")
+    from tradingagents.dataflows import cache_manager, interface
+
+    class FakeClient:
+        def __init__(self, api_key):
+            pass
+
+        def company_basic_financials(self, ticker, metric):
+            time.sleep(0.1)
+            return {"metric": {"peBasicExclExtraTTM": 25.0}}
+
+        def company_profile2(self, symbol):
+            time.sleep(0.1)
+            return {"name": "Apple Inc"}
+
+        def company_earnings(self, ticker, limit):
+            time.sleep(3)
+            return [{"period": "2024-03-31", "actual": 1.5}]
+
+    class FakeCache:
+        saved = []
+
+        def find_cached_fundamentals_data(self, *args, **kwargs):
+            return None
+
+        def save_fundamentals_data(self, *args, **kwargs):
+            self.saved.append(args)
+
+    monkeypatch.setenv("FINNHUB_API_KEY", "test")
+    monkeypatch.setenv("FINNHUB_FETCH_TIMEOUT", "0.5")
+    monkeypatch.setattr(finnhub, "Client", FakeClient)
+    monkeypatch.setattr(cache_manager, "get_cache", lambda: FakeCache())
+
+    start = time.perf_counter()
+    report = interface.get_fundamentals_finnhub("AAPL", "2024-05-01")
+    assert time.perf_counter() - start < 1.5
+    assert "Apple Inc" in report and "| 市盈率 (PE) | 25.00 |" in report
+    assert "## 收益历史" not in report
+    assert FakeCache.saved == []
+
+
+def test_collector_concurrent_merge_matches_serial(monkeypatch):
+    from tradingagents.agents.analysts.fundamentals.data_collector import FundamentalsDataCollector
+
+    def slow_tushare(self, financial_data, years):
+        time.sleep(0.2)
+        financial_data.revenue["2023"] = 500.0
+        financial_data.pe_ratio = 12.0
+
+    def slow_akshare(self, financial_data, years):
+        time.sleep(0.2)
+        financial_data.net_income["2023"] = 50.0
+
+    monkeypatch.setattr(FundamentalsDataCollector, "_collect_from_tushare", slow_tushare)
+    monkeypatch.setattr(FundamentalsDataCollector, "_collect_from_akshare", slow_akshare)
+    market_info = {"is_china": True}
+    monkeypatch.setattr(FundamentalsDataCollector, "_get_china_company_info",
+                        lambda self, symbol: {"symbol": symbol, "name": "测试", "market": "china", "sector": "x"})
+
+    sources = ["tushare", "akshare", "fallback"]
+    serial = FundamentalsDataCollector(concurrent=False)._collect_all_financial_data("000001", market_info, sources, 3)
+    start = time.perf_counter()
+    merged = FundamentalsDataCollector()._collect_all_financial_data("000001", market_info, sources, 3)
+    assert time.perf_counter() - start < 0.35
+    assert merged == serial
+    assert merged.data_sources == ["tushare", "akshare"]
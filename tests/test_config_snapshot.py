@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+配置快照测试
+验证定价/模型/设置的内存快照在文件变化或保存时失效、返回值互不影响，并对比 track_usage 吞吐
+"""
+
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from tradingagents.config.config_manager import ConfigManager, PricingConfig, TokenTracker
+
+
+def _bump_mtime(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_files_parsed_once(tmp_path, monkeypatch):
+    config_manager = ConfigManager(str(tmp_path))
+    config_manager.calculate_cost("dashscope", "qwen-turbo", 1000, 500)
+    config_manager.load_settings()
+    config_manager.get_enabled_models()
+
+    calls = []
+    original_load = json.load
+    monkeypatch.setattr(json, "load", lambda f, *a, **kw: calls.append(f.name) or original_load(f, *a, **kw))
+
+    for _ in range(10):
+        config_manager.calculate_cost("dashscope", "qwen-turbo", 1000, 500)
+        config_manager.load_settings()
+        config_manager.get_model_by_name("dashscope", "qwen-turbo")
+    assert calls == []
+
+
+def test_external_edit_invalidates_snapshot(tmp_path):
+    config_manager = ConfigManager(str(tmp_path))
+    before = config_manager.calculate_cost("dashscope", "qwen-turbo", 1000, 0)
+
+    pricing_file = tmp_path / "pricing.json"
+    data = json.loads(pricing_file.read_text(encoding="utf-8"))
+    for item in data:
+        if item["provider"] == "dashscope" and item["model_name"] == "qwen-turbo":
+            item["input_price_per_1k"] *= 10
+    pricing_file.write_text(json.dumps(data), encoding="utf-8")
+    _bump_mtime(pricing_file)
+
+    assert config_manager.calculate_cost("dashscope", "qwen-turbo", 1000, 0) == pytest.approx(before * 10)
+
+
+def test_save_invalidates_and_returned_values_are_copies(tmp_path):
+    config_manager = ConfigManager(str(tmp_path))
+
+    settings = config_manager.load_settings()
+    settings["cost_alert_threshold"] = 1.0
+    assert config_manager.load_settings()["cost_alert_threshold"] == 100.0
+    config_manager.save_settings(settings)
+    assert config_manager.load_settings()["cost_alert_threshold"] == 1.0
+
+    pricing = config_manager.load_pricing()
+    pricing[0].input_price_per_1k = 999
+    assert config_manager.load_pricing()[0].input_price_per_1k != 999
+    config_manager.save_pricing(pricing + [PricingConfig("test", "m", 1.0, 2.0)])
+    assert config_manager.calculate_cost("test", "m", 1000, 1000) == 3.0
+
+
+def test_concurrent_lookups(tmp_path):
+    config_manager = ConfigManager(str(tmp_path))
+    expected = config_manager.calculate_cost("dashscope", "qwen-plus", 2000, 1000)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        costs = list(pool.map(
+            lambda _: config_manager.calculate_cost("dashscope", "qwen-plus", 2000, 1000), range(200)))
+    assert costs == [expected] * 200
+
+
+@pytest.mark.skipif(
+    not os.getenv("ENABLE_PERFORMANCE_TESTS"),
+    reason="性能测试已禁用，使用 ENABLE_PERFORMANCE_TESTS=1 启用"
+)
+def test_track_usage_throughput(tmp_path):
+    run_benchmark(str(tmp_path))
+
+
+def run_benchmark(config_dir, calls=2000):
+    """对比每次重新解析配置文件（旧行为）与使用快照时 track_usage 的吞吐"""
+    config_manager = ConfigManager(config_dir)
+    tracker = TokenTracker(config_manager)
+
+    def measure(invalidate):
+        start = time.perf_counter()
+        for i in range(calls):
+            if invalidate:
+                config_manager._snapshots.clear()
+            tracker.track_usage("dashscope", "qwen-turbo", 1000, 500, session_id=f"bench{i % 10}")
+        return calls / (time.perf_counter() - start)
+
+    before = measure(invalidate=True)
+    after = measure(invalidate=False)
+    config_manager.usage_ledger.flush()
+    print(f"\n⚡ track_usage吞吐: 每次解析 {before:,.0f}次/秒 | 快照 {after:,.0f}次/秒")
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        run_benchmark(tmp_dir)
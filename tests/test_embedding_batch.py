@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+批量Embedding测试
+验证 get_embeddings 按服务上限分块、去重、保持顺序，批量失败时逐条降级，以及 add_situations 的批量写入
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+pytest.importorskip("chromadb")
+
+from tradingagents.agents.utils import memory as memory_module
+from tradingagents.agents.utils.embedding_cache import EmbeddingCache
+from tradingagents.agents.utils.memory import FinancialSituationMemory
+
+
+def _vector(text):
+    return [float(len(text)), 1.0]
+
+
+class FakeBatchClient:
+    """模拟OpenAI兼容客户端，乱序返回以验证按index还原"""
+
+    def __init__(self):
+        self.base_url = "https://example.invalid/v1"
+        self.requests = []
+        self.fail_batches = False
+        self.embeddings = SimpleNamespace(create=self._create)
+
+    def _create(self, model, input):
+        self.requests.append(input)
+        if isinstance(input, list):
+            if self.fail_batches:
+                raise ConnectionError("batch endpoint unavailable")
+            data = [SimpleNamespace(index=i, embedding=_vector(t)) for i, t in enumerate(input)]
+            return SimpleNamespace(data=list(reversed(data)))
+        return SimpleNamespace(data=[SimpleNamespace(index=0, embedding=_vector(input))])
+
+
+@pytest.fixture
+def memory(monkeypatch):
+    monkeypatch.setattr(memory_module, "get_embedding_cache", lambda: EmbeddingCache(max_entries=1000))
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    config = {"llm_provider": "openai", "backend_url": "https://example.invalid/v1"}
+    memory = FinancialSituationMemory(f"batch_memory_{id(monkeypatch)}", config)
+    memory.client = FakeBatchClient()
+    return memory
+
+
+def test_batches_are_chunked_deduplicated_and_ordered(memory, monkeypatch):
+    monkeypatch.setenv("EMBEDDING_BATCH_SIZE", "4")
+    texts = [f"situation {'x' * i}" for i in range(10)] + ["situation "]
+
+    embeddings = memory.get_embeddings(texts)
+    assert embeddings == [_vector(t) for t in texts]
+    assert [len(r) for r in memory.client.requests] == [4, 4, 2]
+
+    # 再次请求全部命中缓存
+    memory.get_embeddings(texts)
+    assert len(memory.client.requests) == 3
+
+
+def test_batch_failure_falls_back_to_single_requests(memory):
+    memory.client.fail_batches = True
+    texts = ["a", "bb", "ccc"]
+    assert memory.get_embeddings(texts) == [_vector(t) for t in texts]
+    assert memory.client.requests[1:] == texts
+
+
+def test_dashscope_batch_limit(monkeypatch):
+    monkeypatch.setattr(memory_module, "get_embedding_cache", lambda: EmbeddingCache(max_entries=1000))
+    monkeypatch.setenv("DASHSCOPE_API_KEY", "test-key")
+    monkeypatch.delenv("EMBEDDING_BATCH_SIZE", raising=False)
+    import dashscope
+
+    calls = []
+
+    def fake_call(model, input):
+        calls.append(input)
+        items = [{"text_index": i, "embedding": _vector(t)} for i, t in enumerate(input)]
+        return SimpleNamespace(status_code=200, output={"embeddings": items[::-1]})
+
+    monkeypatch.setattr(dashscope.TextEmbedding, "call", fake_call)
+    memory = FinancialSituationMemory("dashscope_batch_memory", {"llm_provider": "dashscope", "backend_url": ""})
+    texts = [f"t{i}" for i in range(25)]
+    assert memory.get_embeddings(texts) == [_vector(t) for t in texts]
+    assert [len(c) for c in calls] == [10, 10, 5]
+
+
+def test_add_situations_backfill(memory):
+    history = [(f"historical situation {i}", f"advice {i}") for i in range(300)]
+    memory.add_situations(history)
+
+    assert memory.situation_collection.count() == 300
+    assert len(memory.client.requests) == 1
+    matches = memory.get_memories("historical situation 42", n_matches=1)
+    assert matches and matches[0]["recommendation"].startswith("advice")
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Embedding缓存测试
+验证五个记忆实例对同一情境文本只请求一次嵌入API，失败的零向量不缓存，以及磁盘持久层
+"""
+
+import os
+import sys
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+pytest.importorskip("chromadb")
+
+from tradingagents.agents.utils import memory as memory_module
+from tradingagents.agents.utils.embedding_cache import (
+    EmbeddingCache, FileEmbeddingStore, make_embedding_key
+)
+from tradingagents.agents.utils.memory import FinancialSituationMemory
+
+
+class FakeEmbeddingClient:
+    """模拟OpenAI兼容的嵌入客户端，记录请求次数"""
+
+    def __init__(self, fail=False):
+        self.base_url = "https://example.invalid/v1"
+        self.calls = []
+        self.fail = fail
+        self.embeddings = SimpleNamespace(create=self._create)
+
+    def _create(self, model, input):
+        self.calls.append(input)
+        if self.fail:
+            raise ConnectionError("connection refused")
+        vector = [float(len(input) % 7 + 1), 0.5, 0.25]
+        return SimpleNamespace(data=[SimpleNamespace(embedding=vector)])
+
+
+@pytest.fixture
+def shared_cache(monkeypatch):
+    cache = EmbeddingCache(max_entries=8)
+    monkeypatch.setattr(memory_module, "get_embedding_cache", lambda: cache)
+    return cache
+
+
+def _make_memories(monkeypatch, client, names):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    config = {"llm_provider": "openai", "backend_url": "https://example.invalid/v1"}
+    memories = []
+    for name in names:
+        memory = FinancialSituationMemory(name, config)
+        memory.client = client
+        memories.append(memory)
+    return memories
+
+
+def test_five_memories_share_one_request(monkeypatch, shared_cache):
+    client = FakeEmbeddingClient()
+    names = ["bull_memory", "bear_memory", "trader_memory", "invest_judge_memory", "risk_manager_memory"]
+    memories = _make_memories(monkeypatch, client, names)
+    curr_situation = "市场报告\n\n情绪报告\n\n新闻报告\n\n基本面报告" * 200
+
+    embeddings = [m.get_embedding(curr_situation) for m in memories]
+    assert len(client.calls) == 1
+    assert all(e == embeddings[0] for e in embeddings)
+
+    info = memories[-1].get_cache_info()["embedding_cache"]
+    assert info["misses"] == 1 and info["hits"] == 4
+
+
+def test_concurrent_lookups_coalesce(monkeypatch, shared_cache):
+    client = FakeEmbeddingClient()
+    memories = _make_memories(monkeypatch, client, ["bull_memory", "bear_memory"])
+    started = threading.Event()
+    original_create = client._create
+
+    def slow_create(model, input):
+        started.set()
+        threading.Event().wait(0.2)
+        return original_create(model, input)
+
+    client.embeddings.create = slow_create
+    threads = [threading.Thread(target=m.get_embedding, args=("same text",)) for m in memories]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(client.calls) == 1
+
+
+def test_failed_embedding_not_cached(monkeypatch, shared_cache):
+    client = FakeEmbeddingClient(fail=True)
+    memory, = _make_memories(monkeypatch, client, ["bull_memory"])
+
+    assert memory.get_embedding("text") == [0.0] * 1024
+    client.fail = False
+    assert memory.get_embedding("text") != [0.0] * 1024
+    assert len(client.calls) == 2
+
+
+def test_key_separates_provider_and_model():
+    keys = {
+        make_embedding_key("dashscope", "text-embedding-v3", "a"),
+        make_embedding_key("openai@x", "text-embedding-v3", "a"),
+        make_embedding_key("dashscope", "text-embedding-v2", "a"),
+        make_embedding_key("dashscope", "text-embedding-v3", "b"),
+    }
+    assert len(keys) == 4
+
+
+def test_lru_and_file_store(tmp_path):
+    store = FileEmbeddingStore(str(tmp_path))
+    cache = EmbeddingCache(max_entries=2, store=store)
+    for i in range(3):
+        cache.put(f"p:m:{i}", [float(i), 0.1])
+    assert cache.get_stats()["size"] == 2
+
+    # 新进程：LRU为空，从磁盘命中
+    restarted = EmbeddingCache(max_entries=2, store=FileEmbeddingStore(str(tmp_path)))
+    assert restarted.get("p:m:0") == [0.0, 0.1]
+    assert restarted.get_stats()["store_hits"] == 1
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+增强新闻过滤器批量推理测试
+用计数的假语义模型验证：整表按批编码、公司查询向量按 (股票代码, 公司名称) 只编码一次、
+持久化向量缓存让同日重跑完全跳过编码，且评分与逐条计算一致
+"""
+
+import os
+import sys
+import types
+import zlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from tradingagents.agents.utils.embedding_cache import EmbeddingCache, FileEmbeddingStore
+from tradingagents.utils import enhanced_news_filter
+from tradingagents.utils.enhanced_news_filter import EnhancedNewsFilter
+
+
+class FakeSentenceTransformer:
+    """按字符哈希生成确定性向量，并记录每次encode的批大小"""
+
+    calls = []
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+    def encode(self, texts, batch_size=32):
+        FakeSentenceTransformer.calls.append(list(texts))
+        vectors = np.zeros((len(texts), 16), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for ch in text:
+                vectors[i, zlib.crc32(ch.encode("utf-8")) % 16] += 1.0
+        return vectors
+
+
+@pytest.fixture
+def fake_model(monkeypatch, tmp_path):
+    module = types.ModuleType("sentence_transformers")
+    module.SentenceTransformer = FakeSentenceTransformer
+    monkeypatch.setitem(sys.modules, "sentence_transformers", module)
+    monkeypatch.setattr(enhanced_news_filter, "_shared_models", {})
+    monkeypatch.setattr(enhanced_news_filter, "_company_embeddings", {})
+    store = FileEmbeddingStore(str(tmp_path / "embeddings"))
+    caches = [EmbeddingCache(max_entries=1000, store=store)]
+    monkeypatch.setattr(enhanced_news_filter, "_get_news_embedding_cache", lambda: caches[-1])
+    FakeSentenceTransformer.calls = []
+    return caches, store
+
+
+def _news(count):
+    templates = ["招商银行发布第{i}期业绩报告", "银行ETF指数基金第{i}次调仓", "招商银行股东大会第{i}次会议",
+                 "市场综述{i}：两市成交放量"]
+    return pd.DataFrame({
+        "新闻标题": [templates[i % 4].format(i=i) for i in range(count)],
+        "新闻内容": [f"第{i}条新闻正文，招商银行600036相关内容" * (i % 3) for i in range(count)],
+        "url": [f"https://example.com/{i}" for i in range(count)],
+    })
+
+
+def _legacy_filter(news_filter, news_df, min_score):
+    """逐条计算增强评分的参考实现"""
+    rows = []
+    for _, row in news_df.iterrows():
+        scores = news_filter.calculate_enhanced_relevance_score(row["新闻标题"], row["新闻内容"])
+        if scores["final_score"] >= min_score:
+            rows.append({**row.to_dict(), **scores})
+    return pd.DataFrame(rows).sort_values("final_score", ascending=False)
+
+
+def test_batched_scores_match_per_item(fake_model):
+    news_df = _news(50)
+    news_filter = EnhancedNewsFilter("600036", "招商银行", use_semantic=True, batch_size=8)
+    assert news_filter.use_semantic
+
+    batched = news_filter.filter_news_enhanced(news_df, min_score=40)
+    expected = _legacy_filter(news_filter, news_df, min_score=40)
+    pd.testing.assert_frame_equal(batched, expected, check_dtype=False)
+    assert 0 < len(batched) < len(news_df)
+
+
+def test_batches_and_query_embedding_cached(fake_model):
+    news_df = _news(50)
+    first = EnhancedNewsFilter("600036", "招商银行", use_semantic=True, batch_size=8)
+    second = EnhancedNewsFilter("600036", "招商银行", use_semantic=True, batch_size=8)
+    assert second.sentence_model is first.sentence_model
+    assert second.company_embedding is first.company_embedding
+    assert len(FakeSentenceTransformer.calls) == 1  # 公司查询只编码一次
+
+    FakeSentenceTransformer.calls = []
+    first.filter_news_enhanced(news_df)
+    assert [len(batch) for batch in FakeSentenceTransformer.calls] == [8] * 6 + [2]
+
+
+def test_persistent_cache_skips_encoding_on_rerun(fake_model):
+    caches, store = fake_model
+    news_df = _news(30)
+    first_run = EnhancedNewsFilter("600036", "招商银行", use_semantic=True).filter_news_enhanced(news_df)
+
+    # 模拟新进程：进程内缓存清空，只剩持久层
+    caches.append(EmbeddingCache(max_entries=1000, store=store))
+    enhanced_news_filter._shared_models.clear()
+    FakeSentenceTransformer.calls = []
+    rerun_filter = EnhancedNewsFilter("600036", "招商银行", use_semantic=True)
+    FakeSentenceTransformer.calls = []
+    rerun = rerun_filter.filter_news_enhanced(news_df)
+
+    assert FakeSentenceTransformer.calls == []
+    assert caches[-1].get_stats()["store_hits"] == 30
+    pd.testing.assert_frame_equal(rerun, first_run)
+
+
+def test_rule_only_output_unchanged():
+    news_df = _news(20)
+    news_filter = EnhancedNewsFilter("600036", "招商银行", use_semantic=False)
+    pd.testing.assert_frame_equal(news_filter.filter_news_enhanced(news_df, min_score=30),
+                                  _legacy_filter(news_filter, news_df, min_score=30))
+
+
+def test_news_cache_is_separate_from_memory_cache(monkeypatch):
+    from tradingagents.agents.utils.embedding_cache import get_embedding_cache
+
+    monkeypatch.delenv("NEWS_EMBEDDING_CACHE_BACKEND", raising=False)
+    monkeypatch.setenv("NEWS_EMBEDDING_CACHE_SIZE", "4096")
+    monkeypatch.setattr(enhanced_news_filter, "_news_embedding_cache", None)
+
+    cache = enhanced_news_filter._get_news_embedding_cache()
+    assert cache is not get_embedding_cache()
+    assert cache.get_stats()["max_entries"] == 4096 and cache.get_stats()["store"] is None
+    assert enhanced_news_filter._get_news_embedding_cache() is cache
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Finnhub离线数据读取器测试
+验证每个文件只解析一次、区间查询结果（含原始键顺序）与逐键过滤一致、文件修改后失效，以及批量预加载
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from tradingagents.dataflows import finnhub_utils, interface
+from tradingagents.dataflows.finnhub_utils import FinnhubDataReader, get_data_in_range
+
+# 故意乱序并包含空列表，验证输出保持原文件顺序且过滤空值
+NEWS = {
+    "2024-03-05": [{"headline": "B", "summary": "b"}],
+    "2024-03-01": [{"headline": "A", "summary": "a"}],
+    "2024-03-03": [],
+    "2024-03-09": [{"headline": "D", "summary": "d"}],
+    "2024-03-07": [{"headline": "C", "summary": "c"}],
+}
+SENTI = {"2024-03-02": [{"year": 2024, "month": 2, "change": 10, "mspr": 0.5}]}
+
+
+def _write(data_dir, data_type, ticker, data):
+    path = os.path.join(data_dir, "finnhub_data", data_type, f"{ticker}_data_formatted.json")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    return path
+
+
+@pytest.fixture
+def reader(tmp_path, monkeypatch):
+    reader = FinnhubDataReader()
+    monkeypatch.setattr(finnhub_utils, "_reader", reader)
+    monkeypatch.setattr(interface, "DATA_DIR", str(tmp_path))
+    _write(str(tmp_path), "news_data", "AAPL", NEWS)
+    _write(str(tmp_path), "insider_senti", "AAPL", SENTI)
+    return reader
+
+
+@pytest.mark.parametrize("start,end", [
+    ("2024-03-01", "2024-03-09"), ("2024-03-02", "2024-03-07"), ("2024-03-10", "2024-03-20"),
+    ("2024-02-01", "2024-03-01"), ("2024-03-06", "2024-03-06")])
+def test_range_matches_linear_filter(tmp_path, reader, start, end):
+    expected = {k: v for k, v in NEWS.items() if start <= k <= end and len(v) > 0}
+    result = get_data_in_range("AAPL", start, end, "news_data", str(tmp_path))
+    assert result == expected
+    assert list(result) == list(expected)
+
+
+def test_each_file_parsed_once(tmp_path, reader, monkeypatch):
+    calls = []
+    original_load = json.load
+    monkeypatch.setattr(json, "load", lambda f, *a, **kw: calls.append(f.name) or original_load(f, *a, **kw))
+
+    for look_back in (3, 7, 15):
+        assert "### C (2024-03-07)" in interface.get_finnhub_news("AAPL", "2024-03-08", look_back)
+        interface.get_finnhub_company_insider_sentiment("AAPL", "2024-03-08", look_back)
+        interface.get_finnhub_company_insider_transactions("AAPL", "2024-03-08", look_back)
+    assert len(calls) == 2
+    assert reader.get_stats()["loads"] == 2
+
+
+def test_modified_file_is_reloaded(tmp_path, reader):
+    assert get_data_in_range("AAPL", "2024-03-10", "2024-03-31", "news_data", str(tmp_path)) == {}
+    path = _write(str(tmp_path), "news_data", "AAPL", {**NEWS, "2024-03-12": [{"headline": "E", "summary": "e"}]})
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert list(get_data_in_range("AAPL", "2024-03-10", "2024-03-31", "news_data", str(tmp_path))) == ["2024-03-12"]
+
+
+def test_preload_warms_cache(tmp_path, reader, monkeypatch):
+    assert finnhub_utils.preload(["AAPL", "MSFT"], ["news_data", "insider_senti"], data_dir=str(tmp_path)) == 2
+
+    monkeypatch.setattr(json, "load", lambda *a, **kw: pytest.fail("预加载后不应再次解析"))
+    assert get_data_in_range("AAPL", "2024-03-01", "2024-03-31", "insider_senti", str(tmp_path)) == SENTI
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+图实例池测试
+验证相同配置的第二次分析复用同一个已编译的图并重置单次运行状态、不同研究深度或API密钥使用不同实例、
+同一配置的并发上限及等待超时后新建不入池的实例、总容量的LRU淘汰和空闲过期淘汰
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from tradingagents.graph.graph_pool import GraphPool, env_fingerprint, make_graph_key
+
+
+class FakeGraph:
+    def __init__(self, analysts, config, debug):
+        self.analysts, self.config = analysts, config
+        self.resets = 0
+
+    def reset_for_run(self):
+        self.resets += 1
+
+
+def _config(**overrides):
+    return {"llm_provider": "openai", "deep_think_llm": "m", "quick_think_llm": "m", **overrides}
+
+
+def test_second_run_reuses_compiled_graph(monkeypatch):
+    pytest.importorskip("langgraph")
+    from tradingagents.default_config import DEFAULT_CONFIG
+
+    # 使用假密钥构建真实的 TradingAgentsGraph，构建过程不访问网络
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    config = {**DEFAULT_CONFIG, "llm_provider": "openai", "memory_enabled": False}
+    pool = GraphPool(max_size=2)
+
+    with pool.checkout(["market"], config) as first:
+        compiled = first.graph
+        first.curr_state, first.ticker = {"final_trade_decision": "BUY"}, "AAPL"
+        first.log_states_dict["2025-01-02"] = {}
+    with pool.checkout(["market"], config) as second:
+        assert second is first and second.graph is compiled
+        assert second.curr_state is None and second.ticker is None and second.log_states_dict == {}
+
+    deeper = {**config, "max_debate_rounds": 3}
+    with pool.checkout(["market"], deeper) as other:
+        assert other is not first
+    assert pool.get_stats()["builds"] == 2 and pool.get_stats()["hits"] == 1
+
+
+def test_key_depends_on_analysts_order_and_config():
+    assert make_graph_key(["market", "news"], _config()) == make_graph_key(["market", "news"], _config())
+    assert make_graph_key(["market", "news"], _config()) != make_graph_key(["news", "market"], _config())
+    assert make_graph_key(["market"], _config()) != make_graph_key(["market"], _config(max_debate_rounds=2))
+
+
+def test_key_changes_with_credentials(monkeypatch):
+    monkeypatch.setenv("DASHSCOPE_API_KEY", "sk-old")
+    before = make_graph_key(["market"], _config())
+    monkeypatch.setenv("TRADINGAGENTS_UNRELATED_SETTING", "x")
+    assert make_graph_key(["market"], _config()) == before
+
+    monkeypatch.setenv("DASHSCOPE_API_KEY", "sk-new")
+    rotated = make_graph_key(["market"], _config())
+    assert rotated != before and "sk-new" not in env_fingerprint()
+    monkeypatch.setenv("OPENAI_BASE_URL", "https://proxy.example.com/v1")
+    assert make_graph_key(["market"], _config()) != rotated
+
+    pool = GraphPool(factory=FakeGraph)
+    with pool.checkout(["market"], _config()) as first:
+        pass
+    monkeypatch.setenv("DASHSCOPE_API_KEY", "sk-newer")
+    with pool.checkout(["market"], _config()) as second:
+        assert second is not first
+
+
+def test_per_key_concurrency_limit():
+    pool = GraphPool(max_size=4, max_per_key=1, factory=FakeGraph)
+    graph = pool.acquire(["market"], _config())
+
+    with pytest.raises(TimeoutError):
+        pool.acquire(["market"], _config(), timeout=0.05)
+
+    # 不同配置不受影响
+    other = pool.acquire(["news"], _config())
+    assert other is not graph
+
+    acquired = []
+    waiter = threading.Thread(target=lambda: acquired.append(pool.acquire(["market"], _config())))
+    waiter.start()
+    time.sleep(0.1)
+    assert not acquired
+    pool.release(graph)
+    waiter.join(timeout=1)
+    assert acquired == [graph] and graph.resets == 2
+
+
+def test_checkout_timeout_reports_wait_and_builds_unpooled():
+    pool = GraphPool(max_size=4, max_per_key=1, factory=FakeGraph)
+    waits = []
+    with pool.checkout(["market"], _config()) as first:
+        with pytest.raises(TimeoutError):
+            with pool.checkout(["market"], _config(), timeout=0.05, on_wait=lambda: waits.append(1)):
+                pass
+        with pool.checkout(["market"], _config(), timeout=0.05, build_on_timeout=True) as overflow:
+            assert overflow is not first
+    assert waits == [1]
+
+    # 不入池的实例归还后不保留，池中只有第一个实例
+    stats = pool.get_stats()
+    assert stats["overflow_builds"] == 1 and stats["total"] == 1 and stats["idle"] == 1
+    with pool.checkout(["market"], _config()) as reused:
+        assert reused is first
+
+
+def test_bounded_size_evicts_least_recently_used():
+    pool = GraphPool(max_size=2, max_per_key=0, factory=FakeGraph)
+    for analysts in (["market"], ["news"], ["social"]):
+        with pool.checkout(analysts, _config()):
+            pass
+
+    stats = pool.get_stats()
+    assert (stats["total"], stats["idle"], stats["evictions"]) == (2, 2, 1)
+    with pool.checkout(["market"], _config()):
+        pass
+    assert pool.get_stats()["builds"] == 4
+
+    # 借出中的实例超过容量时，归还后丢弃而不是保留
+    held = [pool.acquire([name], _config()) for name in ("a", "b", "c")]
+    for graph in held:
+        pool.release(graph)
+    assert pool.get_stats()["total"] == 2 and pool.get_stats()["discarded"] == 1
+
+
+def test_idle_instances_expire():
+    pool = GraphPool(max_size=2, idle_ttl=0.05, factory=FakeGraph)
+    with pool.checkout(["market"], _config()) as first:
+        pass
+    time.sleep(0.1)
+    pool.evict_idle()
+    assert pool.get_stats()["idle"] == 0
+    with pool.checkout(["market"], _config()) as second:
+        assert second is not first
+
+
+def test_failed_build_releases_slot():
+    def failing(analysts, config, debug):
+        raise ValueError("bad key")
+
+    pool = GraphPool(max_size=2, max_per_key=1, factory=failing)
+    with pytest.raises(ValueError):
+        pool.acquire(["market"], _config())
+    with pytest.raises(ValueError):
+        pool.acquire(["market"], _config(), timeout=0.05)  # 失败后不占用并发名额
+    assert pool.get_stats()["total"] == 0
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+数据源对冲降级测试
+用注入延迟和失败的假数据源验证：首选数据源慢时并行启动备用数据源并采用先返回的结果、
+明确失败时立即降级、按p95计算对冲延迟、按健康统计调整顺序，以及数据源管理器的集成
+"""
+
+import os
+import sys
+import time
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from tradingagents.dataflows.hedged_fetch import (
+    DataSourceError, HedgedFetcher, SourceHealth
+)
+
+
+def fake_source(value, delay=0.0, error=None, calls=None):
+    def call():
+        if calls is not None:
+            calls.append(value)
+        time.sleep(delay)
+        if error is not None:
+            raise error
+        return value
+    return call
+
+
+def _fetcher(**kwargs):
+    kwargs.setdefault("health", SourceHealth(min_samples=3))
+    kwargs.setdefault("default_delay", 0.1)
+    kwargs.setdefault("min_delay", 0.01)
+    return HedgedFetcher(**kwargs)
+
+
+def test_slow_primary_is_hedged():
+    fetcher = _fetcher()
+    start = time.monotonic()
+    result = fetcher.fetch([("akshare", fake_source("slow", delay=1.0)), ("tushare", fake_source("fast", 0.05))])
+    elapsed = time.monotonic() - start
+
+    assert result.ok and result.source == "tushare" and result.value == "fast"
+    assert elapsed < 0.5  # 约等于 对冲延迟 + 备用数据源耗时，而不是首选数据源的1秒
+
+
+def test_fast_primary_does_not_start_fallback():
+    calls = []
+    result = _fetcher().fetch([("akshare", fake_source("a", 0.01, calls=calls)),
+                               ("tushare", fake_source("t", calls=calls))])
+    assert result.source == "akshare" and calls == ["a"]
+
+
+def test_failure_falls_back_immediately():
+    fetcher = _fetcher(default_delay=5.0)
+    start = time.monotonic()
+    result = fetcher.fetch([("akshare", fake_source(None, error=ConnectionError("reset"))),
+                            ("tushare", fake_source("t"))])
+    assert result.value == "t" and time.monotonic() - start < 1.0
+    assert [a.source for a in result.attempts] == ["akshare", "tushare"]
+    assert "reset" in str(result.attempts[0].error)
+
+
+def test_invalid_value_counts_as_failure():
+    result = _fetcher().fetch([("akshare", fake_source({"name": "股票000001"})),
+                               ("baostock", fake_source({"name": "平安银行"}))],
+                              validate=lambda info: info["name"] != "股票000001")
+    assert result.source == "baostock"
+    assert isinstance(result.attempts[0].error, DataSourceError)
+
+
+def test_all_sources_fail():
+    result = _fetcher().fetch([("akshare", fake_source(None, error=DataSourceError("❌ 空数据"))),
+                               ("tushare", fake_source(None, error=ValueError("no token")))])
+    assert not result.ok and result.value is None
+    assert "空数据" in result.error_message and "no token" in result.error_message
+    assert _fetcher().fetch([]).error_message == "没有可用的数据源"
+
+
+def test_overall_timeout():
+    start = time.monotonic()
+    result = _fetcher(timeout=0.3).fetch([("akshare", fake_source("a", 2.0)), ("tushare", fake_source("t", 2.0))])
+    assert not result.ok and time.monotonic() - start < 1.0
+    assert all(a.timed_out for a in result.attempts) and len(result.attempts) == 2
+    assert "超时" in result.error_message
+
+
+def test_hedge_delay_uses_p95():
+    health = SourceHealth(min_samples=3)
+    fetcher = _fetcher(health=health, default_delay=3.0, min_delay=0.2, max_delay=10.0)
+    assert fetcher.hedge_delay("akshare") == 3.0  # 样本不足
+
+    for elapsed in (0.5, 0.6, 0.7, 0.8, 1.5):
+        health.record("akshare", elapsed, True)
+    health.record("akshare", 30.0, False)  # 失败的耗时不计入分位数
+    assert fetcher.hedge_delay("akshare") == 1.5
+
+    for _ in range(5):
+        health.record("tushare", 0.01, True)
+        health.record("baostock", 60.0, True)
+    assert fetcher.hedge_delay("tushare") == 0.2
+    assert fetcher.hedge_delay("baostock") == 10.0
+
+
+def test_auto_reorder_by_health():
+    health = SourceHealth(min_samples=3)
+    for _ in range(5):
+        health.record("akshare", 2.0, True)
+        health.record("tushare", 0.1, True)
+        health.record("baostock", 0.05, False)
+    assert health.order(["akshare", "tushare", "baostock", "new"]) == ["tushare", "akshare", "new", "baostock"]
+
+    calls = []
+    result = _fetcher(health=health).fetch([("akshare", fake_source("a", calls=calls)),
+                                            ("tushare", fake_source("t", calls=calls))])
+    assert result.source == "tushare" and calls == ["t"]
+
+    calls.clear()
+    result = _fetcher(health=health, auto_reorder=False).fetch([("akshare", fake_source("a", calls=calls)),
+                                                                ("tushare", fake_source("t", calls=calls))])
+    assert result.source == "akshare" and calls == ["a"]
+
+    stats = health.get_stats()
+    assert stats["baostock"]["error_rate"] == 1.0 and stats["tushare"]["p50_seconds"] == 0.1
+
+
+def test_hanging_primary_is_demoted():
+    health = SourceHealth(min_samples=3)
+    fetcher = _fetcher(health=health, default_delay=0.05)
+    sources = [("akshare", fake_source("a", delay=0.5)), ("tushare", fake_source("t"))]
+    for _ in range(3):
+        assert fetcher.fetch(sources).source == "tushare"
+
+    # 被放弃的请求记为失败，首选数据源排到最后，之后直接请求备用数据源
+    assert health.error_rate("akshare") == 1.0
+    assert health.order(["akshare", "tushare"]) == ["tushare", "akshare"]
+    calls = []
+    start = time.monotonic()
+    result = fetcher.fetch([("akshare", fake_source("a", delay=0.5, calls=calls)),
+                            ("tushare", fake_source("t", calls=calls))])
+    assert result.source == "tushare" and calls == ["t"] and time.monotonic() - start < 0.05
+
+
+def test_hedging_disabled_is_sequential():
+    calls = []
+    start = time.monotonic()
+    result = _fetcher(hedging=False).fetch([("akshare", fake_source("a", 0.3, calls=calls)),
+                                            ("tushare", fake_source("t", calls=calls))])
+    assert result.source == "akshare" and calls == ["a"] and time.monotonic() - start >= 0.3
+
+
+def test_data_source_manager_uses_hedged_fallback(monkeypatch):
+    from tradingagents.dataflows.data_source_manager import ChinaDataSource, DataSourceManager
+
+    manager = DataSourceManager()
+    manager.current_source = ChinaDataSource.TUSHARE
+    manager.available_sources = [ChinaDataSource.TUSHARE, ChinaDataSource.AKSHARE, ChinaDataSource.BAOSTOCK]
+    manager.hedged_fetcher = _fetcher()
+
+    def empty(symbol, start_date, end_date):
+        raise DataSourceError(f"❌ 未获取到{symbol}的有效数据")
+
+    monkeypatch.setattr(manager, "_load_tushare_data", lambda *args: time.sleep(1.0) or "tushare data")
+    monkeypatch.setattr(manager, "_load_akshare_data", empty)
+    monkeypatch.setattr(manager, "_load_baostock_data", lambda *args: "baostock data")
+
+    start = time.monotonic()
+    assert manager._fetch_stock_data("000001", "2025-01-01", "2025-01-31") == "baostock data"
+    assert time.monotonic() - start < 0.8
+
+    # 旧的单数据源接口仍返回错误字符串
+    assert manager._get_akshare_data("000001", "2025-01-01", "2025-01-31") == "❌ 未获取到000001的有效数据"
+
+    monkeypatch.setattr(manager, "_load_baostock_data", empty)
+    monkeypatch.setattr(manager, "_load_tushare_data", empty)
+    result = manager._fetch_stock_data("000001", "2025-01-01", "2025-01-31")
+    assert result.startswith("❌ 所有数据源都无法获取000001的数据")
+
+
+def test_data_source_manager_stock_info_fallback(monkeypatch):
+    from tradingagents.dataflows.data_source_manager import ChinaDataSource, DataSourceManager
+
+    manager = DataSourceManager()
+    manager.current_source = ChinaDataSource.AKSHARE
+    manager.available_sources = [ChinaDataSource.AKSHARE, ChinaDataSource.BAOSTOCK]
+    manager.hedged_fetcher = _fetcher()
+    monkeypatch.setattr(manager, "get_data_adapter", lambda: None)
+    monkeypatch.setattr(manager, "_get_akshare_stock_info",
+                        lambda symbol: {"symbol": symbol, "name": f"股票{symbol}", "error": "timeout"})
+    monkeypatch.setattr(manager, "_get_baostock_stock_info",
+                        lambda symbol: {"symbol": symbol, "name": "平安银行", "source": "baostock"})
+
+    assert manager._fetch_stock_info("000001")["name"] == "平安银行"
+
+    monkeypatch.setattr(manager, "_get_baostock_stock_info", lambda symbol: {"symbol": symbol, "name": ""})
+    assert manager._fetch_stock_info("000001") == {"symbol": "000001", "name": "股票000001", "source": "unknown"}
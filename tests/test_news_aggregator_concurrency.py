@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+实时新闻聚合器并发模式测试
+验证各新闻源同时请求、截止时间后只合并已返回的结果，合并顺序与顺序模式一致，以及每个新闻源的耗时/超时统计
+"""
+
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from tradingagents.dataflows.realtime_news_utils import NewsItem, RealtimeNewsAggregator
+
+
+def _item(title, minutes_ago, source):
+    return NewsItem(title=title, content="", source=source,
+                    publish_time=datetime(2024, 5, 1, 12) - timedelta(minutes=minutes_ago),
+                    url="", urgency="low", relevance_score=0.5)
+
+
+def _patch_sources(monkeypatch, delays):
+    def make(name, delay, items):
+        def fetch(self, ticker, hours_back):
+            time.sleep(delay)
+            return items
+        return fetch
+
+    monkeypatch.setattr(RealtimeNewsAggregator, "_get_finnhub_realtime_news", make(
+        "finnhub", delays[0], [_item("Shared headline about AAPL", 5, "FinnHub"), _item("FinnHub exclusive story", 1, "FinnHub")]))
+    monkeypatch.setattr(RealtimeNewsAggregator, "_get_alpha_vantage_news", make(
+        "av", delays[1], [_item("shared headline about aapl ", 5, "AV"), _item("Alpha Vantage analysis piece", 2, "AV")]))
+    monkeypatch.setattr(RealtimeNewsAggregator, "_get_newsapi_news", make(
+        "newsapi", delays[2], [_item("NewsAPI wire report item", 3, "NewsAPI")]))
+    monkeypatch.setattr(RealtimeNewsAggregator, "_get_chinese_finance_news", make(
+        "chinese", delays[3], [_item("中文财经新闻：苹果公司发布财报", 4, "东方财富")]))
+    monkeypatch.setenv("NEWSAPI_KEY", "test")
+
+
+def test_concurrent_matches_sequential(monkeypatch):
+    _patch_sources(monkeypatch, [0.2, 0.2, 0.2, 0.2])
+    sequential = RealtimeNewsAggregator(concurrent=False).get_realtime_stock_news("AAPL", 6)
+
+    start = time.perf_counter()
+    concurrent = RealtimeNewsAggregator(concurrent=True, deadline=5).get_realtime_stock_news("AAPL", 6)
+    assert time.perf_counter() - start < 0.6
+    assert concurrent == sequential
+    assert [n.source for n in concurrent if n.title.lower().startswith("shared")] == ["FinnHub"]
+
+
+def test_deadline_drops_late_sources(monkeypatch):
+    _patch_sources(monkeypatch, [0.05, 3.0, 0.05, 0.05])
+    aggregator = RealtimeNewsAggregator(concurrent=True, deadline=0.5)
+
+    start = time.perf_counter()
+    news = aggregator.get_realtime_stock_news("AAPL", 6)
+    assert time.perf_counter() - start < 1.5
+    assert {n.source for n in news} == {"FinnHub", "NewsAPI", "东方财富"}
+
+    report = aggregator.format_news_report(news, "AAPL")
+    assert "新闻总数: 4条" in report
+
+    stats = aggregator.get_source_stats()
+    assert stats["alpha_vantage"]["timeouts"] >= 1
+    assert stats["finnhub"]["calls"] >= 1 and stats["finnhub"]["avg_seconds"] > 0
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+新闻近似重复检测测试
+验证转载新闻（标题后缀/标点不同）被合并且保留报道数、不同新闻不被误合并，
+以及在实时新闻聚合器、NewsRelevanceFilter 和统一新闻工具中的使用；附带与两两比较的性能对比
+"""
+
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from tradingagents.utils.news_dedup import NearDuplicateDetector, normalize_news_text
+
+SUFFIXES = ["", "-东方财富网", "_新浪财经", " | 证券时报", "——财联社"]
+COMPANIES = ["招商银行", "贵州茅台", "宁德时代", "比亚迪", "中国平安", "五粮液", "隆基绿能", "海康威视",
+             "中芯国际", "迈瑞医疗", "美的集团", "格力电器", "紫金矿业", "万华化学", "恒瑞医药", "长江电力"]
+PHRASES = ["发布三季度业绩报告", "净利润同比增长", "拟回购公司股份", "北向资金连续增持", "股价盘中涨停",
+           "成交额创年内新高", "董事会审议通过议案", "签订重大采购合同", "控股股东减持计划", "获得机构调研",
+           "海外订单大幅增加", "新产品正式量产", "研发投入持续加大", "毛利率环比改善", "现金流明显好转",
+           "计提资产减值准备", "子公司完成增资", "中标国家电网项目", "与高校共建实验室", "推出股权激励方案",
+           "分红方案获股东大会通过", "发行绿色债券", "产能利用率提升", "原材料价格回落", "获评级机构上调评级"]
+
+
+def _stories(count, seed=7):
+    """生成互不相同的基础新闻：公司、事件短语与数字随机组合"""
+    rng = random.Random(seed)
+    stories = []
+    for i in range(count):
+        company = rng.choice(COMPANIES)
+        phrases = rng.sample(PHRASES, 4)
+        numbers = [rng.randint(2, 999) for _ in range(3)]
+        title = f"{company}{phrases[0]}{numbers[0]}亿元，{phrases[1]}"
+        content = f"{company}公告显示，{phrases[2]}，涉及金额{numbers[1]}万元；{phrases[3]}，" \
+                  f"报告期内同比变动{numbers[2]}%，公告编号{i}。"
+        stories.append((title, content))
+    return stories
+
+
+def _syndicate(stories, copies, seed=11):
+    """每条基础新闻按不同媒体后缀转载，返回 (标题, 正文, 基础新闻编号)，顺序打乱"""
+    rng = random.Random(seed)
+    items = []
+    for sid, (title, content) in enumerate(stories):
+        for suffix in rng.sample(SUFFIXES, copies):
+            items.append((title + suffix, content.replace("，", ", ", rng.randint(0, 1)), sid))
+    rng.shuffle(items)
+    return items
+
+
+def test_syndicated_variants_collapse_with_counts():
+    items = _syndicate(_stories(40), copies=3)
+    clusters = NearDuplicateDetector().cluster(items, lambda x: (x[0], x[1]))
+
+    assert len(clusters) == 40
+    for cluster in clusters:
+        assert {m[2] for m in cluster.members} == {cluster.representative[2]}
+        assert cluster.size == 3
+        assert cluster.representative is cluster.members[0]
+
+
+def test_distinct_news_not_merged():
+    detector = NearDuplicateDetector()
+    items = [
+        ("招商银行发布三季度业绩报告，净利润同比增长8%", ""),
+        ("工商银行发布三季度业绩报告，净利润同比下降2%", ""),
+        ("Apple-Google search deal faces antitrust review", ""),
+        ("Apple-Microsoft AI partnership announced", ""),
+    ]
+    assert len(detector.cluster(items, lambda x: x)) == 4
+
+
+def test_empty_text_items_not_merged():
+    detector = NearDuplicateDetector()
+    items = [("", ""), ("   ", None), ("！！！", "……"), ("招商银行发布三季度业绩报告", ""), ("", "")]
+    clusters = detector.cluster(items, lambda x: x)
+    assert [c.size for c in clusters] == [1] * len(items)
+
+    frame = pd.DataFrame({"新闻标题": ["", None, "招商银行发布三季度业绩报告"], "新闻内容": ["", "", ""]})
+    assert len(detector.deduplicate_frame(frame)) == 3
+
+
+def test_normalize_ignores_width_case_and_punctuation():
+    assert normalize_news_text("ＡＡＰＬ 股价，涨停！") == normalize_news_text("aapl股价涨停")
+
+
+def test_realtime_aggregator_dedup_keeps_source_count():
+    from tradingagents.dataflows.realtime_news_utils import NewsItem, RealtimeNewsAggregator
+
+    def item(title, source):
+        return NewsItem(title=title, content="宁德时代公告显示，拟回购不超过10亿元股份用于员工持股计划。",
+                        source=source, publish_time=datetime(2024, 5, 1), url="", urgency="medium",
+                        relevance_score=0.8)
+
+    news = [item("宁德时代拟回购不超过10亿元股份-东方财富网", "东方财富"),
+            item("宁德时代拟回购不超过10亿元股份_新浪财经", "新浪"),
+            item("宁德时代拟回购不超过10亿元股份-东方财富网", "东方财富"),
+            item("比亚迪10月新能源汽车销量创历史新高", "财联社")]
+    unique = RealtimeNewsAggregator(concurrent=False)._deduplicate_news(news)
+
+    assert [(n.source, n.source_count) for n in unique] == [("东方财富", 3), ("财联社", 1)]
+    report = RealtimeNewsAggregator(concurrent=False).format_news_report(unique, "300750")
+    assert "**报道数**: 3" in report
+
+
+def test_relevance_filter_deduplicate():
+    from tradingagents.utils.news_filter import NewsRelevanceFilter
+
+    news_df = pd.DataFrame([
+        {"新闻标题": "招商银行发布2024年第三季度业绩报告_新浪财经", "新闻内容": "招商银行今日发布第三季度财报，净利润同比增长8%"},
+        {"新闻标题": "招商银行发布2024年第三季度业绩报告 财报超预期", "新闻内容": "招商银行今日发布第三季度财报，净利润同比增长8%"},
+        {"新闻标题": "招商银行股东大会审议通过分红方案", "新闻内容": "招商银行股东大会通过每股派息方案"},
+    ])
+    news_filter = NewsRelevanceFilter("600036", "招商银行")
+    plain = news_filter.filter_news(news_df)
+    deduped = news_filter.filter_news(news_df, deduplicate=True)
+
+    assert len(plain) == 3 and "source_count" not in plain.columns
+    assert len(deduped) == 2
+    merged = deduped[deduped["source_count"] == 2].iloc[0]
+    assert merged["relevance_score"] == plain.loc[[0, 1], "relevance_score"].max()
+
+
+def test_unified_news_tool_sections():
+    from tradingagents.tools.unified_news_tool import UnifiedNewsAnalyzer
+
+    content = "## AAPL News:\n" + "".join(
+        f"### Apple unveils new iPhone lineup at September event{suffix} (2024-09-10)\n"
+        "Apple announced four new iPhone models with upgraded cameras and chips.\n\n"
+        for suffix in ["", " - Reuters", " | CNBC"]
+    ) + "### Tesla recalls Cybertruck over accelerator pedal (2024-09-10)\nTesla is recalling vehicles.\n\n"
+    result = UnifiedNewsAnalyzer(toolkit=None)._format_news_result(content, "Google新闻")
+
+    assert result.count("Apple unveils") == 1
+    assert "（3家媒体报道）" in result and "Tesla recalls" in result
+
+
+def test_sections_keep_group_headings_and_footer():
+    def item(title):
+        return f"### {title}\n**来源**: 新浪财经\n\n"
+
+    text = ("# 600036 实时新闻分析报告\n\n## 🚨 紧急新闻\n\n"
+            + item("招商银行三季度净利润同比增长8%") + item("工商银行发布三季度业绩报告")
+            + "## 📢 重要新闻\n\n"
+            + item("招商银行三季度净利润同比增长8% - 证券时报") + item("招商银行董事会换届选举完成")
+            + item("招商银行董事会换届选举完成 | 财联社")
+            + "## 📊 数据源统计\n- 新闻总数: 5\n")
+    result, removed = NearDuplicateDetector().deduplicate_sections(text)
+
+    assert removed == 2
+    assert result == ("# 600036 实时新闻分析报告\n\n## 🚨 紧急新闻\n\n"
+                      + item("招商银行三季度净利润同比增长8%（2家媒体报道）") + item("工商银行发布三季度业绩报告")
+                      + "## 📢 重要新闻\n\n"
+                      + item("招商银行董事会换届选举完成（2家媒体报道）")
+                      + "## 📊 数据源统计\n- 新闻总数: 5\n")
+
+
+@pytest.mark.skipif(
+    not os.getenv("ENABLE_PERFORMANCE_TESTS"),
+    reason="性能测试已禁用，使用 ENABLE_PERFORMANCE_TESTS=1 启用"
+)
+def test_dedup_benchmark():
+    run_benchmark()
+
+
+def run_benchmark(story_count=1000, copies=3):
+    """对比LSH聚类与两两精确Jaccard比较在数千条新闻上的耗时与召回"""
+    items = _syndicate(_stories(story_count), copies=copies)
+    detector = NearDuplicateDetector()
+
+    start = time.perf_counter()
+    clusters = detector.cluster(items, lambda x: (x[0], x[1]))
+    lsh_seconds = time.perf_counter() - start
+    pure = sum(1 for c in clusters if len({m[2] for m in c.members}) == 1)
+
+    start = time.perf_counter()
+    shingles = [detector._shingles(t, c) for t, c, _ in items]
+    representatives = []
+    for s in shingles:
+        if not any(len(s & r) / len(s | r) >= detector.threshold for r in representatives):
+            representatives.append(s)
+    pairwise_seconds = time.perf_counter() - start
+
+    print(f"\n⚡ {len(items)}条新闻近似去重: LSH {lsh_seconds:.2f}秒 -> {len(clusters)}簇 "
+          f"(纯净簇 {pure}) | 两两比较 {pairwise_seconds:.2f}秒 -> {len(representatives)}簇")
+
+
+if __name__ == "__main__":
+    run_benchmark()
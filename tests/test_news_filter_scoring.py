@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+NewsRelevanceFilter批量评分测试
+用随机组合的测试语料（含重叠关键词、大小写、公司名/代码位置）验证编译后的批量评分与逐条子串扫描的旧实现完全一致
+"""
+
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+import pytest
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from tradingagents.utils.news_filter import NewsRelevanceFilter
+
+
+def legacy_score(news_filter, title, content):
+    """旧实现：对每个关键词分别在标题和正文中做子串查找"""
+    score = 0
+    title_lower = title.lower()
+    content_lower = content.lower()
+    if news_filter.company_name in title:
+        score += 50
+    elif news_filter.company_name in content:
+        score += 25
+    if news_filter.stock_code in title:
+        score += 40
+    elif news_filter.stock_code in content:
+        score += 20
+    for keywords, title_weight, content_weight in (
+        (news_filter.strong_keywords, 30, 15),
+        (news_filter.include_keywords, 15, 8),
+        (news_filter.exclude_keywords, -40, -20),
+    ):
+        for keyword in keywords:
+            if keyword in title_lower:
+                score += title_weight
+            elif keyword in content_lower:
+                score += content_weight
+    if (news_filter.company_name not in title and news_filter.stock_code not in title and
+            any(keyword in title_lower for keyword in news_filter.exclude_keywords)):
+        score -= 30
+    return max(0, min(100, score))
+
+
+def legacy_filter(news_filter, news_df, min_score=30):
+    filtered_news = []
+    for _, row in news_df.iterrows():
+        title = row.get('新闻标题', row.get('标题', ''))
+        content = row.get('新闻内容', row.get('内容', ''))
+        score = legacy_score(news_filter, title, content)
+        if score >= min_score:
+            row_dict = row.to_dict()
+            row_dict['relevance_score'] = score
+            filtered_news.append(row_dict)
+    if not filtered_news:
+        return pd.DataFrame()
+    return pd.DataFrame(filtered_news).sort_values('relevance_score', ascending=False)
+
+
+FILLERS = ["今日", "市场", "消息", "分析师表示", "据悉", "Shares", "rose", "盘中", "，", " ", "ST", "st", "Etf"]
+
+
+def make_corpus(news_filter, count, seed=3):
+    """随机拼接关键词、公司名、代码与填充词生成测试语料"""
+    rng = random.Random(seed)
+    vocabulary = (news_filter.strong_keywords + news_filter.include_keywords + news_filter.exclude_keywords
+                  + [news_filter.company_name, news_filter.stock_code, news_filter.stock_code.lower(),
+                     "ETF", "INDEX", "Fund", "指数基金持仓", "业绩预告快报", "半年报"] + FILLERS * 3)
+
+    def text(length):
+        return "".join(rng.choice(vocabulary) for _ in range(length))
+
+    return pd.DataFrame({
+        "新闻标题": [text(rng.randint(0, 6)) for _ in range(count)],
+        "新闻内容": [text(rng.randint(0, 40)) for _ in range(count)],
+        "发布时间": [f"2024-05-{i % 28 + 1:02d} 09:30:00" for i in range(count)],
+    })
+
+
+@pytest.mark.parametrize("stock_code,company_name", [("600036", "招商银行"), ("aapl", "Apple"), ("000001", "平安银行")])
+def test_scores_match_legacy_exactly(stock_code, company_name):
+    news_filter = NewsRelevanceFilter(stock_code, company_name)
+    corpus = make_corpus(news_filter, 2000)
+
+    expected = [legacy_score(news_filter, t, c) for t, c in zip(corpus["新闻标题"], corpus["新闻内容"])]
+    assert news_filter.score_news(corpus["新闻标题"], corpus["新闻内容"]).tolist() == expected
+    assert 0 < sum(1 for s in expected if s >= 30) < len(expected)
+
+    for t, c, e in list(zip(corpus["新闻标题"], corpus["新闻内容"], expected))[:50]:
+        assert news_filter.calculate_relevance_score(t, c) == e
+
+
+def test_filter_news_matches_legacy_frame():
+    news_filter = NewsRelevanceFilter("600036", "招商银行")
+    corpus = make_corpus(news_filter, 500, seed=9)
+    corpus.index = corpus.index * 3 + 7  # 非默认索引
+
+    pd.testing.assert_frame_equal(news_filter.filter_news(corpus), legacy_filter(news_filter, corpus))
+    assert news_filter.filter_news(corpus, min_score=101).empty
+
+
+def test_overlapping_custom_keywords():
+    """自定义关键词之间互相包含、首尾重叠时命中集合仍与逐个子串查找一致"""
+    rng = random.Random(5)
+    news_filter = NewsRelevanceFilter("ab", "ba")
+    news_filter.strong_keywords = ["abc", "bca", "cab", "a"]
+    news_filter.include_keywords = ["bc", "abca", "cc", "abc"]
+    news_filter.exclude_keywords = ["ca", "bcab", "", "aab"]
+    titles = pd.Series(["".join(rng.choice("abcAB") for _ in range(rng.randint(0, 8))) for _ in range(3000)])
+    contents = pd.Series(["".join(rng.choice("abc") for _ in range(rng.randint(0, 20))) for _ in range(3000)])
+
+    expected = [legacy_score(news_filter, t, c) for t, c in zip(titles, contents)]
+    assert news_filter.score_news(titles, contents).tolist() == expected
+
+
+def test_keyword_changes_rebuild_matcher():
+    news_filter = NewsRelevanceFilter("600036", "招商银行")
+    assert news_filter.calculate_relevance_score("招商银行新闻", "") == 50
+    news_filter.include_keywords.append("新闻")
+    assert news_filter.calculate_relevance_score("招商银行新闻", "") == 65
+
+
+@pytest.mark.skipif(
+    not os.getenv("ENABLE_PERFORMANCE_TESTS"),
+    reason="性能测试已禁用，使用 ENABLE_PERFORMANCE_TESTS=1 启用"
+)
+def test_scoring_benchmark():
+    run_benchmark()
+
+
+def run_benchmark(count=500):
+    """对比逐行iterrows打分与批量打分过滤数百条东方财富新闻的耗时"""
+    news_filter = NewsRelevanceFilter("600036", "招商银行")
+    rng = random.Random(1)
+    sentences = ["据悉，市场分析人士表示，今日两市成交额较昨日有所放大。", "北向资金全天净流入，行业景气度持续回升。",
+                 "多家券商发布研报，维持行业推荐评级。"]
+    keywords = news_filter.include_keywords + news_filter.exclude_keywords + news_filter.strong_keywords
+
+    def text(length):
+        # 接近真实新闻：正文以普通语句为主，偶尔出现公司名和关键词
+        return "".join(rng.choice(keywords + ["招商银行"]) if rng.random() < 0.1 else rng.choice(sentences)
+                       for _ in range(length))
+
+    corpus = pd.DataFrame({"新闻标题": [text(2)[:30] for _ in range(count)],
+                           "新闻内容": [text(30) for _ in range(count)]})
+
+    start = time.perf_counter()
+    legacy_filter(news_filter, corpus)
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    news_filter.filter_news(corpus)
+    batch_seconds = time.perf_counter() - start
+    print(f"\n⚡ 过滤{count}条新闻: 逐条 {legacy_seconds * 1000:.1f}ms | 批量 {batch_seconds * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+区间感知行情存储测试
+验证只获取未覆盖的日期缺口、子区间本地命中、进程重启后从磁盘恢复覆盖区间、
+未收盘日期和长的空缺口不记为已覆盖、已收盘的周末缺口不重复获取、拆股后重新获取、Yahoo K线读取时按区间做分红复权，
+以及Tushare前复权结果与直接按请求区间获取一致
+"""
+
+import os
+import sys
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from tradingagents.dataflows import ohlcv_store
+from tradingagents.dataflows.ohlcv_store import OHLCVStore, merge_intervals, missing_intervals
+
+
+def _d(text):
+    return date.fromisoformat(text)
+
+
+def _daily_bars(start, end):
+    """按工作日生成只取决于日期的K线，日期列为 YYYY-MM-DD"""
+    days = pd.bdate_range(start, end)
+    closes = 10 + np.sin(days.dayofyear.to_numpy()) + days.month.to_numpy()
+    return pd.DataFrame({"date": days.strftime("%Y-%m-%d"), "close": closes.round(2)})
+
+
+class RecordingFetcher:
+    def __init__(self, make=_daily_bars):
+        self.calls = []
+        self.make = make
+
+    def __call__(self, start, end):
+        self.calls.append((start, end))
+        return self.make(start, end)
+
+
+def test_interval_helpers():
+    covered = merge_intervals([(_d("2024-03-01"), _d("2024-03-31")), (_d("2024-01-01"), _d("2024-01-31")),
+                               (_d("2024-02-01"), _d("2024-02-10"))])
+    assert covered == [(_d("2024-01-01"), _d("2024-02-10")), (_d("2024-03-01"), _d("2024-03-31"))]
+    assert missing_intervals(covered, _d("2023-12-25"), _d("2024-04-02")) == [
+        (_d("2023-12-25"), _d("2023-12-31")), (_d("2024-02-11"), _d("2024-02-29")),
+        (_d("2024-04-01"), _d("2024-04-02"))]
+    assert missing_intervals(covered, _d("2024-01-05"), _d("2024-02-01")) == []
+
+
+def test_extending_range_fetches_only_gap(tmp_path):
+    store = OHLCVStore(str(tmp_path))
+    fetch = RecordingFetcher()
+
+    first = store.get_bars("test", "000001", "2024-01-01", "2024-06-28", fetch)
+    extended = store.get_bars("test", "000001", "2024-01-01", "2024-07-05", fetch)
+    inner = store.get_bars("test", "000001", "2024-03-01", "2024-03-31", fetch)
+
+    assert fetch.calls == [("2024-01-01", "2024-06-28"), ("2024-06-29", "2024-07-05")]
+    pd.testing.assert_frame_equal(extended, _daily_bars("2024-01-01", "2024-07-05"))
+    pd.testing.assert_frame_equal(first, _daily_bars("2024-01-01", "2024-06-28"))
+    pd.testing.assert_frame_equal(inner, _daily_bars("2024-03-01", "2024-03-31"))
+    assert store.get_stats()["local_hits"] == 1
+
+
+def test_coverage_persists_across_instances(tmp_path):
+    fetch = RecordingFetcher()
+    OHLCVStore(str(tmp_path)).get_bars("test", "AAPL", "2024-01-01", "2024-02-29", fetch)
+    OHLCVStore(str(tmp_path)).get_bars("test", "AAPL", "2024-02-01", "2024-03-15", fetch)
+
+    assert fetch.calls == [("2024-01-01", "2024-02-29"), ("2024-03-01", "2024-03-15")]
+    assert OHLCVStore(str(tmp_path)).get_coverage("test", "AAPL") == [("2024-01-01", "2024-03-15")]
+
+
+def test_recent_and_empty_ranges_not_covered(tmp_path):
+    store = OHLCVStore(str(tmp_path), settle_days=1)
+    fetch = RecordingFetcher()
+    today = date.today()
+    start = (today - timedelta(days=10)).isoformat()
+
+    store.get_bars("test", "000002", start, today.isoformat(), fetch)
+    store.get_bars("test", "000002", start, today.isoformat(), fetch)
+    assert fetch.calls[1] == (today.isoformat(), today.isoformat())
+
+    empty = RecordingFetcher(lambda start, end: pd.DataFrame())
+    assert store.get_bars("test", "000003", "2024-01-01", "2024-01-31", empty).empty
+    store.get_bars("test", "000003", "2024-01-01", "2024-01-31", empty)
+    assert len(empty.calls) == 2
+
+
+def test_settled_weekend_gap_not_refetched(tmp_path):
+    store = OHLCVStore(str(tmp_path))
+    fetch = RecordingFetcher()
+    store.get_bars("test", "000004", "2024-01-01", "2024-01-05", fetch)  # 周一至周五
+
+    # 只多出一个周末：空结果记为已覆盖，之后的请求本地命中
+    assert store.get_bars("test", "000004", "2024-01-01", "2024-01-07", fetch).equals(
+        _daily_bars("2024-01-01", "2024-01-05"))
+    store.get_bars("test", "000004", "2024-01-03", "2024-01-07", fetch)
+    assert fetch.calls == [("2024-01-01", "2024-01-05"), ("2024-01-06", "2024-01-07")]
+    assert OHLCVStore(str(tmp_path)).get_coverage("test", "000004") == [("2024-01-01", "2024-01-07")]
+
+
+def test_datetime_index_bars(tmp_path):
+    def indexed(start, end):
+        frame = _daily_bars(start, end)
+        frame.index = pd.DatetimeIndex(frame.pop("date")).tz_localize("America/New_York")
+        return frame
+
+    store = OHLCVStore(str(tmp_path))
+    fetch = RecordingFetcher(indexed)
+    store.get_bars("yfinance", "AAPL", "2024-01-01", "2024-01-31", fetch, date_column=None)
+    result = store.get_bars("yfinance", "AAPL", "2024-01-15", "2024-02-10", fetch, date_column=None)
+
+    assert fetch.calls[-1] == ("2024-02-01", "2024-02-10")
+    pd.testing.assert_frame_equal(result, indexed("2024-01-15", "2024-02-10"), check_freq=False)
+
+
+def test_split_in_new_gap_refetches_range(tmp_path):
+    split_day = "2024-02-05"
+
+    def bars(start, end):
+        frame = _daily_bars(start, end)
+        frame["split"] = (frame["date"] == split_day).astype(float)
+        return frame
+
+    store = OHLCVStore(str(tmp_path))
+    fetch = RecordingFetcher(bars)
+    has_split = lambda data: bool(data["split"].ne(0).any())
+    store.get_bars("test", "AAPL", "2024-01-01", "2024-01-31", fetch, rescales=has_split)
+    result = store.get_bars("test", "AAPL", "2024-01-15", "2024-02-29", fetch, rescales=has_split)
+
+    assert fetch.calls == [("2024-01-01", "2024-01-31"), ("2024-02-01", "2024-02-29"),
+                           ("2024-01-15", "2024-02-29")]
+    pd.testing.assert_frame_equal(result, bars("2024-01-15", "2024-02-29"))
+    assert store.get_coverage("test", "AAPL") == [("2024-01-15", "2024-02-29")]
+
+
+def test_yfinance_bars_adjusted_for_dividends_on_read(tmp_path, monkeypatch):
+    import yfinance
+    from tradingagents.dataflows.optimized_us_data import OptimizedUSDataProvider
+
+    days = pd.bdate_range("2024-01-01", "2024-03-29", tz="America/New_York")
+    full = pd.DataFrame({"Open": 100.0, "High": 101.0, "Low": 99.0, "Close": 100.0, "Adj Close": 0.0,
+                         "Volume": 1000, "Dividends": 0.0, "Stock Splits": 0.0}, index=days)
+    full.loc[days[days.month == 3][0], "Dividends"] = 2.0  # 3月首个交易日除息
+    calls = []
+
+    class FakeTicker:
+        def __init__(self, symbol):
+            pass
+
+        def history(self, start, end, auto_adjust=True, actions=True):
+            assert auto_adjust is False
+            calls.append((start, end))
+            index = full.index.tz_localize(None)
+            return full[(index >= start) & (index < end)].copy()
+
+    monkeypatch.setattr(yfinance, "Ticker", FakeTicker)
+    monkeypatch.setattr(ohlcv_store, "_ohlcv_store", OHLCVStore(str(tmp_path)))
+    provider = OptimizedUSDataProvider.__new__(OptimizedUSDataProvider)
+    monkeypatch.setattr(provider, "_wait_for_rate_limit", lambda api="yfinance": None)
+
+    february = provider._get_yfinance_bars("AAPL", "2024-02-01", "2024-03-01")
+    assert (february["Close"] == 100.0).all() and "Adj Close" not in february.columns
+
+    # 除息后再请求，存储的K线不变，读取时按新区间复权
+    with_march = provider._get_yfinance_bars("AAPL", "2024-02-01", "2024-03-30")
+    assert calls[-1] == ("2024-03-01", "2024-03-30")
+    assert np.allclose(with_march.loc[with_march.index < "2024-03-01", "Close"], 98.0)
+    assert (with_march.loc[with_march.index >= "2024-03-01", "Close"] == 100.0).all()
+
+
+def test_tushare_forward_adjusted_matches_direct_fetch(tmp_path, monkeypatch):
+    from tradingagents.dataflows.tushare_utils import TushareProvider
+
+    def raw_daily(start, end):
+        days = pd.bdate_range(start, end)[::-1]  # Tushare按日期倒序返回
+        rng = np.random.RandomState(int(days[0].strftime("%Y%m%d")) % 1000 if len(days) else 0)
+        pct = np.where(np.arange(len(days)) % 17 == 5, -9.5, rng.uniform(-3, 3, len(days))).round(2)
+        close = (20 + np.arange(len(days)) * 0.1).round(2)
+        return pd.DataFrame({
+            "ts_code": "000001.SZ", "trade_date": days.strftime("%Y%m%d"), "open": close - 0.1,
+            "high": close + 0.2, "low": close - 0.3, "close": close, "pct_chg": pct, "vol": 1000.0,
+        })
+
+    # 按全局日期确定K线，保证分段获取与一次性获取的原始数据一致
+    full = raw_daily("2024-01-01", "2024-12-31").set_index("trade_date")
+
+    class FakeApi:
+        calls = []
+
+        def daily(self, ts_code, start_date, end_date):
+            self.calls.append((start_date, end_date))
+            return full[(full.index >= start_date) & (full.index <= end_date)].reset_index()
+
+    monkeypatch.delenv("TUSHARE_TOKEN", raising=False)
+    monkeypatch.setattr(ohlcv_store, "_ohlcv_store", OHLCVStore(str(tmp_path)))
+    provider = TushareProvider(enable_cache=False)
+    provider.connected, provider.api = True, FakeApi()
+
+    provider.get_stock_daily("000001", "2024-01-01", "2024-03-31")
+    result = provider.get_stock_daily("000001", "2024-02-01", "2024-04-30")
+    assert FakeApi.calls == [("20240101", "20240331"), ("20240401", "20240430")]
+
+    direct = full[(full.index >= "20240201") & (full.index <= "20240430")].reset_index()
+    direct = direct.sort_values("trade_date")
+    direct["trade_date"] = pd.to_datetime(direct["trade_date"])
+    expected = provider._calculate_forward_adjusted_prices(direct)
+    pd.testing.assert_frame_equal(result.reset_index(drop=True), expected.reset_index(drop=True))
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+分析师并行模式测试
+用假节点替换各智能体，验证并行分支各自完成工具循环、报告在Bull Researcher前汇合，
+且耗时接近最慢的分析师而非四者之和
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+pytest.importorskip("langgraph")
+
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.tools import tool
+from langgraph.prebuilt import ToolNode
+
+from tradingagents.graph import setup as graph_setup_module
+from tradingagents.graph.conditional_logic import ConditionalLogic
+from tradingagents.graph.propagation import Propagator
+from tradingagents.graph.setup import ANALYST_REPORT_KEYS, GraphSetup
+
+ANALYST_DELAY = 0.3
+
+
+@tool
+def fake_data_tool(ticker: str) -> str:
+    """Return fake data for a ticker."""
+    return f"data for {ticker}"
+
+
+def _fake_analyst(analyst_type):
+    def factory(llm, toolkit):
+        def node(state):
+            tool_results = [m for m in state["messages"] if isinstance(m, ToolMessage)]
+            if not tool_results:
+                call = {"name": "fake_data_tool", "args": {"ticker": analyst_type}, "id": f"call_{analyst_type}"}
+                return {"messages": [AIMessage(content="", tool_calls=[call])]}
+            # 并行分支只能看到自己的工具结果
+            assert [m.content for m in tool_results] == [f"data for {analyst_type}"]
+            time.sleep(ANALYST_DELAY)
+            return {
+                "messages": [AIMessage(content=f"{analyst_type} done")],
+                ANALYST_REPORT_KEYS[analyst_type]: f"{analyst_type} report",
+            }
+        return node
+    return factory
+
+
+def _patch_agents(monkeypatch, seen_reports):
+    for analyst_type, factory_name in [
+        ("market", "create_market_analyst"),
+        ("social", "create_social_media_analyst"),
+        ("news", "create_news_analyst"),
+        ("fundamentals", "create_fundamentals_analyst"),
+    ]:
+        monkeypatch.setattr(graph_setup_module, factory_name, _fake_analyst(analyst_type))
+
+    def bull_factory(llm, memory):
+        def node(state):
+            seen_reports.update({key: state[key] for key in ANALYST_REPORT_KEYS.values()})
+            return {"investment_debate_state": {
+                "history": "", "bull_history": "", "bear_history": "",
+                "current_response": "Bull: ok", "judge_decision": "", "count": 2}}
+        return node
+
+    def risky_factory(llm):
+        return lambda state: {"risk_debate_state": {**state["risk_debate_state"], "latest_speaker": "Risky", "count": 3}}
+
+    monkeypatch.setattr(graph_setup_module, "create_bull_researcher", bull_factory)
+    monkeypatch.setattr(graph_setup_module, "create_bear_researcher", lambda llm, memory: lambda state: {})
+    monkeypatch.setattr(graph_setup_module, "create_research_manager",
+                        lambda llm, memory: lambda state: {"investment_plan": "plan"})
+    monkeypatch.setattr(graph_setup_module, "create_trader",
+                        lambda llm, memory: lambda state: {"trader_investment_plan": "trade"})
+    monkeypatch.setattr(graph_setup_module, "create_risky_debator", risky_factory)
+    monkeypatch.setattr(graph_setup_module, "create_safe_debator", lambda llm: lambda state: {})
+    monkeypatch.setattr(graph_setup_module, "create_neutral_debator", lambda llm: lambda state: {})
+    monkeypatch.setattr(graph_setup_module, "create_risk_manager",
+                        lambda llm, memory: lambda state: {"final_trade_decision": "BUY"})
+
+
+def _build_graph(parallel):
+    tool_node = ToolNode([fake_data_tool])
+    graph_setup = GraphSetup(
+        quick_thinking_llm=None, deep_thinking_llm=None, toolkit=None,
+        tool_nodes={t: tool_node for t in ANALYST_REPORT_KEYS},
+        bull_memory=None, bear_memory=None, trader_memory=None,
+        invest_judge_memory=None, risk_manager_memory=None,
+        conditional_logic=ConditionalLogic(),
+        config={"llm_provider": "openai", "parallel_analysts": parallel},
+    )
+    return graph_setup.setup_graph(list(ANALYST_REPORT_KEYS))
+
+
+def _run(graph):
+    state = Propagator().create_initial_state("AAPL", "2025-01-02")
+    start = time.perf_counter()
+    final_state = graph.invoke(state, config={"recursion_limit": 100})
+    return final_state, time.perf_counter() - start
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_reports_join_before_bull_researcher(monkeypatch, parallel):
+    seen_reports = {}
+    _patch_agents(monkeypatch, seen_reports)
+    final_state, _ = _run(_build_graph(parallel))
+
+    expected = {key: f"{analyst_type} report" for analyst_type, key in ANALYST_REPORT_KEYS.items()}
+    assert seen_reports == expected
+    assert final_state["final_trade_decision"] == "BUY"
+
+
+def test_parallel_mode_takes_slowest_analyst_time(monkeypatch):
+    _patch_agents(monkeypatch, {})
+    _, sequential_seconds = _run(_build_graph(False))
+    _, parallel_seconds = _run(_build_graph(True))
+
+    assert sequential_seconds >= 4 * ANALYST_DELAY
+    assert parallel_seconds < 2 * ANALYST_DELAY
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+复权价格计算测试
+验证向量化前复权与原逐行循环实现的结果完全一致，后复权/不复权的语义，
+以及AKShare中文列名、BaoStock字符串列与昨收价推算的支持
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from tradingagents.dataflows.price_adjustment import (
+    ADJUST_BACKWARD, ADJUST_FORWARD, ADJUST_NONE, adjust_prices, adjusted_closes
+)
+
+
+def legacy_forward_adjust(data):
+    """原 TushareProvider._calculate_forward_adjusted_prices 的逐行实现，作为对照"""
+    adjusted_data = data.copy()
+    adjusted_data = adjusted_data.sort_values('trade_date').reset_index(drop=True)
+    adjusted_data['close_raw'] = adjusted_data['close'].copy()
+    adjusted_data['open_raw'] = adjusted_data['open'].copy()
+    adjusted_data['high_raw'] = adjusted_data['high'].copy()
+    adjusted_data['low_raw'] = adjusted_data['low'].copy()
+    latest_close = float(adjusted_data.iloc[-1]['close'])
+    adjusted_closes_list = [latest_close]
+    for i in range(len(adjusted_data) - 2, -1, -1):
+        pct_change = float(adjusted_data.iloc[i + 1]['pct_chg']) / 100.0
+        prev_close = adjusted_closes_list[0] / (1 + pct_change)
+        adjusted_closes_list.insert(0, prev_close)
+    adjusted_data['close'] = adjusted_closes_list
+    for i in range(len(adjusted_data)):
+        if adjusted_data.iloc[i]['close_raw'] != 0:
+            adjustment_ratio = adjusted_data.iloc[i]['close'] / adjusted_data.iloc[i]['close_raw']
+            adjusted_data.iloc[i, adjusted_data.columns.get_loc('open')] = adjusted_data.iloc[i]['open_raw'] * adjustment_ratio
+            adjusted_data.iloc[i, adjusted_data.columns.get_loc('high')] = adjusted_data.iloc[i]['high_raw'] * adjustment_ratio
+            adjusted_data.iloc[i, adjusted_data.columns.get_loc('low')] = adjusted_data.iloc[i]['low_raw'] * adjustment_ratio
+    adjusted_data['price_type'] = 'forward_adjusted'
+    return adjusted_data
+
+
+def synthetic_bars(days, seed=0, dividend_every=240):
+    """Tushare格式的除权日线：按日期倒序，定期出现除权缺口（收盘价跳空但pct_chg连续）"""
+    rng = np.random.RandomState(seed)
+    dates = pd.bdate_range("2010-01-04", periods=days)
+    pct = rng.normal(0, 2, days).clip(-10, 10).round(2)
+    close = np.empty(days)
+    close[0] = 10.0
+    for i in range(1, days):
+        close[i] = close[i - 1] * (1 + pct[i] / 100)
+        if i % dividend_every == 0:
+            close[i] *= 0.7  # 送转/分红导致的除权缺口
+    close = close.round(2)
+    frame = pd.DataFrame({
+        "ts_code": "000001.SZ",
+        "trade_date": pd.to_datetime(dates),
+        "open": (close * (1 + rng.uniform(-0.01, 0.01, days))).round(2),
+        "high": (close * (1 + rng.uniform(0, 0.03, days))).round(2),
+        "low": (close * (1 - rng.uniform(0, 0.03, days))).round(2),
+        "close": close,
+        "pre_close": np.concatenate(([close[0]], close[:-1])),
+        "pct_chg": pct,
+        "vol": rng.randint(1000, 100000, days).astype(float),
+    })
+    return frame.iloc[::-1].reset_index(drop=True)
+
+
+@pytest.mark.parametrize("days,seed", [(1, 0), (2, 1), (60, 2), (800, 3)])
+def test_forward_matches_legacy_loop(days, seed):
+    bars = synthetic_bars(days, seed)
+    pd.testing.assert_frame_equal(adjust_prices(bars, ADJUST_FORWARD), legacy_forward_adjust(bars))
+
+
+def test_zero_close_and_nan_pct_match_legacy():
+    bars = synthetic_bars(30, 4)
+    bars.loc[10, ["open", "high", "low", "close"]] = 0.0
+    bars.loc[20, "pct_chg"] = np.nan
+    pd.testing.assert_frame_equal(adjust_prices(bars, ADJUST_FORWARD), legacy_forward_adjust(bars))
+
+
+def test_tushare_provider_uses_engine():
+    from tradingagents.dataflows.tushare_utils import TushareProvider
+
+    bars = synthetic_bars(300, 5)
+    provider = TushareProvider.__new__(TushareProvider)
+    pd.testing.assert_frame_equal(provider._calculate_forward_adjusted_prices(bars), legacy_forward_adjust(bars))
+
+
+def test_backward_and_none():
+    bars = synthetic_bars(500, 6)
+    forward = adjust_prices(bars, ADJUST_FORWARD)
+    backward = adjust_prices(bars, ADJUST_BACKWARD)
+    raw = adjust_prices(bars, ADJUST_NONE)
+
+    assert backward["close"].iloc[0] == raw["close"].iloc[0]
+    assert forward["close"].iloc[-1] == raw["close"].iloc[-1]
+    # 两种复权只相差一个常数倍，日收益率与pct_chg一致
+    np.testing.assert_allclose(backward["close"] / forward["close"],
+                               backward["close"].iloc[0] / forward["close"].iloc[0], rtol=1e-10)
+    np.testing.assert_allclose(backward["close"].pct_change().iloc[1:] * 100, raw["pct_chg"].iloc[1:], atol=1e-8)
+    assert (backward["price_type"] == "backward_adjusted").all()
+    pd.testing.assert_series_equal(raw["close"], raw["close_raw"], check_names=False)
+    assert (raw["price_type"] == "raw").all()
+
+    with pytest.raises(ValueError):
+        adjust_prices(bars, "qfq")
+
+
+def test_adjusted_closes_helper():
+    close = np.array([10.0, 11.0, 7.7])
+    growth = np.array([np.nan, 1.1, 1.05])
+    np.testing.assert_allclose(adjusted_closes(close, growth, ADJUST_FORWARD), [7.7 / 1.05 / 1.1, 7.7 / 1.05, 7.7])
+    np.testing.assert_allclose(adjusted_closes(close, growth, ADJUST_BACKWARD), [10.0, 11.0, 11.55])
+
+
+def test_akshare_chinese_columns():
+    bars = synthetic_bars(200, 7)
+    akshare = bars.rename(columns={"trade_date": "日期", "open": "开盘", "close": "收盘", "high": "最高",
+                                   "low": "最低", "pct_chg": "涨跌幅"}).drop(columns=["pre_close"])
+    result = adjust_prices(akshare, ADJUST_FORWARD)
+    expected = legacy_forward_adjust(bars)
+
+    np.testing.assert_array_equal(result["收盘"].to_numpy(), expected["close"].to_numpy())
+    np.testing.assert_array_equal(result["最低"].to_numpy(), expected["low"].to_numpy())
+    assert "收盘_raw" in result.columns
+
+
+def test_baostock_string_columns_with_preclose():
+    bars = synthetic_bars(200, 8).sort_values("trade_date").reset_index(drop=True)
+    baostock = pd.DataFrame({
+        "date": bars["trade_date"].dt.strftime("%Y-%m-%d"),
+        "open": bars["open"].map(str), "high": bars["high"].map(str), "low": bars["low"].map(str),
+        "close": bars["close"].map(str), "preclose": bars["pre_close"].map(str),
+    })
+    result = adjust_prices(baostock, ADJUST_FORWARD)
+
+    # 昨收价推算的收益率在除权日之外与收盘价一致，除权日的缺口被抹平
+    assert result["close"].iloc[-1] == pytest.approx(float(bars["close"].iloc[-1]))
+    expected_growth = bars["close"] / bars["pre_close"]
+    np.testing.assert_allclose((result["close"] / result["close"].shift(1)).iloc[1:], expected_growth.iloc[1:],
+                               rtol=1e-10)
+
+
+@pytest.mark.skipif(
+    not os.getenv("ENABLE_PERFORMANCE_TESTS"),
+    reason="性能测试已禁用，使用 ENABLE_PERFORMANCE_TESTS=1 启用"
+)
+def test_adjustment_benchmark():
+    run_benchmark()
+
+
+def run_benchmark(years=12, tickers=20):
+    """对比逐行循环与向量化前复权在多只股票十余年日线上的耗时"""
+    days = years * 250
+    frames = [synthetic_bars(days, seed) for seed in range(tickers)]
+
+    start = time.perf_counter()
+    for frame in frames[:2]:
+        legacy_forward_adjust(frame)
+    legacy_seconds = (time.perf_counter() - start) / 2 * tickers
+
+    start = time.perf_counter()
+    for frame in frames:
+        adjust_prices(frame, ADJUST_FORWARD)
+    vectorized_seconds = time.perf_counter() - start
+
+    print(f"\n⚡ {tickers}只股票 x {days}根日线前复权: 逐行循环(估算) {legacy_seconds:.2f}秒 | "
+          f"向量化 {vectorized_seconds:.3f}秒 ({legacy_seconds / vectorized_seconds:.0f}x)")
+
+
+if __name__ == "__main__":
+    run_benchmark()
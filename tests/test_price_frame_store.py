@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+进程内价格数据存储测试
+验证区间切片、dtype规整、mtime失效、LRU字节预算淘汰，以及离线YFin读取方共享同一份数据
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from tradingagents.dataflows import interface
+from tradingagents.dataflows.price_frame_store import PriceFrameStore, get_price_frame_store
+
+
+def _write_price_csv(path, start="2015-01-02", periods=500, shuffle=False):
+    dates = pd.bdate_range(start, periods=periods)
+    rng = np.random.default_rng(7)
+    close = 50 + np.cumsum(rng.normal(0, 1, periods))
+    data = pd.DataFrame({
+        "Date": dates.strftime("%Y-%m-%d"),
+        "Open": close,
+        "High": close + 1,
+        "Low": close - 1,
+        "Close": close,
+        "Adj Close": close,
+        "Volume": rng.integers(1_000, 5_000, periods),
+    })
+    if shuffle:
+        data = data.sample(frac=1, random_state=1)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data.to_csv(path, index=False)
+
+
+def test_range_slice_and_dtypes(tmp_path):
+    """区间切片为闭区间，浮点列保持float64，成交量为int64，乱序文件会被排序"""
+    path = str(tmp_path / "AAA.csv")
+    _write_price_csv(path, shuffle=True)
+    store = PriceFrameStore()
+
+    frame = store.get_range("AAA", "test", path, "2015-02-02", "2015-02-06")
+    assert list(frame["Date"]) == ["2015-02-02", "2015-02-03", "2015-02-04", "2015-02-05", "2015-02-06"]
+    assert frame["Close"].dtype == np.float64
+    assert frame["Volume"].dtype == np.int64
+    assert store.get_frame("AAA", "test", path).index.is_monotonic_increasing
+
+
+def test_mtime_invalidation(tmp_path):
+    """文件更新后自动重新加载"""
+    path = str(tmp_path / "AAA.csv")
+    _write_price_csv(path, periods=10)
+    store = PriceFrameStore()
+    assert len(store.get_frame("AAA", "test", path)) == 10
+
+    _write_price_csv(path, periods=20)
+    os.utime(path, (os.path.getatime(path), os.path.getmtime(path) + 5))
+    assert len(store.get_frame("AAA", "test", path)) == 20
+    assert store.get_stats()["reloads"] == 1
+
+
+def test_lru_byte_budget(tmp_path):
+    """超出字节预算时淘汰最久未使用的条目"""
+    paths = {}
+    for symbol in ["AAA", "BBB", "CCC"]:
+        paths[symbol] = str(tmp_path / f"{symbol}.csv")
+        _write_price_csv(paths[symbol])
+
+    probe = PriceFrameStore()
+    probe.get_frame("AAA", "test", paths["AAA"])
+    frame_bytes = probe._total_bytes
+
+    store = PriceFrameStore(max_bytes=int(frame_bytes * 2.5))
+    store.get_frame("AAA", "test", paths["AAA"])
+    store.get_frame("BBB", "test", paths["BBB"])
+    store.get_frame("AAA", "test", paths["AAA"])  # AAA变为最近使用
+    store.get_frame("CCC", "test", paths["CCC"])
+
+    keys = list(store._entries)
+    assert keys == [("AAA", "test"), ("CCC", "test")]
+    assert store.get_stats()["evictions"] == 1
+
+
+@pytest.fixture
+def yfin_data_dir(tmp_path, monkeypatch):
+    _write_price_csv(
+        str(tmp_path / "market_data" / "price_data" / "TEST-YFin-data-2015-01-01-2025-03-25.csv"),
+        periods=800,
+    )
+    monkeypatch.setattr(interface, "DATA_DIR", str(tmp_path))
+    get_price_frame_store().clear()
+    yield str(tmp_path)
+    get_price_frame_store().clear()
+
+
+def test_readers_share_one_parse(yfin_data_dir, monkeypatch):
+    """四个离线读取方共用一次CSV解析"""
+    calls = []
+    original_read_csv = pd.read_csv
+
+    def counting_read_csv(*args, **kwargs):
+        calls.append(args[0])
+        return original_read_csv(*args, **kwargs)
+
+    monkeypatch.setattr(pd, "read_csv", counting_read_csv)
+
+    data = interface.get_YFin_data("TEST", "2016-01-04", "2016-01-29")
+    assert data["Date"].iloc[0] == "2016-01-04" and data["Date"].iloc[-1] == "2016-01-29"
+    assert list(data.index) == list(range(len(data)))
+
+    window = interface.get_YFin_data_window("TEST", "2016-01-29", 10)
+    assert "2016-01-19" in window and "2016-01-29" in window and "2016-01-18" not in window
+
+    interface.get_stock_stats_indicators_window("TEST", "rsi,macd", "2016-01-29", 30, False)
+    value = interface.get_stockstats_indicator("TEST", "rsi", "2016-01-29", False)
+    assert value not in ("", "N/A: Not a trading day (weekend or holiday)")
+
+    assert len(calls) == 1
+
+
+def test_rendered_prices_keep_source_precision(tmp_path, monkeypatch):
+    """LLM可见的行情文本保持CSV中的原始精度，只有指标计算使用float32"""
+    path = tmp_path / "market_data" / "price_data" / "PREC-YFin-data-2015-01-01-2025-03-25.csv"
+    _write_price_csv(str(path), periods=60)
+    data = pd.read_csv(path)
+    data.loc[data["Date"] == "2015-03-02", ["Open", "Close"]] = [123.45, 98.76]
+    data.to_csv(path, index=False)
+    monkeypatch.setattr(interface, "DATA_DIR", str(tmp_path))
+    get_price_frame_store().clear()
+    try:
+        window = interface.get_YFin_data_window("PREC", "2015-03-02", 3)
+        assert "123.45" in window and "98.76" in window
+        assert "123.449997" not in window and "98.760002" not in window
+
+        frame = interface.get_YFin_data("PREC", "2015-03-02", "2015-03-02")
+        assert frame["Open"].iloc[0] == 123.45
+
+        from tradingagents.dataflows.stockstats_utils import get_wrapped_frame
+        wrapped = get_wrapped_frame("PREC", str(path.parent), online=False)
+        assert wrapped["close"].dtype == np.float32
+    finally:
+        get_price_frame_store().clear()
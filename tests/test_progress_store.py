@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+分析进度存储测试
+验证进程内/文件存储的增量事件与阻塞读取、跟踪器按最小间隔合并快照写入且读取方仍能得到最新状态、
+follow_progress 的增量消费、get_progress_by_id 使用全局存储，以及Redis连接用尽时排队等待
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from tradingagents.utils import progress_store
+from tradingagents.utils.progress_store import (
+    CURSOR_FIELD, FileProgressStore, MemoryProgressStore, RedisProgressStore,
+    follow_progress, load_progress, wait_for_progress_update
+)
+from web.utils.async_progress_tracker import AsyncProgressTracker, get_progress_by_id
+
+
+class CountingStore(MemoryProgressStore):
+    def __init__(self):
+        super().__init__()
+        self.snapshots = 0
+
+    def save_snapshot(self, analysis_id, data):
+        self.snapshots += 1
+        super().save_snapshot(analysis_id, data)
+
+
+def _tracker(store, analysis_id="a1", min_write_interval=60.0):
+    return AsyncProgressTracker(analysis_id, ["market", "news"], 2, "dashscope",
+                                store=store, min_write_interval=min_write_interval)
+
+
+@pytest.mark.parametrize("make_store", [MemoryProgressStore, lambda: None], ids=["memory", "file"])
+def test_events_and_cursor(make_store, tmp_path):
+    store = make_store() or FileProgressStore(str(tmp_path))
+    assert store.read_events("a1") == []
+
+    first = store.append_event("a1", {"last_message": "开始"})
+    store.append_event("a1", {"last_message": "市场分析"})
+    events = store.read_events("a1")
+    assert [delta["last_message"] for _, delta in events] == ["开始", "市场分析"]
+    assert events[0][0] == first
+
+    assert [delta for _, delta in store.read_events("a1", first)] == [{"last_message": "市场分析"}]
+    assert store.read_events("a1", events[-1][0]) == []
+
+    store.save_snapshot("a1", {"status": "running", CURSOR_FIELD: first})
+    assert load_progress("a1", store) == {"status": "running", "last_message": "市场分析",
+                                          CURSOR_FIELD: events[-1][0]}
+    assert store.latest_analysis_id() == "a1"
+
+
+@pytest.mark.parametrize("make_store", [MemoryProgressStore, lambda: None], ids=["memory", "file"])
+def test_blocking_read_wakes_on_new_event(make_store, tmp_path):
+    store = make_store() or FileProgressStore(str(tmp_path), poll_interval=0.02)
+    cursor = store.append_event("a1", {"step": 0})
+
+    start = time.monotonic()
+    assert store.read_events("a1", cursor, timeout=0.2) == []
+    assert time.monotonic() - start >= 0.15
+
+    threading.Timer(0.1, lambda: store.append_event("a1", {"step": 1})).start()
+    start = time.monotonic()
+    events = store.read_events("a1", cursor, timeout=5)
+    assert [delta for _, delta in events] == [{"step": 1}]
+    assert time.monotonic() - start < 1.0
+
+
+def test_file_store_skips_partial_line(tmp_path):
+    store = FileProgressStore(str(tmp_path))
+    cursor = store.append_event("a1", {"step": 0})
+    with open(store.events_path("a1"), "ab") as f:
+        f.write(b'{"step": ')
+    assert store.read_events("a1", cursor) == []
+
+    with open(store.events_path("a1"), "ab") as f:
+        f.write(b'1}\n')
+    assert [delta for _, delta in store.read_events("a1", cursor)] == [{"step": 1}]
+
+    # 事件日志不被当作快照文件
+    store.save_snapshot("a1", {"status": "running"})
+    assert [p.name for p in tmp_path.glob("progress_*.json")] == ["progress_a1.json"]
+
+
+def test_tracker_coalesces_snapshots():
+    store = CountingStore()
+    tracker = _tracker(store)
+    for i in range(50):
+        tracker.update_progress(f"🔧 工具调用 第{i}次")
+    assert store.snapshots == 1  # 只有初始化时的快照
+
+    # 快照虽然被合并，读取方仍得到最新状态
+    progress = load_progress("a1", store)
+    assert progress["last_message"] == "🔧 工具调用 第49次"
+    assert progress["steps"] == tracker.analysis_steps
+
+    tracker.mark_completed("✅ 分析完成", results={"decision": "BUY"})
+    assert store.snapshots == 2
+    assert load_progress("a1", store)["raw_results"] == {"decision": "BUY"}
+    assert "raw_results" not in store.read_events("a1")[-1][1]
+
+
+def test_tracker_writes_snapshot_after_interval():
+    store = CountingStore()
+    tracker = _tracker(store, min_write_interval=0.05)
+    tracker.update_progress("验证股票代码")
+    time.sleep(0.06)
+    tracker.update_progress("检查API密钥")
+    assert store.snapshots == 2
+    assert store.load_snapshot("a1")["last_message"] == "检查API密钥"
+
+
+def test_follow_progress_streams_updates():
+    store = MemoryProgressStore()
+    tracker = _tracker(store)
+
+    def run():
+        for message in ("验证股票代码", "检查API密钥", "预估成本"):
+            time.sleep(0.05)
+            tracker.update_progress(message)
+        tracker.mark_failed("网络错误")
+
+    threading.Thread(target=run).start()
+    messages = [state["last_message"] for state in follow_progress("a1", timeout=5, store=store)]
+    expected = ["准备开始分析...", "验证股票代码", "检查API密钥", "预估成本", "分析失败: 网络错误"]
+    # 同一批到达的事件合并为一次产出，所以只要求是按顺序的子序列
+    assert messages[0] == expected[0] and messages[-1] == expected[-1]
+    assert [m for m in expected if m in messages] == messages
+
+
+def test_wait_for_progress_update():
+    store = MemoryProgressStore()
+    cursor = store.append_event("a1", {"step": 0})
+    assert not wait_for_progress_update("a1", cursor, timeout=0.1, min_interval=0.05, store=store)
+    store.append_event("a1", {"step": 1})
+    assert wait_for_progress_update("a1", cursor, timeout=5, min_interval=0.05, store=store)
+
+
+def test_get_progress_by_id_uses_global_store(monkeypatch):
+    store = MemoryProgressStore()
+    monkeypatch.setattr(progress_store, "_progress_store", store)
+    tracker = _tracker(store, analysis_id="global1")
+    tracker.update_progress("检查API密钥")
+
+    assert get_progress_by_id("global1")["last_message"] == "检查API密钥"
+    assert get_progress_by_id("missing") is None
+
+
+def test_memory_store_is_bounded():
+    store = MemoryProgressStore(max_analyses=2)
+    for analysis_id in ("a", "b", "c"):
+        store.save_snapshot(analysis_id, {"status": "running"})
+        time.sleep(0.01)
+    assert store.load_snapshot("a") is None and store.latest_analysis_id() == "c"
+
+
+def test_redis_store_roundtrip():
+    redis = pytest.importorskip("redis")
+    client = redis.Redis(host=os.getenv("REDIS_HOST", "localhost"), port=int(os.getenv("REDIS_PORT", 6379)),
+                         password=os.getenv("REDIS_PASSWORD") or None, decode_responses=True)
+    try:
+        client.ping()
+    except Exception:
+        pytest.skip("Redis不可用")
+
+    store = RedisProgressStore(client, ttl=60)
+    analysis_id = f"test_{time.time_ns()}"
+    try:
+        first = store.append_event(analysis_id, {"step": 0})
+        store.save_snapshot(analysis_id, {"status": "running", CURSOR_FIELD: first})
+        store.append_event(analysis_id, {"step": 1})
+        assert load_progress(analysis_id, store) == {"status": "running", "step": 1,
+                                                     CURSOR_FIELD: store.read_events(analysis_id)[-1][0]}
+        assert store.latest_analysis_id() == analysis_id
+    finally:
+        client.delete(store.snapshot_key(analysis_id), store.events_key(analysis_id))
+        client.zrem(store.INDEX_KEY, analysis_id)
+
+
+def test_redis_pool_waits_for_free_connection(monkeypatch):
+    redis = pytest.importorskip("redis")
+    monkeypatch.setattr(progress_store, "_redis_pool", None)
+    monkeypatch.setenv("PROGRESS_REDIS_MAX_CONNECTIONS", "3")
+    monkeypatch.setenv("PROGRESS_REDIS_POOL_TIMEOUT", "5")
+
+    pool = progress_store.get_redis_connection_pool()
+    assert isinstance(pool, redis.BlockingConnectionPool)
+    assert pool.max_connections == 3 and pool.timeout == 5.0
+    assert progress_store.get_redis_connection_pool() is pool
+
+
+@pytest.mark.skipif(
+    not os.getenv("ENABLE_PERFORMANCE_TESTS"),
+    reason="性能测试已禁用，使用 ENABLE_PERFORMANCE_TESTS=1 启用"
+)
+def test_progress_write_benchmark(tmp_path):
+    run_benchmark(str(tmp_path))
+
+
+def run_benchmark(data_dir="./data", messages=500):
+    """对比每条消息写完整快照与合并快照+增量事件在文件存储上的耗时"""
+    results = {}
+    # 关闭每条进度的日志输出，只测量存储写入
+    tracker_logger = logging.getLogger('async_progress')
+    previous_level = tracker_logger.level
+    tracker_logger.setLevel(logging.WARNING)
+    try:
+        for label, interval in (("每条消息写快照", 0.0), ("合并快照+增量事件", 1.0)):
+            tracker = AsyncProgressTracker(f"bench_{interval}", ["market", "fundamentals", "news", "social"], 3,
+                                           "dashscope", store=FileProgressStore(data_dir), min_write_interval=interval)
+            start = time.perf_counter()
+            for i in range(messages):
+                tracker.update_progress(f"🔧 工具调用 get_stock_market_data_unified 第{i}次")
+            results[label] = time.perf_counter() - start
+    finally:
+        tracker_logger.setLevel(previous_level)
+    print("\n⚡ " + " | ".join(f"{label}: {seconds * 1000:.0f}ms" for label, seconds in results.items()))
+
+
+if __name__ == "__main__":
+    run_benchmark()
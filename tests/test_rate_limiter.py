@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+共享速率限制测试
+验证令牌桶的突发与平均速率、多个提供器实例/线程共享同一配额、环境变量覆盖与接口级配置回退、
+等待时间统计，以及Redis不可用时退回进程内限速
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from tradingagents.dataflows import rate_limiter
+from tradingagents.dataflows.rate_limiter import RateLimiterRegistry, RedisTokenBucket, TokenBucket
+
+
+def test_bucket_allows_burst_then_paces():
+    bucket = TokenBucket(rate=10, capacity=3)
+    waits = [bucket.reserve() for _ in range(5)]
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert waits[3] == pytest.approx(0.1, abs=0.02)
+    assert waits[4] == pytest.approx(0.2, abs=0.02)
+    assert TokenBucket(rate=0).reserve() == 0.0
+
+
+def test_threads_share_one_budget():
+    registry = RateLimiterRegistry(limits={"tushare": {"rate": 20, "capacity": 1}})
+    start = time.perf_counter()
+    threads = [threading.Thread(target=registry.acquire, args=("tushare",)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # 1个突发令牌 + 7个按20次/秒补充
+    assert time.perf_counter() - start == pytest.approx(0.35, abs=0.1)
+    stats = registry.get_stats()["tushare"]
+    assert stats["calls"] == 8 and stats["waits"] == 7
+    assert stats["max_wait_seconds"] == pytest.approx(0.35, abs=0.05)
+
+
+def test_provider_instances_share_quota(monkeypatch):
+    from tradingagents.dataflows.optimized_china_data import OptimizedChinaDataProvider
+
+    registry = RateLimiterRegistry(limits={"tushare": {"rate": 5, "capacity": 1}})
+    monkeypatch.setattr(rate_limiter, "_rate_limiter", registry)
+    first, second = OptimizedChinaDataProvider(), OptimizedChinaDataProvider()
+
+    start = time.perf_counter()
+    first._wait_for_rate_limit()
+    second._wait_for_rate_limit()
+    assert time.perf_counter() - start == pytest.approx(0.2, abs=0.05)
+
+
+def test_env_override_and_endpoint_fallback(monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_YFINANCE_HK_RATE", "4")
+    monkeypatch.setenv("RATE_LIMIT_YFINANCE_HK_BURST", "2")
+    registry = RateLimiterRegistry(limits={"yfinance": {"rate": 1, "capacity": 1},
+                                           "yfinance:hk": {"rate": 0.5, "capacity": 1}})
+
+    assert (registry.get("yfinance:hk").rate, registry.get("yfinance:hk").capacity) == (4.0, 2.0)
+    assert registry.get("yfinance:history").rate == 1
+    assert registry.get("unknown").rate == 0
+
+    registry.configure("yfinance", rate=8, capacity=5)
+    assert registry.get("yfinance:history").rate == 1  # 已创建的接口桶不受影响
+    assert registry.get("yfinance").capacity == 5
+
+
+def test_default_config_has_provider_limits():
+    from tradingagents.default_config import DEFAULT_CONFIG
+
+    limits = DEFAULT_CONFIG["rate_limits"]
+    assert {"tushare", "finnhub", "yfinance", "yfinance:hk", "google_news"} <= set(limits)
+
+
+def test_redis_unavailable_falls_back_to_local():
+    redis = pytest.importorskip("redis")
+    client = redis.Redis(host="127.0.0.1", port=1, socket_connect_timeout=0.2)
+    bucket = RedisTokenBucket(client, "test", rate=1, capacity=1)
+
+    assert bucket.reserve() == 0.0
+    start = time.perf_counter()
+    assert bucket.reserve() == pytest.approx(1.0, abs=0.05)
+    assert time.perf_counter() - start < 0.05  # 冷却期内不再尝试连接Redis
+
+
+@pytest.mark.skipif(not os.getenv("REDIS_URL"), reason="需要 REDIS_URL 指向可用的Redis")
+def test_redis_bucket_shared_between_instances():
+    import redis
+
+    client = redis.Redis.from_url(os.environ["REDIS_URL"])
+    name = f"test:{time.time()}"
+    first = RedisTokenBucket(client, name, rate=10, capacity=1)
+    second = RedisTokenBucket(client, name, rate=10, capacity=1)
+
+    assert first.reserve() == 0.0
+    assert second.reserve() == pytest.approx(0.1, abs=0.02)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Reddit语料日期索引测试
+验证多日查询与逐日全量扫描的旧实现结果一致、索引持久化后不再扫描语料，以及源文件变化后重建索引
+"""
+
+import json
+import os
+import re
+import sys
+from datetime import datetime, timezone
+
+import pytest
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from tradingagents.dataflows import interface, reddit_utils
+from tradingagents.dataflows.reddit_utils import (
+    RedditCorpusIndex, fetch_top_from_category, fetch_top_from_category_range, ticker_to_company
+)
+
+TITLES = ["Apple earnings beat", "AAPL to the moon", "Microsoft cloud growth", "Random chatter",
+          "Why I sold my apple shares", "Snap Inc. layoffs", "SnapXInc rumor"]
+
+
+def _ts(day, hour):
+    return int(datetime(2024, 5, day, hour, tzinfo=timezone.utc).timestamp())
+
+
+def _write_corpus(data_path):
+    for category in ("company_news", "global_news"):
+        os.makedirs(os.path.join(data_path, category))
+        for sub in range(2):
+            with open(os.path.join(data_path, category, f"sub{sub}.jsonl"), "w", encoding="utf-8") as f:
+                for i in range(60):
+                    post = {
+                        "created_utc": _ts(1 + i % 9, (i * 5) % 24),
+                        "title": TITLES[(i + sub) % len(TITLES)],
+                        "selftext": "" if i % 3 else f"body {i} mentions msft",
+                        "url": f"https://reddit.example/{category}/{sub}/{i}",
+                        "ups": (i * 37 + sub) % 11,
+                    }
+                    f.write(json.dumps(post) + "\n")
+                    if i % 10 == 0:
+                        f.write("\n")
+
+
+def _legacy_fetch(category, date, max_limit, query, data_path):
+    """旧实现：逐行解析整个文件，逐个检索词 re.search"""
+    files = os.listdir(os.path.join(data_path, category))
+    limit_per_subreddit = max_limit // len(files)
+    all_content = []
+    for data_file in files:
+        if not data_file.endswith(".jsonl"):
+            continue
+        current = []
+        with open(os.path.join(data_path, category, data_file), "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                parsed = json.loads(line)
+                post_date = datetime.utcfromtimestamp(parsed["created_utc"]).strftime("%Y-%m-%d")
+                if post_date != date:
+                    continue
+                if "company" in category and query:
+                    terms = ticker_to_company[query].split(" OR ") + [query]
+                    if not any(re.search(t, parsed["title"], re.IGNORECASE)
+                               or re.search(t, parsed["selftext"], re.IGNORECASE) for t in terms):
+                        continue
+                current.append({"title": parsed["title"], "content": parsed["selftext"],
+                                "url": parsed["url"], "upvotes": parsed["ups"], "posted_date": post_date})
+        current.sort(key=lambda x: x["upvotes"], reverse=True)
+        all_content.extend(current[:limit_per_subreddit])
+    return all_content
+
+
+@pytest.fixture
+def data_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(reddit_utils, "_indexes", {})
+    _write_corpus(str(tmp_path / "reddit_data"))
+    monkeypatch.setattr(interface, "DATA_DIR", str(tmp_path))
+    return str(tmp_path / "reddit_data")
+
+
+@pytest.mark.parametrize("category,query", [
+    ("company_news", "AAPL"), ("company_news", "MSFT"), ("company_news", "SNAP"), ("global_news", None)])
+def test_range_matches_per_day_scan(data_path, category, query):
+    dates = [f"2024-05-{d:02d}" for d in range(1, 11)]
+    by_date = fetch_top_from_category_range(category, dates, 6, query, data_path=data_path)
+    for date in dates:
+        expected = _legacy_fetch(category, date, 6, query, data_path)
+        assert by_date[date] == expected
+        assert fetch_top_from_category(category, date, 6, query, data_path=data_path) == expected
+
+
+def test_company_news_reads_each_file_once(data_path, monkeypatch):
+    opened = []
+    original_open = open
+
+    def tracking_open(path, *args, **kwargs):
+        if str(path).endswith(".jsonl"):
+            opened.append(path)
+        return original_open(path, *args, **kwargs)
+
+    RedditCorpusIndex(data_path).build()
+    monkeypatch.setattr(reddit_utils, "open", tracking_open, raising=False)
+    result = interface.get_reddit_company_news("AAPL", "2024-05-08", 7, 6)
+
+    assert result.startswith("##AAPL News Reddit, from 2024-05-01 to 2024-05-08:")
+    assert sorted(opened) == sorted(set(opened)) and len(opened) == 2
+
+
+def test_index_persisted_and_rebuilt_on_change(data_path, monkeypatch):
+    RedditCorpusIndex(data_path).build()
+
+    def fail_scan(path):
+        raise AssertionError("索引未变化时不应重新扫描语料")
+
+    with monkeypatch.context() as m:
+        m.setattr(RedditCorpusIndex, "_scan", staticmethod(fail_scan))
+        assert RedditCorpusIndex(data_path).build() == 4
+
+    path = os.path.join(data_path, "global_news", "sub0.jsonl")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"created_utc": _ts(20, 1), "title": "late post", "selftext": "",
+                            "url": "u", "ups": 1}) + "\n")
+    posts = fetch_top_from_category("global_news", "2024-05-20", 6, data_path=data_path)
+    assert [p["title"] for p in posts] == ["late post"]
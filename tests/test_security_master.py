@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+本地证券主数据测试
+验证代码写法规范化、O(1)代码查找、前缀/拼音/名称子串/模糊搜索、持久化与CSV快照导入、
+从StockInfoSyncer的MongoDB集合增量刷新，Tushare股票信息查询命中本地后不再调用API，
+以及港股占位名称不写回主数据
+"""
+
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from tradingagents.dataflows import security_master
+from tradingagents.dataflows.security_master import PYPINYIN_AVAILABLE, SecurityMaster, normalize_symbol
+
+RECORDS = [
+    {"code": "000001.SZ", "name": "平安银行", "industry": "银行", "exchange": "主板", "pinyin": "payh"},
+    {"code": "601318.SH", "name": "中国平安", "industry": "保险", "exchange": "主板", "pinyin": "zgpa"},
+    {"code": "600036.SH", "name": "招商银行", "industry": "银行", "exchange": "主板", "pinyin": "zsyh"},
+    {"code": "000002", "name": "万科A", "industry": "全国地产", "pinyin": "wka"},
+    {"code": "0700.HK", "name": "腾讯控股", "exchange": "HKEX", "pinyin": "txkg"},
+    {"code": "AAPL", "name": "Apple Inc.", "exchange": "NASDAQ"},
+]
+
+
+def _master(tmp_path, records=RECORDS):
+    master = SecurityMaster(str(tmp_path / "security_master.json"), snapshot_path="")
+    master.upsert(records, source="test")
+    return master
+
+
+def test_normalize_symbol():
+    assert normalize_symbol("000001.SZ") == ("china", "000001")
+    assert normalize_symbol("sh600000") == ("china", "600000")
+    assert normalize_symbol("00700") == ("hk", "0700")
+    assert normalize_symbol("700.hk") == ("hk", "0700")
+    assert normalize_symbol("09988.HK") == ("hk", "9988")
+    assert normalize_symbol("aapl") == ("us", "AAPL")
+    assert normalize_symbol("BRK.B") == ("us", "BRK.B")
+    assert normalize_symbol("腾讯") is None
+
+
+def test_lookup_and_persistence(tmp_path):
+    master = _master(tmp_path)
+    assert master.lookup("000001")["name"] == "平安银行"
+    assert master.lookup("sz000001")["industry"] == "银行"
+    assert master.lookup("700")["name"] == "腾讯控股"
+    assert master.lookup("000003") is None
+
+    # 空值不覆盖已有字段
+    assert master.upsert([{"code": "000001", "name": "平安银行", "industry": ""}]) == 0
+
+    reloaded = SecurityMaster(master.path, snapshot_path="")
+    assert len(reloaded) == len(RECORDS)
+    assert reloaded.lookup("AAPL")["exchange"] == "NASDAQ"
+    assert reloaded.get_stats()["markets"] == {"china": 4, "hk": 1, "us": 1}
+
+
+def test_search_ranking(tmp_path):
+    master = _master(tmp_path)
+
+    assert [r["code"] for r in master.search("平安")] == ["000001", "601318"]
+    assert master.search("600036")[0]["name"] == "招商银行"
+    assert [r["code"] for r in master.search("60")] == ["600036", "601318"]
+    assert master.search("payh")[0]["code"] == "000001"
+    assert master.search("apple")[0]["code"] == "AAPL"
+    assert [r["code"] for r in master.search("银行")] == ["000001", "600036"]
+    assert [r["code"] for r in master.search("行", market="china")] == ["000001", "600036"]
+    # 模糊：一半以上的双字片段相同
+    assert master.search("招商银")[0]["code"] == "600036"
+    assert [r["code"] for r in master.search("平安银航")] == ["000001"]
+    assert master.search("腾讯", market="us") == []
+
+    master.upsert([{"code": "000333", "name": "美的集团", "pinyin": "mdjt"}])
+    assert master.search("mdjt")[0]["code"] == "000333"  # 新增记录后索引重建
+
+
+@pytest.mark.skipif(not PYPINYIN_AVAILABLE, reason="需要 pypinyin")
+def test_pinyin_generated_from_name(tmp_path):
+    master = _master(tmp_path, [{"code": "600519", "name": "贵州茅台"}])
+    assert master.search("gzmt")[0]["code"] == "600519"
+    assert master.search("guizhou")[0]["code"] == "600519"
+
+
+def test_csv_snapshot_loaded_when_store_missing(tmp_path):
+    snapshot = tmp_path / "snapshot.csv"
+    pd.DataFrame(RECORDS).to_csv(snapshot, index=False)
+
+    master = SecurityMaster(str(tmp_path / "store" / "security_master.json"), snapshot_path=str(snapshot))
+    assert len(master) == len(RECORDS)
+    assert master.lookup("601318")["source"] == "snapshot"
+    assert os.path.exists(master.path)
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+
+    def find(self, query):
+        self.queries.append(query)
+        since = query.get("updated_at", {}).get("$gt")
+        return [doc for doc in self.docs if since is None or doc["updated_at"] > since]
+
+
+class FakeSyncer:
+    collection_name = "stock_basic_info"
+
+    def __init__(self, docs):
+        self.collection = FakeCollection(docs)
+        self.mongodb_db = {self.collection_name: self.collection}
+
+
+def test_incremental_refresh_from_syncer(tmp_path):
+    first_sync = datetime(2025, 1, 1)
+    docs = [
+        {"code": "000001", "name": "平安银行", "sse": "sz", "sec": "stock_cn", "updated_at": first_sync},
+        {"code": "000001", "name": "上证指数", "sse": "sh", "sec": "index_cn", "updated_at": first_sync},
+        {"code": "600036", "name": "招商银行", "sse": "sh", "sec": "stock_cn", "updated_at": first_sync},
+    ]
+    syncer = FakeSyncer(docs)
+    master = SecurityMaster(str(tmp_path / "security_master.json"), snapshot_path="")
+
+    assert master.refresh_from_syncer(syncer) == 2
+    assert master.lookup("000001")["name"] == "平安银行"
+    assert master.lookup("000001")["exchange"] == "SZ"
+
+    docs.append({"code": "000002", "name": "万科A", "sse": "sz", "sec": "stock_cn",
+                 "updated_at": first_sync + timedelta(days=1)})
+    reloaded = SecurityMaster(master.path, snapshot_path="")
+    assert reloaded.refresh_from_syncer(syncer) == 1
+    assert syncer.collection.queries[-1] == {"updated_at": {"$gt": first_sync}}
+    assert len(reloaded) == 3
+
+
+def test_tushare_stock_info_served_locally(tmp_path, monkeypatch):
+    from tradingagents.dataflows.tushare_utils import TushareProvider
+
+    class FakeApi:
+        calls = 0
+
+        def stock_basic(self, **kwargs):
+            FakeApi.calls += 1
+            return pd.DataFrame([{"ts_code": "000001.SZ", "symbol": "000001", "name": "平安银行", "area": "深圳",
+                                  "industry": "银行", "market": "主板", "list_date": "19910403"}])
+
+    monkeypatch.delenv("TUSHARE_TOKEN", raising=False)
+    monkeypatch.setattr(security_master, "_security_master",
+                        SecurityMaster(str(tmp_path / "security_master.json"), snapshot_path=""))
+    provider = TushareProvider(enable_cache=False)
+    provider.connected, provider.api = True, FakeApi()
+
+    first = provider.get_stock_info("000001")
+    second = provider.get_stock_info("000001.SZ")
+    assert FakeApi.calls == 1
+    assert (second["name"], second["industry"], second["market"], second["list_date"]) == \
+           (first["name"], first["industry"], first["market"], first["list_date"])
+    assert second["ts_code"] == "000001.SZ"
+
+    results = provider.search_stocks("平安")
+    assert list(results["symbol"]) == ["000001"]
+    assert FakeApi.calls == 1
+
+
+def test_hk_placeholder_name_not_written_back(tmp_path, monkeypatch):
+    from tradingagents.dataflows import interface
+    from tradingagents.utils.stock_validator import StockDataPreparer
+
+    master = SecurityMaster(str(tmp_path / "security_master.json"), snapshot_path="")
+    monkeypatch.setattr(security_master, "_security_master", master)
+    monkeypatch.setattr(interface, "get_hk_stock_data_unified", lambda *args: "❌ 数据源不可用")
+
+    # 所有数据源失败时的占位信息
+    monkeypatch.setattr(interface, "get_hk_stock_info_unified", lambda symbol: {
+        "symbol": symbol, "name": f"港股{symbol}", "currency": "HKD", "exchange": "HKG", "source": "fallback"})
+    StockDataPreparer()._prepare_hk_stock_data("0700.HK", 30, "2024-05-01")
+    assert master.lookup("0700.HK") is None
+
+    monkeypatch.setattr(interface, "get_hk_stock_info_unified", lambda symbol: {
+        "symbol": symbol, "name": "腾讯控股", "currency": "HKD", "exchange": "HKG", "source": "akshare"})
+    StockDataPreparer()._prepare_hk_stock_data("0700.HK", 30, "2024-05-01")
+    assert master.lookup("0700.HK")["name"] == "腾讯控股"
+
+
+@pytest.mark.skipif(
+    not os.getenv("ENABLE_PERFORMANCE_TESTS"),
+    reason="性能测试已禁用，使用 ENABLE_PERFORMANCE_TESTS=1 启用"
+)
+def test_security_master_benchmark(tmp_path):
+    run_benchmark(str(tmp_path / "security_master.json"))
+
+
+def run_benchmark(path=None, count=6000):
+    """对比本地索引与全表 str.contains 扫描在数千只股票上的查找和搜索耗时"""
+    import tempfile
+
+    chars = "平安银行招商中国建设工商农业交通浦发兴业光大民生华夏科技医药电子能源地产汽车"
+    records = [{"code": f"{600000 + i:06d}", "ts_code": f"{600000 + i:06d}.SH",
+                "name": "".join(chars[(i * 7 + k * 3) % len(chars)] for k in range(4))} for i in range(count)]
+    master = SecurityMaster(path or os.path.join(tempfile.mkdtemp(), "security_master.json"), snapshot_path="")
+    master.upsert(records, save=False)
+    master.search("预热")
+    frame = pd.DataFrame(records).rename(columns={"code": "symbol"})
+    queries = [records[i]["name"][:2] for i in range(0, count, count // 50)]
+
+    start = time.perf_counter()
+    for record in records[:1000]:
+        master.lookup(record["ts_code"])
+    lookup_us = (time.perf_counter() - start) / 1000 * 1e6
+
+    start = time.perf_counter()
+    for query in queries:
+        master.search(query)
+    index_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+    start = time.perf_counter()
+    for query in queries:
+        frame[frame["name"].str.contains(query, na=False) | frame["symbol"].str.contains(query, na=False) |
+              frame["ts_code"].str.contains(query, na=False)]
+    scan_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+    print(f"\n⚡ {count}只股票: 代码查找 {lookup_us:.1f}微秒/次 | 搜索 索引 {index_ms:.2f}毫秒 vs "
+          f"全表扫描 {scan_ms:.2f}毫秒")
+
+
+if __name__ == "__main__":
+    run_benchmark()
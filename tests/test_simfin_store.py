@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+SimFin分区存储测试
+验证按截止日期查找的结果与逐次解析整份CSV的旧实现完全一致，以及源文件更新后的增量导入
+"""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from tradingagents.dataflows import interface
+from tradingagents.dataflows.simfin_store import SimFinStore, get_simfin_store
+
+ROWS = [
+    # Ticker, SimFinId, Fiscal Year, Report Date, Publish Date, Revenue, Net Income
+    ("AAPL", 111, 2022, "2022-09-30", "2022-10-28", 394.3e9, 99.8e9),
+    ("MSFT", 222, 2022, "2022-06-30", "2022-07-28", 198.2e9, None),
+    ("AAPL", 111, 2023, "2023-09-30", "2023-11-03", 383.2e9, 97.0e9),
+    ("AAPL", 111, 2023, "2023-09-30", "2023-11-03", 383.3e9, 97.1e9),
+    ("MSFT", 222, 2023, "2023-06-30", "2023-07-27", 211.9e9, 72.4e9),
+    ("AAPL", 111, 2021, "2021-09-30", "2021-10-29", 365.8e9, 94.7e9),
+    ("BRK.A", 333, 2023, "2023-12-31", "2024-02-26", 364.5e9, 96.2e9),
+]
+
+GETTERS = [
+    ("balance_sheet", "balance", interface.get_simfin_balance_sheet),
+    ("cash_flow", "cashflow", interface.get_simfin_cashflow),
+    ("income_statements", "income", interface.get_simfin_income_statements),
+]
+
+
+def _write_dump(data_dir, statement, prefix, rows, freq="annual"):
+    path = os.path.join(data_dir, "fundamental_data", "simfin_data_all",
+                        statement, "companies", "us", f"us-{prefix}-{freq}.csv")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pd.DataFrame(rows, columns=["Ticker", "SimFinId", "Fiscal Year", "Report Date",
+                                "Publish Date", "Revenue", "Net Income"]).to_csv(path, sep=";", index=False)
+    return path
+
+
+def _legacy_latest(path, ticker, curr_date):
+    """旧实现：每次解析整份CSV后过滤"""
+    df = pd.read_csv(path, sep=";")
+    df["Report Date"] = pd.to_datetime(df["Report Date"], utc=True).dt.normalize()
+    df["Publish Date"] = pd.to_datetime(df["Publish Date"], utc=True).dt.normalize()
+    curr_date_dt = pd.to_datetime(curr_date, utc=True).normalize()
+    filtered_df = df[(df["Ticker"] == ticker) & (df["Publish Date"] <= curr_date_dt)]
+    if filtered_df.empty:
+        return None
+    return filtered_df.loc[filtered_df["Publish Date"].idxmax()].drop("SimFinId")
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    data_dir = str(tmp_path)
+    for statement, prefix, _ in GETTERS:
+        _write_dump(data_dir, statement, prefix, ROWS)
+    monkeypatch.setattr(interface, "DATA_DIR", data_dir)
+    return data_dir
+
+
+@pytest.mark.parametrize("ticker", ["AAPL", "MSFT", "BRK.A", "TSLA"])
+@pytest.mark.parametrize("curr_date", ["2021-01-01", "2021-10-29", "2023-11-02", "2023-11-03", "2025-01-01"])
+def test_output_matches_full_csv_scan(data_dir, ticker, curr_date):
+    for statement, prefix, getter in GETTERS:
+        path = get_simfin_store(data_dir).source_path(statement, "annual")
+        expected = _legacy_latest(path, ticker, curr_date)
+        output = getter(ticker, "annual", curr_date)
+        if expected is None:
+            assert output == ""
+        else:
+            assert str(expected) in output
+            assert f"released on {str(expected['Publish Date'])[0:10]}" in output
+
+
+def test_incremental_reingestion(tmp_path):
+    data_dir = str(tmp_path)
+    path = _write_dump(data_dir, "income_statements", "income", ROWS)
+    store = SimFinStore(data_dir)
+
+    assert store.ingest("income_statements", "annual") == 3
+    assert store.ingest("income_statements", "annual") == 0
+
+    # 刷新后的导出：MSFT新增一期、BRK.A退市，AAPL不变
+    refreshed = [r for r in ROWS if r[0] != "BRK.A"] + [
+        ("MSFT", 222, 2024, "2024-06-30", "2024-07-30", 245.1e9, 88.1e9)]
+    _write_dump(data_dir, "income_statements", "income", refreshed)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    # 只重写内容变化的MSFT分区
+    assert store.ingest("income_statements", "annual") == 1
+    latest = store.get_latest("MSFT", "income_statements", "annual", "2025-01-01")
+    assert latest["Fiscal Year"] == 2024
+    manifest = store._load_manifest()["income_statements/annual"]
+    assert sorted(manifest["tickers"]) == ["AAPL", "MSFT"]
+    assert store.get_latest("BRK.A", "income_statements", "annual", "2025-01-01") is None
+    assert not os.path.exists(store._partition_path("income_statements", "annual", "BRK.A"))
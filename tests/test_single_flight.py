@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+请求合并测试
+验证同一键的并发未命中只访问一次数据源、异常与超时传递给所有等待方，以及跨进程锁后的缓存复查
+"""
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from tradingagents.dataflows import data_source_manager
+from tradingagents.dataflows.cache_manager import StockDataCache
+from tradingagents.dataflows.optimized_china_data import OptimizedChinaDataProvider
+from tradingagents.dataflows.single_flight import (
+    FileFlightLock, SingleFlight, SingleFlightTimeout, make_flight_key
+)
+
+
+def _run_concurrently(fn, n=8):
+    with ThreadPoolExecutor(max_workers=n) as pool:
+        futures = [pool.submit(fn) for _ in range(n)]
+        return [f.exception() or f.result() for f in futures]
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return "data"
+
+    results = _run_concurrently(lambda: flight.do("k", fetch))
+    assert results == ["data"] * 8
+    assert len(calls) == 1
+    assert flight.get_stats()["shared"] == 7
+    assert flight.in_flight() == 0
+
+    # 请求结束后不再合并
+    assert flight.do("k", fetch) == "data"
+    assert len(calls) == 2
+
+
+def test_error_propagates_to_all_waiters():
+    flight = SingleFlight()
+
+    def fetch():
+        time.sleep(0.2)
+        raise ConnectionError("rate limited")
+
+    results = _run_concurrently(lambda: flight.do("k", fetch), n=4)
+    assert all(isinstance(r, ConnectionError) for r in results)
+
+
+def test_waiter_timeout():
+    flight = SingleFlight(timeout=0.05)
+    release = threading.Event()
+    leader = threading.Thread(target=lambda: flight.do("k", release.wait))
+    leader.start()
+    while not flight.in_flight():
+        time.sleep(0.01)
+
+    with pytest.raises(SingleFlightTimeout):
+        flight.do("k", lambda: "never")
+    release.set()
+    leader.join()
+
+
+def test_file_lock_rechecks_cache_across_processes(tmp_path):
+    """两个实例模拟两个进程：后拿到锁的一方复查缓存命中，不再访问数据源"""
+    cache = {}
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        cache["k"] = "data"
+        return "data"
+
+    flights = [SingleFlight(timeout=5, process_lock=FileFlightLock(str(tmp_path))) for _ in range(2)]
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [pool.submit(f.do, "k", fetch, recheck=lambda: cache.get("k")) for f in flights]
+        assert [f.result() for f in futures] == ["data", "data"]
+    assert len(calls) == 1
+    assert not list(tmp_path.glob("*.lock"))
+
+
+def test_stale_file_lock_is_taken_over(tmp_path):
+    lock = FileFlightLock(str(tmp_path), ttl=0.1)
+    assert lock.acquire("k", timeout=0) is not None
+    assert lock.acquire("k", timeout=0) is None
+    time.sleep(0.15)
+    assert lock.acquire("k", timeout=0.5) is not None
+
+
+def test_china_provider_fetches_once(tmp_path, monkeypatch):
+    """多个会话同时分析同一只A股时只调用一次统一数据接口"""
+    calls = []
+
+    def fake_unified(symbol, start_date, end_date):
+        calls.append(symbol)
+        time.sleep(0.2)
+        return f"# {symbol} 股票数据"
+
+    monkeypatch.setattr(data_source_manager, "get_china_stock_data_unified", fake_unified)
+    provider = OptimizedChinaDataProvider()
+    provider.cache = StockDataCache(cache_dir=str(tmp_path), storage_format="csv")
+    provider.min_api_interval = 0
+
+    results = _run_concurrently(lambda: provider.get_stock_data("600519", "2024-01-01", "2024-03-31"))
+    assert results == ["# 600519 股票数据"] * 8
+    assert calls == ["600519"]
+
+
+def test_flight_key_normalization():
+    assert make_flight_key("us", "stock_data", " aapl ", "2024-01-01", None) == "US:STOCK_DATA:AAPL:2024-01-01"
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+技术指标窗口引擎测试
+验证 get_stock_stats_indicators_window 的向量化实现与逐日计算结果一致，并对比性能
+"""
+
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from dateutil.relativedelta import relativedelta
+from stockstats import wrap
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from tradingagents.dataflows import interface
+from tradingagents.dataflows import stockstats_utils
+from tradingagents.dataflows.price_frame_store import get_price_frame_store
+
+SYMBOL = "TEST"
+CSV_NAME = f"{SYMBOL}-YFin-data-2015-01-01-2025-03-25.csv"
+
+
+def _write_price_csv(price_dir, years=10):
+    """生成与YFin离线数据同格式的合成行情"""
+    dates = pd.bdate_range("2015-01-02", periods=252 * years)
+    rng = np.random.default_rng(42)
+    close = 100 + np.cumsum(rng.normal(0, 1, len(dates)))
+    data = pd.DataFrame({
+        "Date": dates.strftime("%Y-%m-%d"),
+        "Open": close + rng.normal(0, 0.5, len(dates)),
+        "High": close + 1 + rng.random(len(dates)),
+        "Low": close - 1 - rng.random(len(dates)),
+        "Close": close,
+        "Adj Close": close,
+        "Volume": rng.integers(1_000_000, 5_000_000, len(dates)),
+    })
+    os.makedirs(price_dir, exist_ok=True)
+    data.to_csv(os.path.join(price_dir, CSV_NAME), index=False)
+
+
+def _legacy_indicator_window(data_dir, indicator, curr_date, look_back_days):
+    """旧实现：逐日回溯，每天重新读取CSV并包装"""
+    price_file = os.path.join(data_dir, "market_data", "price_data", CSV_NAME)
+    end = datetime.strptime(curr_date, "%Y-%m-%d")
+    before = end - relativedelta(days=look_back_days)
+    dates_in_df = pd.read_csv(price_file)["Date"].astype(str).str[:10]
+
+    lines = ""
+    day = end
+    while day >= before:
+        day_str = day.strftime("%Y-%m-%d")
+        if day_str in dates_in_df.values:
+            df = wrap(pd.read_csv(price_file))
+            df[indicator]
+            value = df[df["Date"].str.startswith(day_str)][indicator].values[0]
+            lines += f"{day_str}: {value}\n"
+        day = day - relativedelta(days=1)
+    return lines
+
+
+@pytest.fixture
+def price_data_dir(tmp_path, monkeypatch):
+    _write_price_csv(os.path.join(tmp_path, "market_data", "price_data"))
+    monkeypatch.setattr(interface, "DATA_DIR", str(tmp_path))
+    get_price_frame_store().clear()
+    yield str(tmp_path)
+    get_price_frame_store().clear()
+
+
+def _parse_lines(lines):
+    return [(line.split(": ")[0], float(line.split(": ")[1])) for line in lines.strip().splitlines()]
+
+
+def test_window_matches_legacy_per_day_values(price_data_dir):
+    """向量化窗口输出与逐日计算一致（价格以float32存储，允许微小误差）"""
+    for indicator in ["rsi", "close_50_sma", "macd", "boll_ub"]:
+        report = interface.get_stock_stats_indicators_window(
+            SYMBOL, indicator, "2020-06-30", 30, False
+        )
+        header = f"## {indicator} values from 2020-05-31 to 2020-06-30:\n\n"
+        assert report.startswith(header)
+        actual = _parse_lines(report[len(header):].split("\n\n")[0])
+        expected = _parse_lines(_legacy_indicator_window(price_data_dir, indicator, "2020-06-30", 30))
+        assert [d for d, _ in actual] == [d for d, _ in expected]
+        np.testing.assert_allclose([v for _, v in actual], [v for _, v in expected], rtol=1e-4)
+
+
+def test_multiple_indicators_in_one_call(price_data_dir):
+    """一次调用返回多个指标，且与单独调用结果一致"""
+    combined = interface.get_stock_stats_indicators_window(
+        SYMBOL, ["rsi", "macd", "atr"], "2019-03-15", 60, False
+    )
+    comma = interface.get_stock_stats_indicators_window(
+        SYMBOL, "rsi, macd, atr", "2019-03-15", 60, False
+    )
+    singles = [
+        interface.get_stock_stats_indicators_window(SYMBOL, ind, "2019-03-15", 60, False)
+        for ind in ["rsi", "macd", "atr"]
+    ]
+    assert combined == comma == "\n\n".join(singles)
+
+
+def test_price_file_loaded_once(price_data_dir, monkeypatch):
+    """同一标的多次调用只读取一次CSV"""
+    calls = []
+    original_read_csv = stockstats_utils.pd.read_csv
+
+    def counting_read_csv(*args, **kwargs):
+        calls.append(args[0])
+        return original_read_csv(*args, **kwargs)
+
+    monkeypatch.setattr(stockstats_utils.pd, "read_csv", counting_read_csv)
+    for indicator in ["rsi", "macd", "boll", "vwma"]:
+        interface.get_stock_stats_indicators_window(SYMBOL, indicator, "2021-01-29", 90, False)
+    assert len(calls) == 1
+
+
+def test_unsupported_indicator_raises(price_data_dir):
+    with pytest.raises(ValueError):
+        interface.get_stock_stats_indicators_window(SYMBOL, "rsi,not_an_indicator", "2020-06-30", 30, False)
+
+
+@pytest.mark.skipif(
+    not os.getenv("ENABLE_PERFORMANCE_TESTS"),
+    reason="性能测试已禁用，使用 ENABLE_PERFORMANCE_TESTS=1 启用"
+)
+def test_window_performance(price_data_dir):
+    run_benchmark(price_data_dir)
+
+
+def run_benchmark(data_dir, indicator="rsi", curr_date="2024-06-28"):
+    """对比30/90/250天窗口下逐日实现与窗口引擎的单次调用耗时"""
+    print(f"\n⚡ 技术指标窗口性能对比 ({indicator})")
+    for look_back_days in (30, 90, 250):
+        start = time.perf_counter()
+        _legacy_indicator_window(data_dir, indicator, curr_date, look_back_days)
+        legacy_ms = (time.perf_counter() - start) * 1000
+
+        get_price_frame_store().clear()
+        start = time.perf_counter()
+        interface.get_stock_stats_indicators_window(SYMBOL, indicator, curr_date, look_back_days, False)
+        cold_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        interface.get_stock_stats_indicators_window(SYMBOL, indicator, curr_date, look_back_days, False)
+        warm_ms = (time.perf_counter() - start) * 1000
+
+        print(f"  {look_back_days:>3}天: 逐日 {legacy_ms:8.1f}ms | 窗口(冷) {cold_ms:6.1f}ms | 窗口(热) {warm_ms:6.1f}ms")
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        _write_price_csv(os.path.join(tmp_dir, "market_data", "price_data"))
+        interface.DATA_DIR = tmp_dir
+        run_benchmark(tmp_dir)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Token使用记录账本测试
+验证追加写入、内存汇总、保留条数压缩、多个实例共用账本时汇总同步、旧版usage.json迁移，以及记录开销不随历史增长
+"""
+
+import json
+import os
+import sys
+import time
+from dataclasses import asdict
+from datetime import datetime, timedelta
+
+import pytest
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from tradingagents.config.config_manager import ConfigManager, TokenTracker, UsageRecord
+from tradingagents.config.usage_ledger import UsageLedger
+
+
+def _record(cost=1.0, provider="dashscope", session_id="s1", days_ago=0):
+    return {
+        "timestamp": (datetime.now() - timedelta(days=days_ago)).isoformat(),
+        "provider": provider,
+        "model_name": "qwen-turbo",
+        "input_tokens": 100,
+        "output_tokens": 50,
+        "cost": cost,
+        "session_id": session_id,
+        "analysis_type": "stock_analysis",
+    }
+
+
+def test_statistics_match_records(tmp_path):
+    ledger = UsageLedger(tmp_path / "usage.jsonl")
+    ledger.append(_record(1.0, "dashscope", "s1"))
+    ledger.append(_record(2.0, "openai", "s1"))
+    ledger.append(_record(4.0, "dashscope", "s2", days_ago=3))
+    ledger.append(_record(8.0, "dashscope", "s3", days_ago=40))
+
+    stats = ledger.get_statistics(30)
+    assert stats["total_requests"] == 3 and stats["total_cost"] == 7.0
+    assert stats["provider_stats"]["dashscope"] == {
+        "cost": 5.0, "input_tokens": 200, "output_tokens": 100, "requests": 2}
+    assert ledger.get_statistics(1)["total_cost"] == 3.0
+    assert ledger.get_day_cost() == 3.0
+    assert ledger.get_session_cost("s1") == 3.0
+
+    # 落盘后重新打开，汇总一致
+    ledger.flush()
+    with open(tmp_path / "usage.jsonl", encoding="utf-8") as f:
+        assert len(f.readlines()) == 4
+    reopened = UsageLedger(tmp_path / "usage.jsonl")
+    assert reopened.get_statistics(30) == stats
+
+
+def test_compaction_enforces_retention(tmp_path):
+    ledger = UsageLedger(tmp_path / "usage.jsonl", max_records=20, batch_size=5)
+    for i in range(50):
+        ledger.append(_record(cost=1.0, session_id=f"s{i}"))
+    ledger.flush()
+    ledger.compact()
+
+    records = ledger.records()
+    assert len(records) == 20
+    assert records[-1]["session_id"] == "s49"
+    assert len(ledger) == 20
+    assert ledger.get_statistics(1)["total_requests"] == 20
+    assert ledger.get_session_cost("s0") == 0
+
+
+def test_statistics_day_window_is_inclusive_of_today(tmp_path):
+    ledger = UsageLedger(tmp_path / "usage.jsonl")
+    ledger.append(_record(1.0))
+    ledger.append(_record(2.0, days_ago=1))
+    ledger.append(_record(4.0, days_ago=2))
+
+    assert ledger.get_statistics(1)["total_cost"] == 1.0
+    assert ledger.get_statistics(2)["total_cost"] == 3.0
+    assert ledger.get_statistics(3)["total_cost"] == 7.0
+
+
+def test_rewrites_are_exclusive_across_processes(tmp_path):
+    """另一个进程持有账本锁时，压缩不会重写账本，追加会等待锁释放"""
+    path = tmp_path / "usage.jsonl"
+    ledger = UsageLedger(path, flush_interval=0.01)
+    for i in range(5):
+        ledger.append(_record(session_id=f"s{i}"))
+    ledger.flush()
+    ledger.max_records = 2  # 落盘后再收紧，避免后台线程自动压缩
+
+    lock_path = tmp_path / "usage.jsonl.lock"
+    lock_path.write_text("other-process")
+    ledger.compact()
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 5
+
+    # 另一个进程（第二个账本实例）的追加在锁释放前不会落盘
+    other = UsageLedger(path, flush_interval=0.01)
+    other.append(_record(session_id="other"))
+    other.flush(timeout=0.3)
+    assert "other" not in path.read_text(encoding="utf-8")
+
+    lock_path.unlink()
+    other.flush()
+    ledger.compact()
+    sessions = [r["session_id"] for r in ledger.records()]
+    assert sessions == ["s4", "other"]
+    assert not lock_path.exists()
+
+
+def test_statistics_include_other_instances_appends(tmp_path):
+    """Web和CLI共用账本：另一个实例追加、压缩或替换后，本实例的汇总随之更新"""
+    path = tmp_path / "usage.jsonl"
+    web = UsageLedger(path, flush_interval=0.01)
+    cli = UsageLedger(path, flush_interval=0.01)
+
+    web.append(_record(1.0, session_id="web"))
+    web.flush()
+    cli.append(_record(2.0, session_id="cli"))
+    cli.flush()
+    assert web.get_day_cost() == 3.0 and cli.get_day_cost() == 3.0
+    assert web.get_session_cost("cli") == 2.0 and len(web) == 2
+
+    # 本实例自己的追加不会在同步时重复计入
+    web.append(_record(4.0, session_id="web"))
+    web.flush()
+    assert web.get_day_cost() == 7.0 and cli.get_day_cost() == 7.0
+    assert cli.get_statistics(1)["total_requests"] == 3 == len(cli.records())
+
+    # 其他进程压缩/替换后从头重建
+    cli.replace([_record(5.0, session_id="cli")])
+    assert web.get_day_cost() == 5.0 and web.get_session_cost("web") == 0
+
+    # 未写完的行等写完后再计入
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(_record(6.0, session_id="partial"))[:20])
+    assert web.get_day_cost() == 5.0
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(_record(6.0, session_id="partial"))[20:] + "\n")
+    assert web.get_day_cost() == 11.0 and web.get_session_cost("partial") == 6.0
+
+
+def test_legacy_usage_json_is_migrated(tmp_path):
+    records = [_record(cost=0.5, session_id="old")] * 3
+    with open(tmp_path / "usage.json", "w", encoding="utf-8") as f:
+        json.dump(records, f, indent=2)
+
+    config_manager = ConfigManager(str(tmp_path))
+    assert len(config_manager.load_usage_records()) == 3
+    assert TokenTracker(config_manager).get_session_cost("old") == 1.5
+    assert not (tmp_path / "usage.json").exists()
+    assert (tmp_path / "usage.json.bak").exists()
+
+
+def test_config_manager_round_trip(tmp_path):
+    config_manager = ConfigManager(str(tmp_path))
+    tracker = TokenTracker(config_manager)
+    record = tracker.track_usage("dashscope", "qwen-turbo", 2000, 1000, session_id="abc")
+    assert tracker.get_session_cost("abc") == record.cost
+
+    loaded = config_manager.load_usage_records()
+    assert [asdict(r) for r in loaded] == [asdict(record)]
+
+    config_manager.save_usage_records([])
+    assert config_manager.load_usage_records() == []
+    assert config_manager.get_usage_statistics(30)["total_requests"] == 0
+
+
+@pytest.mark.skipif(
+    not os.getenv("ENABLE_PERFORMANCE_TESTS"),
+    reason="性能测试已禁用，使用 ENABLE_PERFORMANCE_TESTS=1 启用"
+)
+def test_tracking_cost_independent_of_history(tmp_path):
+    run_benchmark(str(tmp_path))
+
+
+def run_benchmark(config_dir, history=10000, calls=200):
+    """已有大量历史记录时，单次 add_usage_record 的耗时"""
+    config_manager = ConfigManager(config_dir)
+    config_manager.save_usage_records([UsageRecord(**_record(session_id=f"h{i}")) for i in range(history)])
+
+    start = time.perf_counter()
+    for i in range(calls):
+        config_manager.add_usage_record("dashscope", "qwen-turbo", 1000, 500, f"bench{i}")
+        config_manager.get_usage_statistics(1)
+    per_call_ms = (time.perf_counter() - start) * 1000 / calls
+    config_manager.usage_ledger.flush()
+    print(f"\n⚡ {history}条历史记录: 记录+统计 {per_call_ms:.3f}ms/次")
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        run_benchmark(tmp_dir)
@@ -4,7 +4,7 @@
 """
 
 from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from datetime import datetime
 import logging
 
@@ -61,9 +61,25 @@ class FinancialData:
 class FundamentalsDataCollector:
     """基本面数据收集器"""
 
-    def __init__(self, enable_cache: bool = True):
+    # FinancialData中按年份保存的字段
+    YEARLY_FIELDS = (
+        'revenue', 'net_income', 'gross_profit', 'total_assets', 'total_debt',
+        'shareholders_equity', 'operating_cash_flow', 'free_cash_flow'
+    )
+    RATIO_FIELDS = ('pe_ratio', 'pb_ratio', 'roe', 'roa', 'debt_to_equity')
+
+    def __init__(self, enable_cache: bool = True, concurrent: bool = True,
+                 source_timeout: float = 30.0):
+        """
+        Args:
+            enable_cache: 是否启用缓存
+            concurrent: 是否并发请求各数据源（否则按优先级依次尝试）
+            source_timeout: 并发模式下单个数据源的超时秒数，超时的数据源按缺失处理
+        """
         self.enable_cache = enable_cache
         self.cache = {}
+        self.concurrent = concurrent
+        self.source_timeout = source_timeout
 
         # 数据源优先级配置
         self.data_source_priority = {
@@ -253,21 +269,15 @@ class FundamentalsDataCollector:
             free_cash_flow={}
         )
 
+        if self.concurrent and len(data_sources) > 1:
+            return self._collect_concurrently(financial_data, data_sources, years)
+
         # 尝试从各个数据源获取数据
         for data_source in data_sources:
             try:
                 logger.debug(f"尝试从 {data_source} 获取 {symbol} 财务数据")
 
-                if data_source == 'tushare':
-                    self._collect_from_tushare(financial_data, years)
-                elif data_source == 'akshare':
-                    self._collect_from_akshare(financial_data, years)
-                elif data_source == 'finnhub':
-                    self._collect_from_finnhub(financial_data, years)
-                elif data_source == 'yahoo':
-                    self._collect_from_yahoo(financial_data, years)
-                elif data_source == 'fallback':
-                    self._collect_fallback_data(financial_data, years)
+                self._collect_from_source(data_source, financial_data, years)
 
                 # 标记数据源
                 financial_data.data_sources.append(data_source)
@@ -283,6 +293,72 @@ class FundamentalsDataCollector:
 
         return financial_data
 
+    def _collect_from_source(self, data_source: str, financial_data: FinancialData, years: int):
+        """从单个数据源收集数据到financial_data"""
+        if data_source == 'tushare':
+            self._collect_from_tushare(financial_data, years)
+        elif data_source == 'akshare':
+            self._collect_from_akshare(financial_data, years)
+        elif data_source == 'finnhub':
+            self._collect_from_finnhub(financial_data, years)
+        elif data_source == 'yahoo':
+            self._collect_from_yahoo(financial_data, years)
+        elif data_source == 'fallback':
+            self._collect_fallback_data(financial_data, years)
+
+    def _collect_concurrently(self, financial_data: FinancialData,
+                              data_sources: List[str], years: int) -> FinancialData:
+        """
+        并发请求所有数据源，各自写入独立的FinancialData，再按优先级顺序合并：
+        与依次尝试相同，后合并的数据源覆盖同一年份的值，数据充足后停止合并。
+        超时或失败的数据源跳过，不影响其他数据源的结果
+        """
+        from tradingagents.dataflows.concurrent_fetch import FetchTask, fetch_concurrently
+
+        def collect(data_source: str) -> FinancialData:
+            partial = replace(
+                financial_data, data_sources=[],
+                **{field: {} for field in self.YEARLY_FIELDS}
+            )
+            self._collect_from_source(data_source, partial, years)
+            return partial
+
+        results = fetch_concurrently([
+            FetchTask(data_source, lambda data_source=data_source: collect(data_source),
+                      source=data_source, timeout=self.source_timeout)
+            for data_source in data_sources
+        ])
+
+        for data_source, result in results.items():
+            if result.timed_out:
+                logger.warning(f"从 {data_source} 获取 {financial_data.symbol} 数据超时，已跳过")
+                continue
+            if result.error is not None:
+                logger.warning(f"从 {data_source} 获取 {financial_data.symbol} 数据失败: {result.error}")
+                continue
+
+            self._merge_financial_data(financial_data, result.value)
+            financial_data.data_sources.append(data_source)
+
+            if self._is_data_sufficient(financial_data, years):
+                logger.debug(f"{data_source} 提供了足够的数据")
+                break
+
+        return financial_data
+
+    def _merge_financial_data(self, target: FinancialData, partial: FinancialData):
+        """把单个数据源的结果合并到target"""
+        for field in self.YEARLY_FIELDS:
+            getattr(target, field).update(getattr(partial, field))
+        for field in self.RATIO_FIELDS:
+            value = getattr(partial, field)
+            if value is not None:
+                setattr(target, field, value)
+        if partial.fiscal_year_end is not None:
+            target.fiscal_year_end = partial.fiscal_year_end
+        if partial.data_currency != target.data_currency:
+            target.data_currency = partial.data_currency
+
     def _collect_from_tushare(self, financial_data: FinancialData, years: int):
         """从Tushare收集数据"""
         try:
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Embedding缓存
+所有 FinancialSituationMemory 实例共享，按 (提供商, 模型, sha256(文本)) 缓存向量：
+进程内LRU + 可选的Redis/磁盘持久层，同一文本的并发请求只调用一次嵌入API
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from tradingagents.dataflows.single_flight import SingleFlight
+
+# 导入统一日志系统
+from tradingagents.utils.logging_init import get_logger
+logger = get_logger("agents.utils.embedding_cache")
+
+
+def make_embedding_key(provider: str, model: str, text: str) -> str:
+    """生成缓存键：提供商:模型:文本sha256"""
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{provider}:{model}:{digest}"
+
+
+class FileEmbeddingStore:
+    """磁盘持久层，每个向量一个 .npy 文件"""
+
+    name = "file"
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / (key.replace(":", "_").replace("/", "_") + ".npy")
+
+    def get(self, key: str) -> Optional[List[float]]:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        return np.load(path).tolist()
+
+    def put(self, key: str, embedding: List[float]):
+        path = self._path(key)
+        tmp_path = path.with_suffix(".tmp.npy")
+        np.save(tmp_path, np.asarray(embedding, dtype=np.float64))
+        os.replace(tmp_path, path)
+
+
+class RedisEmbeddingStore:
+    """Redis持久层，向量以float64字节串保存"""
+
+    name = "redis"
+
+    def __init__(self, client, ttl_seconds: int = 7 * 24 * 3600, prefix: str = "tradingagents:embedding:"):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[List[float]]:
+        value = self.client.get(self.prefix + key)
+        if value is None:
+            return None
+        return np.frombuffer(value, dtype=np.float64).tolist()
+
+    def put(self, key: str, embedding: List[float]):
+        self.client.set(self.prefix + key, np.asarray(embedding, dtype=np.float64).tobytes(),
+                        ex=self.ttl_seconds)
+
+
+class EmbeddingCache:
+    """进程内LRU + 可选持久层的向量缓存"""
+
+    def __init__(self, max_entries: int = 256, store=None):
+        """
+        Args:
+            max_entries: 进程内LRU最多保存的向量数
+            store: 可选持久层（FileEmbeddingStore / RedisEmbeddingStore）
+        """
+        self.max_entries = max_entries
+        self.store = store
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._stats = {"hits": 0, "store_hits": 0, "misses": 0}
+
+    def get(self, key: str) -> Optional[List[float]]:
+        """查找向量：先查LRU，再查持久层（命中后回填LRU）"""
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return embedding
+
+        if self.store is not None:
+            try:
+                embedding = self.store.get(key)
+            except Exception as e:
+                logger.warning(f"⚠️ Embedding持久缓存读取失败: {e}")
+                embedding = None
+            if embedding is not None:
+                self._remember(key, embedding)
+                with self._lock:
+                    self._stats["store_hits"] += 1
+                return embedding
+        return None
+
+    def put(self, key: str, embedding: List[float]):
+        self._remember(key, embedding)
+        if self.store is not None:
+            try:
+                self.store.put(key, embedding)
+            except Exception as e:
+                logger.warning(f"⚠️ Embedding持久缓存写入失败: {e}")
+
+    def _remember(self, key: str, embedding: List[float]):
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key: str, compute: Callable[[], List[float]]) -> List[float]:
+        """
+        命中直接返回；未命中时调用compute，同一键的并发请求只计算一次。
+        全零向量表示嵌入失败或功能降级，不写入缓存
+        """
+        embedding = self.get(key)
+        if embedding is not None:
+            return embedding
+
+        def compute_and_store():
+            cached = self.get(key)
+            if cached is not None:
+                return cached
+            with self._lock:
+                self._stats["misses"] += 1
+            result = compute()
+            if any(x != 0.0 for x in result):
+                self.put(key, result)
+            return result
+
+        return self._flight.do(key, compute_and_store)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["store_hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": (self._stats["hits"] + self._stats["store_hits"]) / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "store": self.store.name if self.store is not None else None,
+            }
+
+
+def _create_store():
+    """根据 EMBEDDING_CACHE_BACKEND 环境变量创建持久层: none / file / redis"""
+    backend = os.getenv("EMBEDDING_CACHE_BACKEND", "none").lower()
+    if backend == "file":
+        cache_dir = os.getenv("EMBEDDING_CACHE_DIR",
+                              str(Path(__file__).parent.parent.parent / "dataflows" / "data_cache" / "embeddings"))
+        return FileEmbeddingStore(cache_dir)
+    if backend == "redis":
+        from tradingagents.config.database_manager import get_redis_client
+        client = get_redis_client()
+        if client is not None:
+            return RedisEmbeddingStore(client)
+        logger.warning("⚠️ Redis不可用，Embedding缓存仅使用进程内LRU")
+    return None
+
+
+# 全局实例
+_embedding_cache = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """获取全局Embedding缓存实例"""
+    global _embedding_cache
+    if _embedding_cache is None:
+        with _embedding_cache_lock:
+            if _embedding_cache is None:
+                _embedding_cache = EmbeddingCache(
+                    max_entries=int(os.getenv("EMBEDDING_CACHE_SIZE", "256")),
+                    store=_create_store()
+                )
+    return _embedding_cache
@@ -8,10 +8,18 @@ import threading
 import hashlib
 from typing import Dict, Optional
 
+from .embedding_cache import get_embedding_cache, make_embedding_key
+
 # 导入统一日志系统
 from tradingagents.utils.logging_init import get_logger
 logger = get_logger("agents.utils.memory")
 
+# 各嵌入服务单次请求允许的最大文本条数
+EMBEDDING_BATCH_LIMITS = {
+    "dashscope": 10,   # text-embedding-v3 单次最多10条
+    "openai": 2048,    # OpenAI embeddings 单次最多2048条
+}
+
 
 class ChromaDBManager:
     """单例ChromaDB管理器，避免并发创建集合的冲突"""
@@ -317,6 +325,9 @@ class FinancialSituationMemory:
                 self.client = "DISABLED"
                 logger.warning(f"⚠️ 未找到OPENAI_API_KEY，记忆功能已禁用")
 
+        # 所有记忆实例共享的Embedding缓存
+        self.embedding_cache = get_embedding_cache()
+
         # 使用单例ChromaDB管理器
         self.chroma_manager = ChromaDBManager()
         self.situation_collection = self.chroma_manager.get_or_create_collection(name)
@@ -359,8 +370,121 @@ class FinancialSituationMemory:
         logger.warning(f"⚠️ 强制截断：保留首尾关键信息，{len(text)}字符截断为{len(truncated)}字符")
         return truncated, True
 
+    def _uses_dashscope(self):
+        """是否使用阿里百炼的嵌入模型"""
+        return (self.llm_provider == "dashscope" or
+                self.llm_provider == "alibaba" or
+                self.llm_provider == "qianfan" or
+                (self.llm_provider == "google" and self.client is None) or
+                (self.llm_provider == "deepseek" and self.client is None) or
+                (self.llm_provider == "openrouter" and self.client is None))
+
+    def _embedding_backend(self):
+        """嵌入服务标识，用于缓存键（不同服务地址的同名模型不共享向量）"""
+        if self._uses_dashscope():
+            return "dashscope"
+        return f"{self.llm_provider}@{getattr(self.client, 'base_url', '')}"
+
     def get_embedding(self, text):
-        """Get embedding for a text using the configured provider"""
+        """Get embedding for a text using the configured provider, via the shared embedding cache"""
+
+        # 禁用、无效输入和超长文本不经过缓存，直接走原有降级逻辑
+        if not self._is_cacheable_text(text):
+            return self._request_embedding(text)
+
+        self._last_text_info = {
+            'original_length': len(text),
+            'processed_length': len(text),
+            'was_truncated': False,
+            'was_skipped': False,
+            'provider': self.llm_provider,
+            'strategy': 'no_truncation_with_fallback'
+        }
+        key = make_embedding_key(self._embedding_backend(), self.embedding, text)
+        return self.embedding_cache.get_or_compute(key, lambda: self._request_embedding(text))
+
+    def _is_cacheable_text(self, text):
+        """禁用、无效输入和超长文本不经过缓存和批量请求"""
+        return not (self.client == "DISABLED" or not text or not isinstance(text, str) or
+                    (self.enable_embedding_length_check and len(text) > self.max_embedding_length))
+
+    def _embedding_batch_size(self):
+        """单次批量请求的文本条数，可用 EMBEDDING_BATCH_SIZE 调小"""
+        limit = EMBEDDING_BATCH_LIMITS["dashscope" if self._uses_dashscope() else "openai"]
+        configured = int(os.getenv('EMBEDDING_BATCH_SIZE', '0'))
+        return min(configured, limit) if configured > 0 else limit
+
+    def get_embeddings(self, texts):
+        """
+        批量获取向量：先查共享缓存，未命中的文本去重后按服务的批量上限分块请求
+
+        Args:
+            texts: 文本列表
+
+        Returns:
+            与texts一一对应的向量列表
+        """
+        embeddings = [None] * len(texts)
+        missing = {}  # 缓存键 -> (文本, [位置])
+        for i, text in enumerate(texts):
+            if not self._is_cacheable_text(text):
+                embeddings[i] = self._request_embedding(text)
+                continue
+            key = make_embedding_key(self._embedding_backend(), self.embedding, text)
+            cached = self.embedding_cache.get(key)
+            if cached is not None:
+                embeddings[i] = cached
+            else:
+                missing.setdefault(key, (text, []))[1].append(i)
+
+        keys = list(missing)
+        batch_size = self._embedding_batch_size()
+        for start in range(0, len(keys), batch_size):
+            chunk = keys[start:start + batch_size]
+            vectors = self._request_embedding_batch([missing[key][0] for key in chunk])
+            for key, vector in zip(chunk, vectors):
+                if any(x != 0.0 for x in vector):
+                    self.embedding_cache.put(key, vector)
+                for i in missing[key][1]:
+                    embeddings[i] = vector
+
+        if keys:
+            logger.debug(f"📦 批量embedding: {len(texts)}条文本，请求{len(keys)}条，"
+                         f"{(len(keys) + batch_size - 1) // batch_size}次调用")
+        return embeddings
+
+    def _request_embedding_batch(self, texts):
+        """一次请求获取多条文本的向量；批量请求失败时逐条请求，沿用单条的降级逻辑"""
+        if len(texts) == 1:
+            return [self._request_embedding(texts[0])]
+
+        try:
+            if self._uses_dashscope():
+                import dashscope
+                from dashscope import TextEmbedding
+
+                if not getattr(dashscope, 'api_key', None):
+                    raise RuntimeError("DashScope API密钥未设置")
+                response = TextEmbedding.call(model=self.embedding, input=texts)
+                if response.status_code != 200:
+                    raise RuntimeError(f"{response.code} - {response.message}")
+                items = sorted(response.output['embeddings'], key=lambda item: item['text_index'])
+                vectors = [item['embedding'] for item in items]
+            else:
+                if self.client is None:
+                    raise RuntimeError("嵌入客户端未初始化")
+                response = self.client.embeddings.create(model=self.embedding, input=texts)
+                vectors = [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+            if len(vectors) != len(texts):
+                raise RuntimeError(f"返回向量数{len(vectors)}与请求文本数{len(texts)}不一致")
+            return vectors
+        except Exception as e:
+            logger.warning(f"⚠️ 批量embedding失败，改为逐条请求: {e}")
+            return [self._request_embedding(text) for text in texts]
+
+    def _request_embedding(self, text):
+        """调用嵌入API获取向量，失败或功能降级时返回零向量"""
 
         # 检查记忆功能是否被禁用
         if self.client == "DISABLED":
@@ -407,12 +531,7 @@ class FinancialSituationMemory:
             'strategy': 'no_truncation_with_fallback'  # 标记策略
         }
 
-        if (self.llm_provider == "dashscope" or
-            self.llm_provider == "alibaba" or
-            self.llm_provider == "qianfan" or
-            (self.llm_provider == "google" and self.client is None) or
-            (self.llm_provider == "deepseek" and self.client is None) or
-            (self.llm_provider == "openrouter" and self.client is None)):
+        if self._uses_dashscope():
             # 使用阿里百炼的嵌入模型
             try:
                 # 导入DashScope模块
@@ -570,25 +689,26 @@ class FinancialSituationMemory:
     def add_situations(self, situations_and_advice):
         """Add financial situations and their corresponding advice. Parameter is a list of tuples (situation, rec)"""
 
-        situations = []
-        advice = []
-        ids = []
-        embeddings = []
-
-        offset = self.situation_collection.count()
+        if not situations_and_advice:
+            return
 
-        for i, (situation, recommendation) in enumerate(situations_and_advice):
-            situations.append(situation)
-            advice.append(recommendation)
-            ids.append(str(offset + i))
-            embeddings.append(self.get_embedding(situation))
+        situations = [situation for situation, _ in situations_and_advice]
+        advice = [recommendation for _, recommendation in situations_and_advice]
+        embeddings = self.get_embeddings(situations)
 
-        self.situation_collection.add(
-            documents=situations,
-            metadatas=[{"recommendation": rec} for rec in advice],
-            embeddings=embeddings,
-            ids=ids,
-        )
+        offset = self.situation_collection.count()
+        ids = [str(offset + i) for i in range(len(situations))]
+
+        # ChromaDB单次写入有条数上限，历史回填时分块写入
+        max_batch = getattr(self.chroma_manager._client, "get_max_batch_size", lambda: 5000)()
+        for start in range(0, len(situations), max_batch):
+            end = start + max_batch
+            self.situation_collection.add(
+                documents=situations[start:end],
+                metadatas=[{"recommendation": rec} for rec in advice[start:end]],
+                embeddings=embeddings[start:end],
+                ids=ids[start:end],
+            )
 
     def get_memories(self, current_situation, n_matches=1):
         """Find matching recommendations using embeddings with smart truncation handling"""
@@ -656,7 +776,8 @@ class FinancialSituationMemory:
             'collection_count': self.situation_collection.count(),
             'client_status': 'enabled' if self.client != "DISABLED" else 'disabled',
             'embedding_model': self.embedding,
-            'provider': self.llm_provider
+            'provider': self.llm_provider,
+            'embedding_cache': self.embedding_cache.get_stats()
         }
         
         # 添加最后一次文本处理信息
@@ -7,9 +7,10 @@
 import json
 import os
 import re
+import threading
 from datetime import datetime
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List, Optional, Any, Tuple
+from dataclasses import dataclass, asdict, replace
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -27,6 +28,8 @@ except ImportError:
     MONGODB_AVAILABLE = False
     MongoDBStorage = None
 
+from .usage_ledger import UsageLedger
+
 
 @dataclass
 class ModelConfig:
@@ -73,8 +76,13 @@ class ConfigManager:
         self.models_file = self.config_dir / "models.json"
         self.pricing_file = self.config_dir / "pricing.json"
         self.usage_file = self.config_dir / "usage.json"
+        self.usage_ledger_file = self.config_dir / "usage.jsonl"
         self.settings_file = self.config_dir / "settings.json"
 
+        # 配置文件的解析快照：{文件路径: ((mtime_ns, size), 解析结果)}，文件变化或保存时失效
+        self._snapshots: Dict[Path, Tuple[Tuple[int, int], Any]] = {}
+        self._snapshot_lock = threading.Lock()
+
         # 加载.env文件（保持向后兼容）
         self._load_env_file()
 
@@ -84,6 +92,40 @@ class ConfigManager:
 
         self._init_default_configs()
 
+        # 使用记录账本（JSON文件存储模式），旧版 usage.json 自动迁移
+        self.usage_ledger = UsageLedger(
+            self.usage_ledger_file,
+            max_records=self.load_settings().get("max_usage_records", 10000),
+            legacy_file=self.usage_file
+        )
+
+    def _load_snapshot(self, path: Path, parse: Callable[[Any], Any]) -> Any:
+        """读取JSON配置文件的解析结果，文件未变化时直接返回内存快照"""
+        stat = path.stat()
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._snapshot_lock:
+            cached = self._snapshots.get(path)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+
+        with open(path, 'r', encoding='utf-8') as f:
+            value = parse(json.load(f))
+        with self._snapshot_lock:
+            self._snapshots[path] = (signature, value)
+        return value
+
+    def _invalidate_snapshot(self, path: Path):
+        with self._snapshot_lock:
+            self._snapshots.pop(path, None)
+
+    @staticmethod
+    def _parse_pricing(data: List[Dict[str, Any]]) -> Tuple[List[PricingConfig], Dict[Tuple[str, str], PricingConfig]]:
+        pricing = [PricingConfig(**item) for item in data]
+        index = {}
+        for price in pricing:
+            index.setdefault((price.provider, price.model_name), price)  # 与线性查找一致，取第一条
+        return pricing, index
+
     def _load_env_file(self):
         """加载.env文件（保持向后兼容）"""
         # 尝试从项目根目录加载.env文件
@@ -284,35 +326,34 @@ class ConfigManager:
     def load_models(self) -> List[ModelConfig]:
         """加载模型配置，优先使用.env中的API密钥"""
         try:
-            with open(self.models_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                models = [ModelConfig(**item) for item in data]
-
-                # 获取设置
-                settings = self.load_settings()
-                openai_enabled = settings.get("openai_enabled", False)
-
-                # 合并.env中的API密钥（优先级更高）
-                for model in models:
-                    env_api_key = self._get_env_api_key(model.provider)
-                    if env_api_key:
-                        model.api_key = env_api_key
-                        # 如果.env中有API密钥，自动启用该模型
-                        if not model.enabled:
-                            model.enabled = True
-                    
-                    # 特殊处理OpenAI模型
-                    if model.provider.lower() == "openai":
-                        # 检查OpenAI是否在配置中启用
-                        if not openai_enabled:
-                            model.enabled = False
-                            logger.info(f"🔒 OpenAI模型已禁用: {model.model_name}")
-                        # 如果有API密钥但格式不正确，禁用模型（验证始终启用）
-                        elif model.api_key and not self.validate_openai_api_key_format(model.api_key):
-                            model.enabled = False
-                            logger.warning(f"⚠️ OpenAI模型因密钥格式不正确而禁用: {model.model_name}")
-
-                return models
+            data = self._load_snapshot(self.models_file, lambda items: items)
+            models = [ModelConfig(**item) for item in data]
+
+            # 获取设置
+            settings = self.load_settings()
+            openai_enabled = settings.get("openai_enabled", False)
+
+            # 合并.env中的API密钥（优先级更高）
+            for model in models:
+                env_api_key = self._get_env_api_key(model.provider)
+                if env_api_key:
+                    model.api_key = env_api_key
+                    # 如果.env中有API密钥，自动启用该模型
+                    if not model.enabled:
+                        model.enabled = True
+                
+                # 特殊处理OpenAI模型
+                if model.provider.lower() == "openai":
+                    # 检查OpenAI是否在配置中启用
+                    if not openai_enabled:
+                        model.enabled = False
+                        logger.info(f"🔒 OpenAI模型已禁用: {model.model_name}")
+                    # 如果有API密钥但格式不正确，禁用模型（验证始终启用）
+                    elif model.api_key and not self.validate_openai_api_key_format(model.api_key):
+                        model.enabled = False
+                        logger.warning(f"⚠️ OpenAI模型因密钥格式不正确而禁用: {model.model_name}")
+
+            return models
         except Exception as e:
             logger.error(f"加载模型配置失败: {e}")
             return []
@@ -325,13 +366,14 @@ class ConfigManager:
                 json.dump(data, f, ensure_ascii=False, indent=2)
         except Exception as e:
             logger.error(f"保存模型配置失败: {e}")
+        finally:
+            self._invalidate_snapshot(self.models_file)
     
     def load_pricing(self) -> List[PricingConfig]:
         """加载定价配置"""
         try:
-            with open(self.pricing_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            return [PricingConfig(**item) for item in data]
+            pricing, _ = self._load_snapshot(self.pricing_file, self._parse_pricing)
+            return [replace(price) for price in pricing]
         except Exception as e:
             logger.error(f"加载定价配置失败: {e}")
             return []
@@ -344,25 +386,21 @@ class ConfigManager:
                 json.dump(data, f, ensure_ascii=False, indent=2)
         except Exception as e:
             logger.error(f"保存定价配置失败: {e}")
+        finally:
+            self._invalidate_snapshot(self.pricing_file)
     
     def load_usage_records(self) -> List[UsageRecord]:
         """加载使用记录"""
         try:
-            if not self.usage_file.exists():
-                return []
-            with open(self.usage_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return [UsageRecord(**item) for item in data]
+            return [UsageRecord(**item) for item in self.usage_ledger.records()]
         except Exception as e:
             logger.error(f"加载使用记录失败: {e}")
             return []
     
     def save_usage_records(self, records: List[UsageRecord]):
-        """保存使用记录"""
+        """保存使用记录（整体替换账本）"""
         try:
-            data = [asdict(record) for record in records]
-            with open(self.usage_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            self.usage_ledger.replace([asdict(record) for record in records])
         except Exception as e:
             logger.error(f"保存使用记录失败: {e}")
     
@@ -391,29 +429,24 @@ class ConfigManager:
             else:
                 logger.error(f"⚠️ MongoDB保存失败，回退到JSON文件存储")
         
-        # 回退到JSON文件存储
-        records = self.load_usage_records()
-        records.append(record)
-        
-        # 限制记录数量
-        settings = self.load_settings()
-        max_records = settings.get("max_usage_records", 10000)
-        if len(records) > max_records:
-            records = records[-max_records:]
-        
-        self.save_usage_records(records)
+        # 回退到JSON文件存储：追加到账本，由后台线程批量落盘并按 max_usage_records 压缩
+        self.usage_ledger.append(asdict(record))
         return record
     
     def calculate_cost(self, provider: str, model_name: str, input_tokens: int, output_tokens: int) -> float:
         """计算使用成本"""
-        pricing_configs = self.load_pricing()
+        try:
+            pricing_configs, pricing_index = self._load_snapshot(self.pricing_file, self._parse_pricing)
+        except Exception as e:
+            logger.error(f"加载定价配置失败: {e}")
+            pricing_configs, pricing_index = [], {}
 
-        for pricing in pricing_configs:
-            if pricing.provider == provider and pricing.model_name == model_name:
-                input_cost = (input_tokens / 1000) * pricing.input_price_per_1k
-                output_cost = (output_tokens / 1000) * pricing.output_price_per_1k
-                total_cost = input_cost + output_cost
-                return round(total_cost, 6)
+        pricing = pricing_index.get((provider, model_name))
+        if pricing is not None:
+            input_cost = (input_tokens / 1000) * pricing.input_price_per_1k
+            output_cost = (output_tokens / 1000) * pricing.output_price_per_1k
+            total_cost = input_cost + output_cost
+            return round(total_cost, 6)
 
         # 只在找不到配置时输出调试信息
         logger.warning(f"⚠️ [calculate_cost] 未找到匹配的定价配置: {provider}/{model_name}")
@@ -427,8 +460,7 @@ class ConfigManager:
         """加载设置，合并.env中的配置"""
         try:
             if self.settings_file.exists():
-                with open(self.settings_file, 'r', encoding='utf-8') as f:
-                    settings = json.load(f)
+                settings = dict(self._load_snapshot(self.settings_file, lambda data: data))
             else:
                 # 如果设置文件不存在，创建默认设置
                 settings = {
@@ -503,6 +535,12 @@ class ConfigManager:
                 json.dump(settings, f, ensure_ascii=False, indent=2)
         except Exception as e:
             logger.error(f"保存设置失败: {e}")
+        finally:
+            self._invalidate_snapshot(self.settings_file)
+
+        usage_ledger = getattr(self, "usage_ledger", None)
+        if usage_ledger is not None:
+            usage_ledger.max_records = settings.get("max_usage_records", usage_ledger.max_records)
     
     def get_enabled_models(self) -> List[ModelConfig]:
         """获取启用的模型"""
@@ -534,52 +572,8 @@ class ConfigManager:
             except Exception as e:
                 logger.error(f"⚠️ MongoDB统计获取失败，回退到JSON文件: {e}")
         
-        # 回退到JSON文件统计
-        records = self.load_usage_records()
-        
-        # 过滤最近N天的记录
-        from datetime import datetime, timedelta
-
-        cutoff_date = datetime.now() - timedelta(days=days)
-        
-        recent_records = []
-        for record in records:
-            try:
-                record_date = datetime.fromisoformat(record.timestamp)
-                if record_date >= cutoff_date:
-                    recent_records.append(record)
-            except:
-                continue
-        
-        # 统计数据
-        total_cost = sum(record.cost for record in recent_records)
-        total_input_tokens = sum(record.input_tokens for record in recent_records)
-        total_output_tokens = sum(record.output_tokens for record in recent_records)
-        
-        # 按供应商统计
-        provider_stats = {}
-        for record in recent_records:
-            if record.provider not in provider_stats:
-                provider_stats[record.provider] = {
-                    "cost": 0,
-                    "input_tokens": 0,
-                    "output_tokens": 0,
-                    "requests": 0
-                }
-            provider_stats[record.provider]["cost"] += record.cost
-            provider_stats[record.provider]["input_tokens"] += record.input_tokens
-            provider_stats[record.provider]["output_tokens"] += record.output_tokens
-            provider_stats[record.provider]["requests"] += 1
-        
-        return {
-            "period_days": days,
-            "total_cost": round(total_cost, 4),
-            "total_input_tokens": total_input_tokens,
-            "total_output_tokens": total_output_tokens,
-            "total_requests": len(recent_records),
-            "provider_stats": provider_stats,
-            "records_count": len(recent_records)
-        }
+        # 回退到JSON文件统计：直接读取账本的按日汇总
+        return self.usage_ledger.get_statistics(days)
     
     def get_data_dir(self) -> str:
         """获取数据目录路径"""
@@ -681,18 +675,22 @@ class TokenTracker:
 
         # 检查成本警告
         if record:
-            self._check_cost_alert(record.cost)
+            self._check_cost_alert(record.cost, settings)
 
         return record
 
-    def _check_cost_alert(self, current_cost: float):
+    def _check_cost_alert(self, current_cost: float, settings: Optional[Dict[str, Any]] = None):
         """检查成本警告"""
-        settings = self.config_manager.load_settings()
+        if settings is None:
+            settings = self.config_manager.load_settings()
         threshold = settings.get("cost_alert_threshold", 100.0)
 
-        # 获取今日总成本
-        today_stats = self.config_manager.get_usage_statistics(1)
-        total_today = today_stats["total_cost"]
+        # 获取今日总成本（JSON文件存储模式直接读取账本的当日汇总）
+        mongodb_storage = self.config_manager.mongodb_storage
+        if mongodb_storage and mongodb_storage.is_connected():
+            total_today = self.config_manager.get_usage_statistics(1)["total_cost"]
+        else:
+            total_today = self.config_manager.usage_ledger.get_day_cost()
 
         if total_today >= threshold:
             logger.warning(f"⚠️ 成本警告: 今日成本已达到 ¥{total_today:.4f}，超过阈值 ¥{threshold}",
@@ -700,9 +698,7 @@ class TokenTracker:
 
     def get_session_cost(self, session_id: str) -> float:
         """获取会话成本"""
-        records = self.config_manager.load_usage_records()
-        session_cost = sum(record.cost for record in records if record.session_id == session_id)
-        return session_cost
+        return self.config_manager.usage_ledger.get_session_cost(session_id)
 
     def estimate_cost(self, provider: str, model_name: str, estimated_input_tokens: int,
                      estimated_output_tokens: int) -> float:
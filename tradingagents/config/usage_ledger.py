@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Token使用记录账本
+以追加方式写入JSONL文件，由后台线程批量落盘；按日期/供应商/会话维护内存汇总，
+查询前只读取其他进程新追加的行（记录已读到的字节偏移），记录一次使用和查询统计的开销与历史记录数量无关
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+# 锁文件超过该秒数未释放视为持有进程已退出
+_LOCK_STALE_SECONDS = 30.0
+_LOCK_POLL_INTERVAL = 0.05
+
+
+def _empty_totals() -> Dict[str, Any]:
+    return {"cost": 0, "input_tokens": 0, "output_tokens": 0, "requests": 0}
+
+
+class UsageLedger:
+    """追加写入的使用记录账本"""
+
+    def __init__(self, ledger_file: Path, max_records: int = 10000,
+                 legacy_file: Optional[Path] = None,
+                 flush_interval: float = 0.5, batch_size: int = 200):
+        """
+        Args:
+            ledger_file: JSONL账本文件
+            max_records: 保留的最大记录数，超出一定比例后压缩
+            legacy_file: 旧版 usage.json，账本不存在时迁移其中的记录
+            flush_interval: 后台线程攒批等待的最长时间（秒）
+            batch_size: 攒够该数量的记录立即落盘
+        """
+        self.ledger_file = Path(ledger_file)
+        self.max_records = max_records
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        self._cond = threading.Condition()
+        self._file_lock = threading.Lock()
+        self._pending: List[Dict[str, Any]] = []
+        self._enqueued = 0
+        self._written = 0
+        self._flush_requested = False
+        self._closed = False
+        self._generation = 0  # replace() 后递增，丢弃替换前取出的批次
+        self._inflight: List[Dict[str, Any]] = []  # 后台线程已取出、尚未落盘的批次
+        self._writer: Optional[threading.Thread] = None
+
+        # 汇总已包含的账本文件位置：文件inode和已读到的字节偏移，只在持有 _file_lock 时修改
+        self._file_inode: Optional[int] = None
+        self._file_offset = 0
+
+        self._count = 0
+        self._days: Dict[str, Dict[str, Any]] = {}
+        self._sessions: Dict[str, float] = {}
+
+        if legacy_file is not None and Path(legacy_file).exists() and not self.ledger_file.exists():
+            self._migrate_legacy(Path(legacy_file))
+        with self._file_lock:
+            self._sync_from_file()
+        atexit.register(self.close)
+
+    # ==================== 内存汇总 ====================
+
+    def _add_to_aggregates(self, record: Dict[str, Any]):
+        day = self._days.get(record["timestamp"][:10])
+        if day is None:
+            day = self._days[record["timestamp"][:10]] = {**_empty_totals(), "providers": {}}
+        provider = day["providers"].setdefault(record["provider"], _empty_totals())
+        for totals in (day, provider):
+            totals["cost"] += record["cost"]
+            totals["input_tokens"] += record["input_tokens"]
+            totals["output_tokens"] += record["output_tokens"]
+            totals["requests"] += 1
+        self._sessions[record["session_id"]] = self._sessions.get(record["session_id"], 0) + record["cost"]
+        self._count += 1
+
+    def _rebuild_aggregates(self, records: Iterable[Dict[str, Any]]):
+        self._count = 0
+        self._days = {}
+        self._sessions = {}
+        for record in records:
+            self._add_to_aggregates(record)
+
+    # ==================== 文件读写 ====================
+
+    @contextmanager
+    def _locked_file(self, timeout: float = _LOCK_STALE_SECONDS + 5):
+        """
+        进程内锁 + 账本旁的锁文件：Web和CLI共用同一账本，追加与压缩/替换的整体重写必须跨进程互斥，
+        否则重写会覆盖其他进程刚追加的记录。返回是否拿到了锁文件
+        """
+        with self._file_lock:
+            lock_path = self.ledger_file.with_suffix(self.ledger_file.suffix + ".lock")
+            token = uuid.uuid4().hex
+            acquired = False
+            deadline = time.monotonic() + timeout
+            while self.ledger_file.parent.exists():
+                try:
+                    fd = os.open(str(lock_path), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                    with os.fdopen(fd, "w") as f:
+                        f.write(token)
+                    acquired = True
+                    break
+                except FileExistsError:
+                    try:
+                        if time.time() - lock_path.stat().st_mtime > _LOCK_STALE_SECONDS:
+                            logger.warning(f"⚠️ 清理过期的账本锁: {lock_path.name}")
+                            lock_path.unlink()
+                            continue
+                    except FileNotFoundError:
+                        continue
+                if time.monotonic() >= deadline:
+                    break
+                time.sleep(_LOCK_POLL_INTERVAL)
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    try:
+                        with open(lock_path, "r") as f:
+                            if f.read() == token:
+                                lock_path.unlink()
+                    except FileNotFoundError:
+                        pass
+
+    def _read_file(self) -> List[Dict[str, Any]]:
+        return self._read_from(0)[0]
+
+    def _read_from(self, offset: int):
+        """
+        从字节偏移处读取完整的行，返回 (记录, 新偏移, 文件inode)；
+        末尾未写完的行不读取，下次从该行开头继续
+        """
+        records = []
+        try:
+            f = open(self.ledger_file, 'rb')
+        except FileNotFoundError:
+            return records, 0, None
+        with f:
+            inode = os.fstat(f.fileno()).st_ino
+            f.seek(offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        for raw in data[:end].split(b"\n"):
+            line = raw.decode('utf-8', errors='replace').strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning(f"⚠️ 跳过损坏的使用记录行: {line[:80]}")
+        return records, offset + end, inode
+
+    def _file_changed(self) -> bool:
+        """账本文件是否有本进程汇总之外的变化（其他进程追加、压缩或替换）"""
+        try:
+            stat = self.ledger_file.stat()
+        except FileNotFoundError:
+            return self._file_inode is not None
+        return stat.st_ino != self._file_inode or stat.st_size != self._file_offset
+
+    def _sync_from_file(self):
+        """
+        把其他进程写入的记录并入汇总，调用方需持有 _file_lock（跨进程时还应持有锁文件）。
+        文件被替换或变短（其他进程压缩/替换）时从头重建，否则只读取偏移之后新追加的行
+        """
+        try:
+            stat = self.ledger_file.stat()
+        except FileNotFoundError:
+            stat = None
+        if stat is not None and stat.st_ino == self._file_inode and stat.st_size >= self._file_offset:
+            records, offset, inode = self._read_from(self._file_offset)
+            with self._cond:
+                for record in records:
+                    self._add_to_aggregates(record)
+        else:
+            records, offset, inode = self._read_from(0)
+            with self._cond:
+                self._rebuild_aggregates(records + self._inflight + self._pending)
+        self._file_inode, self._file_offset = inode, offset
+
+    def _mark_synced(self):
+        """本进程写入后，汇总已包含文件的全部内容"""
+        try:
+            stat = self.ledger_file.stat()
+            self._file_inode, self._file_offset = stat.st_ino, stat.st_size
+        except FileNotFoundError:
+            self._file_inode, self._file_offset = None, 0
+
+    def _write_file(self, records: List[Dict[str, Any]]):
+        """整体重写账本（压缩、迁移、替换时使用）"""
+        tmp_file = self.ledger_file.with_suffix(self.ledger_file.suffix + ".tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(tmp_file, self.ledger_file)
+
+    def _migrate_legacy(self, legacy_file: Path):
+        try:
+            with open(legacy_file, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+            self._write_file(records)
+            legacy_file.rename(legacy_file.with_suffix(legacy_file.suffix + ".bak"))
+            logger.info(f"📒 已将 {len(records)} 条使用记录迁移到 {self.ledger_file.name}")
+        except Exception as e:
+            logger.error(f"迁移旧使用记录失败: {e}")
+
+    # ==================== 后台写入 ====================
+
+    def _ensure_writer(self):
+        if self._writer is None or not self._writer.is_alive():
+            self._writer = threading.Thread(target=self._run_writer, name="usage-ledger-writer", daemon=True)
+            self._writer.start()
+
+    def _run_writer(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                if not (self._flush_requested or self._closed or len(self._pending) >= self.batch_size):
+                    self._cond.wait(self.flush_interval)
+                batch, self._pending = self._pending, []
+                self._inflight = batch
+                target = self._enqueued
+                generation = self._generation
+                self._flush_requested = False
+
+            with self._locked_file():
+                try:
+                    if generation != self._generation:
+                        batch = []
+                    if not self.ledger_file.parent.exists():
+                        logger.debug(f"账本目录已不存在，丢弃 {len(batch)} 条使用记录")
+                        batch = []
+                    elif batch:
+                        # 先并入其他进程的追加，写入后偏移直接移到文件末尾（本批次已在汇总中）
+                        self._sync_from_file()
+                        with open(self.ledger_file, 'a', encoding='utf-8') as f:
+                            f.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in batch))
+                        self._mark_synced()
+                except Exception as e:
+                    logger.error(f"保存使用记录失败: {e}")
+
+            with self._cond:
+                self._inflight = []
+                self._written = max(self._written, target)
+                needs_compaction = self._count > self.max_records + max(self.max_records // 10, 1)
+                self._cond.notify_all()
+
+            if needs_compaction:
+                self.compact()
+
+    def append(self, record: Dict[str, Any]):
+        """追加一条记录：立即计入汇总，由后台线程落盘"""
+        with self._cond:
+            self._add_to_aggregates(record)
+            self._pending.append(record)
+            self._enqueued += 1
+            self._ensure_writer()
+            if len(self._pending) == 1 or len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+
+    def flush(self, timeout: float = 10.0):
+        """等待已追加的记录全部落盘"""
+        with self._cond:
+            target = self._enqueued
+            if self._written >= target:
+                return
+            self._flush_requested = True
+            self._ensure_writer()
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: self._written >= target, timeout)
+
+    def close(self):
+        """落盘剩余记录并停止后台线程"""
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    # ==================== 压缩与替换 ====================
+
+    def compact(self):
+        """只保留最近的 max_records 条记录，并据此重建汇总；读取到重写之间持有跨进程锁"""
+        with self._locked_file(timeout=1.0) as acquired:
+            if not acquired:
+                logger.debug("📒 账本正被其他进程使用，跳过本次压缩")
+                return
+            records = self._read_file()
+            if len(records) > self.max_records:
+                records = records[-self.max_records:]
+                self._write_file(records)
+            with self._cond:
+                self._rebuild_aggregates(records + self._inflight + self._pending)
+            self._mark_synced()
+        logger.debug(f"📒 使用记录已压缩: 保留 {len(records)} 条")
+
+    def replace(self, records: List[Dict[str, Any]]):
+        """用给定记录整体替换账本"""
+        with self._locked_file():
+            with self._cond:
+                self._pending = []
+                self._inflight = []
+                self._generation += 1
+                self._written = self._enqueued
+                self._rebuild_aggregates(records)
+                self._cond.notify_all()
+            self._write_file(records)
+            self._mark_synced()
+
+    # ==================== 查询 ====================
+
+    def refresh(self):
+        """并入其他进程（Web/CLI共用账本）写入的记录；文件未变化时只需一次stat"""
+        if not self._file_changed():
+            return
+        with self._locked_file(timeout=1.0) as acquired:
+            if acquired:
+                self._sync_from_file()
+
+    def records(self) -> List[Dict[str, Any]]:
+        """读取全部记录（先落盘）"""
+        self.flush()
+        with self._file_lock:
+            return self._read_file()
+
+    def get_statistics(self, days: int = 30) -> Dict[str, Any]:
+        """最近N个自然日（含今天）的汇总统计"""
+        cutoff = (datetime.now() - timedelta(days=max(days, 1) - 1)).strftime("%Y-%m-%d")
+        totals = _empty_totals()
+        provider_stats: Dict[str, Dict[str, Any]] = {}
+        self.refresh()
+        with self._cond:
+            for day_key, day in self._days.items():
+                if day_key < cutoff:
+                    continue
+                for key in totals:
+                    totals[key] += day[key]
+                for provider, stats in day["providers"].items():
+                    merged = provider_stats.setdefault(provider, _empty_totals())
+                    for key in merged:
+                        merged[key] += stats[key]
+
+        return {
+            "period_days": days,
+            "total_cost": round(totals["cost"], 4),
+            "total_input_tokens": totals["input_tokens"],
+            "total_output_tokens": totals["output_tokens"],
+            "total_requests": totals["requests"],
+            "provider_stats": provider_stats,
+            "records_count": totals["requests"]
+        }
+
+    def get_day_cost(self, day: Optional[str] = None) -> float:
+        """某一天（YYYY-MM-DD，默认今天）的总成本"""
+        day = day or datetime.now().strftime("%Y-%m-%d")
+        self.refresh()
+        with self._cond:
+            return self._days.get(day, {}).get("cost", 0)
+
+    def get_session_cost(self, session_id: str) -> float:
+        self.refresh()
+        with self._cond:
+            return self._sessions.get(session_id, 0)
+
+    def __len__(self) -> int:
+        self.refresh()
+        with self._cond:
+            return self._count
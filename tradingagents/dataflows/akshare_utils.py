@@ -14,6 +14,8 @@ from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('agents')
 warnings.filterwarnings('ignore')
 
+from .ohlcv_store import get_ohlcv_store
+
 class AKShareProvider:
     """AKShare数据提供器"""
 
@@ -78,13 +80,19 @@ class AKShareProvider:
             else:
                 symbol = symbol.replace('.SZ', '').replace('.SS', '')
             
-            # 获取数据
-            data = self.ak.stock_zh_a_hist(
-                symbol=symbol,
-                period="daily",
-                start_date=start_date.replace('-', '') if start_date else "20240101",
-                end_date=end_date.replace('-', '') if end_date else "20241231",
-                adjust=""
+            # 获取数据：不复权K线经区间存储获取，只请求本地未覆盖的日期缺口
+            data = get_ohlcv_store().get_bars(
+                "akshare", symbol,
+                start_date or "2024-01-01",
+                end_date or "2024-12-31",
+                fetch=lambda gap_start, gap_end: self.ak.stock_zh_a_hist(
+                    symbol=symbol,
+                    period="daily",
+                    start_date=gap_start.replace('-', ''),
+                    end_date=gap_end.replace('-', ''),
+                    adjust=""
+                ),
+                date_column='日期'
             )
             
             return data
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+缓存元数据目录
+用嵌入式SQLite为StockDataCache的元数据建立索引，替代每次未命中时扫描全部 *_meta.json 文件
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    cache_key   TEXT PRIMARY KEY,
+    symbol      TEXT,
+    data_type   TEXT,
+    market_type TEXT,
+    data_source TEXT,
+    start_date  TEXT,
+    end_date    TEXT,
+    cached_at   REAL NOT NULL,
+    file_path   TEXT,
+    file_format TEXT,
+    file_size   INTEGER,
+    metadata    TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cache_entries_lookup
+    ON cache_entries (symbol, data_type, market_type, data_source, cached_at);
+CREATE INDEX IF NOT EXISTS idx_cache_entries_cached_at
+    ON cache_entries (cached_at);
+CREATE TABLE IF NOT EXISTS catalog_info (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class CacheCatalog:
+    """缓存元数据目录 - 按 symbol/data_type/market/source/cached_at 建索引"""
+
+    def __init__(self, db_path: Path, metadata_dir: Path):
+        """
+        初始化元数据目录，首次启动时从已有的 *_meta.json 文件重建
+
+        Args:
+            db_path: SQLite数据库文件路径
+            metadata_dir: 元数据JSON文件目录
+        """
+        self.db_path = Path(db_path)
+        self.metadata_dir = Path(metadata_dir)
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        try:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.DatabaseError:
+            pass  # 部分文件系统不支持WAL，使用默认日志模式
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+        if self._get_info('rebuilt_at') is None:
+            self.rebuild()
+
+    @staticmethod
+    def _to_timestamp(cached_at: str) -> float:
+        return datetime.fromisoformat(cached_at).timestamp()
+
+    @staticmethod
+    def _row_values(cache_key: str, metadata: Dict[str, Any], file_size: Optional[int]) -> Tuple:
+        return (
+            cache_key,
+            metadata.get('symbol'),
+            metadata.get('data_type'),
+            metadata.get('market_type'),
+            metadata.get('data_source'),
+            metadata.get('start_date'),
+            metadata.get('end_date'),
+            CacheCatalog._to_timestamp(metadata['cached_at']),
+            metadata.get('file_path'),
+            metadata.get('file_format'),
+            file_size,
+            json.dumps(metadata, ensure_ascii=False),
+        )
+
+    def _get_info(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM catalog_info WHERE key = ?", (key,)).fetchone()
+        return row['value'] if row else None
+
+    def rebuild(self) -> int:
+        """从 *_meta.json 文件重建目录，返回收录的条目数"""
+        rows = []
+        for metadata_file in self.metadata_dir.glob("*_meta.json"):
+            try:
+                with open(metadata_file, 'r', encoding='utf-8') as f:
+                    metadata = json.load(f)
+                data_file = Path(metadata.get('file_path', ''))
+                file_size = data_file.stat().st_size if data_file.is_file() else None
+                cache_key = metadata_file.stem.replace('_meta', '')
+                rows.append(self._row_values(cache_key, metadata, file_size))
+            except Exception as e:
+                logger.warning(f"⚠️ 跳过无法解析的元数据文件 {metadata_file.name}: {e}")
+
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cache_entries")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO catalog_info (key, value) VALUES ('rebuilt_at', ?)",
+                (datetime.now().isoformat(),))
+
+        logger.info(f"📇 缓存元数据目录已重建: {len(rows)} 个条目")
+        return len(rows)
+
+    def upsert(self, cache_key: str, metadata: Dict[str, Any], file_size: Optional[int] = None):
+        """写入或更新一个条目"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                self._row_values(cache_key, metadata, file_size))
+
+    def get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """按缓存键获取元数据"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT metadata FROM cache_entries WHERE cache_key = ?", (cache_key,)).fetchone()
+        return json.loads(row['metadata']) if row else None
+
+    def find(self, symbol: str, data_type: str, market_type: str = None,
+             data_source: str = None, max_age_hours: float = None) -> List[str]:
+        """
+        部分匹配查找，按缓存时间从新到旧返回缓存键
+
+        Args:
+            market_type / data_source: 为None时不作为过滤条件
+            max_age_hours: 只返回该时间内缓存的条目，None表示不限
+        """
+        sql = "SELECT cache_key FROM cache_entries WHERE symbol = ? AND data_type = ?"
+        params: List[Any] = [symbol, data_type]
+        if market_type is not None:
+            sql += " AND market_type = ?"
+            params.append(market_type)
+        if data_source is not None:
+            sql += " AND data_source = ?"
+            params.append(data_source)
+        if max_age_hours is not None:
+            sql += " AND cached_at > ?"
+            params.append(datetime.now().timestamp() - max_age_hours * 3600)
+        sql += " ORDER BY cached_at DESC"
+
+        with self._lock:
+            return [row['cache_key'] for row in self._conn.execute(sql, params)]
+
+    def expired(self, cutoff: datetime) -> List[Tuple[str, Optional[str]]]:
+        """返回早于cutoff缓存的 (缓存键, 数据文件路径) 列表"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT cache_key, file_path FROM cache_entries WHERE cached_at < ?",
+                (cutoff.timestamp(),)).fetchall()
+        return [(row['cache_key'], row['file_path']) for row in rows]
+
+    def delete(self, cache_keys: Iterable[str]):
+        """删除条目"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM cache_entries WHERE cache_key = ?", [(key,) for key in cache_keys])
+
+    def stats(self) -> Dict[str, Any]:
+        """按数据类型汇总条目数、文件大小和无数据文件的条目数"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data_type, COUNT(*) AS count, COALESCE(SUM(file_size), 0) AS size, "
+                "SUM(CASE WHEN file_size IS NULL THEN 1 ELSE 0 END) AS missing "
+                "FROM cache_entries GROUP BY data_type").fetchall()
+        return {row['data_type']: {'count': row['count'], 'size': row['size'], 'missing': row['missing']}
+                for row in rows}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -10,23 +10,42 @@ import pickle
 import pandas as pd
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional, Dict, Any, Union, List
+from typing import Optional, Dict, Any, Union, List, Tuple
 import hashlib
 
+from .cache_catalog import CacheCatalog
+
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('agents')
 
+# 列式存储依赖pyarrow，不可用时退回CSV
+try:
+    import pyarrow.feather as pa_feather
+    import pyarrow.parquet as pa_parquet
+    PYARROW_AVAILABLE = True
+except ImportError:
+    pa_feather = None
+    pa_parquet = None
+    PYARROW_AVAILABLE = False
+
+# DataFrame缓存支持的存储格式
+FRAME_STORAGE_FORMATS = ('parquet', 'feather', 'csv')
+
 
 class StockDataCache:
     """股票数据缓存管理器 - 支持美股和A股数据缓存优化"""
 
-    def __init__(self, cache_dir: str = None):
+    def __init__(self, cache_dir: str = None, storage_format: str = None,
+                 memory_map: bool = None):
         """
         初始化缓存管理器
 
         Args:
             cache_dir: 缓存目录路径，默认为 tradingagents/dataflows/data_cache
+            storage_format: DataFrame存储格式 parquet/feather/csv，默认读取环境变量
+                STOCK_CACHE_FORMAT，未设置时pyarrow可用则用parquet，否则csv
+            memory_map: 读取parquet/feather时是否使用内存映射，默认读取 STOCK_CACHE_MEMORY_MAP（默认开启）
         """
         if cache_dir is None:
             # 获取当前文件所在目录
@@ -51,6 +70,9 @@ class StockDataCache:
                         self.china_fundamentals_dir, self.metadata_dir]:
             dir_path.mkdir(exist_ok=True)
 
+        # 元数据索引目录，首次启动时从已有的 *_meta.json 重建
+        self.catalog = CacheCatalog(self.metadata_dir / "catalog.sqlite3", self.metadata_dir)
+
         # 缓存配置 - 针对不同市场设置不同的TTL
         self.cache_config = {
             'us_stock_data': {
@@ -92,7 +114,24 @@ class StockDataCache:
             'enable_length_check': os.getenv('ENABLE_CACHE_LENGTH_CHECK', 'false').lower() == 'true'  # 文件缓存默认不限制
         }
 
+        # DataFrame存储格式配置
+        if storage_format is None:
+            storage_format = os.getenv('STOCK_CACHE_FORMAT', 'parquet' if PYARROW_AVAILABLE else 'csv')
+        storage_format = storage_format.lower()
+        if storage_format not in FRAME_STORAGE_FORMATS:
+            logger.warning(f"⚠️ 不支持的缓存存储格式: {storage_format}，使用csv")
+            storage_format = 'csv'
+        if storage_format != 'csv' and not PYARROW_AVAILABLE:
+            logger.warning(f"⚠️ pyarrow不可用，{storage_format}缓存格式退回csv")
+            storage_format = 'csv'
+        self.storage_format = storage_format
+
+        if memory_map is None:
+            memory_map = os.getenv('STOCK_CACHE_MEMORY_MAP', 'true').lower() == 'true'
+        self.memory_map = memory_map
+
         logger.info(f"📁 缓存管理器初始化完成，缓存目录: {self.cache_dir}")
+        logger.info(f"   DataFrame存储格式: {self.storage_format}")
         logger.info(f"🗄️ 数据库缓存管理器初始化完成")
         logger.info(f"   美股数据: ✅ 已配置")
         logger.info(f"   A股数据: ✅ 已配置")
@@ -208,27 +247,54 @@ class StockDataCache:
         """获取元数据文件路径"""
         return self.metadata_dir / f"{cache_key}_meta.json"
     
-    def _save_metadata(self, cache_key: str, metadata: Dict[str, Any]):
+    def _save_metadata(self, cache_key: str, metadata: Dict[str, Any], keep_cached_at: bool = False):
         """保存元数据"""
         metadata_path = self._get_metadata_path(cache_key)
         metadata_path.parent.mkdir(parents=True, exist_ok=True)  # 确保目录存在
-        metadata['cached_at'] = datetime.now().isoformat()
+        if not (keep_cached_at and metadata.get('cached_at')):
+            metadata['cached_at'] = datetime.now().isoformat()
         
         with open(metadata_path, 'w', encoding='utf-8') as f:
             json.dump(metadata, f, ensure_ascii=False, indent=2)
+
+        data_file = Path(metadata.get('file_path', ''))
+        file_size = data_file.stat().st_size if data_file.is_file() else None
+        self.catalog.upsert(cache_key, metadata, file_size)
     
     def _load_metadata(self, cache_key: str) -> Optional[Dict[str, Any]]:
-        """加载元数据"""
+        """加载元数据 - 优先从元数据目录读取"""
+        metadata = self.catalog.get(cache_key)
+        if metadata is not None:
+            return metadata
+
         metadata_path = self._get_metadata_path(cache_key)
         if not metadata_path.exists():
             return None
         
         try:
             with open(metadata_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+                metadata = json.load(f)
+            # 目录外写入的元数据（如旧版本进程），补录到目录
+            data_file = Path(metadata.get('file_path', ''))
+            self.catalog.upsert(cache_key, metadata, data_file.stat().st_size if data_file.is_file() else None)
+            return metadata
         except Exception as e:
             logger.error(f"⚠️ 加载元数据失败: {e}")
             return None
+
+    def find_cache_keys(self, symbol: str, data_type: str, market_type: str = None,
+                        data_source: str = None, max_age_hours: float = None) -> List[str]:
+        """
+        通过元数据目录查找缓存键，按缓存时间从新到旧排列
+
+        Args:
+            symbol: 股票代码
+            data_type: 数据类型（stock_data/news/fundamentals）
+            market_type: 市场类型，None表示不限
+            data_source: 数据源，None表示不限
+            max_age_hours: 最大缓存时间（小时），None表示包含过期缓存
+        """
+        return self.catalog.find(symbol, data_type, market_type, data_source, max_age_hours)
     
     def is_cache_valid(self, cache_key: str, max_age_hours: int = None, symbol: str = None, data_type: str = None) -> bool:
         """检查缓存是否有效 - 支持智能TTL配置"""
@@ -263,6 +329,70 @@ class StockDataCache:
 
         return is_valid
     
+    def _write_frame(self, data: pd.DataFrame, data_type: str, cache_key: str, symbol: str) -> Tuple[Path, str, Optional[List[str]]]:
+        """
+        按配置格式写入DataFrame，列式格式写入失败时退回CSV
+
+        Returns:
+            (文件路径, 实际使用的格式, feather格式下被还原为列的索引名)
+        """
+        if self.storage_format != 'csv':
+            cache_path = self._get_cache_path(data_type, cache_key, self.storage_format, symbol)
+            cache_path.parent.mkdir(parents=True, exist_ok=True)  # 确保目录存在
+            try:
+                if self.storage_format == 'parquet':
+                    data.to_parquet(cache_path, index=True)
+                    return cache_path, 'parquet', None
+                # feather只支持默认索引，把索引还原成列并记录列名
+                frame = data.reset_index()
+                index_columns = [str(c) for c in frame.columns[:data.index.nlevels]]
+                frame.columns = [str(c) for c in frame.columns]
+                frame.to_feather(cache_path)
+                return cache_path, 'feather', index_columns
+            except Exception as e:
+                logger.warning(f"⚠️ {self.storage_format}格式写入失败，改用csv: {e}")
+                if cache_path.exists():
+                    cache_path.unlink()
+
+        cache_path = self._get_cache_path(data_type, cache_key, "csv", symbol)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)  # 确保目录存在
+        data.to_csv(cache_path, index=True)
+        return cache_path, 'csv', None
+
+    def _read_frame(self, cache_path: Path, metadata: Dict[str, Any]) -> pd.DataFrame:
+        """按元数据记录的格式读取DataFrame"""
+        file_format = metadata['file_format']
+        if file_format == 'parquet':
+            return pa_parquet.read_table(cache_path, memory_map=self.memory_map).to_pandas()
+        if file_format == 'feather':
+            frame = pa_feather.read_table(cache_path, memory_map=self.memory_map).to_pandas()
+            index_columns = metadata.get('index_columns')
+            if index_columns:
+                frame = frame.set_index(index_columns)
+                if index_columns == ['index']:
+                    frame.index.name = None
+            return frame
+        return pd.read_csv(cache_path, index_col=0)
+
+    def _migrate_csv_entry(self, cache_key: str, metadata: Dict[str, Any], data: pd.DataFrame):
+        """把旧的CSV缓存条目迁移为当前列式格式，保留原缓存时间"""
+        old_path = Path(metadata['file_path'])
+        try:
+            new_path, file_format, index_columns = self._write_frame(
+                data, metadata.get('data_type', 'stock_data'), cache_key, metadata.get('symbol'))
+            if file_format == 'csv':
+                return
+            metadata['file_path'] = str(new_path)
+            metadata['file_format'] = file_format
+            if index_columns:
+                metadata['index_columns'] = index_columns
+            self._save_metadata(cache_key, metadata, keep_cached_at=True)
+            if old_path != new_path and old_path.exists():
+                old_path.unlink()
+            logger.debug(f"🔄 缓存已迁移为{file_format}: {cache_key}")
+        except Exception as e:
+            logger.warning(f"⚠️ 缓存迁移失败，保留csv: {cache_key} - {e}")
+
     def save_stock_data(self, symbol: str, data: Union[pd.DataFrame, str],
                        start_date: str = None, end_date: str = None,
                        data_source: str = "unknown") -> str:
@@ -301,11 +431,11 @@ class StockDataCache:
                                            market=market_type)
 
         # 保存数据
+        index_columns = None
         if isinstance(data, pd.DataFrame):
-            cache_path = self._get_cache_path("stock_data", cache_key, "csv", symbol)
-            cache_path.parent.mkdir(parents=True, exist_ok=True)  # 确保目录存在
-            data.to_csv(cache_path, index=True)
+            cache_path, file_format, index_columns = self._write_frame(data, "stock_data", cache_key, symbol)
         else:
+            file_format = 'txt'
             cache_path = self._get_cache_path("stock_data", cache_key, "txt", symbol)
             cache_path.parent.mkdir(parents=True, exist_ok=True)  # 确保目录存在
             with open(cache_path, 'w', encoding='utf-8') as f:
@@ -320,9 +450,11 @@ class StockDataCache:
             'end_date': end_date,
             'data_source': data_source,
             'file_path': str(cache_path),
-            'file_format': 'csv' if isinstance(data, pd.DataFrame) else 'txt',
+            'file_format': file_format,
             'content_length': len(content_to_check)
         }
+        if index_columns:
+            metadata['index_columns'] = index_columns
         self._save_metadata(cache_key, metadata)
 
         # 获取描述信息
@@ -343,7 +475,13 @@ class StockDataCache:
         
         try:
             if metadata['file_format'] == 'csv':
-                return pd.read_csv(cache_path, index_col=0)
+                data = pd.read_csv(cache_path, index_col=0)
+                # 旧的CSV条目在读取时透明迁移到列式格式
+                if self.storage_format != 'csv':
+                    self._migrate_csv_entry(cache_key, metadata, data)
+                return data
+            elif metadata['file_format'] in ('parquet', 'feather'):
+                return self._read_frame(cache_path, metadata)
             else:
                 with open(cache_path, 'r', encoding='utf-8') as f:
                     return f.read()
@@ -387,24 +525,11 @@ class StockDataCache:
             logger.info(f"🎯 找到精确匹配的{desc}: {symbol} -> {search_key}")
             return search_key
 
-        # 如果没有精确匹配，查找部分匹配（相同股票代码的其他缓存）
-        for metadata_file in self.metadata_dir.glob(f"*_meta.json"):
-            try:
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-
-                if (metadata.get('symbol') == symbol and
-                    metadata.get('data_type') == 'stock_data' and
-                    metadata.get('market_type') == market_type and
-                    (data_source is None or metadata.get('data_source') == data_source)):
-
-                    cache_key = metadata_file.stem.replace('_meta', '')
-                    if self.is_cache_valid(cache_key, max_age_hours, symbol, 'stock_data'):
-                        desc = self.cache_config.get(f"{market_type}_stock_data", {}).get('description', '数据')
-                        logger.info(f"📋 找到部分匹配的{desc}: {symbol} -> {cache_key}")
-                        return cache_key
-            except Exception:
-                continue
+        # 如果没有精确匹配，查找部分匹配（相同股票代码的其他缓存，最新的优先）
+        for cache_key in self.find_cache_keys(symbol, 'stock_data', market_type, data_source, max_age_hours):
+            desc = self.cache_config.get(f"{market_type}_stock_data", {}).get('description', '数据')
+            logger.info(f"📋 找到部分匹配的{desc}: {symbol} -> {cache_key}")
+            return cache_key
 
         desc = self.cache_config.get(f"{market_type}_stock_data", {}).get('description', '数据')
         logger.error(f"❌ 未找到有效的{desc}缓存: {symbol}")
@@ -528,24 +653,11 @@ class StockDataCache:
             cache_type = f"{market_type}_fundamentals"
             max_age_hours = self.cache_config.get(cache_type, {}).get('ttl_hours', 24)
         
-        # 查找匹配的缓存
-        for metadata_file in self.metadata_dir.glob(f"*_meta.json"):
-            try:
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-                
-                if (metadata.get('symbol') == symbol and
-                    metadata.get('data_type') == 'fundamentals' and
-                    metadata.get('market_type') == market_type and
-                    (data_source is None or metadata.get('data_source') == data_source)):
-                    
-                    cache_key = metadata_file.stem.replace('_meta', '')
-                    if self.is_cache_valid(cache_key, max_age_hours, symbol, 'fundamentals'):
-                        desc = self.cache_config.get(f"{market_type}_fundamentals", {}).get('description', '基本面数据')
-                        logger.info(f"🎯 找到匹配的{desc}缓存: {symbol} ({data_source}) -> {cache_key}")
-                        return cache_key
-            except Exception:
-                continue
+        # 查找匹配的缓存（最新的优先）
+        for cache_key in self.find_cache_keys(symbol, 'fundamentals', market_type, data_source, max_age_hours):
+            desc = self.cache_config.get(f"{market_type}_fundamentals", {}).get('description', '基本面数据')
+            logger.info(f"🎯 找到匹配的{desc}缓存: {symbol} ({data_source}) -> {cache_key}")
+            return cache_key
         
         desc = self.cache_config.get(f"{market_type}_fundamentals", {}).get('description', '基本面数据')
         logger.error(f"❌ 未找到有效的{desc}缓存: {symbol} ({data_source})")
@@ -556,24 +668,25 @@ class StockDataCache:
         cutoff_time = datetime.now() - timedelta(days=max_age_days)
         cleared_count = 0
         
-        for metadata_file in self.metadata_dir.glob("*_meta.json"):
+        cleared_keys = []
+        for cache_key, file_path in self.catalog.expired(cutoff_time):
             try:
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-                
-                cached_at = datetime.fromisoformat(metadata['cached_at'])
-                if cached_at < cutoff_time:
-                    # 删除数据文件
-                    data_file = Path(metadata['file_path'])
+                # 删除数据文件
+                if file_path:
+                    data_file = Path(file_path)
                     if data_file.exists():
                         data_file.unlink()
-                    
-                    # 删除元数据文件
+                
+                # 删除元数据文件
+                metadata_file = self._get_metadata_path(cache_key)
+                if metadata_file.exists():
                     metadata_file.unlink()
-                    cleared_count += 1
+                cleared_keys.append(cache_key)
+                cleared_count += 1
                     
             except Exception as e:
                 logger.warning(f"⚠️ 清理缓存时出错: {e}")
+        self.catalog.delete(cleared_keys)
         
         logger.info(f"🧹 已清理 {cleared_count} 个过期缓存文件")
     
@@ -588,31 +701,19 @@ class StockDataCache:
             'skipped_count': 0  # 新增：跳过的缓存数量
         }
         
-        for metadata_file in self.metadata_dir.glob("*_meta.json"):
-            try:
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-                
-                data_type = metadata.get('data_type', 'unknown')
-                if data_type == 'stock_data':
-                    stats['stock_data_count'] += 1
-                elif data_type == 'news':
-                    stats['news_count'] += 1
-                elif data_type == 'fundamentals':
-                    stats['fundamentals_count'] += 1
-                
-                # 检查是否为跳过的缓存（没有实际文件）
-                data_file = Path(metadata.get('file_path', ''))
-                if not data_file.exists():
-                    stats['skipped_count'] += 1
-                else:
-                    # 计算文件大小
-                    stats['total_size_mb'] += data_file.stat().st_size / (1024 * 1024)
-                
-                stats['total_files'] += 1
-                
-            except Exception:
-                continue
+        # 条目数与文件大小由元数据目录汇总，文件大小在写入缓存时记录
+        for data_type, type_stats in self.catalog.stats().items():
+            if data_type == 'stock_data':
+                stats['stock_data_count'] += type_stats['count']
+            elif data_type == 'news':
+                stats['news_count'] += type_stats['count']
+            elif data_type == 'fundamentals':
+                stats['fundamentals_count'] += type_stats['count']
+
+            # 没有实际数据文件的条目视为跳过的缓存
+            stats['skipped_count'] += type_stats['missing']
+            stats['total_size_mb'] += type_stats['size'] / (1024 * 1024)
+            stats['total_files'] += type_stats['count']
         
         stats['total_size_mb'] = round(stats['total_size_mb'], 2)
         return stats
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+并发数据获取
+把彼此独立的数据源/接口调用放进有界线程池同时发起，按任务顺序确定性地返回结果。
+每个任务有自己的超时，超时或失败的任务只记为缺失，不阻塞其余结果；
+同一数据源的并发调用数受信号量限制，避免一次性打满接口配额
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+DEFAULT_SOURCE_CONCURRENCY = 4
+
+
+@dataclass
+class FetchTask:
+    """单个获取任务"""
+    name: str
+    fn: Callable[[], Any]
+    source: str = "default"
+    timeout: Optional[float] = None
+
+
+@dataclass
+class FetchResult:
+    """任务结果：成功时value有效；失败时error非空；超时时timed_out为True"""
+    name: str
+    source: str
+    value: Any = None
+    error: Optional[BaseException] = None
+    timed_out: bool = False
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and not self.timed_out
+
+
+class SourceStats:
+    """按数据源统计调用次数、失败、超时与累计耗时"""
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, result: FetchResult):
+        with self._lock:
+            stats = self._stats.setdefault(
+                result.source, {"calls": 0, "errors": 0, "timeouts": 0, "total_seconds": 0.0})
+            stats["calls"] += 1
+            if result.timed_out:
+                stats["timeouts"] += 1
+            elif result.error is not None:
+                stats["errors"] += 1
+            stats["total_seconds"] += result.elapsed
+
+    def get(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                source: {**stats, "avg_seconds": stats["total_seconds"] / stats["calls"] if stats["calls"] else 0.0}
+                for source, stats in self._stats.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+_source_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+_source_semaphores_lock = threading.Lock()
+_source_stats = SourceStats()
+
+
+def _source_limit(source: str) -> int:
+    """数据源并发上限，环境变量 FETCH_CONCURRENCY_<SOURCE> 可覆盖"""
+    value = os.getenv(f"FETCH_CONCURRENCY_{source.upper()}")
+    try:
+        return max(1, int(value)) if value else DEFAULT_SOURCE_CONCURRENCY
+    except ValueError:
+        return DEFAULT_SOURCE_CONCURRENCY
+
+
+def _get_source_semaphore(source: str) -> threading.BoundedSemaphore:
+    with _source_semaphores_lock:
+        semaphore = _source_semaphores.get(source)
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(_source_limit(source))
+            _source_semaphores[source] = semaphore
+        return semaphore
+
+
+def get_fetch_stats() -> Dict[str, Dict[str, float]]:
+    """各数据源的调用统计"""
+    return _source_stats.get()
+
+
+def fetch_concurrently(tasks: List[FetchTask], max_workers: Optional[int] = None,
+                       deadline: Optional[float] = None) -> Dict[str, FetchResult]:
+    """
+    并发执行任务
+
+    Args:
+        tasks: 任务列表，名称需唯一
+        max_workers: 线程池大小，默认等于任务数
+        deadline: 全局截止时间（秒），与各任务自身的timeout取较早者
+
+    Returns:
+        任务名 -> FetchResult，顺序与tasks一致。
+        超时的任务若尚未开始会被取消；已在运行的线程无法强制中止，其结果被丢弃
+    """
+    if not tasks:
+        return {}
+
+    start = time.monotonic()
+    results = {task.name: FetchResult(task.name, task.source) for task in tasks}
+
+    def run(task: FetchTask):
+        with _get_source_semaphore(task.source):
+            task_start = time.monotonic()
+            try:
+                return task.fn(), None, time.monotonic() - task_start
+            except Exception as e:
+                return None, e, time.monotonic() - task_start
+
+    task_deadlines = {}
+    for task in tasks:
+        limits = [t for t in (task.timeout, deadline) if t is not None]
+        task_deadlines[task.name] = start + min(limits) if limits else None
+
+    executor = ThreadPoolExecutor(max_workers=max_workers or len(tasks), thread_name_prefix="fetch")
+    try:
+        futures = {executor.submit(run, task): task for task in tasks}
+        pending = set(futures)
+        while pending:
+            now = time.monotonic()
+            for future in [f for f in pending if task_deadlines[futures[f].name] is not None
+                           and task_deadlines[futures[f].name] <= now]:
+                task = futures[future]
+                future.cancel()
+                results[task.name].timed_out = True
+                results[task.name].elapsed = now - start
+                pending.discard(future)
+                logger.warning(f"⏱️ [{task.source}] {task.name} 超时，使用已获取的部分数据")
+            if not pending:
+                break
+
+            active_deadlines = [task_deadlines[futures[f].name] for f in pending
+                                if task_deadlines[futures[f].name] is not None]
+            wait_timeout = max(0.0, min(active_deadlines) - now) if active_deadlines else None
+            done, pending = wait(pending, timeout=wait_timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                task = futures[future]
+                value, error, elapsed = future.result()
+                result = results[task.name]
+                result.value, result.error, result.elapsed = value, error, elapsed
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    for result in results.values():
+        _source_stats.record(result)
+    return results
@@ -6,11 +6,16 @@
 
 import os
 import time
+from functools import partial
 from typing import Dict, List, Optional, Any
 from enum import Enum
 import warnings
 import pandas as pd
 
+from .single_flight import get_single_flight, make_flight_key, SingleFlightTimeout
+from .security_master import get_security_master, normalize_symbol
+from .hedged_fetch import DataSourceError, HedgedResult, create_hedged_fetcher, get_source_health
+
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('agents')
@@ -39,6 +44,8 @@ class DataSourceManager:
         self.default_source = self._get_default_source()
         self.available_sources = self._check_available_sources()
         self.current_source = self.default_source
+        # 首选数据源慢或失败时对冲/降级到备用数据源
+        self.hedged_fetcher = create_hedged_fetcher()
 
         logger.info(f"📊 数据源管理器初始化完成")
         logger.info(f"   默认数据源: {self.default_source.value}")
@@ -274,7 +281,7 @@ class DataSourceManager:
     
     def get_stock_data(self, symbol: str, start_date: str = None, end_date: str = None) -> str:
         """
-        获取股票数据的统一接口
+        获取股票数据的统一接口，同一股票和区间的并发请求合并为一次数据源调用
 
         Args:
             symbol: 股票代码
@@ -284,6 +291,15 @@ class DataSourceManager:
         Returns:
             str: 格式化的股票数据
         """
+        flight_key = make_flight_key("china_source", self.current_source.value, symbol, start_date, end_date)
+        try:
+            return get_single_flight().do(flight_key, self._fetch_stock_data, symbol, start_date, end_date)
+        except SingleFlightTimeout as e:
+            logger.error(f"❌ [数据获取] {e}")
+            return f"❌ 获取{symbol}股票数据超时: {e}"
+
+    def _fetch_stock_data(self, symbol: str, start_date: str = None, end_date: str = None) -> str:
+        """按当前数据源获取股票数据，慢或失败时对冲/降级到其他数据源"""
         # 记录详细的输入参数
         logger.info(f"📊 [数据获取] 开始获取股票数据",
                    extra={
@@ -300,76 +316,44 @@ class DataSourceManager:
         logger.info(f"🔍 [股票代码追踪] 股票代码字符: {list(str(symbol))}")
         logger.info(f"🔍 [股票代码追踪] 当前数据源: {self.current_source.value}")
 
-        start_time = time.time()
-
-        try:
-            # 根据数据源调用相应的获取方法
-            if self.current_source == ChinaDataSource.TUSHARE:
-                logger.info(f"🔍 [股票代码追踪] 调用 Tushare 数据源，传入参数: symbol='{symbol}'")
-                result = self._get_tushare_data(symbol, start_date, end_date)
-            elif self.current_source == ChinaDataSource.AKSHARE:
-                result = self._get_akshare_data(symbol, start_date, end_date)
-            elif self.current_source == ChinaDataSource.BAOSTOCK:
-                result = self._get_baostock_data(symbol, start_date, end_date)
-            else:
-                result = f"❌ 不支持的数据源: {self.current_source.value}"
-
-            # 记录详细的输出结果
-            duration = time.time() - start_time
-            result_length = len(result) if result else 0
-            is_success = result and "❌" not in result and "错误" not in result
-
-            if is_success:
-                logger.info(f"✅ [数据获取] 成功获取股票数据",
-                           extra={
-                               'symbol': symbol,
-                               'start_date': start_date,
-                               'end_date': end_date,
-                               'data_source': self.current_source.value,
-                               'duration': duration,
-                               'result_length': result_length,
-                               'result_preview': result[:200] + '...' if result_length > 200 else result,
-                               'event_type': 'data_fetch_success'
-                           })
-                return result
-            else:
-                logger.warning(f"⚠️ [数据获取] 数据质量异常，尝试降级到其他数据源",
-                              extra={
-                                  'symbol': symbol,
-                                  'start_date': start_date,
-                                  'end_date': end_date,
-                                  'data_source': self.current_source.value,
-                                  'duration': duration,
-                                  'result_length': result_length,
-                                  'result_preview': result[:200] + '...' if result_length > 200 else result,
-                                  'event_type': 'data_fetch_warning'
-                              })
-
-                # 数据质量异常时也尝试降级到其他数据源
-                fallback_result = self._try_fallback_sources(symbol, start_date, end_date)
-                if fallback_result and "❌" not in fallback_result and "错误" not in fallback_result:
-                    logger.info(f"✅ [数据获取] 降级成功获取数据")
-                    return fallback_result
-                else:
-                    logger.error(f"❌ [数据获取] 所有数据源都无法获取有效数据")
-                    return result  # 返回原始结果（包含错误信息）
-
-        except Exception as e:
-            duration = time.time() - start_time
-            logger.error(f"❌ [数据获取] 异常失败: {e}",
-                        extra={
-                            'symbol': symbol,
-                            'start_date': start_date,
-                            'end_date': end_date,
-                            'data_source': self.current_source.value,
-                            'duration': duration,
-                            'error': str(e),
-                            'event_type': 'data_fetch_exception'
-                        }, exc_info=True)
-            return self._try_fallback_sources(symbol, start_date, end_date)
+        result = self._try_fallback_sources(symbol, start_date, end_date, include_current=True)
+        if result.ok:
+            result_length = len(result.value)
+            logger.info(f"✅ [数据获取] 成功获取股票数据",
+                       extra={
+                           'symbol': symbol,
+                           'start_date': start_date,
+                           'end_date': end_date,
+                           'data_source': result.source,
+                           'fallback': result.source != self.current_source.value,
+                           'duration': result.elapsed,
+                           'result_length': result_length,
+                           'result_preview': result.value[:200] + '...' if result_length > 200 else result.value,
+                           'event_type': 'data_fetch_success'
+                       })
+            return result.value
+
+        logger.error(f"❌ [数据获取] 所有数据源都无法获取有效数据",
+                    extra={
+                        'symbol': symbol,
+                        'start_date': start_date,
+                        'end_date': end_date,
+                        'data_source': self.current_source.value,
+                        'duration': result.elapsed,
+                        'error': result.error_message,
+                        'event_type': 'data_fetch_failed'
+                    })
+        return f"❌ 所有数据源都无法获取{symbol}的数据: {result.error_message}"
     
     def _get_tushare_data(self, symbol: str, start_date: str, end_date: str) -> str:
         """使用Tushare获取数据 - 直接调用适配器，避免循环调用"""
+        try:
+            return self._load_tushare_data(symbol, start_date, end_date)
+        except DataSourceError as e:
+            return str(e)
+
+    def _load_tushare_data(self, symbol: str, start_date: str, end_date: str) -> str:
+        """使用Tushare获取数据，无有效数据时抛出DataSourceError"""
         logger.debug(f"📊 [Tushare] 调用参数: symbol={symbol}, start_date={start_date}, end_date={end_date}")
 
         # 添加详细的股票代码追踪日志
@@ -420,17 +404,11 @@ class DataSourceManager:
 
                 return result
             else:
-                result = f"❌ 未获取到{symbol}的有效数据"
-
-            duration = time.time() - start_time
-            logger.info(f"🔍 [DataSourceManager详细日志] interface调用完成，耗时: {duration:.3f}秒")
-            logger.info(f"🔍 [股票代码追踪] get_china_stock_data_tushare 返回结果前200字符: {result[:200] if result else 'None'}")
-            logger.info(f"🔍 [DataSourceManager详细日志] 返回结果类型: {type(result)}")
-            logger.info(f"🔍 [DataSourceManager详细日志] 返回结果长度: {len(result) if result else 0}")
-
-            logger.debug(f"📊 [Tushare] 调用完成: 耗时={duration:.2f}s, 结果长度={len(result) if result else 0}")
-
-            return result
+                duration = time.time() - start_time
+                logger.warning(f"⚠️ [Tushare] 数据为空: 耗时={duration:.2f}s")
+                raise DataSourceError(f"❌ 未获取到{symbol}的有效数据")
+        except DataSourceError:
+            raise
         except Exception as e:
             duration = time.time() - start_time
             logger.error(f"❌ [Tushare] 调用失败: {e}, 耗时={duration:.2f}s", exc_info=True)
@@ -442,6 +420,15 @@ class DataSourceManager:
     
     def _get_akshare_data(self, symbol: str, start_date: str, end_date: str) -> str:
         """使用AKShare获取数据"""
+        try:
+            return self._load_akshare_data(symbol, start_date, end_date)
+        except DataSourceError as e:
+            return str(e)
+        except Exception as e:
+            return f"❌ AKShare获取{symbol}数据失败: {e}"
+
+    def _load_akshare_data(self, symbol: str, start_date: str, end_date: str) -> str:
+        """使用AKShare获取数据，无有效数据时抛出DataSourceError"""
         logger.debug(f"📊 [AKShare] 调用参数: symbol={symbol}, start_date={start_date}, end_date={end_date}")
 
         start_time = time.time()
@@ -487,17 +474,25 @@ class DataSourceManager:
                 logger.debug(f"📊 [AKShare] 调用成功: 耗时={duration:.2f}s, 数据条数={len(data)}, 结果长度={len(result)}")
                 return result
             else:
-                result = f"❌ 未能获取{symbol}的股票数据"
                 logger.warning(f"⚠️ [AKShare] 数据为空: 耗时={duration:.2f}s")
-                return result
+                raise DataSourceError(f"❌ 未能获取{symbol}的股票数据")
 
+        except DataSourceError:
+            raise
         except Exception as e:
             duration = time.time() - start_time
             logger.error(f"❌ [AKShare] 调用失败: {e}, 耗时={duration:.2f}s", exc_info=True)
-            return f"❌ AKShare获取{symbol}数据失败: {e}"
+            raise
     
     def _get_baostock_data(self, symbol: str, start_date: str, end_date: str) -> str:
         """使用BaoStock获取数据"""
+        try:
+            return self._load_baostock_data(symbol, start_date, end_date)
+        except DataSourceError as e:
+            return str(e)
+
+    def _load_baostock_data(self, symbol: str, start_date: str, end_date: str) -> str:
+        """使用BaoStock获取数据，无有效数据时抛出DataSourceError"""
         # 这里需要实现BaoStock的统一接口
         from .baostock_utils import get_baostock_provider
         provider = get_baostock_provider()
@@ -520,7 +515,7 @@ class DataSourceManager:
                 result += data.tail(display_rows).to_string(index=False)
             return result
         else:
-            return f"❌ 未能获取{symbol}的股票数据"
+            raise DataSourceError(f"❌ 未能获取{symbol}的股票数据")
     
     def _get_volume_safely(self, data) -> float:
         """安全地获取成交量数据，支持多种列名"""
@@ -541,133 +536,101 @@ class DataSourceManager:
             logger.error(f"❌ 获取成交量失败: {e}")
             return 0
 
-    def _try_fallback_sources(self, symbol: str, start_date: str, end_date: str) -> str:
-        """尝试备用数据源 - 避免递归调用"""
-        logger.error(f"🔄 {self.current_source.value}失败，尝试备用数据源...")
+    def _try_fallback_sources(self, symbol: str, start_date: str, end_date: str,
+                              include_current: bool = False) -> HedgedResult:
+        """
+        对冲获取股票数据：按优先级启动数据源，前一个在其p95耗时内未返回时并行启动下一个，
+        明确失败时立即启动下一个，采用最先返回的有效结果
 
+        Args:
+            include_current: 是否把当前数据源作为首选，False 时只尝试备用数据源
+        """
         # 备用数据源优先级: AKShare > Tushare > BaoStock
         fallback_order = [
             ChinaDataSource.AKSHARE,
             ChinaDataSource.TUSHARE,
             ChinaDataSource.BAOSTOCK
         ]
+        sources = [self.current_source] if include_current else []
+        sources += [s for s in fallback_order if s != self.current_source and s in self.available_sources]
 
-        for source in fallback_order:
-            if source != self.current_source and source in self.available_sources:
-                try:
-                    logger.info(f"🔄 尝试备用数据源: {source.value}")
-
-                    # 直接调用具体的数据源方法，避免递归
-                    if source == ChinaDataSource.TUSHARE:
-                        result = self._get_tushare_data(symbol, start_date, end_date)
-                    elif source == ChinaDataSource.AKSHARE:
-                        result = self._get_akshare_data(symbol, start_date, end_date)
-                    elif source == ChinaDataSource.BAOSTOCK:
-                        result = self._get_baostock_data(symbol, start_date, end_date)
-                    else:
-                        logger.warning(f"⚠️ 未知数据源: {source.value}")
-                        continue
-
-                    if "❌" not in result:
-                        logger.info(f"✅ 备用数据源{source.value}获取成功")
-                        return result
-                    else:
-                        logger.warning(f"⚠️ 备用数据源{source.value}返回错误结果")
-
-                except Exception as e:
-                    logger.error(f"❌ 备用数据源{source.value}也失败: {e}")
-                    continue
-        
-        return f"❌ 所有数据源都无法获取{symbol}的数据"
+        loaders = {
+            ChinaDataSource.TUSHARE: self._load_tushare_data,
+            ChinaDataSource.AKSHARE: self._load_akshare_data,
+            ChinaDataSource.BAOSTOCK: self._load_baostock_data,
+        }
+        calls = [(source.value, partial(loaders[source], symbol, start_date, end_date))
+                 for source in sources if source in loaders]
+        return self.hedged_fetcher.fetch(calls)
+
+    def get_source_stats(self) -> Dict[str, Dict]:
+        """各数据源最近调用的失败率和p50/p95耗时"""
+        return get_source_health().get_stats()
     
     def get_stock_info(self, symbol: str) -> Dict:
-        """获取股票基本信息，支持降级机制"""
+        """获取股票基本信息，优先查本地证券主数据，未命中时按数据源降级获取并写回"""
+        security_master = get_security_master()
+        record = security_master.lookup(symbol)
+        if record is not None and record['market'] == 'china':
+            logger.debug(f"⚡ [股票信息] 证券主数据命中: {symbol} - {record['name']}")
+            return {
+                'symbol': symbol,
+                'name': record['name'],
+                'area': record.get('area', ''),
+                'industry': record.get('industry', ''),
+                'market': record.get('exchange', ''),
+                'list_date': record.get('list_date', ''),
+                'source': record.get('source', 'security_master')
+            }
+
+        result = self._fetch_stock_info(symbol)
+        normalized = normalize_symbol(symbol)
+        if result.get('name') and result['name'] != f'股票{symbol}' and normalized and normalized[0] == 'china':
+            security_master.upsert([{
+                'code': symbol, 'name': result['name'], 'area': result.get('area'),
+                'industry': result.get('industry'), 'exchange': result.get('market'),
+                'list_date': result.get('list_date'), 'source': result.get('source')
+            }])
+        return result
+
+    def _fetch_stock_info(self, symbol: str) -> Dict:
+        """从数据源获取股票基本信息，支持降级机制"""
         logger.info(f"📊 [股票信息] 开始获取{symbol}基本信息...")
-
-        # 首先尝试当前数据源
-        try:
-            if self.current_source == ChinaDataSource.TUSHARE:
-                from .interface import get_china_stock_info_tushare
-                info_str = get_china_stock_info_tushare(symbol)
-                result = self._parse_stock_info_string(info_str, symbol)
-
-                # 检查是否获取到有效信息
-                if result.get('name') and result['name'] != f'股票{symbol}':
-                    logger.info(f"✅ [股票信息] Tushare成功获取{symbol}信息")
-                    return result
-                else:
-                    logger.warning(f"⚠️ [股票信息] Tushare返回无效信息，尝试降级...")
-                    return self._try_fallback_stock_info(symbol)
-            else:
-                adapter = self.get_data_adapter()
-                if adapter and hasattr(adapter, 'get_stock_info'):
-                    result = adapter.get_stock_info(symbol)
-                    if result.get('name') and result['name'] != f'股票{symbol}':
-                        logger.info(f"✅ [股票信息] {self.current_source.value}成功获取{symbol}信息")
-                        return result
-                    else:
-                        logger.warning(f"⚠️ [股票信息] {self.current_source.value}返回无效信息，尝试降级...")
-                        return self._try_fallback_stock_info(symbol)
-                else:
-                    logger.warning(f"⚠️ [股票信息] {self.current_source.value}不支持股票信息获取，尝试降级...")
-                    return self._try_fallback_stock_info(symbol)
-
-        except Exception as e:
-            logger.error(f"❌ [股票信息] {self.current_source.value}获取失败: {e}")
-            return self._try_fallback_stock_info(symbol)
-
-    def _try_fallback_stock_info(self, symbol: str) -> Dict:
-        """尝试使用备用数据源获取股票基本信息"""
-        logger.info(f"🔄 [股票信息] {self.current_source.value}失败，尝试备用数据源...")
-
-        # 获取所有可用数据源
-        available_sources = self.available_sources.copy()
-
-        # 移除当前数据源
-        if self.current_source.value in available_sources:
-            available_sources.remove(self.current_source.value)
-
-        # 尝试所有备用数据源
-        for source_name in available_sources:
-            try:
-                source = ChinaDataSource(source_name)
-                logger.info(f"🔄 [股票信息] 尝试备用数据源: {source_name}")
-
-                # 根据数据源类型获取股票信息
-                if source == ChinaDataSource.TUSHARE:
-                    from .interface import get_china_stock_info_tushare
-                    info_str = get_china_stock_info_tushare(symbol)
-                    result = self._parse_stock_info_string(info_str, symbol)
-                elif source == ChinaDataSource.AKSHARE:
-                    result = self._get_akshare_stock_info(symbol)
-                elif source == ChinaDataSource.BAOSTOCK:
-                    result = self._get_baostock_stock_info(symbol)
-                else:
-                    # 尝试通用适配器
-                    original_source = self.current_source
-                    self.current_source = source
-                    adapter = self.get_data_adapter()
-                    self.current_source = original_source
-
-                    if adapter and hasattr(adapter, 'get_stock_info'):
-                        result = adapter.get_stock_info(symbol)
-                    else:
-                        logger.warning(f"⚠️ [股票信息] {source_name}不支持股票信息获取")
-                        continue
-
-                # 检查是否获取到有效信息
-                if result.get('name') and result['name'] != f'股票{symbol}':
-                    logger.info(f"✅ [股票信息] 备用数据源{source_name}成功获取{symbol}信息")
-                    return result
-                else:
-                    logger.warning(f"⚠️ [股票信息] 备用数据源{source_name}返回无效信息")
-
-            except Exception as e:
-                logger.error(f"❌ [股票信息] 备用数据源{source_name}失败: {e}")
-                continue
+        return self._try_fallback_stock_info(symbol, include_current=True)
+
+    def _load_stock_info(self, source: ChinaDataSource, symbol: str) -> Dict:
+        """从指定数据源获取股票基本信息"""
+        if source == ChinaDataSource.TUSHARE:
+            from .interface import get_china_stock_info_tushare
+            info_str = get_china_stock_info_tushare(symbol)
+            return self._parse_stock_info_string(info_str, symbol)
+        if source == self.current_source:
+            adapter = self.get_data_adapter()
+            if adapter and hasattr(adapter, 'get_stock_info'):
+                return adapter.get_stock_info(symbol)
+        if source == ChinaDataSource.AKSHARE:
+            return self._get_akshare_stock_info(symbol)
+        if source == ChinaDataSource.BAOSTOCK:
+            return self._get_baostock_stock_info(symbol)
+        raise DataSourceError(f"{source.value}不支持股票信息获取")
+
+    def _try_fallback_stock_info(self, symbol: str, include_current: bool = False) -> Dict:
+        """对冲获取股票基本信息，include_current 时首选当前数据源"""
+        sources = [self.current_source] if include_current else []
+        sources += [ChinaDataSource(s) for s in self.available_sources if ChinaDataSource(s) != self.current_source]
+
+        def is_valid(info):
+            return bool(info.get('name')) and info['name'] != f'股票{symbol}' and 'error' not in info
+
+        # 股票信息与K线的耗时差别很大，使用单独的健康统计名称
+        calls = [(f"{source.value}_info", partial(self._load_stock_info, source, symbol)) for source in sources]
+        result = self.hedged_fetcher.fetch(calls, validate=is_valid)
+        if result.ok:
+            logger.info(f"✅ [股票信息] {result.source}成功获取{symbol}信息")
+            return result.value
 
         # 所有数据源都失败，返回默认值
-        logger.error(f"❌ [股票信息] 所有数据源都无法获取{symbol}的基本信息")
+        logger.error(f"❌ [股票信息] 所有数据源都无法获取{symbol}的基本信息: {result.error_message}")
         return {'symbol': symbol, 'name': f'股票{symbol}', 'source': 'unknown'}
 
     def _get_akshare_stock_info(self, symbol: str) -> Dict:
@@ -1,11 +1,161 @@
+import bisect
 import json
 import os
+import threading
+from collections import OrderedDict
 
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('agents')
 
 
+# 离线数据类型
+FINNHUB_DATA_TYPES = ("news_data", "insider_senti", "insider_trans", "SEC_filings", "fin_as_reported")
+
+
+def _data_path(ticker, data_type, data_dir, period=None):
+    if period:
+        return os.path.join(
+            data_dir,
+            "finnhub_data",
+            data_type,
+            f"{ticker}_{period}_data_formatted.json",
+        )
+    return os.path.join(
+        data_dir, "finnhub_data", data_type, f"{ticker}_data_formatted.json"
+    )
+
+
+class _DateIndex:
+    """单个数据文件的日期索引：按日期排序的键，以及每个键在原文件中的位置（用于还原原始顺序）"""
+
+    __slots__ = ("keys", "positions", "values")
+
+    def __init__(self, data):
+        # 空列表在任何查询中都会被过滤，建索引时直接丢弃
+        items = [(key, position, value) for position, (key, value) in enumerate(data.items()) if len(value) > 0]
+        items.sort(key=lambda item: item[0])
+        self.keys = [item[0] for item in items]
+        self.positions = [item[1] for item in items]
+        self.values = [item[2] for item in items]
+
+    def range(self, start_date, end_date):
+        lo = bisect.bisect_left(self.keys, start_date)
+        hi = bisect.bisect_right(self.keys, end_date)
+        if lo >= hi:
+            return {}
+        # 按原文件中的顺序返回，与逐键过滤的结果一致
+        selected = sorted(range(lo, hi), key=self.positions.__getitem__)
+        return {self.keys[i]: self.values[i] for i in selected}
+
+
+class FinnhubDataReader:
+    """
+    Finnhub离线数据读取器
+    每个文件只解析一次并建立日期索引，按文件修改时间和大小失效，区间查询用二分查找
+    """
+
+    def __init__(self, max_files: int = 256):
+        self.max_files = max_files
+        self._indexes: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "loads": 0}
+
+    def _load(self, data_path):
+        """返回文件的日期索引；文件不存在或解析失败时返回None（已记录日志）"""
+        try:
+            if not os.path.exists(data_path):
+                logger.warning(f"⚠️ [DEBUG] 数据文件不存在: {data_path}")
+                logger.warning(f"⚠️ [DEBUG] 请确保已下载相关数据或检查数据目录配置")
+                return None
+
+            stat = os.stat(data_path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+            with self._lock:
+                cached = self._indexes.get(data_path)
+                if cached is not None and cached[0] == signature:
+                    self._indexes.move_to_end(data_path)
+                    self._stats["hits"] += 1
+                    return cached[1]
+
+            with open(data_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            logger.error(f"❌ [ERROR] 文件未找到: {data_path}")
+            return None
+        except json.JSONDecodeError as e:
+            logger.error(f"❌ [ERROR] JSON解析错误: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"❌ [ERROR] 读取数据文件时发生错误: {e}")
+            return None
+
+        index = _DateIndex(data)
+        with self._lock:
+            self._indexes[data_path] = (signature, index)
+            self._indexes.move_to_end(data_path)
+            while len(self._indexes) > self.max_files:
+                self._indexes.popitem(last=False)
+            self._stats["loads"] += 1
+        return index
+
+    def get_range(self, ticker, start_date, end_date, data_type, data_dir, period=None):
+        """
+        返回 [start_date, end_date] 内非空的 日期 -> 条目列表。
+        条目列表与缓存共享，调用方不应修改
+        """
+        index = self._load(_data_path(ticker, data_type, data_dir, period))
+        if index is None:
+            return {}
+        return index.range(start_date, end_date)
+
+    def preload(self, tickers, data_types=FINNHUB_DATA_TYPES, data_dir=None, period=None):
+        """
+        批量预加载，供批量回测在开始前一次性解析所有文件
+
+        Returns:
+            成功加载（或已在缓存中）的文件数
+        """
+        if data_dir is None:
+            from .config import get_config
+            data_dir = get_config()["data_dir"]
+
+        paths = [_data_path(ticker, data_type, data_dir, period)
+                 for ticker in tickers for data_type in data_types]
+        if len(paths) > self.max_files:
+            logger.warning(f"⚠️ 预加载文件数({len(paths)})超过缓存容量({self.max_files})，较早的文件会被淘汰")
+        loaded = sum(1 for path in paths if os.path.exists(path) and self._load(path) is not None)
+        logger.info(f"📦 Finnhub离线数据预加载完成: {loaded}/{len(paths)}个文件")
+        return loaded
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+
+    def get_stats(self):
+        with self._lock:
+            return {**self._stats, "files": len(self._indexes), "max_files": self.max_files}
+
+
+# 全局实例
+_reader = None
+_reader_lock = threading.Lock()
+
+
+def get_finnhub_reader() -> FinnhubDataReader:
+    """获取全局Finnhub离线数据读取器"""
+    global _reader
+    if _reader is None:
+        with _reader_lock:
+            if _reader is None:
+                _reader = FinnhubDataReader(max_files=int(os.getenv("FINNHUB_READER_MAX_FILES", "256")))
+    return _reader
+
+
+def preload(tickers, data_types=FINNHUB_DATA_TYPES, data_dir=None, period=None):
+    """批量预加载指定股票和数据类型的离线文件到全局读取器"""
+    return get_finnhub_reader().preload(tickers, data_types, data_dir, period)
+
 
 def get_data_in_range(ticker, start_date, end_date, data_type, data_dir, period=None):
     """
@@ -17,40 +167,4 @@ def get_data_in_range(ticker, start_date, end_date, data_type, data_dir, period=
         data_dir (str): Directory where the data is saved.
         period (str): Default to none, if there is a period specified, should be annual or quarterly.
     """
-
-    if period:
-        data_path = os.path.join(
-            data_dir,
-            "finnhub_data",
-            data_type,
-            f"{ticker}_{period}_data_formatted.json",
-        )
-    else:
-        data_path = os.path.join(
-            data_dir, "finnhub_data", data_type, f"{ticker}_data_formatted.json"
-        )
-
-    try:
-        if not os.path.exists(data_path):
-            logger.warning(f"⚠️ [DEBUG] 数据文件不存在: {data_path}")
-            logger.warning(f"⚠️ [DEBUG] 请确保已下载相关数据或检查数据目录配置")
-            return {}
-        
-        with open(data_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except FileNotFoundError:
-        logger.error(f"❌ [ERROR] 文件未找到: {data_path}")
-        return {}
-    except json.JSONDecodeError as e:
-        logger.error(f"❌ [ERROR] JSON解析错误: {e}")
-        return {}
-    except Exception as e:
-        logger.error(f"❌ [ERROR] 读取数据文件时发生错误: {e}")
-        return {}
-
-    # filter keys (date, str in format YYYY-MM-DD) by the date range (str, str in format YYYY-MM-DD)
-    filtered_data = {}
-    for key, value in data.items():
-        if start_date <= key <= end_date and len(value) > 0:
-            filtered_data[key] = value
-    return filtered_data
+    return get_finnhub_reader().get_range(ticker, start_date, end_date, data_type, data_dir, period)
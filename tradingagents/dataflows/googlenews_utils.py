@@ -2,8 +2,6 @@ import json
 import requests
 from bs4 import BeautifulSoup
 from datetime import datetime
-import time
-import random
 from tenacity import (
     retry,
     stop_after_attempt,
@@ -16,6 +14,8 @@ from tenacity import (
 from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('agents')
 
+from .rate_limiter import wait_for_rate_limit
+
 
 def is_rate_limited(response):
     """Check if the response indicates rate limiting (status code 429)"""
@@ -29,8 +29,8 @@ def is_rate_limited(response):
 )
 def make_request(url, headers):
     """Make a request with retry logic for rate limiting and connection issues"""
-    # Random delay before each request to avoid detection
-    time.sleep(random.uniform(2, 6))
+    # Shared token bucket instead of a fixed random delay: concurrent analyses share one budget
+    wait_for_rate_limit("google_news")
     # 添加超时参数，设置连接超时和读取超时
     response = requests.get(url, headers=headers, timeout=(10, 30))  # 连接超时10秒，读取超时30秒
     return response
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+对冲式数据源降级
+先请求首选数据源，若在其历史p95耗时内没有返回，再并行启动下一个数据源，采用最先返回的有效结果，
+其余请求取消或丢弃；数据源明确失败时立即启动下一个。各数据源最近若干次的耗时和失败率用于
+计算对冲延迟，并自动把持续更快的数据源排到前面、把持续失败的数据源排到最后
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from .concurrent_fetch import FetchResult
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+class DataSourceError(Exception):
+    """数据源调用成功但没有返回有效数据（空数据、无效股票信息等）"""
+
+
+@dataclass
+class HedgedResult:
+    """对冲获取的结果：source 为采用结果的数据源，attempts 为已结束的各次尝试"""
+    value: Any = None
+    source: Optional[str] = None
+    attempts: List[FetchResult] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.source is not None
+
+    @property
+    def error_message(self) -> str:
+        errors = [f"{a.source}: {'超时' if a.timed_out else a.error}" for a in self.attempts if not a.ok]
+        return "; ".join(errors) or "没有可用的数据源"
+
+
+class SourceHealth:
+    """按数据源保存最近 window 次调用的耗时与成败"""
+
+    def __init__(self, window: int = 50, min_samples: int = 5, max_error_rate: float = 0.5):
+        """
+        Args:
+            window: 每个数据源保留的最近样本数
+            min_samples: 样本数达到该值后才用于计算p95和排序
+            max_error_rate: 失败率不低于该值的数据源排到最后
+        """
+        self.window = window
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self._samples: Dict[str, Deque[Tuple[float, bool]]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, source: str, elapsed: float, ok: bool):
+        with self._lock:
+            self._samples.setdefault(source, deque(maxlen=self.window)).append((elapsed, ok))
+
+    def _latencies(self, source: str) -> List[float]:
+        with self._lock:
+            return sorted(elapsed for elapsed, ok in self._samples.get(source, ()) if ok)
+
+    def latency_quantile(self, source: str, quantile: float) -> Optional[float]:
+        """成功调用耗时的分位数，样本不足时为None"""
+        latencies = self._latencies(source)
+        if len(latencies) < self.min_samples:
+            return None
+        return latencies[min(len(latencies) - 1, int(quantile * len(latencies)))]
+
+    def error_rate(self, source: str) -> float:
+        with self._lock:
+            samples = self._samples.get(source, ())
+            return sum(1 for _, ok in samples if not ok) / len(samples) if samples else 0.0
+
+    def _unhealthy(self, source: str) -> bool:
+        with self._lock:
+            count = len(self._samples.get(source, ()))
+        return count >= self.min_samples and self.error_rate(source) >= self.max_error_rate
+
+    def order(self, sources: Sequence[str]) -> List[str]:
+        """
+        按健康状况调整顺序：持续失败的数据源移到最后；样本充足的数据源之间按中位耗时排序，
+        样本不足的数据源保持配置中的位置
+        """
+        healthy = [s for s in sources if not self._unhealthy(s)]
+        unhealthy = [s for s in sources if self._unhealthy(s)]
+        medians = {s: self.latency_quantile(s, 0.5) for s in healthy}
+        known = sorted((s for s in healthy if medians[s] is not None), key=lambda s: medians[s])
+        known_iter = iter(known)
+        ordered = [next(known_iter) if medians[s] is not None else s for s in healthy]
+        return ordered + unhealthy
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            sources = list(self._samples)
+        return {
+            source: {
+                "samples": len(self._samples[source]),
+                "error_rate": self.error_rate(source),
+                "p50_seconds": self.latency_quantile(source, 0.5),
+                "p95_seconds": self.latency_quantile(source, 0.95),
+            }
+            for source in sources
+        }
+
+
+class HedgedFetcher:
+    """按顺序对冲调用多个数据源"""
+
+    def __init__(self, health: Optional[SourceHealth] = None, hedging: bool = True,
+                 default_delay: float = 3.0, min_delay: float = 0.2, max_delay: float = 10.0,
+                 timeout: Optional[float] = None, auto_reorder: bool = True):
+        """
+        Args:
+            health: 数据源健康统计，默认新建
+            hedging: False 时只在前一个数据源失败后才启动下一个（传统顺序降级）
+            default_delay: 数据源样本不足时的对冲延迟（秒）
+            min_delay / max_delay: 由p95得到的对冲延迟的上下限
+            timeout: 整体超时（秒），None表示不限
+            auto_reorder: 是否根据健康统计调整数据源顺序
+        """
+        self.health = health or SourceHealth()
+        self.hedging = hedging
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.auto_reorder = auto_reorder
+
+    def hedge_delay(self, source: str) -> float:
+        """启动 source 后等待多久再启动下一个数据源"""
+        p95 = self.health.latency_quantile(source, 0.95)
+        if p95 is None:
+            return self.default_delay
+        return min(self.max_delay, max(self.min_delay, p95))
+
+    def fetch(self, calls: Sequence[Tuple[str, Callable[[], Any]]],
+              validate: Optional[Callable[[Any], bool]] = None,
+              timeout: Optional[float] = None) -> HedgedResult:
+        """
+        Args:
+            calls: (数据源名称, 无参调用) 列表，顺序即配置的优先级
+            validate: 返回值的有效性检查，返回False视为该数据源失败
+            timeout: 覆盖整体超时
+
+        Returns:
+            HedgedResult: 第一个有效结果；全部失败或超时时 ok 为 False。
+            已在运行的落后请求无法强制中止，其结果被丢弃
+        """
+        functions = dict(calls)
+        order = self.health.order(list(functions)) if self.auto_reorder else list(functions)
+        timeout = self.timeout if timeout is None else timeout
+        result = HedgedResult()
+        if not order:
+            return result
+
+        def run(fn):
+            started = time.monotonic()
+            try:
+                value = fn()
+                if validate is not None and not validate(value):
+                    raise DataSourceError("返回数据无效")
+                return value, None, time.monotonic() - started
+            except Exception as e:
+                return None, e, time.monotonic() - started
+
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        running: Dict[Any, Tuple[str, float]] = {}
+        state = {"next": 0, "hedge_at": None}
+        executor = ThreadPoolExecutor(max_workers=len(order), thread_name_prefix="hedge")
+
+        def launch():
+            name = order[state["next"]]
+            state["next"] += 1
+            running[executor.submit(run, functions[name])] = (name, time.monotonic())
+            has_next = state["next"] < len(order)
+            state["hedge_at"] = time.monotonic() + self.hedge_delay(name) if self.hedging and has_next else None
+
+        try:
+            launch()
+            while running:
+                wake_times = [t for t in (state["hedge_at"], deadline) if t is not None]
+                wait_timeout = max(0.0, min(wake_times) - time.monotonic()) if wake_times else None
+                done, _ = wait(list(running), timeout=wait_timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    name, _ = running.pop(future)
+                    value, error, elapsed = future.result()
+                    attempt = FetchResult(name, name, value=value, error=error, elapsed=elapsed)
+                    result.attempts.append(attempt)
+                    self.health.record(name, elapsed, error is None)
+                    if error is None and result.source is None:
+                        result.value, result.source = value, name
+                    elif error is not None:
+                        logger.warning(f"⚠️ [数据源对冲] {name}失败({elapsed:.2f}s): {error}")
+                        if state["next"] < len(order) and result.source is None:
+                            launch()
+                if result.source is not None:
+                    break
+
+                now = time.monotonic()
+                if state["hedge_at"] is not None and now >= state["hedge_at"] and state["next"] < len(order):
+                    slow = [name for name, _ in running.values()]
+                    logger.info(f"⏱️ [数据源对冲] {slow}未在对冲延迟内返回，并行启动{order[state['next']]}")
+                    launch()
+                if deadline is not None and now >= deadline:
+                    for name, started in running.values():
+                        result.attempts.append(FetchResult(name, name, timed_out=True, elapsed=now - started))
+                        self.health.record(name, now - started, False)
+                        logger.warning(f"⏱️ [数据源对冲] {name}超时")
+                    running.clear()
+        finally:
+            # 仍在运行的落后请求被放弃，记为一次失败：一直挂起的数据源失败率上升、被排到后面，
+            # 也不会以"成功"样本拉低p95而让对冲延迟偏小
+            now = time.monotonic()
+            for name, started in running.values():
+                self.health.record(name, now - started, False)
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        result.elapsed = time.monotonic() - start
+        if result.ok:
+            logger.debug(f"✅ [数据源对冲] 采用{result.source}的结果，耗时{result.elapsed:.2f}s")
+        return result
+
+
+# 全局健康统计
+_source_health = SourceHealth(window=int(os.getenv("DATA_SOURCE_HEALTH_WINDOW", "50")))
+
+
+def get_source_health() -> SourceHealth:
+    """全局数据源健康统计"""
+    return _source_health
+
+
+def create_hedged_fetcher() -> HedgedFetcher:
+    """按环境变量创建使用全局健康统计的对冲获取器"""
+    timeout = os.getenv("DATA_SOURCE_TIMEOUT")
+    return HedgedFetcher(
+        health=_source_health,
+        hedging=os.getenv("DATA_SOURCE_HEDGING_ENABLED", "true").lower() == "true",
+        default_delay=float(os.getenv("DATA_SOURCE_HEDGE_DELAY", "3.0")),
+        max_delay=float(os.getenv("DATA_SOURCE_HEDGE_MAX_DELAY", "10.0")),
+        timeout=float(timeout) if timeout else None,
+        auto_reorder=os.getenv("DATA_SOURCE_AUTO_REORDER", "true").lower() == "true",
+    )
@@ -14,6 +14,8 @@ import os
 from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('agents')
 
+from .rate_limiter import wait_for_rate_limit
+
 
 
 class HKStockProvider:
@@ -21,8 +23,6 @@ class HKStockProvider:
 
     def __init__(self):
         """初始化港股数据提供器"""
-        self.last_request_time = 0
-        self.min_request_interval = 2.0  # 增加请求间隔到2秒
         self.timeout = 60  # 请求超时时间（增加到60秒）
         self.max_retries = 3  # 增加重试次数
         self.rate_limit_wait = 60  # 遇到限制时等待时间
@@ -30,15 +30,8 @@ class HKStockProvider:
         logger.info(f"🇭🇰 港股数据提供器初始化完成")
     
     def _wait_for_rate_limit(self):
-        """等待速率限制"""
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
-        
-        if time_since_last_request < self.min_request_interval:
-            sleep_time = self.min_request_interval - time_since_last_request
-            time.sleep(sleep_time)
-        
-        self.last_request_time = time.time()
+        """等待速率限制（所有实例共享港股Yahoo Finance配额）"""
+        wait_for_rate_limit("yfinance:hk")
     
     def get_stock_data(self, symbol: str, start_date: str = None, end_date: str = None) -> Optional[pd.DataFrame]:
         """
@@ -14,6 +14,8 @@ from datetime import datetime, timedelta
 from tradingagents.utils.logging_init import get_logger
 logger = get_logger("default")
 
+from .rate_limiter import wait_for_rate_limit
+
 
 class ImprovedHKStockProvider:
     """改进的港股数据提供器"""
@@ -21,8 +23,6 @@ class ImprovedHKStockProvider:
     def __init__(self):
         self.cache_file = "hk_stock_cache.json"
         self.cache_ttl = 3600 * 24  # 24小时缓存
-        self.rate_limit_wait = 5  # 速率限制等待时间
-        self.last_request_time = 0
         
         # 内置港股名称映射（避免API调用）
         self.hk_stock_names = {
@@ -169,14 +169,8 @@ class ImprovedHKStockProvider:
             
             # 方案2：优先尝试AKShare API获取（有速率限制保护）
             try:
-                # 速率限制保护
-                current_time = time.time()
-                if current_time - self.last_request_time < self.rate_limit_wait:
-                    wait_time = self.rate_limit_wait - (current_time - self.last_request_time)
-                    logger.debug(f"📊 [港股API] 速率限制保护，等待 {wait_time:.1f} 秒")
-                    time.sleep(wait_time)
-
-                self.last_request_time = time.time()
+                # 速率限制保护（所有实例共享配额）
+                wait_for_rate_limit("akshare:hk_info")
 
                 # 优先尝试AKShare获取
                 try:
@@ -1,9 +1,9 @@
-from typing import Annotated, Dict, Optional, List, Any
+from typing import Annotated, Dict, Optional, List, Any, Union
 import time
 import os
-from .reddit_utils import fetch_top_from_category
+from .reddit_utils import fetch_top_from_category_range
 from .chinese_finance_utils import get_chinese_social_sentiment
-from .googlenews_utils import get_google_finance_news, search_news_by_stock
+from .googlenews_utils import getNewsData
 from .finnhub_utils import get_data_in_range
 
 # 导入统一日志系统
@@ -41,19 +41,19 @@ except ImportError as e:
     get_yahoo_stock_info = None
 
 try:
-    from .stockstats_utils import calculate_technical_indicators
+    from .stockstats_utils import StockstatsUtils, NOT_TRADING_DAY
     STOCKSTATS_AVAILABLE = True
 except ImportError as e:
     logger.warning(f"⚠️ stockstats工具不可用: {e}")
     STOCKSTATS_AVAILABLE = False
-    calculate_technical_indicators = None
+    StockstatsUtils = None
+    NOT_TRADING_DAY = "N/A: Not a trading day (weekend or holiday)"
 from dateutil.relativedelta import relativedelta
 from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import json
 import os
 import pandas as pd
-from tqdm import tqdm
 from openai import OpenAI
 
 # 尝试导入yfinance，如果失败则设置为None
@@ -65,6 +65,9 @@ except ImportError as e:
     yf = None
     YF_AVAILABLE = False
 from .config import get_config, set_config, DATA_DIR
+from .price_frame_store import get_price_frame_store
+from .simfin_store import get_simfin_store
+from .concurrent_fetch import FetchTask, fetch_concurrently
 
 
 def get_finnhub_news(
@@ -207,35 +210,14 @@ def get_simfin_balance_sheet(
     ],
     curr_date: Annotated[str, "current date you are trading at, yyyy-mm-dd"],
 ):
-    data_path = os.path.join(
-        DATA_DIR,
-        "fundamental_data",
-        "simfin_data_all",
-        "balance_sheet",
-        "companies",
-        "us",
-        f"us-balance-{freq}.csv",
-    )
-    df = pd.read_csv(data_path, sep=";")
-
-    # Convert date strings to datetime objects and remove any time components
-    df["Report Date"] = pd.to_datetime(df["Report Date"], utc=True).dt.normalize()
-    df["Publish Date"] = pd.to_datetime(df["Publish Date"], utc=True).dt.normalize()
-
-    # Convert the current date to datetime and normalize
-    curr_date_dt = pd.to_datetime(curr_date, utc=True).normalize()
-
-    # Filter the DataFrame for the given ticker and for reports that were published on or before the current date
-    filtered_df = df[(df["Ticker"] == ticker) & (df["Publish Date"] <= curr_date_dt)]
+    # 按股票分区、发布日期排序的存储中二分查找截止当前日期的最近一期报表
+    latest_balance_sheet = get_simfin_store(DATA_DIR).get_latest(ticker, "balance_sheet", freq, curr_date)
 
     # Check if there are any available reports; if not, return a notification
-    if filtered_df.empty:
+    if latest_balance_sheet is None:
         logger.info(f"No balance sheet available before the given current date.")
         return ""
 
-    # Get the most recent balance sheet by selecting the row with the latest Publish Date
-    latest_balance_sheet = filtered_df.loc[filtered_df["Publish Date"].idxmax()]
-
     # drop the SimFinID column
     latest_balance_sheet = latest_balance_sheet.drop("SimFinId")
 
@@ -254,35 +236,14 @@ def get_simfin_cashflow(
     ],
     curr_date: Annotated[str, "current date you are trading at, yyyy-mm-dd"],
 ):
-    data_path = os.path.join(
-        DATA_DIR,
-        "fundamental_data",
-        "simfin_data_all",
-        "cash_flow",
-        "companies",
-        "us",
-        f"us-cashflow-{freq}.csv",
-    )
-    df = pd.read_csv(data_path, sep=";")
-
-    # Convert date strings to datetime objects and remove any time components
-    df["Report Date"] = pd.to_datetime(df["Report Date"], utc=True).dt.normalize()
-    df["Publish Date"] = pd.to_datetime(df["Publish Date"], utc=True).dt.normalize()
-
-    # Convert the current date to datetime and normalize
-    curr_date_dt = pd.to_datetime(curr_date, utc=True).normalize()
-
-    # Filter the DataFrame for the given ticker and for reports that were published on or before the current date
-    filtered_df = df[(df["Ticker"] == ticker) & (df["Publish Date"] <= curr_date_dt)]
+    # 按股票分区、发布日期排序的存储中二分查找截止当前日期的最近一期报表
+    latest_cash_flow = get_simfin_store(DATA_DIR).get_latest(ticker, "cash_flow", freq, curr_date)
 
     # Check if there are any available reports; if not, return a notification
-    if filtered_df.empty:
+    if latest_cash_flow is None:
         logger.info(f"No cash flow statement available before the given current date.")
         return ""
 
-    # Get the most recent cash flow statement by selecting the row with the latest Publish Date
-    latest_cash_flow = filtered_df.loc[filtered_df["Publish Date"].idxmax()]
-
     # drop the SimFinID column
     latest_cash_flow = latest_cash_flow.drop("SimFinId")
 
@@ -301,35 +262,14 @@ def get_simfin_income_statements(
     ],
     curr_date: Annotated[str, "current date you are trading at, yyyy-mm-dd"],
 ):
-    data_path = os.path.join(
-        DATA_DIR,
-        "fundamental_data",
-        "simfin_data_all",
-        "income_statements",
-        "companies",
-        "us",
-        f"us-income-{freq}.csv",
-    )
-    df = pd.read_csv(data_path, sep=";")
-
-    # Convert date strings to datetime objects and remove any time components
-    df["Report Date"] = pd.to_datetime(df["Report Date"], utc=True).dt.normalize()
-    df["Publish Date"] = pd.to_datetime(df["Publish Date"], utc=True).dt.normalize()
-
-    # Convert the current date to datetime and normalize
-    curr_date_dt = pd.to_datetime(curr_date, utc=True).normalize()
-
-    # Filter the DataFrame for the given ticker and for reports that were published on or before the current date
-    filtered_df = df[(df["Ticker"] == ticker) & (df["Publish Date"] <= curr_date_dt)]
+    # 按股票分区、发布日期排序的存储中二分查找截止当前日期的最近一期报表
+    latest_income = get_simfin_store(DATA_DIR).get_latest(ticker, "income_statements", freq, curr_date)
 
     # Check if there are any available reports; if not, return a notification
-    if filtered_df.empty:
+    if latest_income is None:
         logger.info(f"No income statement available before the given current date.")
         return ""
 
-    # Get the most recent income statement by selecting the row with the latest Publish Date
-    latest_income = filtered_df.loc[filtered_df["Publish Date"].idxmax()]
-
     # drop the SimFinID column
     latest_income = latest_income.drop("SimFinId")
 
@@ -413,21 +353,17 @@ def get_reddit_global_news(
     curr_date = datetime.strptime(before, "%Y-%m-%d")
 
     total_iterations = (start_date - curr_date).days + 1
-    pbar = tqdm(desc=f"Getting Global News on {start_date}", total=total_iterations)
-
-    while curr_date <= start_date:
-        curr_date_str = curr_date.strftime("%Y-%m-%d")
-        fetch_result = fetch_top_from_category(
-            "global_news",
-            curr_date_str,
-            max_limit_per_day,
-            data_path=os.path.join(DATA_DIR, "reddit_data"),
-        )
-        posts.extend(fetch_result)
-        curr_date += relativedelta(days=1)
-        pbar.update(1)
-
-    pbar.close()
+    dates = [(curr_date + relativedelta(days=i)).strftime("%Y-%m-%d") for i in range(total_iterations)]
+
+    # 整个窗口只读取一次语料
+    posts_by_date = fetch_top_from_category_range(
+        "global_news",
+        dates,
+        max_limit_per_day,
+        data_path=os.path.join(DATA_DIR, "reddit_data"),
+    )
+    for curr_date_str in dates:
+        posts.extend(posts_by_date[curr_date_str])
 
     if len(posts) == 0:
         return ""
@@ -439,7 +375,7 @@ def get_reddit_global_news(
         else:
             news_str += f"### {post['title']}\n\n{post['content']}\n\n"
 
-    return f"## Global News Reddit, from {before} to {curr_date}:\n{news_str}"
+    return f"## Global News Reddit, from {before} to {start_date.strftime('%Y-%m-%d')}:\n{news_str}"
 
 
 def get_reddit_company_news(
@@ -467,26 +403,18 @@ def get_reddit_company_news(
     curr_date = datetime.strptime(before, "%Y-%m-%d")
 
     total_iterations = (start_date - curr_date).days + 1
-    pbar = tqdm(
-        desc=f"Getting Company News for {ticker} on {start_date}",
-        total=total_iterations,
+    dates = [(curr_date + relativedelta(days=i)).strftime("%Y-%m-%d") for i in range(total_iterations)]
+
+    # 整个窗口只读取一次语料
+    posts_by_date = fetch_top_from_category_range(
+        "company_news",
+        dates,
+        max_limit_per_day,
+        ticker,
+        data_path=os.path.join(DATA_DIR, "reddit_data"),
     )
-
-    while curr_date <= start_date:
-        curr_date_str = curr_date.strftime("%Y-%m-%d")
-        fetch_result = fetch_top_from_category(
-            "company_news",
-            curr_date_str,
-            max_limit_per_day,
-            ticker,
-            data_path=os.path.join(DATA_DIR, "reddit_data"),
-        )
-        posts.extend(fetch_result)
-        curr_date += relativedelta(days=1)
-
-        pbar.update(1)
-
-    pbar.close()
+    for curr_date_str in dates:
+        posts.extend(posts_by_date[curr_date_str])
 
     if len(posts) == 0:
         return ""
@@ -498,12 +426,15 @@ def get_reddit_company_news(
         else:
             news_str += f"### {post['title']}\n\n{post['content']}\n\n"
 
-    return f"##{ticker} News Reddit, from {before} to {curr_date}:\n\n{news_str}"
+    return f"##{ticker} News Reddit, from {before} to {start_date.strftime('%Y-%m-%d')}:\n\n{news_str}"
 
 
 def get_stock_stats_indicators_window(
     symbol: Annotated[str, "ticker symbol of the company"],
-    indicator: Annotated[str, "technical indicator to get the analysis and report of"],
+    indicator: Annotated[
+        Union[str, List[str]],
+        "technical indicator(s) to get the analysis and report of, a list or comma-separated string",
+    ],
     curr_date: Annotated[
         str, "The current trading date you are trading on, YYYY-mm-dd"
     ],
@@ -584,57 +515,70 @@ def get_stock_stats_indicators_window(
         ),
     }
 
-    if indicator not in best_ind_params:
-        raise ValueError(
-            f"Indicator {indicator} is not supported. Please choose from: {list(best_ind_params.keys())}"
-        )
+    # 支持一次请求多个指标：列表或逗号分隔的字符串
+    if isinstance(indicator, str):
+        indicators = [ind.strip() for ind in indicator.split(",") if ind.strip()]
+    else:
+        indicators = list(indicator)
+
+    for ind in indicators:
+        if ind not in best_ind_params:
+            raise ValueError(
+                f"Indicator {ind} is not supported. Please choose from: {list(best_ind_params.keys())}"
+            )
 
     end_date = curr_date
     curr_date = datetime.strptime(curr_date, "%Y-%m-%d")
     before = curr_date - relativedelta(days=look_back_days)
 
-    if not online:
-        # read from YFin data
-        data = pd.read_csv(
-            os.path.join(
-                DATA_DIR,
-                f"market_data/price_data/{symbol}-YFin-data-2015-01-01-2025-03-25.csv",
-            )
+    # 价格数据只加载一次，所有指标在同一个窗口上计算
+    try:
+        window = StockstatsUtils.get_stock_stats_window(
+            symbol,
+            indicators,
+            before.strftime("%Y-%m-%d"),
+            end_date,
+            os.path.join(DATA_DIR, "market_data", "price_data"),
+            online=online,
         )
-        data["Date"] = pd.to_datetime(data["Date"], utc=True)
-        dates_in_df = data["Date"].astype(str).str[:10]
-
-        ind_string = ""
-        while curr_date >= before:
-            # only do the trading dates
-            if curr_date.strftime("%Y-%m-%d") in dates_in_df.values:
-                indicator_value = get_stockstats_indicator(
-                    symbol, indicator, curr_date.strftime("%Y-%m-%d"), online
-                )
-
-                ind_string += f"{curr_date.strftime('%Y-%m-%d')}: {indicator_value}\n"
+    except Exception as e:
+        if not online:
+            raise
+        logger.error(f"Error getting stockstats indicator data for {indicators} of {symbol}: {e}")
+        window = None
 
-            curr_date = curr_date - relativedelta(days=1)
-    else:
-        # online gathering
+    sections = []
+    for ind in indicators:
         ind_string = ""
-        while curr_date >= before:
-            indicator_value = get_stockstats_indicator(
-                symbol, indicator, curr_date.strftime("%Y-%m-%d"), online
-            )
+        if not online:
+            # only do the trading dates, newest first
+            values = window[ind]
+            for date_str, indicator_value in zip(values.index[::-1], values.values[::-1]):
+                ind_string += f"{date_str}: {indicator_value}\n"
+        else:
+            # online gathering reports every calendar day
+            day = curr_date
+            while day >= before:
+                date_str = day.strftime("%Y-%m-%d")
+                if window is None:
+                    indicator_value = ""
+                elif date_str in window.index:
+                    indicator_value = window.at[date_str, ind]
+                else:
+                    indicator_value = NOT_TRADING_DAY
 
-            ind_string += f"{curr_date.strftime('%Y-%m-%d')}: {indicator_value}\n"
+                ind_string += f"{date_str}: {indicator_value}\n"
 
-            curr_date = curr_date - relativedelta(days=1)
+                day = day - relativedelta(days=1)
 
-    result_str = (
-        f"## {indicator} values from {before.strftime('%Y-%m-%d')} to {end_date}:\n\n"
-        + ind_string
-        + "\n\n"
-        + best_ind_params.get(indicator, "No description available.")
-    )
+        sections.append(
+            f"## {ind} values from {before.strftime('%Y-%m-%d')} to {end_date}:\n\n"
+            + ind_string
+            + "\n\n"
+            + best_ind_params.get(ind, "No description available.")
+        )
 
-    return result_str
+    return "\n\n".join(sections)
 
 
 def get_stockstats_indicator(
@@ -666,6 +610,13 @@ def get_stockstats_indicator(
     return str(indicator_value)
 
 
+def _yfin_offline_data_file(symbol: str) -> str:
+    return os.path.join(
+        DATA_DIR,
+        f"market_data/price_data/{symbol}-YFin-data-2015-01-01-2025-03-25.csv",
+    )
+
+
 def get_YFin_data_window(
     symbol: Annotated[str, "ticker symbol of the company"],
     curr_date: Annotated[str, "Start date in yyyy-mm-dd format"],
@@ -676,24 +627,10 @@ def get_YFin_data_window(
     before = date_obj - relativedelta(days=look_back_days)
     start_date = before.strftime("%Y-%m-%d")
 
-    # read in data
-    data = pd.read_csv(
-        os.path.join(
-            DATA_DIR,
-            f"market_data/price_data/{symbol}-YFin-data-2015-01-01-2025-03-25.csv",
-        )
-    )
-
-    # Extract just the date part for comparison
-    data["DateOnly"] = data["Date"].str[:10]
-
-    # Filter data between the start and end dates (inclusive)
-    filtered_data = data[
-        (data["DateOnly"] >= start_date) & (data["DateOnly"] <= curr_date)
-    ]
-
-    # Drop the temporary column we created
-    filtered_data = filtered_data.drop("DateOnly", axis=1)
+    # Filter data between the start and end dates (inclusive) from the shared price store
+    filtered_data = get_price_frame_store().get_range(
+        symbol, "yfin_offline", _yfin_offline_data_file(symbol), start_date, curr_date
+    ).reset_index(drop=True)
 
     # Set pandas display options to show the full DataFrame
     with pd.option_context(
@@ -757,29 +694,15 @@ def get_YFin_data(
     start_date: Annotated[str, "Start date in yyyy-mm-dd format"],
     end_date: Annotated[str, "End date in yyyy-mm-dd format"],
 ) -> str:
-    # read in data
-    data = pd.read_csv(
-        os.path.join(
-            DATA_DIR,
-            f"market_data/price_data/{symbol}-YFin-data-2015-01-01-2025-03-25.csv",
-        )
-    )
-
     if end_date > "2025-03-25":
         raise Exception(
             f"Get_YFin_Data: {end_date} is outside of the data range of 2015-01-01 to 2025-03-25"
         )
 
-    # Extract just the date part for comparison
-    data["DateOnly"] = data["Date"].str[:10]
-
-    # Filter data between the start and end dates (inclusive)
-    filtered_data = data[
-        (data["DateOnly"] >= start_date) & (data["DateOnly"] <= end_date)
-    ]
-
-    # Drop the temporary column we created
-    filtered_data = filtered_data.drop("DateOnly", axis=1)
+    # Filter data between the start and end dates (inclusive) from the shared price store
+    filtered_data = get_price_frame_store().get_range(
+        symbol, "yfin_offline", _yfin_offline_data_file(symbol), start_date, end_date
+    )
 
     # remove the index from the dataframe
     filtered_data = filtered_data.reset_index(drop=True)
@@ -890,26 +813,27 @@ def get_fundamentals_finnhub(ticker, curr_date):
         
         logger.debug(f"📊 [DEBUG] 使用Finnhub API获取 {ticker} 的基本面数据...")
         
-        # 获取基本财务数据
-        try:
-            basic_financials = finnhub_client.company_basic_financials(ticker, 'all')
-        except Exception as e:
-            logger.error(f"❌ [DEBUG] Finnhub基本财务数据获取失败: {str(e)}")
-            basic_financials = None
-        
-        # 获取公司概况
-        try:
-            company_profile = finnhub_client.company_profile2(symbol=ticker)
-        except Exception as e:
-            logger.error(f"❌ [DEBUG] Finnhub公司概况获取失败: {str(e)}")
-            company_profile = None
-        
-        # 获取收益数据
-        try:
-            earnings = finnhub_client.company_earnings(ticker, limit=4)
-        except Exception as e:
-            logger.error(f"❌ [DEBUG] Finnhub收益数据获取失败: {str(e)}")
-            earnings = None
+        # 三个接口彼此独立，并发请求；单个接口失败或超时只缺少对应部分
+        timeout = float(os.getenv("FINNHUB_FETCH_TIMEOUT", "15"))
+        results = fetch_concurrently([
+            FetchTask("basic_financials", lambda: finnhub_client.company_basic_financials(ticker, 'all'),
+                      source="finnhub", timeout=timeout),
+            FetchTask("company_profile", lambda: finnhub_client.company_profile2(symbol=ticker),
+                      source="finnhub", timeout=timeout),
+            FetchTask("earnings", lambda: finnhub_client.company_earnings(ticker, limit=4),
+                      source="finnhub", timeout=timeout),
+        ])
+        error_labels = {
+            "basic_financials": "基本财务数据",
+            "company_profile": "公司概况",
+            "earnings": "收益数据",
+        }
+        for name, result in results.items():
+            if result.error is not None:
+                logger.error(f"❌ [DEBUG] Finnhub{error_labels[name]}获取失败: {str(result.error)}")
+        basic_financials = results["basic_financials"].value
+        company_profile = results["company_profile"].value
+        earnings = results["earnings"].value
         
         # 格式化报告
         report = f"# {ticker} 基本面分析报告（Finnhub数据源）\n\n"
@@ -983,8 +907,9 @@ def get_fundamentals_finnhub(ticker, curr_date):
             report += "- Finnhub API限制\n"
             report += "- 该股票暂无基本面数据\n"
         
-        # 保存到缓存
-        if report and len(report) > 100:  # 只有当报告有实际内容时才缓存
+        # 保存到缓存（有接口超时的部分报告不缓存，下次重新获取）
+        timed_out = any(result.timed_out for result in results.values())
+        if report and len(report) > 100 and not timed_out:  # 只有当报告有实际内容时才缓存
             cache.save_fundamentals_data(ticker, report, data_source="finnhub")
         
         logger.debug(f"📊 [DEBUG] Finnhub基本面数据获取完成，报告长度: {len(report)}")
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+区间感知的日线行情存储
+按 (数据源, 股票代码) 保存原始K线，并记录已经覆盖的日期区间。请求新区间时只向数据源获取
+尚未覆盖的缺口，合并后在本地切出所需子区间；报告格式化在此之上单独完成
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+# 列式存储依赖pyarrow，不可用时退回pickle
+try:
+    import pyarrow.parquet as pa_parquet
+    PYARROW_AVAILABLE = True
+except ImportError:
+    pa_parquet = None
+    PYARROW_AVAILABLE = False
+
+Interval = Tuple[date, date]
+
+
+def _to_date(value) -> date:
+    """接受 YYYY-MM-DD / YYYYMMDD 字符串、date 或 Timestamp"""
+    return pd.Timestamp(value).date()
+
+
+def merge_intervals(intervals: List[Interval]) -> List[Interval]:
+    """合并重叠或首尾相邻（相差一天）的闭区间"""
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def missing_intervals(covered: List[Interval], start: date, end: date) -> List[Interval]:
+    """返回 [start, end] 中未被 covered（已合并、有序）覆盖的部分"""
+    gaps: List[Interval] = []
+    cursor = start
+    for covered_start, covered_end in covered:
+        if covered_end < cursor:
+            continue
+        if covered_start > end:
+            break
+        if covered_start > cursor:
+            gaps.append((cursor, covered_start - timedelta(days=1)))
+        cursor = max(cursor, covered_end + timedelta(days=1))
+        if cursor > end:
+            break
+    if cursor <= end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+class OHLCVStore:
+    """按股票保存原始K线和已覆盖日期区间的存储，缺口按需增量获取"""
+
+    def __init__(self, store_dir: Optional[str] = None, max_cached_frames: int = 128, settle_days: int = 1,
+                 max_empty_gap_days: int = 5):
+        """
+        Args:
+            store_dir: 存储目录，默认 OHLCV_STORE_DIR 环境变量或 data_cache_dir/ohlcv_store
+            max_cached_frames: 进程内缓存的股票数
+            settle_days: 距今不足该天数的日期视为未收盘，不记为已覆盖，下次请求会重新获取
+            max_empty_gap_days: 已收盘且不超过该天数的缺口返回空数据时视为休市（周末、节假日）并记为已覆盖；
+                更长的空缺口更可能是数据源失败，不记为已覆盖
+        """
+        if store_dir is None:
+            from .config import get_config
+            store_dir = os.getenv("OHLCV_STORE_DIR", os.path.join(get_config()["data_cache_dir"], "ohlcv_store"))
+        self.store_dir = store_dir
+        self.max_cached_frames = max_cached_frames
+        self.settle_days = settle_days
+        self.max_empty_gap_days = max_empty_gap_days
+        self.extension = ".parquet" if PYARROW_AVAILABLE else ".pkl"
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[pd.DataFrame, List[Interval]]]" = OrderedDict()
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "local_hits": 0, "gap_fetches": 0}
+
+    def _path(self, source: str, symbol: str, extension: str) -> str:
+        name = symbol.replace("/", "_").replace("\\", "_")
+        return os.path.join(self.store_dir, source, name + extension)
+
+    def _symbol_lock(self, key: Tuple[str, str]) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _load(self, source: str, symbol: str) -> Tuple[pd.DataFrame, List[Interval]]:
+        """读取进程内缓存或磁盘上的K线和覆盖区间"""
+        key = (source, symbol)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        frame, covered = pd.DataFrame(), []
+        try:
+            with open(self._path(source, symbol, ".json"), "r", encoding="utf-8") as f:
+                covered = [(_to_date(s), _to_date(e)) for s, e in json.load(f)["covered"]]
+            frame_path = self._path(source, symbol, self.extension)
+            frame = pd.read_parquet(frame_path, engine="pyarrow") if PYARROW_AVAILABLE else pd.read_pickle(frame_path)
+        except (OSError, ValueError, KeyError) as e:
+            if covered:
+                logger.warning(f"⚠️ 行情存储文件损坏，重新获取: {source}/{symbol}: {e}")
+            frame, covered = pd.DataFrame(), []
+
+        self._remember(key, frame, covered)
+        return frame, covered
+
+    def _remember(self, key: Tuple[str, str], frame: pd.DataFrame, covered: List[Interval]):
+        with self._lock:
+            self._entries[key] = (frame, covered)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_cached_frames:
+                self._entries.popitem(last=False)
+
+    def _save(self, source: str, symbol: str, frame: pd.DataFrame, covered: List[Interval]):
+        os.makedirs(os.path.join(self.store_dir, source), exist_ok=True)
+        frame_path = self._path(source, symbol, self.extension)
+        tmp_path = frame_path + ".tmp"
+        if PYARROW_AVAILABLE:
+            frame.to_parquet(tmp_path, engine="pyarrow", index=True)
+        else:
+            frame.to_pickle(tmp_path)
+        os.replace(tmp_path, frame_path)
+
+        # 覆盖区间最后写入：中途失败时旧区间仍与旧K线对应
+        manifest_path = self._path(source, symbol, ".json")
+        with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"covered": [[s.isoformat(), e.isoformat()] for s, e in covered]}, f)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+    def _commit(self, source: str, symbol: str, frame: pd.DataFrame, covered: List[Interval]):
+        self._remember((source, symbol), frame, covered)
+        try:
+            self._save(source, symbol, frame, covered)
+        except Exception as e:
+            logger.warning(f"⚠️ [行情存储] 写入失败 {source}/{symbol}: {e}")
+
+    @staticmethod
+    def _bar_dates(frame: pd.DataFrame, date_column: Optional[str]) -> pd.Series:
+        """每根K线的日期（去掉时区和时间部分），date_column为None时取索引"""
+        values = frame.index if date_column is None else frame[date_column]
+        dates = pd.to_datetime(pd.Series(values, index=frame.index).astype(str).str[:10])
+        return dates.dt.normalize()
+
+    def get_bars(self, source: str, symbol: str, start_date: str, end_date: str,
+                 fetch: Callable[[str, str], Optional[pd.DataFrame]],
+                 date_column: Optional[str] = "date", settle_days: Optional[int] = None,
+                 rescales: Optional[Callable[[pd.DataFrame], bool]] = None) -> pd.DataFrame:
+        """
+        获取 [start_date, end_date] 的K线，只对未覆盖的缺口调用数据源
+
+        Args:
+            source: 数据源名称，不同数据源（复权方式、列名不同）分开存储
+            symbol: 股票代码
+            start_date: 开始日期（含）
+            end_date: 结束日期（含）
+            fetch: fetch(缺口开始, 缺口结束) -> 原始K线DataFrame，日期为 YYYY-MM-DD
+            date_column: K线日期列，None 表示日期在索引上
+            settle_days: 覆盖该股票时使用的未收盘天数，默认取存储的设置
+            rescales: rescales(新获取的K线) 为真时（如缺口内发生拆股，数据源会改写此前所有K线的价格尺度），
+                丢弃已存储的K线和覆盖区间，重新获取整个请求区间
+
+        Returns:
+            pd.DataFrame: 按日期升序的原始K线（保留数据源返回的列），无数据时为空DataFrame
+        """
+        start, end = _to_date(start_date), _to_date(end_date)
+        if end < start:
+            return pd.DataFrame()
+        settle_days = self.settle_days if settle_days is None else settle_days
+        settled_until = date.today() - timedelta(days=settle_days)
+
+        key = (source, symbol)
+        with self._symbol_lock(key):
+            frame, covered = self._load(source, symbol)
+            gaps = missing_intervals(covered, start, end)
+            with self._lock:
+                self._stats["requests"] += 1
+                if not gaps:
+                    self._stats["local_hits"] += 1
+
+            fetched = []
+            new_covered = list(covered)
+            for gap_start, gap_end in gaps:
+                logger.info(f"🌐 [行情存储] 获取缺口 {source}/{symbol}: {gap_start} 至 {gap_end}")
+                with self._lock:
+                    self._stats["gap_fetches"] += 1
+                data = fetch(gap_start.isoformat(), gap_end.isoformat())
+                if data is None or data.empty:
+                    # 空结果可能是休市也可能是数据源失败：只有已收盘的短缺口按休市记为已覆盖
+                    if gap_end <= settled_until and (gap_end - gap_start).days < self.max_empty_gap_days:
+                        new_covered.append((gap_start, gap_end))
+                    continue
+                fetched.append(data)
+                if gap_start <= settled_until:
+                    new_covered.append((gap_start, min(gap_end, settled_until)))
+
+            if rescales is not None and not frame.empty and any(rescales(data) for data in fetched):
+                logger.info(f"🔄 [行情存储] {source}/{symbol} 价格尺度变化，重新获取 {start} 至 {end}")
+                with self._lock:
+                    self._stats["gap_fetches"] += 1
+                data = fetch(start.isoformat(), end.isoformat())
+                frame, fetched, new_covered = pd.DataFrame(), [], []
+                if data is not None and not data.empty:
+                    fetched.append(data)
+                    if start <= settled_until:
+                        new_covered.append((start, min(end, settled_until)))
+                else:
+                    # 旧K线已失效，即使这次没取到数据也要清掉
+                    self._remove(source, symbol)
+
+            if fetched:
+                merged = pd.concat([frame] + fetched) if not frame.empty else pd.concat(fetched)
+                dates = self._bar_dates(merged, date_column)
+                # 同一天以最新获取的K线为准
+                keep = ~dates.duplicated(keep="last").to_numpy()
+                merged = merged[keep]
+                merged = merged.iloc[dates[keep].argsort(kind="mergesort")]
+                if date_column is not None:
+                    merged = merged.reset_index(drop=True)
+                frame, covered = merged, merge_intervals(new_covered)
+                self._commit(source, symbol, frame, covered)
+            elif gaps:
+                logger.debug(f"📭 [行情存储] 缺口无数据: {source}/{symbol}")
+                if len(new_covered) > len(covered):
+                    covered = merge_intervals(new_covered)
+                    self._commit(source, symbol, frame, covered)
+            else:
+                logger.debug(f"⚡ [行情存储] 本地命中 {source}/{symbol}: {start} 至 {end}")
+
+        if frame.empty:
+            return pd.DataFrame()
+        dates = self._bar_dates(frame, date_column)
+        in_range = ((dates >= pd.Timestamp(start)) & (dates <= pd.Timestamp(end))).to_numpy()
+        result = frame[in_range].copy()
+        return result.reset_index(drop=True) if date_column is not None else result
+
+    def get_coverage(self, source: str, symbol: str) -> List[Tuple[str, str]]:
+        """已覆盖的日期区间"""
+        _, covered = self._load(source, symbol)
+        return [(s.isoformat(), e.isoformat()) for s, e in covered]
+
+    def invalidate(self, source: str, symbol: str):
+        """删除某只股票的存储（例如发现数据错误时）"""
+        with self._symbol_lock((source, symbol)):
+            self._remove(source, symbol)
+
+    def _remove(self, source: str, symbol: str):
+        with self._lock:
+            self._entries.pop((source, symbol), None)
+        for extension in (self.extension, ".json"):
+            try:
+                os.remove(self._path(source, symbol, extension))
+            except OSError:
+                pass
+
+    def get_stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {**self._stats, "cached_symbols": len(self._entries), "store_dir": self.store_dir}
+
+
+# 全局实例
+_ohlcv_store: Optional[OHLCVStore] = None
+_ohlcv_store_lock = threading.Lock()
+
+
+def get_ohlcv_store() -> OHLCVStore:
+    """获取全局行情存储实例"""
+    global _ohlcv_store
+    if _ohlcv_store is None:
+        with _ohlcv_store_lock:
+            if _ohlcv_store is None:
+                _ohlcv_store = OHLCVStore(settle_days=int(os.getenv("OHLCV_STORE_SETTLE_DAYS", "1")))
+    return _ohlcv_store
@@ -5,12 +5,13 @@
 """
 
 import os
-import time
 import random
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 from .cache_manager import get_cache
 from .config import get_config
+from .single_flight import get_single_flight, make_flight_key, SingleFlightTimeout
+from .rate_limiter import wait_for_rate_limit
 
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
@@ -23,21 +24,12 @@ class OptimizedChinaDataProvider:
     def __init__(self):
         self.cache = get_cache()
         self.config = get_config()
-        self.last_api_call = 0
-        self.min_api_interval = 0.5  # Tushare数据接口调用间隔较短
         
         logger.info(f"📊 优化A股数据提供器初始化完成")
     
     def _wait_for_rate_limit(self):
-        """等待API限制"""
-        current_time = time.time()
-        time_since_last_call = current_time - self.last_api_call
-        
-        if time_since_last_call < self.min_api_interval:
-            wait_time = self.min_api_interval - time_since_last_call
-            time.sleep(wait_time)
-        
-        self.last_api_call = time.time()
+        """等待API限制（所有实例共享Tushare配额）"""
+        wait_for_rate_limit("tushare")
     
     def get_stock_data(self, symbol: str, start_date: str, end_date: str, 
                       force_refresh: bool = False) -> str:
@@ -57,20 +49,41 @@ class OptimizedChinaDataProvider:
         
         # 检查缓存（除非强制刷新）
         if not force_refresh:
-            cache_key = self.cache.find_cached_stock_data(
-                symbol=symbol,
-                start_date=start_date,
-                end_date=end_date,
-                data_source="unified"
+            cached_data = self._load_cached_stock_data(symbol, start_date, end_date)
+            if cached_data:
+                return cached_data
+
+        # 缓存未命中，同一请求的并发调用只访问一次数据源
+        try:
+            return get_single_flight().do(
+                make_flight_key("china", "stock_data", symbol, start_date, end_date),
+                self._fetch_stock_data, symbol, start_date, end_date,
+                recheck=None if force_refresh else (
+                    lambda: self._load_cached_stock_data(symbol, start_date, end_date))
             )
-            
-            if cache_key:
-                cached_data = self.cache.load_stock_data(cache_key)
-                if cached_data:
-                    logger.info(f"⚡ 从缓存加载A股数据: {symbol}")
-                    return cached_data
-        
-        # 缓存未命中，从Tushare数据接口获取
+        except SingleFlightTimeout as e:
+            logger.error(f"❌ {e}")
+            return self._try_get_old_cache(symbol, start_date, end_date) or \
+                self._generate_fallback_data(symbol, start_date, end_date, str(e))
+
+    def _load_cached_stock_data(self, symbol: str, start_date: str, end_date: str) -> Optional[str]:
+        """从缓存加载A股数据，未命中返回None"""
+        cache_key = self.cache.find_cached_stock_data(
+            symbol=symbol,
+            start_date=start_date,
+            end_date=end_date,
+            data_source="unified"
+        )
+
+        if cache_key:
+            cached_data = self.cache.load_stock_data(cache_key)
+            if cached_data:
+                logger.info(f"⚡ 从缓存加载A股数据: {symbol}")
+                return cached_data
+        return None
+
+    def _fetch_stock_data(self, symbol: str, start_date: str, end_date: str) -> str:
+        """从数据源获取A股数据并写入缓存"""
         logger.info(f"🌐 从Tushare数据接口获取数据: {symbol}")
         
         try:
@@ -139,22 +152,13 @@ class OptimizedChinaDataProvider:
         # 检查缓存（除非强制刷新）
         if not force_refresh:
             # 查找基本面数据缓存
-            for metadata_file in self.cache.metadata_dir.glob(f"*_meta.json"):
+            for cache_key in self.cache.find_cache_keys(symbol, 'fundamentals', 'china'):
                 try:
-                    import json
-                    with open(metadata_file, 'r', encoding='utf-8') as f:
-                        metadata = json.load(f)
-                    
-                    if (metadata.get('symbol') == symbol and 
-                        metadata.get('data_type') == 'fundamentals' and
-                        metadata.get('market_type') == 'china'):
-                        
-                        cache_key = metadata_file.stem.replace('_meta', '')
-                        if self.cache.is_cache_valid(cache_key, symbol=symbol, data_type='fundamentals'):
-                            cached_data = self.cache.load_stock_data(cache_key)
-                            if cached_data:
-                                logger.info(f"⚡ 从缓存加载A股基本面数据: {symbol}")
-                                return cached_data
+                    if self.cache.is_cache_valid(cache_key, symbol=symbol, data_type='fundamentals'):
+                        cached_data = self.cache.load_stock_data(cache_key)
+                        if cached_data:
+                            logger.info(f"⚡ 从缓存加载A股基本面数据: {symbol}")
+                            return cached_data
                 except Exception:
                     continue
         
@@ -1064,21 +1068,11 @@ class OptimizedChinaDataProvider:
         """尝试获取过期的缓存数据作为备用"""
         try:
             # 查找任何相关的缓存，不考虑TTL
-            for metadata_file in self.cache.metadata_dir.glob(f"*_meta.json"):
+            for cache_key in self.cache.find_cache_keys(symbol, 'stock_data', 'china'):
                 try:
-                    import json
-
-                    with open(metadata_file, 'r', encoding='utf-8') as f:
-                        metadata = json.load(f)
-                    
-                    if (metadata.get('symbol') == symbol and 
-                        metadata.get('data_type') == 'stock_data' and
-                        metadata.get('market_type') == 'china'):
-                        
-                        cache_key = metadata_file.stem.replace('_meta', '')
-                        cached_data = self.cache.load_stock_data(cache_key)
-                        if cached_data:
-                            return cached_data + "\n\n⚠️ 注意: 使用的是过期缓存数据"
+                    cached_data = self.cache.load_stock_data(cache_key)
+                    if cached_data:
+                        return cached_data + "\n\n⚠️ 注意: 使用的是过期缓存数据"
                 except Exception:
                     continue
         except Exception:
@@ -5,42 +5,57 @@
 """
 
 import os
-import time
 import random
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
+import numpy as np
 import yfinance as yf
 import pandas as pd
 from .cache_manager import get_cache
+from .ohlcv_store import get_ohlcv_store
 from .config import get_config
+from .single_flight import get_single_flight, make_flight_key, SingleFlightTimeout
+from .rate_limiter import wait_for_rate_limit
 
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('agents')
 
 
+def adjust_for_dividends(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    按区间内的分红对未复权K线做后向复权（以区间最后一天为基准），口径与Yahoo的 auto_adjust 相同：
+    除息日之前的价格乘以 1 - 分红 / 除息日前一日收盘价。返回的列与 auto_adjust=True 一致（不含Adj Close）
+    """
+    if data.empty or "Dividends" not in data.columns:
+        return data.drop(columns=["Adj Close"], errors="ignore")
+
+    data = data.drop(columns=["Adj Close"], errors="ignore").copy()
+    dividends = data["Dividends"].fillna(0).to_numpy()
+    prev_close = data["Close"].shift(1).to_numpy()
+    step = np.ones(len(data))
+    has_dividend = (dividends > 0) & (prev_close > 0)
+    step[has_dividend] = 1 - dividends[has_dividend] / prev_close[has_dividend]
+    # 第i行的因子 = 之后所有除息日的乘积
+    factor = np.append(np.cumprod(step[::-1])[::-1][1:], 1.0)
+    for column in ("Open", "High", "Low", "Close"):
+        if column in data.columns:
+            data[column] = data[column] * factor
+    return data
+
+
 class OptimizedUSDataProvider:
     """优化的美股数据提供器 - 集成缓存和API限制处理"""
     
     def __init__(self):
         self.cache = get_cache()
         self.config = get_config()
-        self.last_api_call = 0
-        self.min_api_interval = 1.0  # 最小API调用间隔（秒）
         
         logger.info(f"📊 优化美股数据提供器初始化完成")
     
-    def _wait_for_rate_limit(self):
-        """等待API限制"""
-        current_time = time.time()
-        time_since_last_call = current_time - self.last_api_call
-        
-        if time_since_last_call < self.min_api_interval:
-            wait_time = self.min_api_interval - time_since_last_call
-            logger.info(f"⏳ API限制等待 {wait_time:.1f}s...")
-            time.sleep(wait_time)
-        
-        self.last_api_call = time.time()
+    def _wait_for_rate_limit(self, api: str = "yfinance"):
+        """等待API限制（所有实例共享同一数据源的配额）"""
+        wait_for_rate_limit(api)
     
     def get_stock_data(self, symbol: str, start_date: str, end_date: str, 
                       force_refresh: bool = False) -> str:
@@ -60,37 +75,59 @@ class OptimizedUSDataProvider:
         
         # 检查缓存（除非强制刷新）
         if not force_refresh:
-            # 优先查找FINNHUB缓存
+            cached_data = self._load_cached_stock_data(symbol, start_date, end_date)
+            if cached_data:
+                return cached_data
+
+        # 缓存未命中，同一请求的并发调用只访问一次数据源
+        try:
+            return get_single_flight().do(
+                make_flight_key("us", "stock_data", symbol, start_date, end_date),
+                self._fetch_stock_data, symbol, start_date, end_date,
+                recheck=None if force_refresh else (
+                    lambda: self._load_cached_stock_data(symbol, start_date, end_date))
+            )
+        except SingleFlightTimeout as e:
+            logger.error(f"❌ {e}")
+            return self._try_get_old_cache(symbol, start_date, end_date) or \
+                self._generate_fallback_data(symbol, start_date, end_date, str(e))
+
+    def _load_cached_stock_data(self, symbol: str, start_date: str, end_date: str) -> Optional[str]:
+        """从缓存加载美股数据，未命中返回None"""
+        # 优先查找FINNHUB缓存
+        cache_key = self.cache.find_cached_stock_data(
+            symbol=symbol,
+            start_date=start_date,
+            end_date=end_date,
+            data_source="finnhub"
+        )
+
+        # 如果没有FINNHUB缓存，查找Yahoo Finance缓存
+        if not cache_key:
             cache_key = self.cache.find_cached_stock_data(
                 symbol=symbol,
                 start_date=start_date,
                 end_date=end_date,
-                data_source="finnhub"
+                data_source="yfinance"
             )
 
-            # 如果没有FINNHUB缓存，查找Yahoo Finance缓存
-            if not cache_key:
-                cache_key = self.cache.find_cached_stock_data(
-                    symbol=symbol,
-                    start_date=start_date,
-                    end_date=end_date,
-                    data_source="yfinance"
-                )
-
-            if cache_key:
-                cached_data = self.cache.load_stock_data(cache_key)
-                if cached_data:
-                    logger.info(f"⚡ 从缓存加载美股数据: {symbol}")
-                    return cached_data
-        
-        # 缓存未命中，从API获取 - 优先使用FINNHUB
+        if cache_key:
+            cached_data = self.cache.load_stock_data(cache_key)
+            if cached_data:
+                logger.info(f"⚡ 从缓存加载美股数据: {symbol}")
+                return cached_data
+        return None
+
+    def _fetch_stock_data(self, symbol: str, start_date: str, end_date: str) -> str:
+        """从API获取美股数据并写入缓存"""
+        # 优先使用FINNHUB
         formatted_data = None
         data_source = None
 
         # 尝试FINNHUB API（优先）
         try:
             logger.info(f"🌐 从FINNHUB API获取数据: {symbol}")
-            self._wait_for_rate_limit()
+            self._wait_for_rate_limit("finnhub")
 
             formatted_data = self._get_data_from_finnhub(symbol, start_date, end_date)
             if formatted_data and "❌" not in formatted_data:
@@ -130,9 +167,7 @@ class OptimizedUSDataProvider:
                         # 备用方案：Yahoo Finance
                         logger.info(f"🔄 使用Yahoo Finance备用方案获取港股数据: {symbol}")
 
-                        self._wait_for_rate_limit()
-                        ticker = yf.Ticker(symbol)  # 港股代码保持原格式
-                        data = ticker.history(start=start_date, end=end_date)
+                        data = self._get_yfinance_bars(symbol, start_date, end_date, api="yfinance:hk")  # 港股代码保持原格式
 
                         if not data.empty:
                             formatted_data = self._format_stock_data(symbol, data, start_date, end_date)
@@ -143,11 +178,8 @@ class OptimizedUSDataProvider:
                 else:
                     # 美股使用Yahoo Finance
                     logger.info(f"🇺🇸 从Yahoo Finance API获取美股数据: {symbol}")
-                    self._wait_for_rate_limit()
-
                     # 获取数据
-                    ticker = yf.Ticker(symbol.upper())
-                    data = ticker.history(start=start_date, end=end_date)
+                    data = self._get_yfinance_bars(symbol.upper(), start_date, end_date)
 
                     if data.empty:
                         error_msg = f"未找到股票 '{symbol}' 在 {start_date} 到 {end_date} 期间的数据"
@@ -179,6 +211,30 @@ class OptimizedUSDataProvider:
 
         return formatted_data
     
+    def _get_yfinance_bars(self, symbol: str, start_date: str, end_date: str,
+                           api: str = "yfinance") -> pd.DataFrame:
+        """
+        经区间存储获取Yahoo Finance日线，只请求本地未覆盖的日期缺口。
+        end_date不含在内，与 Ticker.history 的语义一致
+
+        存储的是未做分红复权的K线（auto_adjust=False）及分红、拆股列：Yahoo的自动复权价会随之后的
+        每次分红整体改写，存下来就会过期，因此分红复权在读取时按请求区间计算。
+        Yahoo的Close已按拆股调整，拆股会改写此前所有K线，所以新缺口中出现拆股时整只股票重新获取
+        """
+        def fetch(gap_start: str, gap_end: str) -> pd.DataFrame:
+            self._wait_for_rate_limit(api)
+            gap_stop = (datetime.strptime(gap_end, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+            return yf.Ticker(symbol).history(start=gap_start, end=gap_stop, auto_adjust=False, actions=True)
+
+        def has_split(data: pd.DataFrame) -> bool:
+            return "Stock Splits" in data.columns and bool(data["Stock Splits"].fillna(0).ne(0).any())
+
+        last_day = (datetime.strptime(end_date, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
+        # 美股收盘时间按本地日期可能晚一天，多留一天再记为已覆盖
+        bars = get_ohlcv_store().get_bars("yfinance_unadjusted", symbol, start_date, last_day, fetch,
+                                          date_column=None, settle_days=2, rescales=has_split)
+        return adjust_for_dividends(bars)
+
     def _format_stock_data(self, symbol: str, data: pd.DataFrame, 
                           start_date: str, end_date: str) -> str:
         """格式化股票数据为字符串"""
@@ -244,20 +300,11 @@ class OptimizedUSDataProvider:
         """尝试获取过期的缓存数据作为备用"""
         try:
             # 查找任何相关的缓存，不考虑TTL
-            for metadata_file in self.cache.metadata_dir.glob(f"*_meta.json"):
+            for cache_key in self.cache.find_cache_keys(symbol, 'stock_data', 'us'):
                 try:
-                    import json
-                    with open(metadata_file, 'r', encoding='utf-8') as f:
-                        metadata = json.load(f)
-                    
-                    if (metadata.get('symbol') == symbol and 
-                        metadata.get('data_type') == 'stock_data' and
-                        metadata.get('market_type') == 'us'):
-                        
-                        cache_key = metadata_file.stem.replace('_meta', '')
-                        cached_data = self.cache.load_stock_data(cache_key)
-                        if cached_data:
-                            return cached_data + "\n\n⚠️ 注意: 使用的是过期缓存数据"
+                    cached_data = self.cache.load_stock_data(cache_key)
+                    if cached_data:
+                        return cached_data + "\n\n⚠️ 注意: 使用的是过期缓存数据"
                 except Exception:
                     continue
         except Exception:
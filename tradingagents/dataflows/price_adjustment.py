@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+复权价格计算
+根据每日涨跌幅（或昨收价）推算连续的复权收盘价，再按 复权收盘价/原始收盘价 的比例调整开盘、最高、最低价。
+全部使用NumPy累积运算，适用于Tushare、AKShare、BaoStock等数据源的K线（自动识别中英文列名）
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+ADJUST_FORWARD = "forward"    # 前复权：最新收盘价不变，向前推算
+ADJUST_BACKWARD = "backward"  # 后复权：最早收盘价不变，向后推算
+ADJUST_NONE = "none"          # 不复权
+
+_PRICE_TYPES = {
+    ADJUST_FORWARD: "forward_adjusted",
+    ADJUST_BACKWARD: "backward_adjusted",
+    ADJUST_NONE: "raw",
+}
+
+# 各数据源的列名：Tushare / BaoStock 为英文，AKShare 为中文
+_COLUMN_ALIASES = {
+    "date": ("trade_date", "date", "日期"),
+    "close": ("close", "收盘"),
+    "open": ("open", "开盘"),
+    "high": ("high", "最高"),
+    "low": ("low", "最低"),
+    "pct_chg": ("pct_chg", "pctChg", "涨跌幅"),
+    "pre_close": ("pre_close", "preclose"),
+}
+
+
+def resolve_price_columns(data: pd.DataFrame) -> Dict[str, str]:
+    """返回 标准列名 -> 数据中的实际列名，缺失的列不出现在结果中"""
+    columns = {}
+    for standard, aliases in _COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in data.columns:
+                columns[standard] = alias
+                break
+    return columns
+
+
+def _daily_growth(data: pd.DataFrame, columns: Dict[str, str]) -> Optional[np.ndarray]:
+    """每日收盘价相对前一日的复权增长倍数 1 + 涨跌幅；没有涨跌幅时用 收盘/昨收"""
+    if "pct_chg" in columns:
+        return 1 + pd.to_numeric(data[columns["pct_chg"]], errors="coerce").to_numpy(dtype=float) / 100.0
+    if "pre_close" in columns:
+        close = pd.to_numeric(data[columns["close"]], errors="coerce").to_numpy(dtype=float)
+        pre_close = pd.to_numeric(data[columns["pre_close"]], errors="coerce").to_numpy(dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return close / pre_close
+    return None
+
+
+def adjusted_closes(close: np.ndarray, growth: np.ndarray, method: str = ADJUST_FORWARD) -> np.ndarray:
+    """
+    由原始收盘价和每日增长倍数计算复权收盘价（按日期升序）
+
+    前复权：adj[-1] = close[-1]，adj[i] = adj[i+1] / growth[i+1]
+    后复权：adj[0] = close[0]，adj[i] = adj[i-1] * growth[i]
+    逐日的除法/乘法用 ufunc.accumulate 完成，与逐行循环的浮点结果完全一致
+    """
+    close = np.asarray(close, dtype=float)
+    if method == ADJUST_NONE or len(close) == 0:
+        return close.copy()
+    growth = np.asarray(growth, dtype=float)
+    if method == ADJUST_FORWARD:
+        steps = np.concatenate(([close[-1]], growth[:0:-1]))
+        return np.divide.accumulate(steps)[::-1]
+    if method == ADJUST_BACKWARD:
+        steps = np.concatenate(([close[0]], growth[1:]))
+        return np.multiply.accumulate(steps)
+    raise ValueError(f"不支持的复权方式: {method}")
+
+
+def adjust_prices(data: pd.DataFrame, method: str = ADJUST_FORWARD, keep_raw: bool = True) -> pd.DataFrame:
+    """
+    计算复权K线
+
+    Args:
+        data: 含收盘价和涨跌幅（或昨收价）的K线，列名可为Tushare/BaoStock英文或AKShare中文
+        method: forward（前复权）、backward（后复权）或 none（不复权）
+        keep_raw: 是否保留原始价格列（列名加 _raw 后缀）
+
+    Returns:
+        pd.DataFrame: 按日期升序、索引重置的新DataFrame，price_type 列标记复权方式
+
+    Raises:
+        ValueError: 不支持的复权方式，或缺少收盘价/涨跌幅/昨收价列
+    """
+    if method not in _PRICE_TYPES:
+        raise ValueError(f"不支持的复权方式: {method}")
+    columns = resolve_price_columns(data)
+    if "close" not in columns:
+        raise ValueError("缺少收盘价列，无法计算复权价格")
+
+    adjusted = data.copy()
+    if "date" in columns:
+        adjusted = adjusted.sort_values(columns["date"]).reset_index(drop=True)
+    else:
+        adjusted = adjusted.reset_index(drop=True)
+
+    price_columns = [columns[name] for name in ("close", "open", "high", "low") if name in columns]
+    raw = {column: pd.to_numeric(adjusted[column], errors="coerce").to_numpy(dtype=float)
+           for column in price_columns}
+    if keep_raw:
+        for column in price_columns:
+            adjusted[f"{column}_raw"] = adjusted[column].copy()
+
+    if method != ADJUST_NONE:
+        growth = _daily_growth(adjusted, columns)
+        if growth is None:
+            raise ValueError("缺少涨跌幅或昨收价列，无法计算复权价格")
+        close_column = columns["close"]
+        close_raw = raw[close_column]
+        close_adjusted = adjusted_closes(close_raw, growth, method)
+        adjusted[close_column] = close_adjusted
+
+        # 原始收盘价为0的行无法得到调整比例，保持原价
+        valid = close_raw != 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = close_adjusted / close_raw
+            for column in price_columns[1:]:
+                adjusted[column] = np.where(valid, raw[column] * ratio, raw[column])
+
+    adjusted["price_type"] = _PRICE_TYPES[method]
+    return adjusted
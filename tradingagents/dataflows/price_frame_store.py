@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+进程内价格数据存储
+所有离线YFin读取方共享同一份已解析的行情DataFrame，避免同一个CSV在一次分析中被反复解析
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+def read_price_csv(path: str) -> pd.DataFrame:
+    """
+    读取YFin格式的行情CSV并规整为紧凑的DataFrame
+
+    - 以 "Date" 列前10位解析出的日期作为升序DatetimeIndex（原始 "Date" 列保留）
+    - 浮点列保持float64（这些数据会原样渲染给LLM，不能损失源数据精度），整数列（如Volume）转为int64
+    """
+    data = pd.read_csv(path)
+
+    for column in data.columns:
+        if pd.api.types.is_integer_dtype(data[column]):
+            data[column] = data[column].astype(np.int64)
+
+    data.index = pd.DatetimeIndex(
+        pd.to_datetime(data["Date"].astype(str).str[:10], format="%Y-%m-%d")
+    )
+    data.index.name = None
+    return data.sort_index(kind="stable")
+
+
+def downcast_floats(data: pd.DataFrame) -> pd.DataFrame:
+    """把浮点列原地转为float32，用于只参与指标计算、不直接输出的派生数据"""
+    for column in data.columns:
+        if pd.api.types.is_float_dtype(data[column]):
+            data[column] = data[column].astype(np.float32)
+    return data
+
+
+class PriceFrameStore:
+    """进程级价格数据存储 - 按 (symbol, source) 缓存，按文件mtime失效，按字节预算LRU淘汰"""
+
+    def __init__(self, max_bytes: int = None):
+        """
+        初始化价格数据存储
+
+        Args:
+            max_bytes: 内存预算（字节），默认读取环境变量 PRICE_FRAME_STORE_MAX_MB（默认256MB）
+        """
+        if max_bytes is None:
+            max_bytes = int(os.getenv('PRICE_FRAME_STORE_MAX_MB', '256')) * 1024 * 1024
+        self.max_bytes = max_bytes
+
+        # (symbol, source) -> {'path', 'mtime', 'frame', 'nbytes'}
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._total_bytes = 0
+
+        self.stats = {'hits': 0, 'misses': 0, 'reloads': 0, 'evictions': 0}
+
+    @staticmethod
+    def _frame_nbytes(frame: pd.DataFrame) -> int:
+        return int(frame.memory_usage(index=True, deep=True).sum())
+
+    def get_frame(self, symbol: str, source: str, path: str,
+                  loader: Callable[[str], pd.DataFrame] = None) -> pd.DataFrame:
+        """
+        获取完整的价格数据
+
+        Args:
+            symbol: 股票代码
+            source: 数据来源标识（如 "yfin_offline"）
+            path: 数据文件路径，文件mtime变化时自动重新加载
+            loader: 文件加载函数，默认 read_price_csv
+
+        Returns:
+            pd.DataFrame: 共享的只读DataFrame，调用方如需修改请先copy()
+        """
+        key = (symbol, source)
+        path = os.path.abspath(path)
+        mtime = os.path.getmtime(path)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['path'] == path and entry['mtime'] == mtime:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry['frame']
+
+            if entry is not None:
+                self.stats['reloads'] += 1
+                self._remove(key)
+            else:
+                self.stats['misses'] += 1
+
+            frame = (loader or read_price_csv)(path)
+            self._entries[key] = {
+                'path': path,
+                'mtime': mtime,
+                'frame': frame,
+                'nbytes': self._frame_nbytes(frame),
+            }
+            self._total_bytes += self._entries[key]['nbytes']
+            logger.debug(f"📦 价格数据已载入内存: {symbol} ({source}), {self._entries[key]['nbytes'] / 1024:.0f}KB")
+            self._evict(keep=key)
+            return frame
+
+    def get_range(self, symbol: str, source: str, path: str,
+                  start_date: str = None, end_date: str = None,
+                  loader: Callable[[str], pd.DataFrame] = None) -> pd.DataFrame:
+        """
+        获取 [start_date, end_date] 闭区间内的行情，通过有序索引二分查找切片
+
+        Args:
+            start_date: 开始日期 YYYY-mm-dd，None表示不限
+            end_date: 结束日期 YYYY-mm-dd，None表示不限
+        """
+        frame = self.get_frame(symbol, source, path, loader)
+        index = frame.index
+        start = 0 if start_date is None else index.searchsorted(pd.Timestamp(start_date), side='left')
+        stop = len(index) if end_date is None else index.searchsorted(pd.Timestamp(end_date), side='right')
+        return frame.iloc[start:stop]
+
+    def resize(self, symbol: str, source: str):
+        """重新计算原地增长的条目（如追加了指标列）的内存占用，必要时触发淘汰"""
+        key = (symbol, source)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            nbytes = self._frame_nbytes(entry['frame'])
+            self._total_bytes += nbytes - entry['nbytes']
+            entry['nbytes'] = nbytes
+            self._evict(keep=key)
+
+    def invalidate(self, symbol: str = None, source: str = None):
+        """使匹配的条目失效，参数为None时匹配全部"""
+        with self._lock:
+            for key in list(self._entries):
+                if (symbol is None or key[0] == symbol) and (source is None or key[1] == source):
+                    self._remove(key)
+
+    def clear(self):
+        """清空存储"""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取存储统计信息"""
+        with self._lock:
+            return {
+                **self.stats,
+                'entries': len(self._entries),
+                'total_mb': round(self._total_bytes / (1024 * 1024), 2),
+                'max_mb': round(self.max_bytes / (1024 * 1024), 2),
+            }
+
+    def _remove(self, key: Tuple[str, str]):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry['nbytes']
+
+    def _evict(self, keep: Optional[Tuple[str, str]] = None):
+        # 从最久未使用的条目开始淘汰，刚访问的条目即使超出预算也保留
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            if oldest == keep:
+                break
+            self._remove(oldest)
+            self.stats['evictions'] += 1
+            logger.debug(f"🧹 价格数据已淘汰: {oldest[0]} ({oldest[1]})")
+
+
+# 全局存储实例
+_store_instance = None
+_store_lock = threading.Lock()
+
+
+def get_price_frame_store() -> PriceFrameStore:
+    """获取全局价格数据存储实例"""
+    global _store_instance
+    if _store_instance is None:
+        with _store_lock:
+            if _store_instance is None:
+                _store_instance = PriceFrameStore()
+    return _store_instance
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+共享速率限制
+按数据源/接口名称维护令牌桶，同一进程内所有提供器实例共用一个配额；
+可选Redis后端让多个工作进程共享同一配额。每次等待时间计入统计，便于观察限流开销
+"""
+
+import os
+import re
+import threading
+import time
+from typing import Dict, Optional
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+# Redis令牌桶：按预约方式扣减令牌（可为负），返回调用方需要等待的秒数
+_REDIS_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local requested = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate) - requested
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(math.max(now, ts)))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+if tokens < 0 then
+    return tostring(-tokens / rate)
+end
+return '0'
+"""
+
+
+class TokenBucket:
+    """线程安全的进程内令牌桶，rate<=0 表示不限速"""
+
+    backend = "local"
+
+    def __init__(self, rate: float, capacity: float = 1):
+        """
+        Args:
+            rate: 每秒补充的令牌数（即长期平均请求速率）
+            capacity: 桶容量（允许的突发请求数）
+        """
+        self.rate = rate
+        self.capacity = max(1.0, float(capacity))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1) -> float:
+        """扣减令牌并返回需要等待的秒数（不睡眠），令牌不足时预约未来的令牌"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate) - tokens
+            self._updated = now
+            return max(0.0, -self._tokens / self.rate)
+
+
+class RedisTokenBucket:
+    """Redis上的令牌桶，多个进程共享同一配额；Redis不可用时退回进程内令牌桶"""
+
+    backend = "redis"
+
+    def __init__(self, client, name: str, rate: float, capacity: float = 1,
+                 prefix: str = "tradingagents:rate_limit:"):
+        self.client = client
+        self.key = prefix + name
+        self.rate = rate
+        self.capacity = max(1.0, float(capacity))
+        self._script = client.register_script(_REDIS_BUCKET_SCRIPT)
+        self._fallback = TokenBucket(rate, capacity)
+        # Redis失败后在这段时间内直接使用进程内令牌桶，避免每次调用都等待连接超时
+        self._retry_after = 30.0
+        self._redis_down_until = 0.0
+
+    def reserve(self, tokens: float = 1) -> float:
+        if self.rate <= 0:
+            return 0.0
+        if time.monotonic() < self._redis_down_until:
+            return self._fallback.reserve(tokens)
+        try:
+            wait = self._script(keys=[self.key], args=[self.rate, self.capacity, time.time(), tokens])
+            return max(0.0, float(wait.decode() if isinstance(wait, bytes) else wait))
+        except Exception as e:
+            logger.warning(f"⚠️ Redis速率限制不可用，{self._retry_after:.0f}秒内改用进程内限速: {e}")
+            self._redis_down_until = time.monotonic() + self._retry_after
+            return self._fallback.reserve(tokens)
+
+
+def _env_name(name: str) -> str:
+    """yfinance:hk -> YFINANCE_HK"""
+    return re.sub(r"[^0-9A-Za-z]+", "_", name).upper()
+
+
+class RateLimiterRegistry:
+    """
+    按名称管理令牌桶。名称形如 "提供器" 或 "提供器:接口"，接口没有单独配置时使用提供器的配置。
+    配置优先级：环境变量 RATE_LIMIT_<NAME>_RATE / RATE_LIMIT_<NAME>_BURST > default_config["rate_limits"]；
+    未配置的名称不限速，但同样记录统计
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Dict[str, float]]] = None, redis_client=None):
+        """
+        Args:
+            limits: 名称 -> {"rate": 每秒请求数, "capacity": 突发数}，默认读取 default_config
+            redis_client: 提供时使用Redis令牌桶跨进程共享配额
+        """
+        if limits is None:
+            from .config import get_config
+            limits = get_config().get("rate_limits", {})
+        self.limits = dict(limits)
+        self.redis_client = redis_client
+        self._buckets: Dict[str, object] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _resolve(self, name: str) -> Optional[Dict[str, float]]:
+        """按 名称 -> 提供器 的顺序查找配置，环境变量覆盖配置文件"""
+        candidates = [name] + ([name.split(":", 1)[0]] if ":" in name else [])
+        for candidate in candidates:
+            limit = dict(self.limits.get(candidate, {}))
+            env_rate = os.getenv(f"RATE_LIMIT_{_env_name(candidate)}_RATE")
+            env_burst = os.getenv(f"RATE_LIMIT_{_env_name(candidate)}_BURST")
+            if env_rate is not None:
+                limit["rate"] = float(env_rate)
+            if env_burst is not None:
+                limit["capacity"] = float(env_burst)
+            if "rate" in limit:
+                limit.setdefault("capacity", 1)
+                return limit
+        return None
+
+    def get(self, name: str):
+        """获取（必要时创建）名称对应的令牌桶"""
+        with self._lock:
+            bucket = self._buckets.get(name)
+            if bucket is None:
+                limit = self._resolve(name) or {"rate": 0, "capacity": 1}
+                if self.redis_client is not None and limit["rate"] > 0:
+                    bucket = RedisTokenBucket(self.redis_client, name, limit["rate"], limit["capacity"])
+                else:
+                    bucket = TokenBucket(limit["rate"], limit["capacity"])
+                self._buckets[name] = bucket
+            return bucket
+
+    def configure(self, name: str, rate: float, capacity: float = 1):
+        """运行时修改某个名称的限速（已有令牌桶会被替换）"""
+        with self._lock:
+            self.limits[name] = {"rate": rate, "capacity": capacity}
+            self._buckets.pop(name, None)
+
+    def acquire(self, name: str, tokens: float = 1) -> float:
+        """
+        获取令牌，必要时睡眠等待
+
+        Returns:
+            float: 实际等待的秒数
+        """
+        wait = self.get(name).reserve(tokens)
+        if wait > 0:
+            logger.info(f"⏳ [{name}] API限制等待 {wait:.1f}s...")
+            time.sleep(wait)
+
+        with self._lock:
+            stats = self._stats.setdefault(
+                name, {"calls": 0, "waits": 0, "total_wait_seconds": 0.0, "max_wait_seconds": 0.0})
+            stats["calls"] += 1
+            if wait > 0:
+                stats["waits"] += 1
+                stats["total_wait_seconds"] += wait
+                stats["max_wait_seconds"] = max(stats["max_wait_seconds"], wait)
+        return wait
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """各名称的调用次数、等待次数、累计/最长/平均等待秒数及当前限速"""
+        with self._lock:
+            result = {}
+            for name, stats in self._stats.items():
+                bucket = self._buckets.get(name)
+                result[name] = {
+                    **stats,
+                    "avg_wait_seconds": stats["total_wait_seconds"] / stats["calls"] if stats["calls"] else 0.0,
+                    "rate": bucket.rate if bucket is not None else 0,
+                    "capacity": bucket.capacity if bucket is not None else 1,
+                    "backend": bucket.backend if bucket is not None else "local",
+                }
+            return result
+
+
+def _create_redis_client():
+    """RATE_LIMIT_BACKEND=redis 时使用数据库管理器的Redis连接"""
+    if os.getenv("RATE_LIMIT_BACKEND", "local").lower() != "redis":
+        return None
+    try:
+        from tradingagents.config.database_manager import get_redis_client
+        client = get_redis_client()
+    except Exception as e:
+        logger.warning(f"⚠️ Redis速率限制初始化失败: {e}")
+        client = None
+    if client is None:
+        logger.warning("⚠️ Redis不可用，速率限制仅在进程内生效")
+    return client
+
+
+# 全局实例
+_rate_limiter: Optional[RateLimiterRegistry] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiterRegistry:
+    """获取全局速率限制注册表"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = RateLimiterRegistry(redis_client=_create_redis_client())
+    return _rate_limiter
+
+
+def wait_for_rate_limit(name: str, tokens: float = 1) -> float:
+    """在调用名为name的接口前获取令牌，返回等待的秒数"""
+    return get_rate_limiter().acquire(name, tokens)
+
+
+def get_rate_limit_stats() -> Dict[str, Dict[str, float]]:
+    """全局速率限制统计"""
+    return get_rate_limiter().get_stats()
@@ -12,6 +12,9 @@ import time
 import os
 from dataclasses import dataclass
 
+from .concurrent_fetch import FetchResult, FetchTask, fetch_concurrently, get_fetch_stats
+from tradingagents.utils.news_dedup import get_near_duplicate_detector
+
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('agents')
@@ -28,12 +31,19 @@ class NewsItem:
     url: str
     urgency: str  # high, medium, low
     relevance_score: float
+    source_count: int = 1  # 近似重复合并后，报道该新闻的条目数
 
 
 class RealtimeNewsAggregator:
     """实时新闻聚合器"""
     
-    def __init__(self):
+    def __init__(self, concurrent: Optional[bool] = None, deadline: Optional[float] = None):
+        """
+        Args:
+            concurrent: 是否同时请求所有新闻源，默认读取 NEWS_AGGREGATOR_CONCURRENT（默认开启）
+            deadline: 并发模式的全局截止秒数，默认读取 NEWS_AGGREGATOR_DEADLINE（默认10秒），
+                      截止时未返回的新闻源被放弃，只合并已到达的结果
+        """
         self.headers = {
             'User-Agent': 'TradingAgents-CN/1.0'
         }
@@ -42,6 +52,11 @@ class RealtimeNewsAggregator:
         self.finnhub_key = os.getenv('FINNHUB_API_KEY')
         self.alpha_vantage_key = os.getenv('ALPHA_VANTAGE_API_KEY')
         self.newsapi_key = os.getenv('NEWSAPI_KEY')
+
+        if concurrent is None:
+            concurrent = os.getenv('NEWS_AGGREGATOR_CONCURRENT', 'true').lower() == 'true'
+        self.concurrent = concurrent
+        self.deadline = deadline if deadline is not None else float(os.getenv('NEWS_AGGREGATOR_DEADLINE', '10'))
         
     def get_realtime_stock_news(self, ticker: str, hours_back: int = 6, max_news: int = 10) -> List[NewsItem]:
         """
@@ -55,62 +70,11 @@ class RealtimeNewsAggregator:
         """
         logger.info(f"[新闻聚合器] 开始获取 {ticker} 的实时新闻，回溯时间: {hours_back}小时")
         start_time = datetime.now()
-        all_news = []
-        
-        # 1. FinnHub实时新闻 (最高优先级)
-        logger.info(f"[新闻聚合器] 尝试从 FinnHub 获取 {ticker} 的新闻")
-        finnhub_start = datetime.now()
-        finnhub_news = self._get_finnhub_realtime_news(ticker, hours_back)
-        finnhub_time = (datetime.now() - finnhub_start).total_seconds()
-        
-        if finnhub_news:
-            logger.info(f"[新闻聚合器] 成功从 FinnHub 获取 {len(finnhub_news)} 条新闻，耗时: {finnhub_time:.2f}秒")
-        else:
-            logger.info(f"[新闻聚合器] FinnHub 未返回新闻，耗时: {finnhub_time:.2f}秒")
-            
-        all_news.extend(finnhub_news)
-        
-        # 2. Alpha Vantage新闻
-        logger.info(f"[新闻聚合器] 尝试从 Alpha Vantage 获取 {ticker} 的新闻")
-        av_start = datetime.now()
-        av_news = self._get_alpha_vantage_news(ticker, hours_back)
-        av_time = (datetime.now() - av_start).total_seconds()
-        
-        if av_news:
-            logger.info(f"[新闻聚合器] 成功从 Alpha Vantage 获取 {len(av_news)} 条新闻，耗时: {av_time:.2f}秒")
-        else:
-            logger.info(f"[新闻聚合器] Alpha Vantage 未返回新闻，耗时: {av_time:.2f}秒")
-            
-        all_news.extend(av_news)
-        
-        # 3. NewsAPI (如果配置了)
-        if self.newsapi_key:
-            logger.info(f"[新闻聚合器] 尝试从 NewsAPI 获取 {ticker} 的新闻")
-            newsapi_start = datetime.now()
-            newsapi_news = self._get_newsapi_news(ticker, hours_back)
-            newsapi_time = (datetime.now() - newsapi_start).total_seconds()
-            
-            if newsapi_news:
-                logger.info(f"[新闻聚合器] 成功从 NewsAPI 获取 {len(newsapi_news)} 条新闻，耗时: {newsapi_time:.2f}秒")
-            else:
-                logger.info(f"[新闻聚合器] NewsAPI 未返回新闻，耗时: {newsapi_time:.2f}秒")
-                
-            all_news.extend(newsapi_news)
+        sources = self._get_news_sources(ticker, hours_back)
+        if self.concurrent:
+            all_news = self._collect_news_concurrently(ticker, sources)
         else:
-            logger.info(f"[新闻聚合器] NewsAPI 密钥未配置，跳过此新闻源")
-        
-        # 4. 中文财经新闻源
-        logger.info(f"[新闻聚合器] 尝试获取 {ticker} 的中文财经新闻")
-        chinese_start = datetime.now()
-        chinese_news = self._get_chinese_finance_news(ticker, hours_back)
-        chinese_time = (datetime.now() - chinese_start).total_seconds()
-        
-        if chinese_news:
-            logger.info(f"[新闻聚合器] 成功获取 {len(chinese_news)} 条中文财经新闻，耗时: {chinese_time:.2f}秒")
-        else:
-            logger.info(f"[新闻聚合器] 未获取到中文财经新闻，耗时: {chinese_time:.2f}秒")
-            
-        all_news.extend(chinese_news)
+            all_news = self._collect_news_sequentially(ticker, sources)
         
         # 去重和排序
         logger.info(f"[新闻聚合器] 开始对 {len(all_news)} 条新闻进行去重和排序")
@@ -140,6 +104,54 @@ class RealtimeNewsAggregator:
         
         return sorted_news
     
+    def _get_news_sources(self, ticker: str, hours_back: int) -> List[FetchTask]:
+        """按优先级排列的新闻源：FinnHub > Alpha Vantage > NewsAPI > 中文财经"""
+        sources = [
+            FetchTask("FinnHub", lambda: self._get_finnhub_realtime_news(ticker, hours_back), source="news:finnhub"),
+            FetchTask("Alpha Vantage", lambda: self._get_alpha_vantage_news(ticker, hours_back), source="news:alpha_vantage"),
+        ]
+        if self.newsapi_key:
+            sources.append(FetchTask("NewsAPI", lambda: self._get_newsapi_news(ticker, hours_back), source="news:newsapi"))
+        else:
+            logger.info(f"[新闻聚合器] NewsAPI 密钥未配置，跳过此新闻源")
+        sources.append(FetchTask("中文财经", lambda: self._get_chinese_finance_news(ticker, hours_back), source="news:chinese_finance"))
+        return sources
+
+    def _merge_source_results(self, ticker: str, results: Dict[str, FetchResult]) -> List[NewsItem]:
+        """按新闻源优先级顺序合并结果，保证去重时保留的条目与顺序执行一致"""
+        all_news = []
+        for name, result in results.items():
+            if result.timed_out:
+                logger.warning(f"[新闻聚合器] {name} 未在截止时间内返回，已放弃，等待: {result.elapsed:.2f}秒")
+            elif result.error is not None:
+                logger.error(f"[新闻聚合器] {name} 新闻获取失败: {result.error}，耗时: {result.elapsed:.2f}秒")
+            elif result.value:
+                logger.info(f"[新闻聚合器] 成功从 {name} 获取 {len(result.value)} 条新闻，耗时: {result.elapsed:.2f}秒")
+                all_news.extend(result.value)
+            else:
+                logger.info(f"[新闻聚合器] {name} 未返回新闻，耗时: {result.elapsed:.2f}秒")
+        return all_news
+
+    def _collect_news_sequentially(self, ticker: str, sources: List[FetchTask]) -> List[NewsItem]:
+        """依次请求各新闻源"""
+        results = {}
+        for task in sources:
+            logger.info(f"[新闻聚合器] 尝试从 {task.name} 获取 {ticker} 的新闻")
+            results.update(fetch_concurrently([task]))
+        return self._merge_source_results(ticker, results)
+
+    def _collect_news_concurrently(self, ticker: str, sources: List[FetchTask]) -> List[NewsItem]:
+        """同时请求所有新闻源，截止时间到达后只合并已返回的结果"""
+        logger.info(f"[新闻聚合器] 并发请求 {len(sources)} 个新闻源，截止时间: {self.deadline:.1f}秒")
+        results = fetch_concurrently(sources, deadline=self.deadline)
+        return self._merge_source_results(ticker, results)
+
+    @staticmethod
+    def get_source_stats() -> Dict[str, Dict[str, float]]:
+        """各新闻源的调用次数、失败、超时与平均耗时"""
+        return {source[len("news:"):]: stats for source, stats in get_fetch_stats().items()
+                if source.startswith("news:")}
+
     def _get_finnhub_realtime_news(self, ticker: str, hours_back: int) -> List[NewsItem]:
         """获取FinnHub实时新闻"""
         if not self.finnhub_key:
@@ -159,7 +171,7 @@ class RealtimeNewsAggregator:
                 'token': self.finnhub_key
             }
             
-            response = requests.get(url, params=params, headers=self.headers)
+            response = requests.get(url, params=params, headers=self.headers, timeout=self.deadline)
             response.raise_for_status()
             
             news_data = response.json()
@@ -204,7 +216,7 @@ class RealtimeNewsAggregator:
                 'limit': 50
             }
             
-            response = requests.get(url, params=params, headers=self.headers)
+            response = requests.get(url, params=params, headers=self.headers, timeout=self.deadline)
             response.raise_for_status()
             
             data = response.json()
@@ -264,7 +276,7 @@ class RealtimeNewsAggregator:
                 'apiKey': self.newsapi_key
             }
             
-            response = requests.get(url, params=params, headers=self.headers)
+            response = requests.get(url, params=params, headers=self.headers, timeout=self.deadline)
             response.raise_for_status()
             
             data = response.json()
@@ -567,7 +579,7 @@ class RealtimeNewsAggregator:
         logger.info(f"[新闻去重] 开始对 {len(news_items)} 条新闻进行去重处理")
         start_time = datetime.now()
         
-        seen_titles = set()
+        seen_titles = {}
         unique_news = []
         duplicate_count = 0
         short_title_count = 0
@@ -585,17 +597,25 @@ class RealtimeNewsAggregator:
             # 检查是否重复
             if title_key in seen_titles:
                 logger.debug(f"[新闻去重] 检测到重复新闻: '{item.title[:50]}...'，来源: {item.source}")
+                seen_titles[title_key].source_count += item.source_count
                 duplicate_count += 1
                 continue
                 
             # 添加到结果集
-            seen_titles.add(title_key)
+            seen_titles[title_key] = item
             unique_news.append(item)
         
+        # 近似重复：不同媒体转载的同一新闻（标题后缀、措辞略有差异）合并为一条，保留优先级最高的来源
+        clusters = get_near_duplicate_detector().cluster(unique_news, lambda n: (n.title, n.content))
+        near_duplicate_count = len(unique_news) - len(clusters)
+        for cluster in clusters:
+            cluster.representative.source_count = sum(n.source_count for n in cluster.members)
+        unique_news = [cluster.representative for cluster in clusters]
+        
         # 记录去重结果
         time_taken = (datetime.now() - start_time).total_seconds()
         logger.info(f"[新闻去重] 去重完成，原始新闻: {len(news_items)}条，去重后: {len(unique_news)}条，")
-        logger.info(f"[新闻去重] 去除重复: {duplicate_count}条，标题过短: {short_title_count}条，耗时: {time_taken:.2f}秒")
+        logger.info(f"[新闻去重] 去除重复: {duplicate_count}条，近似重复: {near_duplicate_count}条，标题过短: {short_title_count}条，耗时: {time_taken:.2f}秒")
         
         return unique_news
     
@@ -636,14 +656,16 @@ class RealtimeNewsAggregator:
             report += "## 🚨 紧急新闻\n\n"
             for news in high_urgency[:3]:  # 最多显示3条
                 report += f"### {news.title}\n"
-                report += f"**来源**: {news.source} | **时间**: {news.publish_time.strftime('%H:%M')}\n"
+                report += f"**来源**: {news.source} | **时间**: {news.publish_time.strftime('%H:%M')}"
+                report += f" | **报道数**: {news.source_count}\n" if news.source_count > 1 else "\n"
                 report += f"{news.content}\n\n"
         
         if medium_urgency:
             report += "## 📢 重要新闻\n\n"
             for news in medium_urgency[:5]:  # 最多显示5条
                 report += f"### {news.title}\n"
-                report += f"**来源**: {news.source} | **时间**: {news.publish_time.strftime('%H:%M')}\n"
+                report += f"**来源**: {news.source} | **时间**: {news.publish_time.strftime('%H:%M')}"
+                report += f" | **报道数**: {news.source_count}\n" if news.source_count > 1 else "\n"
                 report += f"{news.content}\n\n"
         
         # 添加时效性说明
@@ -3,9 +3,14 @@ import time
 import json
 from datetime import datetime, timedelta
 from contextlib import contextmanager
-from typing import Annotated
+from typing import Annotated, Dict, List, Optional
 import os
 import re
+import threading
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
 
 ticker_to_company = {
     "AAPL": "Apple",
@@ -49,87 +54,215 @@ ticker_to_company = {
 }
 
 
-def fetch_top_from_category(
+# 索引文件目录，位于 reddit_data 下但不在任何分类目录内（分类目录的文件数参与每个子版块的配额计算）
+INDEX_DIR_NAME = ".reddit_index"
+
+_company_matchers = {}
+_company_matchers_lock = threading.Lock()
+
+
+def get_company_matcher(ticker: str):
+    """
+    返回预编译的公司匹配正则：公司名（" OR " 分隔的多个别名）或股票代码，忽略大小写。
+    各检索词按原样作为正则拼接，匹配结果与逐个 re.search 相同
+    """
+    matcher = _company_matchers.get(ticker)
+    if matcher is None:
+        search_terms = ticker_to_company[ticker].split(" OR ") + [ticker]
+        matcher = re.compile("|".join(f"(?:{term})" for term in search_terms), re.IGNORECASE)
+        with _company_matchers_lock:
+            _company_matchers[ticker] = matcher
+    return matcher
+
+
+def _post_date(created_utc) -> str:
+    return datetime.utcfromtimestamp(created_utc).strftime("%Y-%m-%d")
+
+
+class RedditCorpusIndex:
+    """
+    Reddit离线语料的日期索引：(分类, 子版块文件, 日期) -> 行的字节偏移。
+    索引按源文件的修改时间和大小校验，写入 reddit_data/.reddit_index，文件不变时无需重新扫描
+    """
+
+    def __init__(self, data_path: str):
+        self.data_path = data_path
+        self.index_dir = os.path.join(data_path, INDEX_DIR_NAME)
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def _index_path(self, category: str, data_file: str) -> str:
+        return os.path.join(self.index_dir, category, data_file + ".json")
+
+    @staticmethod
+    def _scan(path: str) -> Dict[str, List[int]]:
+        dates = {}
+        with open(path, "rb") as f:
+            offset = 0
+            for line in f:
+                if line.strip():
+                    created_utc = json.loads(line)["created_utc"]
+                    dates.setdefault(_post_date(created_utc), []).append(offset)
+                offset += len(line)
+        return dates
+
+    def get_file_index(self, category: str, data_file: str) -> Dict[str, List[int]]:
+        """返回单个子版块文件的 日期 -> 偏移列表，源文件变化时重建"""
+        path = os.path.join(self.data_path, category, data_file)
+        stat = os.stat(path)
+        signature = [stat.st_mtime_ns, stat.st_size]
+        key = (category, data_file)
+
+        with self._lock:
+            cached = self._files.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        index_path = self._index_path(category, data_file)
+        dates = None
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            if stored.get("source") == signature:
+                dates = stored["dates"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+        if dates is None:
+            dates = self._scan(path)
+            try:
+                os.makedirs(os.path.dirname(index_path), exist_ok=True)
+                tmp_path = index_path + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"source": signature, "dates": dates}, f)
+                os.replace(tmp_path, index_path)
+            except OSError as e:
+                logger.warning(f"⚠️ Reddit索引写入失败，仅保存在内存中: {e}")
+
+        with self._lock:
+            self._files[key] = (signature, dates)
+        return dates
+
+    def build(self, categories: Optional[List[str]] = None) -> int:
+        """离线建立（或校验）全部分类的索引，返回已索引的文件数"""
+        if categories is None:
+            categories = [c for c in os.listdir(self.data_path)
+                          if c != INDEX_DIR_NAME and os.path.isdir(os.path.join(self.data_path, c))]
+        count = 0
+        for category in categories:
+            for data_file in os.listdir(os.path.join(self.data_path, category)):
+                if data_file.endswith(".jsonl"):
+                    self.get_file_index(category, data_file)
+                    count += 1
+        return count
+
+    def read_posts(self, category: str, data_file: str, dates: List[str]) -> Dict[str, list]:
+        """一次读取文件中属于给定日期的所有帖子，按日期分组并保持文件内顺序"""
+        file_index = self.get_file_index(category, data_file)
+        wanted = [(offset, date) for date in dates for offset in file_index.get(date, [])]
+        wanted.sort()
+        posts = {date: [] for date in dates}
+        if not wanted:
+            return posts
+        with open(os.path.join(self.data_path, category, data_file), "rb") as f:
+            for offset, date in wanted:
+                f.seek(offset)
+                posts[date].append(json.loads(f.readline()))
+        return posts
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_reddit_index(data_path: str) -> RedditCorpusIndex:
+    """获取指定数据目录的Reddit语料索引"""
+    with _indexes_lock:
+        index = _indexes.get(data_path)
+        if index is None:
+            index = RedditCorpusIndex(data_path)
+            _indexes[data_path] = index
+        return index
+
+
+def fetch_top_from_category_range(
     category: Annotated[
         str, "Category to fetch top post from. Collection of subreddits."
     ],
-    date: Annotated[str, "Date to fetch top posts from."],
-    max_limit: Annotated[int, "Maximum number of posts to fetch."],
+    dates: Annotated[List[str], "Dates (yyyy-mm-dd) to fetch top posts from."],
+    max_limit: Annotated[int, "Maximum number of posts to fetch per day."],
     query: Annotated[str, "Optional query to search for in the subreddit."] = None,
     data_path: Annotated[
         str,
         "Path to the data folder. Default is 'reddit_data'.",
     ] = "reddit_data",
-):
-    base_path = data_path
+) -> Dict[str, list]:
+    """
+    多日查询：每个子版块文件只读取一次，返回 日期 -> 帖子列表，
+    每天的结果与对该日单独调用 fetch_top_from_category 相同
+    """
+    category_files = os.listdir(os.path.join(data_path, category))
 
-    all_content = []
-
-    if max_limit < len(os.listdir(os.path.join(base_path, category))):
+    if max_limit < len(category_files):
         raise ValueError(
             "REDDIT FETCHING ERROR: max limit is less than the number of files in the category. Will not be able to fetch any posts"
         )
 
-    limit_per_subreddit = max_limit // len(
-        os.listdir(os.path.join(base_path, category))
-    )
+    limit_per_subreddit = max_limit // len(category_files)
+
+    # if is company_news, check that the title or the content has the company's name (query) mentioned
+    match_company = bool("company" in category and query)
+
+    index = get_reddit_index(data_path)
+    all_content = {date: [] for date in dates}
 
-    for data_file in os.listdir(os.path.join(base_path, category)):
+    for data_file in category_files:
         # check if data_file is a .jsonl file
         if not data_file.endswith(".jsonl"):
             continue
 
-        all_content_curr_subreddit = []
-
-        with open(os.path.join(base_path, category, data_file), "rb") as f:
-            for i, line in enumerate(f):
-                # skip empty lines
-                if not line.strip():
-                    continue
-
-                parsed_line = json.loads(line)
-
-                # select only lines that are from the date
-                post_date = datetime.utcfromtimestamp(
-                    parsed_line["created_utc"]
-                ).strftime("%Y-%m-%d")
-                if post_date != date:
-                    continue
-
-                # if is company_news, check that the title or the content has the company's name (query) mentioned
-                if "company" in category and query:
-                    search_terms = []
-                    if "OR" in ticker_to_company[query]:
-                        search_terms = ticker_to_company[query].split(" OR ")
-                    else:
-                        search_terms = [ticker_to_company[query]]
-
-                    search_terms.append(query)
-
-                    found = False
-                    for term in search_terms:
-                        if re.search(
-                            term, parsed_line["title"], re.IGNORECASE
-                        ) or re.search(term, parsed_line["selftext"], re.IGNORECASE):
-                            found = True
-                            break
-
-                    if not found:
+        for date, parsed_lines in index.read_posts(category, data_file, dates).items():
+            all_content_curr_subreddit = []
+            for parsed_line in parsed_lines:
+                if match_company:
+                    matcher = get_company_matcher(query)
+                    if not (matcher.search(parsed_line["title"]) or matcher.search(parsed_line["selftext"])):
                         continue
 
-                post = {
+                all_content_curr_subreddit.append({
                     "title": parsed_line["title"],
                     "content": parsed_line["selftext"],
                     "url": parsed_line["url"],
                     "upvotes": parsed_line["ups"],
-                    "posted_date": post_date,
-                }
+                    "posted_date": date,
+                })
 
-                all_content_curr_subreddit.append(post)
+            # sort all_content_curr_subreddit by upvote_ratio in descending order
+            all_content_curr_subreddit.sort(key=lambda x: x["upvotes"], reverse=True)
 
-        # sort all_content_curr_subreddit by upvote_ratio in descending order
-        all_content_curr_subreddit.sort(key=lambda x: x["upvotes"], reverse=True)
-
-        all_content.extend(all_content_curr_subreddit[:limit_per_subreddit])
+            all_content[date].extend(all_content_curr_subreddit[:limit_per_subreddit])
 
     return all_content
+
+
+def fetch_top_from_category(
+    category: Annotated[
+        str, "Category to fetch top post from. Collection of subreddits."
+    ],
+    date: Annotated[str, "Date to fetch top posts from."],
+    max_limit: Annotated[int, "Maximum number of posts to fetch."],
+    query: Annotated[str, "Optional query to search for in the subreddit."] = None,
+    data_path: Annotated[
+        str,
+        "Path to the data folder. Default is 'reddit_data'.",
+    ] = "reddit_data",
+):
+    return fetch_top_from_category_range(category, [date], max_limit, query, data_path)[date]
+
+
+if __name__ == "__main__":
+    import sys
+
+    reddit_data_path = sys.argv[1] if len(sys.argv) > 1 else "reddit_data"
+    indexed = get_reddit_index(reddit_data_path).build()
+    print(f"✅ Reddit语料索引完成: {indexed}个文件")
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+本地证券主数据
+A股、港股、美股的代码、名称、交易所、行业、上市日期等基础信息持久化在本地并一次性加载到内存，
+按代码O(1)查找，按代码/名称/拼音前缀和名称n-gram模糊搜索，避免每次分析都通过网络查询股票信息
+"""
+
+import bisect
+import json
+import os
+import re
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+# 拼音搜索依赖pypinyin，不可用时只使用记录自带的pinyin字段
+try:
+    from pypinyin import Style, lazy_pinyin
+    PYPINYIN_AVAILABLE = True
+except ImportError:
+    Style = lazy_pinyin = None
+    PYPINYIN_AVAILABLE = False
+
+FIELDS = ("code", "name", "market", "exchange", "industry", "area", "list_date", "ts_code", "pinyin", "source")
+
+# 指数、ETF等与个股代码可能重复（如上证指数000001），不放入证券主数据
+_NON_STOCK_MARKERS = ("index", "etf", "fund", "指数", "基金")
+
+
+def normalize_symbol(symbol: str) -> Optional[Tuple[str, str]]:
+    """
+    把各种写法的股票代码规范为 (市场, 代码)
+
+    000001 / 000001.SZ / sh600000 -> ("china", 6位代码)；0700.HK / 00700 / 700 -> ("hk", 至少4位代码)；
+    aapl / BRK.B -> ("us", 大写代码)。无法识别时返回None
+    """
+    if symbol is None:
+        return None
+    text = str(symbol).strip().upper()
+    if not text:
+        return None
+
+    match = re.match(r'^(?:(?:SH|SZ|BJ)\.?)?(\d{6})(?:\.(?:SH|SZ|SS|BJ))?$', text)
+    if match:
+        return "china", match.group(1)
+    match = re.match(r'^(\d{1,5})(?:\.HK)?$', text)
+    if match:
+        return "hk", str(int(match.group(1))).zfill(4)
+    match = re.match(r'^([A-Z][A-Z0-9.\-]{0,9}?)(?:\.US)?$', text)
+    if match:
+        return "us", match.group(1)
+    return None
+
+
+def _name_pinyin(name: str) -> Tuple[str, str]:
+    """名称的全拼和首字母，如 平安银行 -> ("pinganyinhang", "payh")"""
+    if not PYPINYIN_AVAILABLE or not name:
+        return "", ""
+    full = "".join(lazy_pinyin(name)).lower()
+    initials = "".join(lazy_pinyin(name, style=Style.FIRST_LETTER)).lower()
+    return full, initials
+
+
+def _ngrams(text: str) -> Set[str]:
+    """单字和相邻双字，单字用于一个字的查询，双字用于子串和模糊匹配"""
+    return set(text) | {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class SecurityMaster:
+    """进程内证券主数据索引，持久化为JSON文件"""
+
+    def __init__(self, path: Optional[str] = None, snapshot_path: Optional[str] = None):
+        """
+        Args:
+            path: 持久化文件，默认 SECURITY_MASTER_PATH 环境变量或 data_cache_dir/security_master.json
+            snapshot_path: 本地文件不存在时导入的CSV快照，默认 SECURITY_MASTER_SNAPSHOT 环境变量
+        """
+        if path is None:
+            from .config import get_config
+            path = os.getenv("SECURITY_MASTER_PATH",
+                             os.path.join(get_config()["data_cache_dir"], "security_master.json"))
+        self.path = path
+        self.snapshot_path = snapshot_path if snapshot_path is not None else os.getenv("SECURITY_MASTER_SNAPSHOT")
+        self._records: Dict[str, Dict[str, str]] = {}
+        self._sync_marks: Dict[str, str] = {}
+        self._prefix_terms: List[Tuple[str, str]] = []
+        self._grams: Dict[str, Set[str]] = {}
+        self._index_dirty = True
+        self._lock = threading.RLock()
+        self._stats = {"lookups": 0, "lookup_hits": 0, "searches": 0}
+        self._load()
+
+    @staticmethod
+    def _key(market: str, code: str) -> str:
+        return f"{market}:{code}"
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for record in data.get("records", []):
+                self._records[self._key(record["market"], record["code"])] = record
+            self._sync_marks = data.get("sync_marks", {})
+            logger.info(f"📇 [证券主数据] 加载{len(self._records)}条记录: {self.path}")
+        except FileNotFoundError:
+            if self.snapshot_path and os.path.exists(self.snapshot_path):
+                self.load_csv(self.snapshot_path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"⚠️ [证券主数据] 文件损坏，将重新积累: {self.path}: {e}")
+            self._records = {}
+
+    def save(self):
+        """原子写入持久化文件"""
+        with self._lock:
+            payload = {
+                "updated_at": datetime.now().isoformat(),
+                "sync_marks": dict(self._sync_marks),
+                "records": list(self._records.values()),
+            }
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(self.path + ".tmp", self.path)
+
+    def upsert(self, records: Iterable[Dict], source: str = "", save: bool = True) -> int:
+        """
+        增量写入记录，代码相同的记录合并（新值覆盖旧值，空值不覆盖）
+
+        Args:
+            records: 至少包含 code 和 name 的字典，code 可以是任意写法（000001.SZ、0700.HK 等）
+            source: 数据来源，记录自身没有 source 时使用
+            save: 是否立即持久化
+
+        Returns:
+            int: 新增或变化的记录数
+        """
+        changed = 0
+        with self._lock:
+            for raw in records:
+                normalized = normalize_symbol(raw.get("code") or raw.get("ts_code") or raw.get("symbol"))
+                name = str(raw.get("name") or "").strip()
+                if normalized is None or not name:
+                    continue
+                market, code = normalized
+                key = self._key(market, code)
+                record = dict(self._records.get(key, {}))
+                for field in FIELDS:
+                    value = raw.get(field)
+                    if value is not None and not (isinstance(value, float) and pd.isna(value)) and str(value) != "":
+                        record[field] = str(value)
+                record.update(code=code, market=market, name=name)
+                record.setdefault("source", source or "unknown")
+                if record != self._records.get(key):
+                    self._records[key] = record
+                    changed += 1
+            if changed:
+                self._index_dirty = True
+        if changed:
+            logger.info(f"📇 [证券主数据] 更新{changed}条记录 (来源: {source or '记录自带'})")
+            if save:
+                try:
+                    self.save()
+                except Exception as e:
+                    logger.warning(f"⚠️ [证券主数据] 写入失败: {e}")
+        return changed
+
+    def load_csv(self, csv_path: str, save: bool = True) -> int:
+        """从CSV快照导入，列名与 FIELDS 一致（至少 code、name）"""
+        frame = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+        return self.upsert(frame.to_dict("records"), source="snapshot", save=save)
+
+    def refresh_from_syncer(self, syncer, save: bool = True) -> int:
+        """
+        从 StockInfoSyncer 同步到MongoDB的 stock_basic_info 集合增量刷新，
+        只读取上次刷新之后 updated_at 变化的文档
+        """
+        if getattr(syncer, "mongodb_db", None) is None:
+            logger.warning("⚠️ [证券主数据] MongoDB未连接，跳过同步")
+            return 0
+
+        collection_name = getattr(syncer, "collection_name", "stock_basic_info")
+        mark = self._sync_marks.get(collection_name)
+        query = {"updated_at": {"$gt": datetime.fromisoformat(mark)}} if mark else {}
+        latest, records = None, []
+        for doc in syncer.mongodb_db[collection_name].find(query):
+            updated_at = doc.get("updated_at")
+            if updated_at is not None and (latest is None or updated_at > latest):
+                latest = updated_at
+            kind = f"{doc.get('sec', '')} {doc.get('category', '')}".lower()
+            if any(marker in kind for marker in _NON_STOCK_MARKERS):
+                continue
+            records.append({
+                "code": doc.get("code"),
+                "name": doc.get("name"),
+                "exchange": str(doc.get("sse", "")).upper(),
+                "industry": doc.get("industry"),
+                "list_date": doc.get("list_date"),
+                "source": doc.get("sync_source", "mongodb"),
+            })
+
+        changed = self.upsert(records, source="mongodb", save=False)
+        if latest is not None:
+            with self._lock:
+                self._sync_marks[collection_name] = latest.isoformat()
+        if save and (changed or latest is not None):
+            self.save()
+        return changed
+
+    def lookup(self, symbol: str) -> Optional[Dict[str, str]]:
+        """按代码查找，接受 000001、000001.SZ、0700.HK、AAPL 等写法"""
+        normalized = normalize_symbol(symbol)
+        record = self._records.get(self._key(*normalized)) if normalized else None
+        with self._lock:
+            self._stats["lookups"] += 1
+            if record is not None:
+                self._stats["lookup_hits"] += 1
+        return dict(record) if record is not None else None
+
+    def get_name(self, symbol: str) -> Optional[str]:
+        record = self.lookup(symbol)
+        return record["name"] if record else None
+
+    def _build_index(self):
+        """前缀索引为 (检索词, 键) 的有序列表，n-gram索引为 片段 -> 键集合"""
+        terms, grams = [], {}
+        for key, record in self._records.items():
+            name = record["name"].lower()
+            candidates = {record["code"].lower(), name}
+            if record.get("ts_code"):
+                candidates.add(record["ts_code"].lower())
+            full, initials = _name_pinyin(record["name"])
+            for value in (record.get("pinyin", "").lower(), full, initials):
+                if value:
+                    candidates.add(value)
+            terms.extend((term, key) for term in candidates)
+            for gram in _ngrams(name):
+                grams.setdefault(gram, set()).add(key)
+        terms.sort()
+        self._prefix_terms, self._grams = terms, grams
+        self._index_dirty = False
+
+    def search(self, keyword: str, limit: int = 20, market: Optional[str] = None) -> List[Dict[str, str]]:
+        """
+        搜索股票：代码/名称/拼音前缀，名称子串，以及名称n-gram模糊匹配
+
+        结果按 代码完全匹配 > 名称完全匹配 > 前缀 > 子串 > 模糊（按相同片段数）排序
+
+        Args:
+            keyword: 代码、名称、拼音全拼或首字母
+            limit: 最多返回条数
+            market: 只返回某个市场（china / hk / us）
+        """
+        query = str(keyword or "").strip().lower()
+        if not query:
+            return []
+        with self._lock:
+            self._stats["searches"] += 1
+            if self._index_dirty:
+                self._build_index()
+            terms, grams, records = self._prefix_terms, self._grams, self._records
+
+        ranks: Dict[str, Tuple[int, int]] = {}
+
+        def rank(key: str, value: Tuple[int, int]):
+            if key not in ranks or value < ranks[key]:
+                ranks[key] = value
+
+        normalized = normalize_symbol(keyword)
+        if normalized and self._key(*normalized) in records:
+            rank(self._key(*normalized), (0, 0))
+
+        position = bisect.bisect_left(terms, (query, ""))
+        while position < len(terms) and terms[position][0].startswith(query):
+            term, key = terms[position]
+            rank(key, (1, 0) if term == query and term == records[key]["name"].lower() else (2, len(term)))
+            position += 1
+
+        query_grams = _ngrams(query) if len(query) == 1 else {query[i:i + 2] for i in range(len(query) - 1)}
+        counts: Dict[str, int] = {}
+        for gram in query_grams:
+            for key in grams.get(gram, ()):
+                counts[key] = counts.get(key, 0) + 1
+        threshold = max(1, (len(query_grams) + 1) // 2)
+        for key, count in counts.items():
+            if query in records[key]["name"].lower():
+                rank(key, (3, len(records[key]["name"])))
+            elif count >= threshold:
+                rank(key, (4, -count))
+
+        ordered = sorted(ranks, key=lambda key: (ranks[key], records[key]["code"]))
+        if market:
+            ordered = [key for key in ordered if records[key]["market"] == market]
+        return [dict(records[key]) for key in ordered[:limit]]
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def get_stats(self) -> Dict[str, object]:
+        with self._lock:
+            markets: Dict[str, int] = {}
+            for record in self._records.values():
+                markets[record["market"]] = markets.get(record["market"], 0) + 1
+            return {**self._stats, "records": len(self._records), "markets": markets,
+                    "pinyin_available": PYPINYIN_AVAILABLE, "path": self.path}
+
+
+# 全局实例
+_security_master: Optional[SecurityMaster] = None
+_security_master_lock = threading.Lock()
+
+
+def get_security_master() -> SecurityMaster:
+    """获取全局证券主数据实例（首次调用时从磁盘加载）"""
+    global _security_master
+    if _security_master is None:
+        with _security_master_lock:
+            if _security_master is None:
+                _security_master = SecurityMaster()
+    return _security_master
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+SimFin财报分区存储
+把全市场的 us-*-{freq}.csv 一次性导入为按股票代码分区、按发布日期排序的列式文件，
+之后按 (股票, 截止日期) 二分查找最近一期已发布的报表，避免每次调用都解析整份CSV
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+# 列式存储依赖pyarrow，不可用时退回pickle（CSV会丢失列类型）
+try:
+    import pyarrow.parquet as pa_parquet
+    PYARROW_AVAILABLE = True
+except ImportError:
+    pa_parquet = None
+    PYARROW_AVAILABLE = False
+
+# 报表类型 -> SimFin导出文件名中的前缀
+SIMFIN_STATEMENTS = {
+    "balance_sheet": "balance",
+    "cash_flow": "cashflow",
+    "income_statements": "income",
+}
+
+DATE_COLUMNS = ("Report Date", "Publish Date")
+MANIFEST_NAME = "manifest.json"
+
+
+def read_statement_csv(path: str) -> pd.DataFrame:
+    """读取SimFin导出的CSV，日期列解析为UTC并去掉时间部分"""
+    df = pd.read_csv(path, sep=";")
+    for column in DATE_COLUMNS:
+        df[column] = pd.to_datetime(df[column], utc=True).dt.normalize()
+    return df
+
+
+def _partition_name(ticker: str) -> str:
+    """股票代码转为安全的文件名（部分代码含 '/' 或 '.'）"""
+    return ticker.replace("/", "_").replace("\\", "_")
+
+
+def _frame_digest(frame: pd.DataFrame) -> str:
+    """分区内容摘要，用于增量导入时判断是否需要重写"""
+    hashed = pd.util.hash_pandas_object(frame, index=True).values
+    return hashlib.sha256(hashed.tobytes() + ",".join(frame.columns).encode("utf-8")).hexdigest()
+
+
+class SimFinStore:
+    """按股票分区的SimFin报表存储"""
+
+    def __init__(self, data_dir: str, store_dir: Optional[str] = None, max_cached_frames: int = 64):
+        """
+        Args:
+            data_dir: 数据目录，SimFin原始导出位于 fundamental_data/simfin_data_all 下
+            store_dir: 分区存储目录，默认 fundamental_data/simfin_store
+            max_cached_frames: 进程内缓存的分区数
+        """
+        self.data_dir = data_dir
+        self.store_dir = store_dir or os.path.join(data_dir, "fundamental_data", "simfin_store")
+        self.max_cached_frames = max_cached_frames
+        self.extension = ".parquet" if PYARROW_AVAILABLE else ".pkl"
+        self._frames: "OrderedDict[Tuple[str, str, str], pd.DataFrame]" = OrderedDict()
+        self._verified: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        self._lock = threading.RLock()
+
+    def source_path(self, statement: str, freq: str) -> str:
+        """SimFin原始导出文件路径"""
+        prefix = SIMFIN_STATEMENTS[statement]
+        return os.path.join(
+            self.data_dir, "fundamental_data", "simfin_data_all",
+            statement, "companies", "us", f"us-{prefix}-{freq}.csv",
+        )
+
+    def _partition_dir(self, statement: str, freq: str) -> str:
+        return os.path.join(self.store_dir, statement, freq)
+
+    def _partition_path(self, statement: str, freq: str, ticker: str) -> str:
+        return os.path.join(self._partition_dir(statement, freq), _partition_name(ticker) + self.extension)
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.store_dir, MANIFEST_NAME)
+
+    def _load_manifest(self) -> dict:
+        try:
+            with open(self._manifest_path(), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self, manifest: dict):
+        os.makedirs(self.store_dir, exist_ok=True)
+        tmp_path = self._manifest_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self._manifest_path())
+
+    def _write_frame(self, frame: pd.DataFrame, path: str):
+        tmp_path = path + ".tmp"
+        if PYARROW_AVAILABLE:
+            frame.to_parquet(tmp_path, engine="pyarrow", index=True)
+        else:
+            frame.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+
+    def _read_frame(self, path: str) -> pd.DataFrame:
+        if PYARROW_AVAILABLE:
+            return pd.read_parquet(path, engine="pyarrow")
+        return pd.read_pickle(path)
+
+    def ingest(self, statement: str, freq: str, force: bool = False) -> int:
+        """
+        导入一份SimFin导出文件。
+
+        源文件的修改时间和大小未变时直接跳过；变化时重新解析一次，
+        只重写内容摘要发生变化的分区，并删除已从源文件中消失的股票。
+
+        Returns:
+            本次重写的分区数
+        """
+        source = self.source_path(statement, freq)
+        stat = os.stat(source)
+        signature = [stat.st_mtime_ns, stat.st_size]
+        manifest_key = f"{statement}/{freq}"
+
+        with self._lock:
+            manifest = self._load_manifest()
+            entry = manifest.get(manifest_key, {})
+            if not force and entry.get("source") == signature and entry.get("format") == self.extension:
+                self._verified[(statement, freq)] = tuple(signature)
+                return 0
+
+            logger.info(f"📥 导入SimFin {manifest_key}: {source}")
+            df = read_statement_csv(source)
+            df = df[df["Ticker"].notna()]
+            # 稳定排序：发布日期相同的行保持原始顺序
+            df = df.sort_values("Publish Date", kind="stable")
+
+            partition_dir = self._partition_dir(statement, freq)
+            os.makedirs(partition_dir, exist_ok=True)
+            old_digests = entry.get("tickers", {}) if entry.get("format") == self.extension else {}
+            new_digests = {}
+            written = 0
+            for ticker, frame in df.groupby("Ticker", sort=False):
+                digest = _frame_digest(frame)
+                new_digests[ticker] = digest
+                path = self._partition_path(statement, freq, ticker)
+                if force or old_digests.get(ticker) != digest or not os.path.exists(path):
+                    self._write_frame(frame, path)
+                    written += 1
+
+            for ticker in set(old_digests) - set(new_digests):
+                try:
+                    os.remove(self._partition_path(statement, freq, ticker))
+                except FileNotFoundError:
+                    pass
+
+            manifest[manifest_key] = {
+                "source": signature,
+                "format": self.extension,
+                "rows": int(len(df)),
+                "tickers": new_digests,
+            }
+            self._save_manifest(manifest)
+            self._verified[(statement, freq)] = tuple(signature)
+            for key in [k for k in self._frames if k[:2] == (statement, freq)]:
+                del self._frames[key]
+
+        logger.info(f"✅ SimFin {manifest_key} 导入完成: {len(new_digests)}只股票，重写{written}个分区")
+        return written
+
+    def _ensure_ingested(self, statement: str, freq: str):
+        """源文件自上次检查后未变化则不做任何事，否则增量导入"""
+        stat = os.stat(self.source_path(statement, freq))
+        if self._verified.get((statement, freq)) != (stat.st_mtime_ns, stat.st_size):
+            self.ingest(statement, freq)
+
+    def load_ticker(self, ticker: str, statement: str, freq: str) -> Optional[pd.DataFrame]:
+        """读取单只股票的全部报表（按发布日期升序），不存在返回None"""
+        self._ensure_ingested(statement, freq)
+        key = (statement, freq, ticker)
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is not None:
+                self._frames.move_to_end(key)
+                return frame
+
+        path = self._partition_path(statement, freq, ticker)
+        if not os.path.exists(path):
+            return None
+        frame = self._read_frame(path)
+
+        with self._lock:
+            self._frames[key] = frame
+            while len(self._frames) > self.max_cached_frames:
+                self._frames.popitem(last=False)
+        return frame
+
+    def get_latest(self, ticker: str, statement: str, freq: str, curr_date: str) -> Optional[pd.Series]:
+        """
+        返回截止 curr_date（含）最近发布的一期报表。
+        同一发布日期有多行时取原文件中最先出现的一行，与按idxmax选取的结果一致
+        """
+        frame = self.load_ticker(ticker, statement, freq)
+        if frame is None or frame.empty:
+            return None
+
+        curr_date_dt = pd.to_datetime(curr_date, utc=True).normalize()
+        publish_dates = frame["Publish Date"].values
+        target = np.datetime64(curr_date_dt.tz_convert(None))
+        end = int(np.searchsorted(publish_dates, target, side="right"))
+        if end == 0:
+            return None
+        first = int(np.searchsorted(publish_dates, publish_dates[end - 1], side="left"))
+        return frame.iloc[first]
+
+    def clear_cache(self):
+        with self._lock:
+            self._frames.clear()
+            self._verified.clear()
+
+
+# 按数据目录区分的全局实例
+_stores: Dict[str, SimFinStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_simfin_store(data_dir: str) -> SimFinStore:
+    """获取指定数据目录的SimFin存储实例"""
+    with _stores_lock:
+        store = _stores.get(data_dir)
+        if store is None:
+            store = SimFinStore(data_dir)
+            _stores[data_dir] = store
+        return store
+
+
+if __name__ == "__main__":
+    from tradingagents.dataflows.config import get_config
+
+    simfin_store = get_simfin_store(get_config()["data_dir"])
+    for statement_name in SIMFIN_STATEMENTS:
+        for frequency in ("annual", "quarterly"):
+            if os.path.exists(simfin_store.source_path(statement_name, frequency)):
+                simfin_store.ingest(statement_name, frequency)
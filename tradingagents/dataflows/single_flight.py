@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+请求合并（single-flight）
+同一缓存键的并发未命中只由第一个调用方访问数据源，其余调用方等待并共享同一结果；
+可选通过Redis或文件锁在多个进程之间互斥，拿到锁后先复查缓存再访问数据源
+"""
+
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+DEFAULT_TIMEOUT = 120.0  # 等待进行中请求的默认超时（秒）
+_POLL_INTERVAL = 0.05
+
+
+class SingleFlightTimeout(TimeoutError):
+    """等待进行中的请求超时"""
+    pass
+
+
+class _Call:
+    """一次进行中的请求"""
+
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class FileFlightLock:
+    """基于锁文件的跨进程锁，适用于共享同一磁盘的多个进程"""
+
+    def __init__(self, lock_dir: str, ttl: float = DEFAULT_TIMEOUT):
+        """
+        Args:
+            lock_dir: 锁文件目录
+            ttl: 锁的最长持有时间，超过后视为持有进程已退出，锁可被抢占
+        """
+        self.lock_dir = Path(lock_dir)
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+
+    def _lock_path(self, key: str) -> Path:
+        safe_key = "".join(c if c.isalnum() or c in "-_." else "_" for c in key)
+        return self.lock_dir / f"{safe_key}.lock"
+
+    def acquire(self, key: str, timeout: float) -> Optional[str]:
+        """获取锁，成功返回令牌，超时返回None"""
+        path = self._lock_path(key)
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                fd = os.open(str(path), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                with os.fdopen(fd, "w") as f:
+                    f.write(token)
+                return token
+            except FileExistsError:
+                try:
+                    if time.time() - path.stat().st_mtime > self.ttl:
+                        logger.warning(f"⚠️ 清理过期的请求锁: {path.name}")
+                        path.unlink()
+                        continue
+                except FileNotFoundError:
+                    continue
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(_POLL_INTERVAL)
+
+    def release(self, key: str, token: str):
+        """释放锁，只删除自己持有的锁文件"""
+        path = self._lock_path(key)
+        try:
+            with open(path, "r") as f:
+                if f.read() != token:
+                    return
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class RedisFlightLock:
+    """基于Redis SET NX PX 的跨进程锁，适用于多台机器共享同一缓存"""
+
+    _RELEASE_SCRIPT = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then "
+        "return redis.call('del', KEYS[1]) else return 0 end"
+    )
+
+    def __init__(self, client, ttl: float = DEFAULT_TIMEOUT, prefix: str = "tradingagents:flight:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def acquire(self, key: str, timeout: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.client.set(self.prefix + key, token, nx=True, px=int(self.ttl * 1000)):
+                return token
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(_POLL_INTERVAL)
+
+    def release(self, key: str, token: str):
+        self.client.eval(self._RELEASE_SCRIPT, 1, self.prefix + key, token)
+
+
+class SingleFlight:
+    """按键合并并发请求"""
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT, process_lock=None):
+        """
+        Args:
+            timeout: 等待进行中请求（或跨进程锁）的超时时间（秒）
+            process_lock: 可选的跨进程锁（FileFlightLock / RedisFlightLock）
+        """
+        self.timeout = timeout
+        self.process_lock = process_lock
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._stats = {"leaders": 0, "shared": 0, "rechecked": 0, "timeouts": 0}
+
+    def do(self, key: str, fn: Callable[..., Any], *args,
+           recheck: Optional[Callable[[], Any]] = None,
+           timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        执行 fn(*args, **kwargs)；同一key已有请求进行中时等待并返回其结果
+
+        Args:
+            key: 合并键，通常为规范化后的缓存键
+            fn: 实际访问数据源的函数
+            recheck: 拿到跨进程锁后调用的缓存复查函数，返回非None时直接使用其结果
+            timeout: 本次等待超时，None使用实例默认值
+
+        Raises:
+            SingleFlightTimeout: 等待超时
+            发起请求的调用方抛出的异常会同样抛给所有等待方
+        """
+        timeout = self.timeout if timeout is None else timeout
+
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _Call()
+                self._calls[key] = call
+                self._stats["leaders"] += 1
+            else:
+                call.waiters += 1
+                self._stats["shared"] += 1
+
+        if not is_leader:
+            logger.debug(f"⏳ 等待进行中的请求: {key}")
+            if not call.event.wait(timeout):
+                self._stats["timeouts"] += 1
+                raise SingleFlightTimeout(f"等待请求超时({timeout}s): {key}")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run(key, fn, args, kwargs, recheck, timeout)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            if call.waiters:
+                logger.info(f"🔗 {call.waiters} 个并发请求共享了结果: {key}")
+            call.event.set()
+
+    def _run(self, key, fn, args, kwargs, recheck, timeout):
+        if self.process_lock is None:
+            return fn(*args, **kwargs)
+
+        token = self.process_lock.acquire(key, timeout)
+        if token is None:
+            self._stats["timeouts"] += 1
+            raise SingleFlightTimeout(f"等待跨进程请求锁超时({timeout}s): {key}")
+        try:
+            if recheck is not None:
+                cached = recheck()
+                if cached is not None:
+                    self._stats["rechecked"] += 1
+                    return cached
+            return fn(*args, **kwargs)
+        finally:
+            try:
+                self.process_lock.release(key, token)
+            except Exception as e:
+                logger.warning(f"⚠️ 释放请求锁失败 {key}: {e}")
+
+    def in_flight(self) -> int:
+        """当前进行中的请求数"""
+        with self._lock:
+            return len(self._calls)
+
+    def get_stats(self) -> Dict[str, int]:
+        """发起请求数、共享结果的等待数、锁后复查命中数与超时数"""
+        with self._lock:
+            return dict(self._stats)
+
+
+def make_flight_key(*parts: Any) -> str:
+    """由市场、代码、日期等组成规范化的合并键"""
+    return ":".join(str(p).strip().upper() for p in parts if p is not None)
+
+
+def _create_process_lock(ttl: float):
+    """根据 SINGLE_FLIGHT_LOCK 环境变量创建跨进程锁: none / file / redis"""
+    backend = os.getenv("SINGLE_FLIGHT_LOCK", "none").lower()
+    if backend == "file":
+        lock_dir = os.getenv("SINGLE_FLIGHT_LOCK_DIR",
+                             str(Path(__file__).parent / "data_cache" / "locks"))
+        return FileFlightLock(lock_dir, ttl=ttl)
+    if backend == "redis":
+        from tradingagents.config.database_manager import get_redis_client
+        client = get_redis_client()
+        if client is not None:
+            return RedisFlightLock(client, ttl=ttl)
+        logger.warning("⚠️ Redis不可用，请求合并仅在进程内生效")
+    return None
+
+
+# 全局实例
+_single_flight = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """获取全局请求合并实例"""
+    global _single_flight
+    if _single_flight is None:
+        with _single_flight_lock:
+            if _single_flight is None:
+                timeout = float(os.getenv("SINGLE_FLIGHT_TIMEOUT", DEFAULT_TIMEOUT))
+                _single_flight = SingleFlight(timeout=timeout, process_lock=_create_process_lock(timeout))
+    return _single_flight
@@ -1,9 +1,91 @@
 import pandas as pd
 import yfinance as yf
 from stockstats import wrap
-from typing import Annotated
+from typing import Annotated, List, Union
 import os
+import threading
 from .config import get_config
+from .price_frame_store import downcast_floats, get_price_frame_store
+
+
+NOT_TRADING_DAY = "N/A: Not a trading day (weekend or holiday)"
+
+# stockstats在首次访问时原地添加指标列，加锁避免并发分析线程重复计算
+_indicator_lock = threading.Lock()
+
+
+def _price_source(online: bool) -> str:
+    return "yfin_online" if online else "yfin_offline"
+
+
+def _offline_data_file(symbol: str, data_dir: str) -> str:
+    return os.path.join(data_dir, f"{symbol}-YFin-data-2015-01-01-2025-03-25.csv")
+
+
+def _online_data_file(symbol: str) -> str:
+    """返回在线数据的本地缓存文件，不存在时先从yfinance下载"""
+    # Get today's date as YYYY-mm-dd to add to cache
+    today_date = pd.Timestamp.today()
+    start_date = (today_date - pd.DateOffset(years=15)).strftime("%Y-%m-%d")
+    end_date = today_date.strftime("%Y-%m-%d")
+
+    # Get config and ensure cache directory exists
+    config = get_config()
+    os.makedirs(config["data_cache_dir"], exist_ok=True)
+
+    data_file = os.path.join(
+        config["data_cache_dir"],
+        f"{symbol}-YFin-data-{start_date}-{end_date}.csv",
+    )
+
+    if not os.path.exists(data_file):
+        data = yf.download(
+            symbol,
+            start=start_date,
+            end=end_date,
+            multi_level_index=False,
+            progress=False,
+            auto_adjust=True,
+        )
+        data = data.reset_index()
+        data.to_csv(data_file, index=False)
+
+    return data_file
+
+
+def get_wrapped_frame(symbol: str, data_dir: str, online: bool = False) -> pd.DataFrame:
+    """
+    获取已用stockstats包装的价格数据，每个 (symbol, source) 只读取和包装一次
+
+    原始行情来自共享的价格数据存储，包装后的DataFrame作为派生条目存回同一存储，
+    已计算过的指标列随之保留，因此同一指标在多次调用之间只计算一次。
+    """
+    store = get_price_frame_store()
+    source = _price_source(online)
+    if not online:
+        data_file = _offline_data_file(symbol, data_dir)
+        if not os.path.exists(data_file):
+            raise Exception("Stockstats fail: Yahoo Finance data not fetched yet!")
+    else:
+        data_file = _online_data_file(symbol)
+
+    def wrap_price_frame(path: str) -> pd.DataFrame:
+        # 指标计算使用float32副本以节省内存，原始行情保持源数据精度
+        df = wrap(downcast_floats(store.get_frame(symbol, source, path).copy()))
+        df["DateKey"] = df.index.strftime("%Y-%m-%d")
+        return df
+
+    return store.get_frame(symbol, f"{source}:stockstats", data_file, loader=wrap_price_frame)
+
+
+def _ensure_indicators(df: pd.DataFrame, indicators: List[str], symbol: str, online: bool):
+    with _indicator_lock:
+        missing = [indicator for indicator in indicators if indicator not in df.columns]
+        for indicator in missing:
+            df[indicator]  # trigger stockstats to calculate the indicator
+    if missing:
+        # 新增的指标列计入内存预算
+        get_price_frame_store().resize(symbol, f"{_price_source(online)}:stockstats")
 
 
 class StockstatsUtils:
@@ -25,63 +107,52 @@ class StockstatsUtils:
             "whether to use online tools to fetch data or offline tools. If True, will use online tools.",
         ] = False,
     ):
-        df = None
-        data = None
-
-        if not online:
-            try:
-                data = pd.read_csv(
-                    os.path.join(
-                        data_dir,
-                        f"{symbol}-YFin-data-2015-01-01-2025-03-25.csv",
-                    )
-                )
-                df = wrap(data)
-            except FileNotFoundError:
-                raise Exception("Stockstats fail: Yahoo Finance data not fetched yet!")
-        else:
-            # Get today's date as YYYY-mm-dd to add to cache
-            today_date = pd.Timestamp.today()
-            curr_date = pd.to_datetime(curr_date)
-
-            end_date = today_date
-            start_date = today_date - pd.DateOffset(years=15)
-            start_date = start_date.strftime("%Y-%m-%d")
-            end_date = end_date.strftime("%Y-%m-%d")
-
-            # Get config and ensure cache directory exists
-            config = get_config()
-            os.makedirs(config["data_cache_dir"], exist_ok=True)
-
-            data_file = os.path.join(
-                config["data_cache_dir"],
-                f"{symbol}-YFin-data-{start_date}-{end_date}.csv",
-            )
-
-            if os.path.exists(data_file):
-                data = pd.read_csv(data_file)
-                data["Date"] = pd.to_datetime(data["Date"])
-            else:
-                data = yf.download(
-                    symbol,
-                    start=start_date,
-                    end=end_date,
-                    multi_level_index=False,
-                    progress=False,
-                    auto_adjust=True,
-                )
-                data = data.reset_index()
-                data.to_csv(data_file, index=False)
-
-            df = wrap(data)
-            df["Date"] = df["Date"].dt.strftime("%Y-%m-%d")
-            curr_date = curr_date.strftime("%Y-%m-%d")
-
-        df[indicator]  # trigger stockstats to calculate the indicator
-        matching_rows = df[df["Date"].str.startswith(curr_date)]
-
-        if not matching_rows.empty:
-            indicator_value = matching_rows[indicator].values[0]
+        df = get_wrapped_frame(symbol, data_dir, online=online)
+        curr_date = pd.to_datetime(curr_date).strftime("%Y-%m-%d")
+
+        _ensure_indicators(df, [indicator], symbol, online)
+        pos = df.index.searchsorted(pd.Timestamp(curr_date), side="left")
+
+        if pos < len(df) and df["DateKey"].iat[pos] == curr_date:
+            indicator_value = df[indicator].values[pos]
             return indicator_value
         else:
-            return "N/A: Not a trading day (weekend or holiday)"
+            return NOT_TRADING_DAY
+
+    @staticmethod
+    def get_stock_stats_window(
+        symbol: Annotated[str, "ticker symbol for the company"],
+        indicators: Annotated[
+            Union[str, List[str]],
+            "one or more quantitative indicators based off of the stock data for the company",
+        ],
+        start_date: Annotated[str, "window start date, YYYY-mm-dd (inclusive)"],
+        end_date: Annotated[str, "window end date, YYYY-mm-dd (inclusive)"],
+        data_dir: Annotated[
+            str,
+            "directory where the stock data is stored.",
+        ],
+        online: Annotated[
+            bool,
+            "whether to use online tools to fetch data or offline tools. If True, will use online tools.",
+        ] = False,
+    ) -> pd.DataFrame:
+        """
+        一次性获取日期窗口内的一个或多个指标
+
+        价格数据只加载一次，每个指标列只计算一次，窗口通过有序日期索引二分查找切片。
+
+        Returns:
+            pd.DataFrame: 以交易日（YYYY-mm-dd，升序）为索引，每个指标一列
+        """
+        if isinstance(indicators, str):
+            indicators = [indicators]
+
+        df = get_wrapped_frame(symbol, data_dir, online=online)
+        _ensure_indicators(df, indicators, symbol, online)
+
+        start = df.index.searchsorted(pd.Timestamp(start_date), side="left")
+        stop = df.index.searchsorted(pd.Timestamp(end_date), side="right")
+        window = df.iloc[start:stop][["DateKey"] + list(indicators)]
+        window = window.drop_duplicates(subset="DateKey", keep="first")
+        return window.set_index("DateKey")
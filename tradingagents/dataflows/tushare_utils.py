@@ -20,6 +20,10 @@ warnings.filterwarnings('ignore')
 # 导入统一日志系统
 from tradingagents.utils.logging_init import get_logger
 
+from .ohlcv_store import get_ohlcv_store
+from .security_master import get_security_master
+from .price_adjustment import ADJUST_FORWARD, adjust_prices
+
 # 导入缓存管理器
 try:
     from .cache_manager import get_cache
@@ -113,6 +117,7 @@ class TushareProvider:
                         # 检查是否为DataFrame且不为空
                         if hasattr(cached_data, 'empty') and not cached_data.empty:
                             logger.info(f"📦 从缓存获取股票列表: {len(cached_data)}条")
+                            self._update_security_master(cached_data)
                             return cached_data
                         elif isinstance(cached_data, str) and cached_data.strip():
                             logger.info(f"📦 从缓存获取股票列表: 字符串格式")
@@ -129,6 +134,8 @@ class TushareProvider:
             
             if stock_list is not None and not stock_list.empty:
                 logger.info(f"✅ 获取股票列表成功: {len(stock_list)}条")
+
+                self._update_security_master(stock_list)
                 
                 # 缓存数据
                 if self.enable_cache and self.cache_manager:
@@ -151,6 +158,15 @@ class TushareProvider:
             logger.error(f"❌ 获取股票列表失败: {e}")
             return pd.DataFrame()
     
+    @staticmethod
+    def _update_security_master(stock_list: pd.DataFrame):
+        """整表写入证券主数据，之后的单只股票信息查询和搜索都在本地完成"""
+        try:
+            records = stock_list.rename(columns={'market': 'exchange'}).assign(code=stock_list['ts_code'])
+            get_security_master().upsert(records.to_dict('records'), source='tushare')
+        except Exception as e:
+            logger.warning(f"⚠️ 证券主数据更新失败: {e}")
+
     def get_stock_daily(self, symbol: str, start_date: str = None, end_date: str = None) -> pd.DataFrame:
         """
         获取股票日线数据
@@ -204,12 +220,16 @@ class TushareProvider:
             api_start_time = time.time()
             logger.info(f"🔍 [Tushare详细日志] API调用开始时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')}")
 
-            # 获取日线数据
+            # 获取日线数据：原始K线经区间存储获取，只请求本地未覆盖的日期缺口
             try:
-                data = self.api.daily(
-                    ts_code=ts_code,
-                    start_date=start_date,
-                    end_date=end_date
+                data = get_ohlcv_store().get_bars(
+                    "tushare", ts_code, start_date, end_date,
+                    fetch=lambda gap_start, gap_end: self.api.daily(
+                        ts_code=ts_code,
+                        start_date=gap_start.replace('-', ''),
+                        end_date=gap_end.replace('-', '')
+                    ),
+                    date_column='trade_date'
                 )
                 api_duration = time.time() - api_start_time
                 logger.info(f"🔍 [Tushare详细日志] API调用完成，耗时: {api_duration:.3f}秒")
@@ -292,6 +312,7 @@ class TushareProvider:
 
         Tushare的daily接口返回除权价格，在除权日会出现价格跳跃。
         使用pct_chg（涨跌幅）重新计算连续的前复权价格，确保价格序列的连续性。
+        计算由 price_adjustment.adjust_prices 向量化完成。
 
         Args:
             data: 包含除权价格和pct_chg的DataFrame
@@ -304,49 +325,7 @@ class TushareProvider:
             return data
 
         try:
-            # 复制数据避免修改原始数据
-            adjusted_data = data.copy()
-
-            # 确保数据按日期排序
-            adjusted_data = adjusted_data.sort_values('trade_date').reset_index(drop=True)
-
-            # 保存原始价格列（用于对比）
-            adjusted_data['close_raw'] = adjusted_data['close'].copy()
-            adjusted_data['open_raw'] = adjusted_data['open'].copy()
-            adjusted_data['high_raw'] = adjusted_data['high'].copy()
-            adjusted_data['low_raw'] = adjusted_data['low'].copy()
-
-            # 从最新的收盘价开始，向前计算前复权价格
-            # 使用最后一天的收盘价作为基准
-            latest_close = float(adjusted_data.iloc[-1]['close'])
-
-            # 计算前复权收盘价
-            adjusted_closes = [latest_close]
-
-            # 从倒数第二天开始向前计算
-            for i in range(len(adjusted_data) - 2, -1, -1):
-                pct_change = float(adjusted_data.iloc[i + 1]['pct_chg']) / 100.0  # 转换为小数
-
-                # 前一天的前复权收盘价 = 今天的前复权收盘价 / (1 + 今天的涨跌幅)
-                prev_close = adjusted_closes[0] / (1 + pct_change)
-                adjusted_closes.insert(0, prev_close)
-
-            # 更新收盘价
-            adjusted_data['close'] = adjusted_closes
-
-            # 计算其他价格的调整比例
-            for i in range(len(adjusted_data)):
-                if adjusted_data.iloc[i]['close_raw'] != 0:  # 避免除零
-                    # 计算调整比例
-                    adjustment_ratio = adjusted_data.iloc[i]['close'] / adjusted_data.iloc[i]['close_raw']
-
-                    # 应用调整比例到其他价格
-                    adjusted_data.iloc[i, adjusted_data.columns.get_loc('open')] = adjusted_data.iloc[i]['open_raw'] * adjustment_ratio
-                    adjusted_data.iloc[i, adjusted_data.columns.get_loc('high')] = adjusted_data.iloc[i]['high_raw'] * adjustment_ratio
-                    adjusted_data.iloc[i, adjusted_data.columns.get_loc('low')] = adjusted_data.iloc[i]['low_raw'] * adjustment_ratio
-
-            # 添加标记表示这是前复权价格
-            adjusted_data['price_type'] = 'forward_adjusted'
+            adjusted_data = adjust_prices(data, ADJUST_FORWARD)
 
             logger.info(f"✅ 前复权价格计算完成，数据条数: {len(adjusted_data)}")
             logger.info(f"📊 价格调整范围: 最早调整比例 {adjusted_data.iloc[0]['close'] / adjusted_data.iloc[0]['close_raw']:.4f}")
@@ -368,6 +347,20 @@ class TushareProvider:
         Returns:
             Dict: 股票基本信息
         """
+        record = get_security_master().lookup(symbol)
+        if record is not None and record['market'] == 'china':
+            logger.debug(f"⚡ [证券主数据] 本地命中: {symbol} - {record['name']}")
+            return {
+                'symbol': symbol,
+                'ts_code': record.get('ts_code', ''),
+                'name': record['name'],
+                'area': record.get('area', ''),
+                'industry': record.get('industry', ''),
+                'market': record.get('exchange', ''),
+                'list_date': record.get('list_date', ''),
+                'source': record.get('source', 'tushare')
+            }
+
         if not self.connected:
             return {'symbol': symbol, 'name': f'股票{symbol}', 'source': 'unknown'}
         
@@ -389,6 +382,11 @@ class TushareProvider:
             
             if basic_info is not None and not basic_info.empty:
                 info = basic_info.iloc[0]
+                get_security_master().upsert([{
+                    'code': info['ts_code'], 'ts_code': info['ts_code'], 'name': info['name'],
+                    'area': info.get('area'), 'industry': info.get('industry'),
+                    'exchange': info.get('market'), 'list_date': info.get('list_date')
+                }], source='tushare')
                 return {
                     'symbol': symbol,
                     'ts_code': info['ts_code'],
@@ -524,7 +522,21 @@ class TushareProvider:
             DataFrame: 搜索结果
         """
         try:
-            stock_list = self.get_stock_list()
+            security_master = get_security_master()
+            stock_list = None
+            if len(security_master) == 0:
+                # 首次搜索时拉取一次股票列表填充证券主数据
+                stock_list = self.get_stock_list()
+
+            if len(security_master) > 0:
+                results = pd.DataFrame(security_master.search(keyword, limit=50, market='china'))
+                if not results.empty:
+                    results = results.drop(columns=['market']).rename(columns={'code': 'symbol', 'exchange': 'market'})
+                logger.debug(f"🔍 搜索'{keyword}'找到{len(results)}只股票")
+                return results
+
+            if stock_list is None:
+                stock_list = self.get_stock_list()
             
             if stock_list.empty:
                 return pd.DataFrame()
@@ -17,10 +17,22 @@ DEFAULT_CONFIG = {
     "max_debate_rounds": 1,
     "max_risk_discuss_rounds": 1,
     "max_recur_limit": 100,
+    # 分析师并行执行：选中的分析师同时运行，全部完成后进入研究员辩论
+    "parallel_analysts": os.getenv("PARALLEL_ANALYSTS_ENABLED", "false").lower() == "true",
     # Tool settings - 从环境变量读取，提供默认值
     "online_tools": os.getenv("ONLINE_TOOLS_ENABLED", "false").lower() == "true",
     "online_news": os.getenv("ONLINE_NEWS_ENABLED", "true").lower() == "true", 
     "realtime_data": os.getenv("REALTIME_DATA_ENABLED", "false").lower() == "true",
+    # 数据源速率限制（令牌桶）：rate为每秒请求数，capacity为允许的突发请求数
+    # 可用 RATE_LIMIT_<NAME>_RATE / RATE_LIMIT_<NAME>_BURST 环境变量覆盖，如 RATE_LIMIT_YFINANCE_HK_RATE
+    "rate_limits": {
+        "tushare": {"rate": 2.0, "capacity": 1},
+        "finnhub": {"rate": 1.0, "capacity": 1},
+        "yfinance": {"rate": 1.0, "capacity": 1},
+        "yfinance:hk": {"rate": 0.5, "capacity": 1},
+        "akshare:hk_info": {"rate": 0.2, "capacity": 1},
+        "google_news": {"rate": 0.25, "capacity": 1},
+    },
 
     # Note: Database and cache configuration is now managed by .env file and config.database_manager
     # No database/cache settings in default config to avoid configuration conflicts
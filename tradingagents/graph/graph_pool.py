@@ -0,0 +1,243 @@
+# TradingAgents/graph/graph_pool.py
+
+"""
+TradingAgentsGraph 实例池
+构建一个图要创建LLM客户端、五个记忆集合、Toolkit并编译LangGraph，耗时数秒。
+实例池按 (分析师列表, 配置) 复用已编译的图：每次分析借出一个空闲实例并重置单次运行状态，
+用完归还。支持总容量上限、空闲过期淘汰和同一配置的并发上限
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+# 构建图时从环境变量读取的连接配置：API密钥、端点地址和数据库/记忆开关，变化后需要重建图
+_ENV_KEY_SUFFIXES = ("_API_KEY", "_TOKEN", "_BASE_URL", "_HOST", "_PORT", "_ENABLED")
+
+
+def env_fingerprint() -> str:
+    """影响图构建的环境变量的摘要，只参与哈希，不保存明文密钥"""
+    items = sorted((name, value) for name, value in os.environ.items() if name.endswith(_ENV_KEY_SUFFIXES))
+    return hashlib.sha256(json.dumps(items).encode("utf-8")).hexdigest()
+
+
+def make_graph_key(selected_analysts: Sequence[str], config: Dict[str, Any], debug: bool = False) -> str:
+    """
+    分析师顺序、debug和完整配置（供应商、模型、研究深度对应的辩论轮数等）决定图的结构；
+    图中的LLM客户端在构建时读取API密钥和端点，因此相关环境变量变化后也使用新的实例
+    """
+    payload = json.dumps(
+        {"analysts": list(selected_analysts), "debug": debug, "config": config, "env": env_fingerprint()},
+        sort_keys=True, default=str, ensure_ascii=False,
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _build_graph(selected_analysts: List[str], config: Dict[str, Any], debug: bool):
+    from .trading_graph import TradingAgentsGraph
+    return TradingAgentsGraph(selected_analysts, config=config, debug=debug)
+
+
+class GraphPool:
+    """按配置复用 TradingAgentsGraph 的线程安全实例池"""
+
+    def __init__(self, max_size: int = 4, max_per_key: int = 2, idle_ttl: float = 1800,
+                 factory: Optional[Callable[[List[str], Dict[str, Any], bool], Any]] = None):
+        """
+        Args:
+            max_size: 池中保留的实例总数上限（含借出的），0 表示不保留，每次都新建
+            max_per_key: 同一配置同时借出的实例数上限，超过时等待归还，0 表示不限
+            idle_ttl: 空闲超过该秒数的实例被淘汰
+            factory: factory(分析师列表, 配置, debug) -> 图实例，默认构建 TradingAgentsGraph
+        """
+        self.max_size = max_size
+        self.max_per_key = max_per_key
+        self.idle_ttl = idle_ttl
+        self._factory = factory or _build_graph
+        self._idle: Dict[str, List[Tuple[Any, float]]] = {}
+        self._in_use: Dict[str, int] = {}
+        self._owners: Dict[int, str] = {}
+        self._total = 0
+        self._cond = threading.Condition()
+        self._stats = {"hits": 0, "builds": 0, "evictions": 0, "waits": 0, "discarded": 0, "overflow_builds": 0}
+
+    def _evict_locked(self, key: str, index: int, reason: str):
+        self._idle[key].pop(index)
+        if not self._idle[key]:
+            del self._idle[key]
+        self._total -= 1
+        self._stats["evictions"] += 1
+        logger.debug(f"🗑️ [图实例池] 淘汰空闲实例({reason}): {key[:8]}")
+
+    def _evict_expired_locked(self):
+        cutoff = time.monotonic() - self.idle_ttl
+        for key in list(self._idle):
+            for index in range(len(self._idle[key]) - 1, -1, -1):
+                if self._idle[key][index][1] < cutoff:
+                    self._evict_locked(key, index, "过期")
+
+    def _evict_lru_locked(self) -> bool:
+        """淘汰最久未用的空闲实例，没有空闲实例时返回False"""
+        oldest = None
+        for key, entries in self._idle.items():
+            for index, (_, last_used) in enumerate(entries):
+                if oldest is None or last_used < oldest[2]:
+                    oldest = (key, index, last_used)
+        if oldest is None:
+            return False
+        self._evict_locked(oldest[0], oldest[1], "容量")
+        return True
+
+    def acquire(self, selected_analysts: Sequence[str], config: Dict[str, Any], debug: bool = False,
+                timeout: Optional[float] = None, on_wait: Optional[Callable[[], None]] = None):
+        """
+        借出一个与配置匹配的图实例，没有空闲实例时新建；必须用 release 归还
+
+        Args:
+            on_wait: 因并发上限开始等待时调用一次（例如向用户报告排队）
+
+        Raises:
+            TimeoutError: 同一配置的并发已达上限且在timeout秒内没有实例归还
+        """
+        key = make_graph_key(selected_analysts, config, debug)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        graph = None
+        with self._cond:
+            self._evict_expired_locked()
+            while True:
+                if self._idle.get(key):
+                    graph, _ = self._idle[key].pop()
+                    if not self._idle[key]:
+                        del self._idle[key]
+                    self._stats["hits"] += 1
+                    break
+                if self.max_per_key <= 0 or self._in_use.get(key, 0) < self.max_per_key:
+                    # 为新实例腾出位置；借出中的实例无法淘汰，超出容量的实例在归还时丢弃
+                    while self._total >= self.max_size and self._evict_lru_locked():
+                        pass
+                    self._total += 1
+                    self._stats["builds"] += 1
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"图实例池等待超时: 同一配置已有{self.max_per_key}个分析在运行")
+                if on_wait is not None:
+                    on_wait()
+                    on_wait = None
+                self._stats["waits"] += 1
+                logger.info(f"⏳ [图实例池] 同一配置的并发已达上限({self.max_per_key})，等待实例归还...")
+                self._cond.wait(remaining)
+            self._in_use[key] = self._in_use.get(key, 0) + 1
+
+        if graph is None:
+            logger.info(f"🔧 [图实例池] 构建新的分析图: 分析师={list(selected_analysts)}")
+            try:
+                graph = self._factory(list(selected_analysts), dict(config), debug)
+            except Exception:
+                with self._cond:
+                    self._in_use[key] -= 1
+                    self._total -= 1
+                    self._cond.notify_all()
+                raise
+        else:
+            logger.info(f"♻️ [图实例池] 复用已编译的分析图: 分析师={list(selected_analysts)}")
+
+        reset = getattr(graph, "reset_for_run", None)
+        if reset is not None:
+            reset()
+        with self._cond:
+            self._owners[id(graph)] = key
+        return graph
+
+    def release(self, graph):
+        """归还借出的实例"""
+        with self._cond:
+            key = self._owners.pop(id(graph), None)
+            if key is None:
+                return
+            self._in_use[key] -= 1
+            if not self._in_use[key]:
+                del self._in_use[key]
+            if self._total > self.max_size:
+                self._total -= 1
+                self._stats["discarded"] += 1
+            else:
+                self._idle.setdefault(key, []).append((graph, time.monotonic()))
+            self._cond.notify_all()
+
+    @contextmanager
+    def checkout(self, selected_analysts: Sequence[str], config: Dict[str, Any], debug: bool = False,
+                 timeout: Optional[float] = None, on_wait: Optional[Callable[[], None]] = None,
+                 build_on_timeout: bool = False):
+        """
+        with pool.checkout(analysts, config) as graph: graph.propagate(...)
+
+        build_on_timeout 为真时，等待超时后新建一个不入池的实例，而不是抛出 TimeoutError
+        """
+        try:
+            graph = self.acquire(selected_analysts, config, debug, timeout, on_wait)
+        except TimeoutError as e:
+            if not build_on_timeout:
+                raise
+            logger.warning(f"⚠️ [图实例池] {e}，新建不入池的分析图")
+            with self._cond:
+                self._stats["overflow_builds"] += 1
+            graph = self._factory(list(selected_analysts), dict(config), debug)
+        try:
+            yield graph
+        finally:
+            self.release(graph)
+
+    def evict_idle(self):
+        """立即淘汰过期的空闲实例"""
+        with self._cond:
+            self._evict_expired_locked()
+
+    def clear(self):
+        """丢弃所有空闲实例（例如修改了API密钥或模型配置后）"""
+        with self._cond:
+            for key in list(self._idle):
+                while key in self._idle:
+                    self._evict_locked(key, 0, "清空")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                **self._stats,
+                "idle": sum(len(entries) for entries in self._idle.values()),
+                "in_use": sum(self._in_use.values()),
+                "total": self._total,
+                "max_size": self.max_size,
+                "max_per_key": self.max_per_key,
+            }
+
+
+# 全局实例
+_graph_pool: Optional[GraphPool] = None
+_graph_pool_lock = threading.Lock()
+
+
+def get_graph_pool() -> GraphPool:
+    """获取全局图实例池，GRAPH_POOL_ENABLED=false 时每次分析都新建图"""
+    global _graph_pool
+    if _graph_pool is None:
+        with _graph_pool_lock:
+            if _graph_pool is None:
+                if os.getenv("GRAPH_POOL_ENABLED", "true").lower() == "true":
+                    _graph_pool = GraphPool(
+                        max_size=int(os.getenv("GRAPH_POOL_MAX_SIZE", "4")),
+                        max_per_key=int(os.getenv("GRAPH_POOL_MAX_PER_KEY", "2")),
+                        idle_ttl=float(os.getenv("GRAPH_POOL_IDLE_TTL", "1800")),
+                    )
+                else:
+                    _graph_pool = GraphPool(max_size=0, max_per_key=0)
+    return _graph_pool
@@ -2,6 +2,7 @@
 
 from typing import Dict, Any
 from langchain_openai import ChatOpenAI
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import END, StateGraph, START
 from langgraph.prebuilt import ToolNode
 
@@ -15,6 +16,14 @@ from .conditional_logic import ConditionalLogic
 from tradingagents.utils.logging_init import get_logger
 logger = get_logger("default")
 
+# 每个分析师写入的报告字段（并行模式下各分支只回写自己的报告）
+ANALYST_REPORT_KEYS = {
+    "market": "market_report",
+    "social": "sentiment_report",
+    "news": "news_report",
+    "fundamentals": "fundamentals_report",
+}
+
 
 class GraphSetup:
     """Handles the setup and configuration of the agent graph."""
@@ -159,13 +168,25 @@ class GraphSetup:
         # Create workflow
         workflow = StateGraph(AgentState)
 
-        # Add analyst nodes to the graph
-        for analyst_type, node in analyst_nodes.items():
-            workflow.add_node(f"{analyst_type.capitalize()} Analyst", node)
-            workflow.add_node(
-                f"Msg Clear {analyst_type.capitalize()}", delete_nodes[analyst_type]
-            )
-            workflow.add_node(f"tools_{analyst_type}", tool_nodes[analyst_type])
+        parallel_analysts = self.config.get("parallel_analysts", False)
+        if parallel_analysts:
+            # 并行模式：每个分析师作为独立分支运行，各自使用私有的消息通道
+            logger.info(f"🔀 分析师并行模式: {selected_analysts}")
+            for analyst_type in selected_analysts:
+                workflow.add_node(
+                    f"{analyst_type.capitalize()} Analyst",
+                    self._create_analyst_branch(
+                        analyst_type, analyst_nodes[analyst_type], tool_nodes[analyst_type]
+                    ),
+                )
+        else:
+            # Add analyst nodes to the graph
+            for analyst_type, node in analyst_nodes.items():
+                workflow.add_node(f"{analyst_type.capitalize()} Analyst", node)
+                workflow.add_node(
+                    f"Msg Clear {analyst_type.capitalize()}", delete_nodes[analyst_type]
+                )
+                workflow.add_node(f"tools_{analyst_type}", tool_nodes[analyst_type])
 
         # Add other nodes
         workflow.add_node("Bull Researcher", bull_researcher_node)
@@ -178,6 +199,50 @@ class GraphSetup:
         workflow.add_node("Risk Judge", risk_manager_node)
 
         # Define edges
+        if parallel_analysts:
+            # 所有分析师同时开始，全部完成后汇合到Bull Researcher
+            branch_names = [f"{analyst_type.capitalize()} Analyst" for analyst_type in selected_analysts]
+            for branch_name in branch_names:
+                workflow.add_edge(START, branch_name)
+            workflow.add_edge(branch_names, "Bull Researcher")
+        else:
+            self._add_sequential_analyst_edges(workflow, selected_analysts)
+
+        self._add_research_and_risk_edges(workflow)
+
+        # Compile and return
+        return workflow.compile()
+
+    def _create_analyst_branch(self, analyst_type, analyst_node, tool_node):
+        """把一个分析师的 分析师→工具→分析师 循环编译为子图，包装成主图中的单个节点。
+
+        子图拥有独立的messages，因此并行分支之间互不干扰；
+        节点只回写该分析师的报告字段，避免并发写入同一状态键。
+        """
+        analyst_name = f"{analyst_type.capitalize()} Analyst"
+        tools_name = f"tools_{analyst_type}"
+        report_key = ANALYST_REPORT_KEYS[analyst_type]
+
+        branch = StateGraph(AgentState)
+        branch.add_node(analyst_name, analyst_node)
+        branch.add_node(tools_name, tool_node)
+        branch.add_edge(START, analyst_name)
+        branch.add_conditional_edges(
+            analyst_name,
+            getattr(self.conditional_logic, f"should_continue_{analyst_type}"),
+            {tools_name: tools_name, f"Msg Clear {analyst_type.capitalize()}": END},
+        )
+        branch.add_edge(tools_name, analyst_name)
+        compiled_branch = branch.compile()
+
+        def run_analyst_branch(state, config: RunnableConfig):
+            result = compiled_branch.invoke(state, config)
+            return {report_key: result.get(report_key, "")}
+
+        return run_analyst_branch
+
+    def _add_sequential_analyst_edges(self, workflow, selected_analysts):
+        """串行模式：分析师依次执行，每个分析师结束后清空消息再交给下一位"""
         # Start with the first analyst
         first_analyst = selected_analysts[0]
         workflow.add_edge(START, f"{first_analyst.capitalize()} Analyst")
@@ -203,7 +268,8 @@ class GraphSetup:
             else:
                 workflow.add_edge(current_clear, "Bull Researcher")
 
-        # Add remaining edges
+    def _add_research_and_risk_edges(self, workflow):
+        """研究员辩论、交易员和风险讨论阶段的连线"""
         workflow.add_conditional_edges(
             "Bull Researcher",
             self.conditional_logic.should_continue_debate,
@@ -248,6 +314,3 @@ class GraphSetup:
         )
 
         workflow.add_edge("Risk Judge", END)
-
-        # Compile and return
-        return workflow.compile()
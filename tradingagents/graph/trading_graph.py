@@ -3,6 +3,7 @@
 import os
 from pathlib import Path
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 from typing import Dict, Any, Tuple, List, Optional
 
@@ -284,6 +285,18 @@ class TradingAgentsGraph:
         # Set up the graph
         self.graph = self.graph_setup.setup_graph(selected_analysts)
 
+    def reset_for_run(self):
+        """Reset per-run state so a pooled instance can serve another analysis.
+
+        The interface and Toolkit configs are process-wide, so they are restored
+        to this graph's config in case another graph changed them in between.
+        """
+        set_config(self.config)
+        self.toolkit.update_config(self.config)
+        self.curr_state = None
+        self.ticker = None
+        self.log_states_dict = {}
+
     def _create_tool_nodes(self) -> Dict[str, ToolNode]:
         """Create tool nodes for different data sources."""
         return {
@@ -418,22 +431,25 @@ class TradingAgentsGraph:
             json.dump(self.log_states_dict, f, indent=4)
 
     def reflect_and_remember(self, returns_losses):
-        """Reflect on decisions and update memory based on returns."""
-        self.reflector.reflect_bull_researcher(
-            self.curr_state, returns_losses, self.bull_memory
-        )
-        self.reflector.reflect_bear_researcher(
-            self.curr_state, returns_losses, self.bear_memory
-        )
-        self.reflector.reflect_trader(
-            self.curr_state, returns_losses, self.trader_memory
-        )
-        self.reflector.reflect_invest_judge(
-            self.curr_state, returns_losses, self.invest_judge_memory
-        )
-        self.reflector.reflect_risk_manager(
-            self.curr_state, returns_losses, self.risk_manager_memory
-        )
+        """Reflect on decisions and update memory based on returns.
+
+        The five reflections are independent (one LLM call and one memory write
+        each), so they run concurrently; the first failure is re-raised.
+        """
+        reflections = [
+            (self.reflector.reflect_bull_researcher, self.bull_memory),
+            (self.reflector.reflect_bear_researcher, self.bear_memory),
+            (self.reflector.reflect_trader, self.trader_memory),
+            (self.reflector.reflect_invest_judge, self.invest_judge_memory),
+            (self.reflector.reflect_risk_manager, self.risk_manager_memory),
+        ]
+        with ThreadPoolExecutor(max_workers=len(reflections)) as executor:
+            futures = [
+                executor.submit(reflect, self.curr_state, returns_losses, memory)
+                for reflect, memory in reflections
+            ]
+            for future in futures:
+                future.result()
 
     def process_signal(self, full_signal, stock_symbol=None):
         """Process a signal to extract the core decision."""
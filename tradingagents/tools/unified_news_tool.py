@@ -9,6 +9,8 @@ import logging
 from datetime import datetime
 import re
 
+from tradingagents.utils.news_dedup import get_near_duplicate_detector
+
 logger = logging.getLogger(__name__)
 
 class UnifiedNewsAnalyzer:
@@ -243,6 +245,11 @@ class UnifiedNewsAnalyzer:
         logger.info(f"[统一新闻工具] 📋 原始新闻内容预览 (前500字符): {news_content[:500]}")
         logger.info(f"[统一新闻工具] 📊 原始内容长度: {len(news_content)} 字符")
         
+        # 合并不同媒体转载的近似重复新闻，减少送入模型的重复内容
+        news_content, removed_sections = get_near_duplicate_detector().deduplicate_sections(news_content)
+        if removed_sections:
+            logger.info(f"[统一新闻工具] 🔁 合并近似重复新闻 {removed_sections} 条，剩余长度: {len(news_content)} 字符")
+        
         # 检测是否为Google/Gemini模型
         is_google_model = any(keyword in model_info.lower() for keyword in ['google', 'gemini', 'gemma'])
         original_length = len(news_content)
@@ -3,10 +3,12 @@
 支持多种过滤策略：规则过滤、语义相似度、本地分类模型
 """
 
+import os
+import threading
 import pandas as pd
 import re
 import logging
-from typing import List, Dict, Tuple, Optional
+from typing import Callable, List, Dict, Tuple, Optional
 from datetime import datetime
 import numpy as np
 
@@ -15,10 +17,73 @@ from .news_filter import NewsRelevanceFilter, create_news_filter, get_company_na
 
 logger = logging.getLogger(__name__)
 
+# 使用轻量级中文模型
+SENTENCE_MODEL_NAME = "paraphrase-multilingual-MiniLM-L12-v2"  # 支持中文的轻量级模型
+CLASSIFICATION_MODEL_NAME = "uer/roberta-base-finetuned-chinanews-chinese"
+
+# 进程内共享的模型和公司查询向量：同一进程多次创建过滤器时不再重复加载模型、重复编码公司查询
+_shared_models: Dict[str, object] = {}
+_company_embeddings: Dict[Tuple[str, str, str], np.ndarray] = {}
+_shared_lock = threading.Lock()
+
+
+def _get_shared_model(model_name: str, loader: Callable[[], object]) -> object:
+    """按模型名加载一次并在进程内共享"""
+    with _shared_lock:
+        model = _shared_models.get(model_name)
+        if model is None:
+            model = loader()
+            _shared_models[model_name] = model
+        return model
+
+
+_news_embedding_cache = None
+_news_embedding_cache_lock = threading.Lock()
+
+
+def _create_news_embedding_store():
+    """
+    新闻向量的持久层，由 NEWS_EMBEDDING_CACHE_BACKEND 配置: none（默认）/ redis。
+    新闻文本几乎不重复，不提供无上限增长的磁盘持久层；Redis持久层按 NEWS_EMBEDDING_CACHE_TTL 过期
+    """
+    if os.getenv("NEWS_EMBEDDING_CACHE_BACKEND", "none").lower() != "redis":
+        return None
+    from tradingagents.agents.utils.embedding_cache import RedisEmbeddingStore
+    from tradingagents.config.database_manager import get_redis_client
+    client = get_redis_client()
+    if client is None:
+        logger.warning("⚠️ Redis不可用，新闻向量缓存仅使用进程内LRU")
+        return None
+    return RedisEmbeddingStore(client, ttl_seconds=int(os.getenv("NEWS_EMBEDDING_CACHE_TTL", "86400")),
+                               prefix="tradingagents:news_embedding:")
+
+
+def _get_news_embedding_cache():
+    """新闻向量/分类结果缓存，独立于记忆模块的全局Embedding缓存，避免大量新闻向量挤出记忆向量"""
+    global _news_embedding_cache
+    if _news_embedding_cache is None:
+        with _news_embedding_cache_lock:
+            if _news_embedding_cache is None:
+                from tradingagents.agents.utils.embedding_cache import EmbeddingCache
+                _news_embedding_cache = EmbeddingCache(
+                    max_entries=int(os.getenv("NEWS_EMBEDDING_CACHE_SIZE", "2048")),
+                    store=_create_news_embedding_store()
+                )
+    return _news_embedding_cache
+
+
 class EnhancedNewsFilter(NewsRelevanceFilter):
     """增强新闻过滤器，集成本地模型和多种过滤策略"""
     
-    def __init__(self, stock_code: str, company_name: str, use_semantic: bool = True, use_local_model: bool = False):
+    # 综合评分权重
+    SCORE_WEIGHTS = {
+        'rule': 0.4,      # 规则过滤权重40%
+        'semantic': 0.35,  # 语义相似度权重35%
+        'classification': 0.25  # 分类模型权重25%
+    }
+    
+    def __init__(self, stock_code: str, company_name: str, use_semantic: bool = True, use_local_model: bool = False,
+                 batch_size: Optional[int] = None):
         """
         初始化增强过滤器
         
@@ -27,10 +92,12 @@ class EnhancedNewsFilter(NewsRelevanceFilter):
             company_name: 公司名称
             use_semantic: 是否使用语义相似度过滤
             use_local_model: 是否使用本地分类模型
+            batch_size: 模型批量推理的批大小，默认读取 NEWS_FILTER_BATCH_SIZE 环境变量（32）
         """
         super().__init__(stock_code, company_name)
         self.use_semantic = use_semantic
         self.use_local_model = use_local_model
+        self.batch_size = max(1, batch_size or int(os.getenv("NEWS_FILTER_BATCH_SIZE", "32")))
         
         # 语义模型相关
         self.sentence_model = None
@@ -55,21 +122,23 @@ class EnhancedNewsFilter(NewsRelevanceFilter):
             try:
                 from sentence_transformers import SentenceTransformer
                 
-                # 使用轻量级中文模型
-                model_name = "paraphrase-multilingual-MiniLM-L12-v2"  # 支持中文的轻量级模型
-                self.sentence_model = SentenceTransformer(model_name)
+                model_name = SENTENCE_MODEL_NAME
+                self.sentence_model = _get_shared_model(model_name, lambda: SentenceTransformer(model_name))
                 
-                # 预计算公司相关的embedding
-                company_texts = [
-                    self.company_name,
-                    f"{self.company_name}股票",
-                    f"{self.company_name}公司",
-                    f"{self.stock_code}",
-                    f"{self.company_name}业绩",
-                    f"{self.company_name}财报"
-                ]
-                
-                self.company_embedding = self.sentence_model.encode(company_texts)
+                # 预计算公司相关的embedding，按 (模型, 股票代码, 公司名称) 缓存
+                cache_key = (model_name, self.stock_code, self.company_name)
+                self.company_embedding = _company_embeddings.get(cache_key)
+                if self.company_embedding is None:
+                    company_texts = [
+                        self.company_name,
+                        f"{self.company_name}股票",
+                        f"{self.company_name}公司",
+                        f"{self.stock_code}",
+                        f"{self.company_name}业绩",
+                        f"{self.company_name}财报"
+                    ]
+                    self.company_embedding = self.sentence_model.encode(company_texts, batch_size=self.batch_size)
+                    _company_embeddings[cache_key] = self.company_embedding
                 logger.info(f"[增强过滤器] ✅ 语义模型加载成功: {model_name}")
                 
             except ImportError:
@@ -91,10 +160,12 @@ class EnhancedNewsFilter(NewsRelevanceFilter):
                 import torch
                 
                 # 使用轻量级中文文本分类模型
-                model_name = "uer/roberta-base-finetuned-chinanews-chinese"
+                model_name = CLASSIFICATION_MODEL_NAME
                 
-                self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-                self.classification_model = AutoModelForSequenceClassification.from_pretrained(model_name)
+                self.tokenizer, self.classification_model = _get_shared_model(model_name, lambda: (
+                    AutoTokenizer.from_pretrained(model_name),
+                    AutoModelForSequenceClassification.from_pretrained(model_name)
+                ))
                 
                 logger.info(f"[增强过滤器] ✅ 分类模型加载成功: {model_name}")
                 
@@ -106,101 +177,162 @@ class EnhancedNewsFilter(NewsRelevanceFilter):
             logger.error(f"[增强过滤器] 本地分类模型初始化失败: {e}")
             self.use_local_model = False
     
-    def calculate_semantic_similarity(self, title: str, content: str) -> float:
+    def _encode_cached(self, namespace: str, texts: List[str],
+                       encode_batch: Callable[[List[str]], np.ndarray]) -> np.ndarray:
         """
-        计算语义相似度评分
+        按文本内容哈希查缓存，只对未命中的文本按 batch_size 分批推理，结果写回缓存
         
         Args:
-            title: 新闻标题
-            content: 新闻内容
+            namespace: 缓存命名空间（模型类型:模型名）
+            texts: 待推理文本
+            encode_batch: 对一批文本推理，返回二维数组（每行一条）
+        """
+        from tradingagents.agents.utils.embedding_cache import make_embedding_key
+        
+        cache = _get_news_embedding_cache()
+        provider, model_name = namespace.split(":", 1)
+        keys = [make_embedding_key(provider, model_name, text) for text in texts]
+        rows: List[Optional[np.ndarray]] = [None] * len(texts)
+        
+        # 同一批中的重复文本只推理一次
+        pending: Dict[str, List[int]] = {}
+        for i, key in enumerate(keys):
+            cached = cache.get(key)
+            if cached is not None:
+                rows[i] = np.asarray(cached, dtype=np.float64)
+            else:
+                pending.setdefault(key, []).append(i)
+        
+        if pending:
+            missing = list(pending.values())
+            logger.debug(f"[增强过滤器] {namespace} 缓存命中 {len(texts) - sum(map(len, missing))}条，"
+                         f"待推理 {len(missing)}条")
+            for start in range(0, len(missing), self.batch_size):
+                batch = missing[start:start + self.batch_size]
+                outputs = np.asarray(encode_batch([texts[positions[0]] for positions in batch]), dtype=np.float64)
+                for positions, output in zip(batch, outputs):
+                    cache.put(keys[positions[0]], output.tolist())
+                    for i in positions:
+                        rows[i] = output
+        
+        return np.vstack(rows) if rows else np.empty((0, 0))
+    
+    def calculate_semantic_similarities(self, titles: List[str], contents: List[str]) -> np.ndarray:
+        """
+        批量计算语义相似度评分
+        
+        Args:
+            titles: 新闻标题
+            contents: 新闻内容（与titles等长）
             
         Returns:
-            float: 语义相似度评分 (0-100)
+            np.ndarray: 语义相似度评分 (0-100)
         """
         if not self.use_semantic or self.sentence_model is None:
-            return 0
+            return np.zeros(len(titles))
         
         try:
             # 组合标题和内容的前200字符
-            text = f"{title} {content[:200]}"
+            texts = [f"{title} {content[:200]}" for title, content in zip(titles, contents)]
+            if not texts:
+                return np.zeros(0)
             
             # 计算文本embedding
-            text_embedding = self.sentence_model.encode([text])
-            
-            # 计算与公司相关文本的相似度
-            similarities = []
-            for company_emb in self.company_embedding:
-                similarity = np.dot(text_embedding[0], company_emb) / (
-                    np.linalg.norm(text_embedding[0]) * np.linalg.norm(company_emb)
-                )
-                similarities.append(similarity)
+            text_embeddings = self._encode_cached(
+                f"sentence_transformers:{SENTENCE_MODEL_NAME}", texts,
+                lambda batch: self.sentence_model.encode(batch, batch_size=self.batch_size))
             
-            # 取最高相似度
-            max_similarity = max(similarities)
+            # 计算与公司相关文本的余弦相似度，取最高相似度
+            company_embedding = np.asarray(self.company_embedding)
+            similarities = (text_embeddings @ company_embedding.T) / np.outer(
+                np.linalg.norm(text_embeddings, axis=1), np.linalg.norm(company_embedding, axis=1))
+            max_similarity = similarities.max(axis=1)
             
             # 转换为0-100评分
-            semantic_score = max(0, min(100, max_similarity * 100))
-            
-            logger.debug(f"[增强过滤器] 语义相似度评分: {semantic_score:.1f}")
-            return semantic_score
+            return np.clip(max_similarity * 100, 0, 100)
             
         except Exception as e:
             logger.error(f"[增强过滤器] 语义相似度计算失败: {e}")
-            return 0
+            return np.zeros(len(titles))
     
-    def classify_news_relevance(self, title: str, content: str) -> float:
+    def calculate_semantic_similarity(self, title: str, content: str) -> float:
         """
-        使用本地模型分类新闻相关性
+        计算语义相似度评分
         
         Args:
             title: 新闻标题
             content: 新闻内容
             
         Returns:
-            float: 分类相关性评分 (0-100)
+            float: 语义相似度评分 (0-100)
+        """
+        semantic_score = float(self.calculate_semantic_similarities([title], [content])[0])
+        logger.debug(f"[增强过滤器] 语义相似度评分: {semantic_score:.1f}")
+        return semantic_score
+    
+    def classify_news_relevance_batch(self, titles: List[str], contents: List[str]) -> np.ndarray:
+        """
+        使用本地模型批量分类新闻相关性
+        
+        Args:
+            titles: 新闻标题
+            contents: 新闻内容（与titles等长）
+            
+        Returns:
+            np.ndarray: 分类相关性评分 (0-100)
         """
         if not self.use_local_model or self.classification_model is None:
-            return 0
+            return np.zeros(len(titles))
         
         try:
             import torch
             
-            # 构建分类文本
-            text = f"{title} {content[:300]}"
+            # 构建分类文本，添加公司信息作为上下文
+            context_texts = [f"关于{self.company_name}({self.stock_code})的新闻: {title} {content[:300]}"
+                             for title, content in zip(titles, contents)]
+            if not context_texts:
+                return np.zeros(0)
             
-            # 添加公司信息作为上下文
-            context_text = f"关于{self.company_name}({self.stock_code})的新闻: {text}"
+            def classify(batch: List[str]) -> np.ndarray:
+                # 分词和编码
+                inputs = self.tokenizer(
+                    batch,
+                    return_tensors="pt",
+                    truncation=True,
+                    padding=True,
+                    max_length=512
+                )
+                
+                # 模型推理，使用softmax获取概率分布
+                with torch.no_grad():
+                    outputs = self.classification_model(**inputs)
+                    return torch.softmax(outputs.logits, dim=-1).numpy()
             
-            # 分词和编码
-            inputs = self.tokenizer(
-                context_text,
-                return_tensors="pt",
-                truncation=True,
-                padding=True,
-                max_length=512
-            )
+            probabilities = self._encode_cached(f"news_classifier:{CLASSIFICATION_MODEL_NAME}",
+                                                context_texts, classify)
             
-            # 模型推理
-            with torch.no_grad():
-                outputs = self.classification_model(**inputs)
-                logits = outputs.logits
-                
-                # 使用softmax获取概率分布
-                probabilities = torch.softmax(logits, dim=-1)
-                
-                # 假设第一个类别是"相关"，第二个是"不相关"
-                # 这里需要根据具体模型调整
-                relevance_prob = probabilities[0][0].item()  # 相关性概率
-                
-                # 转换为0-100评分
-                classification_score = relevance_prob * 100
-                
-                logger.debug(f"[增强过滤器] 分类模型评分: {classification_score:.1f}")
-                return classification_score
+            # 假设第一个类别是"相关"，第二个是"不相关"
+            # 这里需要根据具体模型调整
+            return probabilities[:, 0] * 100
                 
         except Exception as e:
             logger.error(f"[增强过滤器] 本地模型分类失败: {e}")
-            return 0
+            return np.zeros(len(titles))
+    
+    def classify_news_relevance(self, title: str, content: str) -> float:
+        """
+        使用本地模型分类新闻相关性
+        
+        Args:
+            title: 新闻标题
+            content: 新闻内容
+            
+        Returns:
+            float: 分类相关性评分 (0-100)
+        """
+        classification_score = float(self.classify_news_relevance_batch([title], [content])[0])
+        logger.debug(f"[增强过滤器] 分类模型评分: {classification_score:.1f}")
+        return classification_score
     
     def calculate_enhanced_relevance_score(self, title: str, content: str) -> Dict[str, float]:
         """
@@ -234,11 +366,7 @@ class EnhancedNewsFilter(NewsRelevanceFilter):
             scores['classification_score'] = 0
         
         # 4. 综合评分（加权平均）
-        weights = {
-            'rule': 0.4,      # 规则过滤权重40%
-            'semantic': 0.35,  # 语义相似度权重35%
-            'classification': 0.25  # 分类模型权重25%
-        }
+        weights = self.SCORE_WEIGHTS
         
         final_score = (
             weights['rule'] * rule_score +
@@ -270,27 +398,32 @@ class EnhancedNewsFilter(NewsRelevanceFilter):
         
         logger.info(f"[增强过滤器] 开始增强过滤，原始数量: {len(news_df)}条，最低评分阈值: {min_score}")
         
-        filtered_news = []
+        titles, contents = self._get_text_columns(news_df)
+        titles = titles.fillna('').astype(str).tolist()
+        contents = contents.fillna('').astype(str).tolist()
+        count = len(titles)
         
-        for idx, row in news_df.iterrows():
-            title = row.get('新闻标题', row.get('标题', ''))
-            content = row.get('新闻内容', row.get('内容', ''))
-            
-            # 计算增强评分
-            scores = self.calculate_enhanced_relevance_score(title, content)
-            
-            if scores['final_score'] >= min_score:
-                row_dict = row.to_dict()
-                row_dict.update(scores)  # 添加所有评分信息
-                filtered_news.append(row_dict)
-                
-                logger.debug(f"[增强过滤器] 保留新闻 (综合评分: {scores['final_score']:.1f}): {title[:50]}...")
-            else:
-                logger.debug(f"[增强过滤器] 过滤新闻 (综合评分: {scores['final_score']:.1f}): {title[:50]}...")
+        # 整列计算各项评分，模型按批推理
+        scores = pd.DataFrame(index=range(count))
+        scores['rule_score'] = self.score_news(pd.Series(titles), pd.Series(contents)).to_numpy()
+        scores['semantic_score'] = (self.calculate_semantic_similarities(titles, contents)
+                                    if self.use_semantic else np.zeros(count, dtype=np.int64))
+        scores['classification_score'] = (self.classify_news_relevance_batch(titles, contents)
+                                          if self.use_local_model else np.zeros(count, dtype=np.int64))
+        weights = self.SCORE_WEIGHTS
+        scores['final_score'] = (
+            weights['rule'] * scores['rule_score'] +
+            weights['semantic'] * scores['semantic_score'] +
+            weights['classification'] * scores['classification_score']
+        )
+        keep = (scores['final_score'] >= min_score).to_numpy()
+        logger.debug(f"[增强过滤器] 评分完成，保留 {int(keep.sum())}条，过滤 {int((~keep).sum())}条")
         
         # 创建过滤后的DataFrame
-        if filtered_news:
-            filtered_df = pd.DataFrame(filtered_news)
+        if keep.any():
+            filtered_df = news_df[keep].reset_index(drop=True)
+            for column in scores.columns:
+                filtered_df[column] = scores[column].to_numpy()[keep]
             # 按综合评分排序
             filtered_df = filtered_df.sort_values('final_score', ascending=False)
             logger.info(f"[增强过滤器] 增强过滤完成，保留 {len(filtered_df)}条 新闻")
@@ -301,7 +434,8 @@ class EnhancedNewsFilter(NewsRelevanceFilter):
         return filtered_df
 
 
-def create_enhanced_news_filter(ticker: str, use_semantic: bool = True, use_local_model: bool = False) -> EnhancedNewsFilter:
+def create_enhanced_news_filter(ticker: str, use_semantic: bool = True, use_local_model: bool = False,
+                                batch_size: Optional[int] = None) -> EnhancedNewsFilter:
     """
     创建增强新闻过滤器的便捷函数
     
@@ -309,12 +443,13 @@ def create_enhanced_news_filter(ticker: str, use_semantic: bool = True, use_loca
         ticker: 股票代码
         use_semantic: 是否使用语义相似度过滤
         use_local_model: 是否使用本地分类模型
+        batch_size: 模型批量推理的批大小
         
     Returns:
         EnhancedNewsFilter: 配置好的增强过滤器实例
     """
     company_name = get_company_name(ticker)
-    return EnhancedNewsFilter(ticker, company_name, use_semantic, use_local_model)
+    return EnhancedNewsFilter(ticker, company_name, use_semantic, use_local_model, batch_size)
 
 
 # 使用示例
@@ -0,0 +1,201 @@
+"""
+新闻近似重复检测
+对 标题 + 正文开头 做字符n-gram的MinHash签名，用LSH分桶找候选，再按估计的Jaccard相似度确认，
+把不同媒体转载的同一条新闻（如标题后缀不同）聚成一簇，只保留代表条目并记录报道数
+"""
+
+import re
+import unicodedata
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+# Mersenne素数，配合32位crc哈希保证 a*x+b 不溢出uint64
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+# 归一化时去掉空白和标点，只保留文字与数字
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def normalize_news_text(text: str) -> str:
+    """全角转半角、小写，并去掉空白和标点"""
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    return _NON_WORD.sub("", text)
+
+
+@dataclass
+class NewsCluster:
+    """近似重复新闻簇，representative为簇内第一条（即输入顺序中优先级最高的一条）"""
+    representative: Any
+    members: List[Any] = field(default_factory=list)
+
+    @property
+    def size(self) -> int:
+        return len(self.members)
+
+
+class NearDuplicateDetector:
+    """基于MinHash + LSH的新闻近似重复检测器"""
+
+    def __init__(self, threshold: float = 0.6, num_perm: int = 64, bands: int = 16,
+                 shingle_size: int = 3, content_chars: int = 120, seed: int = 1):
+        """
+        Args:
+            threshold: 估计Jaccard相似度不低于该值视为重复
+            num_perm: MinHash签名长度
+            bands: LSH分带数，num_perm需能被整除；带数越多召回越高、候选越多
+            shingle_size: 字符n-gram长度（对中文和英文都适用）
+            content_chars: 参与签名的正文前若干字符
+            seed: 哈希参数的随机种子，固定后签名在进程间可复现
+        """
+        if num_perm % bands:
+            raise ValueError(f"num_perm({num_perm}) 必须能被 bands({bands}) 整除")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.content_chars = content_chars
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 31, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, 1 << 31, size=num_perm).astype(np.uint64)
+
+    def _shingles(self, title: str, content: str) -> set:
+        text = normalize_news_text(title) + normalize_news_text((content or "")[:self.content_chars])
+        n = self.shingle_size
+        if not text:
+            return set()
+        if len(text) <= n:
+            return {text}
+        return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+    def signature(self, title: str, content: str = "") -> Optional[np.ndarray]:
+        """计算MinHash签名；归一化后没有文字的条目无法比较，返回None"""
+        shingles = self._shingles(title, content)
+        if not shingles:
+            return None
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0)
+
+    @staticmethod
+    def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+        """由签名估计Jaccard相似度"""
+        return float(np.count_nonzero(sig_a == sig_b)) / len(sig_a)
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                for band in range(self.bands)]
+
+    def cluster(self, items: Sequence[Any], text_of: Callable[[Any], Tuple[str, str]]) -> List[NewsCluster]:
+        """
+        按输入顺序聚类，每条新闻与已有簇的代表条目比较，返回的簇按代表条目的出现顺序排列
+
+        Args:
+            items: 新闻条目
+            text_of: 从条目取 (标题, 正文)
+        """
+        clusters: List[NewsCluster] = []
+        signatures: List[Optional[np.ndarray]] = []
+        buckets: Dict[Tuple[int, bytes], List[int]] = {}
+
+        for item in items:
+            title, content = text_of(item)
+            signature = self.signature(title, content)
+            if signature is None:
+                # 空标题/纯标点的条目各自成簇，不参与分桶，避免互相误判为重复
+                clusters.append(NewsCluster(representative=item, members=[item]))
+                signatures.append(None)
+                continue
+            band_keys = self._band_keys(signature)
+
+            matched = None
+            candidates = sorted({cid for key in band_keys for cid in buckets.get(key, ())})
+            for cid in candidates:
+                if self.similarity(signature, signatures[cid]) >= self.threshold:
+                    matched = cid
+                    break
+
+            if matched is not None:
+                clusters[matched].members.append(item)
+                continue
+
+            cid = len(clusters)
+            clusters.append(NewsCluster(representative=item, members=[item]))
+            signatures.append(signature)
+            for key in band_keys:
+                buckets.setdefault(key, []).append(cid)
+
+        return clusters
+
+    def deduplicate_frame(self, news_df: pd.DataFrame, count_column: str = "source_count") -> pd.DataFrame:
+        """
+        DataFrame去重：保留每簇第一行，并在count_column记录该簇的条数。
+        标题/正文列兼容 新闻标题/标题 与 新闻内容/内容
+        """
+        if news_df.empty:
+            return news_df
+        title_col = next((c for c in ("新闻标题", "标题", "title") if c in news_df.columns), None)
+        content_col = next((c for c in ("新闻内容", "内容", "content") if c in news_df.columns), None)
+        if title_col is None:
+            return news_df
+
+        titles = news_df[title_col].fillna("").astype(str).tolist()
+        contents = (news_df[content_col].fillna("").astype(str).tolist()
+                    if content_col else [""] * len(news_df))
+        clusters = self.cluster(range(len(news_df)), lambda i: (titles[i], contents[i]))
+
+        result = news_df.iloc[[c.representative for c in clusters]].copy()
+        result[count_column] = [c.size for c in clusters]
+        return result
+
+    def deduplicate_sections(self, text: str, heading: str = "### ") -> Tuple[str, int]:
+        """
+        对Markdown格式的新闻文本去重：以 heading 开头的行开始一条新闻，到下一个任意级别的标题行为止，
+        重复新闻只保留第一条并注明报道数；分组标题、页脚等其他行原样保留。
+
+        Returns:
+            (去重后的文本, 移除的段落数)
+        """
+        lines = text.split("\n")
+        starts = [i for i, line in enumerate(lines) if line.startswith(heading)]
+        if len(starts) < 2:
+            return text, 0
+
+        spans = []
+        for start in starts:
+            end = next((i for i in range(start + 1, len(lines)) if lines[i].startswith("#")), len(lines))
+            spans.append((start, end))
+        clusters = self.cluster(
+            spans, lambda span: (lines[span[0]][len(heading):], "\n".join(lines[span[0] + 1:span[1]])))
+
+        output = list(lines)
+        dropped = set()
+        for c in clusters:
+            if c.size > 1:
+                start = c.representative[0]
+                output[start] = f"{lines[start]}（{c.size}家媒体报道）"
+            for start, end in c.members[1:]:
+                dropped.update(range(start, end))
+        output = [line for i, line in enumerate(output) if i not in dropped]
+        return "\n".join(output), len(spans) - len(clusters)
+
+
+_default_detector: Optional[NearDuplicateDetector] = None
+
+
+def get_near_duplicate_detector() -> NearDuplicateDetector:
+    """获取默认参数的全局检测器（无状态，可在线程间共享）"""
+    global _default_detector
+    if _default_detector is None:
+        _default_detector = NearDuplicateDetector()
+    return _default_detector
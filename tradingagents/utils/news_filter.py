@@ -3,12 +3,15 @@
 用于过滤与特定股票/公司不相关的新闻，提高新闻分析质量
 """
 
+import numpy as np
 import pandas as pd
 import re
 from typing import List, Dict, Tuple
 from datetime import datetime
 import logging
 
+from tradingagents.utils.news_dedup import get_near_duplicate_detector
+
 logger = logging.getLogger(__name__)
 
 class NewsRelevanceFilter:
@@ -48,6 +51,112 @@ class NewsRelevanceFilter:
             '资产重组', '借壳上市', '退市', '摘帽', 'ST'
         ]
     
+    def _get_keyword_matcher(self):
+        """
+        编译关键词匹配器（过滤器实例内只构建一次，关键词列表变化时自动重建）
+
+        所有关键词按长度降序合并为一个正则，一次扫描即可找出文本中的关键词。扫描结果是不重叠的，
+        因此为每个关键词预先算好：被它包含的其他关键词，以及可能与它部分重叠（从它内部开始、越过它结尾）
+        的关键词及其起始偏移，保证命中集合与逐个关键词做子串查找完全一致
+        """
+        key = (tuple(self.strong_keywords), tuple(self.include_keywords), tuple(self.exclude_keywords))
+        if getattr(self, '_matcher_key', None) == key:
+            return self._keyword_matcher
+
+        # 关键词 -> (标题命中得分, 正文命中得分)，同一关键词出现在多个列表时得分累加
+        weights = {}
+        for keywords, title_weight, content_weight in (
+            (self.strong_keywords, 30, 15),
+            (self.include_keywords, 15, 8),
+            (self.exclude_keywords, -40, -20),
+        ):
+            for keyword in keywords:
+                title_score, content_score = weights.get(keyword, (0, 0))
+                weights[keyword] = (title_score + title_weight, content_score + content_weight)
+
+        ordered = sorted((k for k in weights if k), key=len, reverse=True)
+        pattern = re.compile('|'.join(re.escape(k) for k in ordered)) if ordered else None
+        # 空关键词与任何文本都“匹配”
+        always = frozenset(k for k in weights if not k)
+        contained = {k: frozenset(other for other in weights if other in k) for k in ordered}
+        overlapping = {
+            k: [(offset, other) for other in ordered for offset in range(1, len(k))
+                if len(other) > len(k) - offset and other.startswith(k[offset:])]
+            for k in ordered
+        }
+
+        self._keyword_matcher = (pattern, always, contained, overlapping, weights)
+        self._matcher_key = key
+        return self._keyword_matcher
+
+    def _find_keywords(self, texts: List[str]) -> List[frozenset]:
+        """返回每条（已小写的）文本中出现的关键词集合"""
+        pattern, always, contained, overlapping, _ = self._get_keyword_matcher()
+        if pattern is None:
+            return [always] * len(texts)
+
+        found_list = []
+        for text in texts:
+            found = set(always)
+            for match in pattern.finditer(text):
+                keyword = match.group()
+                found |= contained[keyword]
+                for offset, other in overlapping[keyword]:
+                    if text.startswith(other, match.start() + offset):
+                        found |= contained[other]
+            found_list.append(frozenset(found))
+        return found_list
+
+    def score_news(self, titles: pd.Series, contents: pd.Series) -> pd.Series:
+        """
+        批量计算相关性评分，对整列标题/正文完成匹配，与逐条调用 calculate_relevance_score 的结果一致
+        
+        Args:
+            titles: 新闻标题
+            contents: 新闻内容（与titles等长）
+            
+        Returns:
+            pd.Series: 相关性评分 (0-100)，索引与titles一致
+        """
+        title_list = titles.fillna('').astype(str).tolist()
+        content_list = contents.fillna('').astype(str).tolist()
+        weights = self._get_keyword_matcher()[4]
+        exclude = frozenset(self.exclude_keywords)
+
+        # 1. 直接提及公司名称：标题+50，仅正文+25
+        company_in_title = np.array([self.company_name in t for t in title_list], dtype=bool)
+        company_in_content = np.array([self.company_name in c for c in content_list], dtype=bool)
+        # 2. 直接提及股票代码：标题+40，仅正文+20
+        code_in_title = np.array([self.stock_code in t for t in title_list], dtype=bool)
+        code_in_content = np.array([self.stock_code in c for c in content_list], dtype=bool)
+
+        scores = (np.where(company_in_title, 50, np.where(company_in_content, 25, 0))
+                  + np.where(code_in_title, 40, np.where(code_in_content, 20, 0)))
+
+        # 3-5. 强相关/包含/排除关键词：标题命中取标题得分，否则正文命中取正文得分
+        title_found = self._find_keywords([t.lower() for t in title_list])
+        content_found = self._find_keywords([c.lower() for c in content_list])
+        scores = scores + np.array(
+            [sum(weights[k][0] if k in in_title else weights[k][1] for k in in_title | in_content)
+             for in_title, in_content in zip(title_found, content_found)], dtype=np.int64)
+
+        # 6. 特殊规则：标题完全不包含公司信息但包含排除词，再减30分
+        title_excluded = np.array([not exclude.isdisjoint(found) for found in title_found], dtype=bool)
+        scores = scores - np.where(~company_in_title & ~code_in_title & title_excluded, 30, 0)
+
+        # 确保评分在0-100范围内
+        return pd.Series(np.clip(scores, 0, 100).astype(np.int64), index=titles.index)
+
+    @staticmethod
+    def _get_text_columns(news_df: pd.DataFrame) -> Tuple[pd.Series, pd.Series]:
+        """取新闻标题/内容列，兼容 新闻标题/标题 与 新闻内容/内容，缺失的列视为空字符串"""
+        title_column = next((c for c in ('新闻标题', '标题') if c in news_df.columns), None)
+        content_column = next((c for c in ('新闻内容', '内容') if c in news_df.columns), None)
+        empty = pd.Series('', index=news_df.index)
+        titles = news_df[title_column] if title_column else empty
+        contents = news_df[content_column] if content_column else empty
+        return titles, contents
+
     def calculate_relevance_score(self, title: str, content: str) -> float:
         """
         计算新闻相关性评分
@@ -59,85 +168,19 @@ class NewsRelevanceFilter:
         Returns:
             float: 相关性评分 (0-100)
         """
-        score = 0
-        title_lower = title.lower()
-        content_lower = content.lower()
-        
-        # 1. 直接提及公司名称
-        if self.company_name in title:
-            score += 50  # 标题中出现公司名称，高分
-            logger.debug(f"[过滤器] 标题包含公司名称 '{self.company_name}': +50分")
-        elif self.company_name in content:
-            score += 25  # 内容中出现公司名称，中等分
-            logger.debug(f"[过滤器] 内容包含公司名称 '{self.company_name}': +25分")
-            
-        # 2. 直接提及股票代码
-        if self.stock_code in title:
-            score += 40  # 标题中出现股票代码，高分
-            logger.debug(f"[过滤器] 标题包含股票代码 '{self.stock_code}': +40分")
-        elif self.stock_code in content:
-            score += 20  # 内容中出现股票代码，中等分
-            logger.debug(f"[过滤器] 内容包含股票代码 '{self.stock_code}': +20分")
-            
-        # 3. 强相关关键词检查
-        strong_matches = []
-        for keyword in self.strong_keywords:
-            if keyword in title_lower:
-                score += 30
-                strong_matches.append(keyword)
-            elif keyword in content_lower:
-                score += 15
-                strong_matches.append(keyword)
-        
-        if strong_matches:
-            logger.debug(f"[过滤器] 强相关关键词匹配: {strong_matches}")
-            
-        # 4. 包含关键词检查
-        include_matches = []
-        for keyword in self.include_keywords:
-            if keyword in title_lower:
-                score += 15
-                include_matches.append(keyword)
-            elif keyword in content_lower:
-                score += 8
-                include_matches.append(keyword)
-        
-        if include_matches:
-            logger.debug(f"[过滤器] 相关关键词匹配: {include_matches[:3]}...")  # 只显示前3个
-            
-        # 5. 排除关键词检查（减分）
-        exclude_matches = []
-        for keyword in self.exclude_keywords:
-            if keyword in title_lower:
-                score -= 40  # 标题中出现排除词，大幅减分
-                exclude_matches.append(keyword)
-            elif keyword in content_lower:
-                score -= 20  # 内容中出现排除词，中等减分
-                exclude_matches.append(keyword)
-        
-        if exclude_matches:
-            logger.debug(f"[过滤器] 排除关键词匹配: {exclude_matches[:3]}...")
-            
-        # 6. 特殊规则：如果标题完全不包含公司信息但包含排除词，严重减分
-        if (self.company_name not in title and self.stock_code not in title and 
-            any(keyword in title_lower for keyword in self.exclude_keywords)):
-            score -= 30
-            logger.debug(f"[过滤器] 标题无公司信息但含排除词: -30分")
-        
-        # 确保评分在0-100范围内
-        final_score = max(0, min(100, score))
-        
+        final_score = int(self.score_news(pd.Series([title]), pd.Series([content])).iloc[0])
         logger.debug(f"[过滤器] 最终评分: {final_score}分 - 标题: {title[:30]}...")
-        
         return final_score
     
-    def filter_news(self, news_df: pd.DataFrame, min_score: float = 30) -> pd.DataFrame:
+    def filter_news(self, news_df: pd.DataFrame, min_score: float = 30,
+                    deduplicate: bool = False) -> pd.DataFrame:
         """
         过滤新闻DataFrame
         
         Args:
             news_df: 原始新闻DataFrame
             min_score: 最低相关性评分阈值
+            deduplicate: 是否合并近似重复的新闻（每簇保留评分最高的一条，source_count 记录报道数）
             
         Returns:
             pd.DataFrame: 过滤后的新闻DataFrame，按相关性评分排序
@@ -148,29 +191,23 @@ class NewsRelevanceFilter:
         
         logger.info(f"[过滤器] 开始过滤新闻，原始数量: {len(news_df)}条，最低评分阈值: {min_score}")
         
-        filtered_news = []
+        titles, contents = self._get_text_columns(news_df)
         
-        for idx, row in news_df.iterrows():
-            title = row.get('新闻标题', row.get('标题', ''))
-            content = row.get('新闻内容', row.get('内容', ''))
-            
-            # 计算相关性评分
-            score = self.calculate_relevance_score(title, content)
-            
-            if score >= min_score:
-                row_dict = row.to_dict()
-                row_dict['relevance_score'] = score
-                filtered_news.append(row_dict)
-                
-                logger.debug(f"[过滤器] 保留新闻 (评分: {score:.1f}): {title[:50]}...")
-            else:
-                logger.debug(f"[过滤器] 过滤新闻 (评分: {score:.1f}): {title[:50]}...")
+        # 计算相关性评分
+        scores = self.score_news(titles, contents)
+        keep = (scores >= min_score).to_numpy()
+        logger.debug(f"[过滤器] 评分完成，保留 {int(keep.sum())}条，过滤 {int((~keep).sum())}条")
         
         # 创建过滤后的DataFrame
-        if filtered_news:
-            filtered_df = pd.DataFrame(filtered_news)
+        if keep.any():
+            filtered_df = news_df[keep].reset_index(drop=True)
+            filtered_df['relevance_score'] = scores[keep].to_numpy()
             # 按相关性评分排序
             filtered_df = filtered_df.sort_values('relevance_score', ascending=False)
+            if deduplicate:
+                before_count = len(filtered_df)
+                filtered_df = get_near_duplicate_detector().deduplicate_frame(filtered_df)
+                logger.info(f"[过滤器] 近似重复合并: {before_count}条 -> {len(filtered_df)}条")
             logger.info(f"[过滤器] 过滤完成，保留 {len(filtered_df)}条 新闻")
         else:
             filtered_df = pd.DataFrame()
@@ -180,7 +180,7 @@ def create_filtered_realtime_news_function():
                          # 应用新闻过滤
                          from tradingagents.utils.news_filter import create_news_filter
                          news_filter = create_news_filter(clean_ticker)
-                         filtered_news_df = news_filter.filter_news(original_news_df, min_score=min_score)
+                         filtered_news_df = news_filter.filter_news(original_news_df, min_score=min_score, deduplicate=True)
                          
                          # 记录过滤统计
                          filter_stats = news_filter.get_filter_statistics(original_news_df, filtered_news_df)
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+分析进度存储
+进度由"快照 + 增量事件"组成：跟踪器每条进度消息只追加一个很小的增量事件（Redis Stream、文件追加日志或内存列表），
+完整快照按最小间隔合并写入。读取方加载快照后应用其后的增量事件即可得到最新状态，
+并可以阻塞等待新事件，而不是定时重新读取完整状态
+"""
+
+import copy
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('async_progress')
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+# 快照中记录已包含到哪个增量事件的字段
+CURSOR_FIELD = 'event_cursor'
+TERMINAL_STATUSES = ('completed', 'failed')
+
+
+class ProgressStore:
+    """进度存储接口；cursor 是各后端自定义的事件位置，None 表示从头开始"""
+
+    name = "base"
+
+    def save_snapshot(self, analysis_id: str, data: Dict[str, Any]):
+        raise NotImplementedError
+
+    def load_snapshot(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def append_event(self, analysis_id: str, delta: Dict[str, Any]) -> Any:
+        """追加一个增量事件，返回该事件之后的cursor"""
+        raise NotImplementedError
+
+    def read_events(self, analysis_id: str, after: Any = None, timeout: float = 0) -> List[Tuple[Any, Dict[str, Any]]]:
+        """读取 after 之后的事件 [(cursor, delta)]；没有新事件时最多阻塞 timeout 秒"""
+        raise NotImplementedError
+
+    def latest_analysis_id(self) -> Optional[str]:
+        raise NotImplementedError
+
+
+class MemoryProgressStore(ProgressStore):
+    """进程内存储，适用于测试和单机部署（分析线程与页面在同一进程中）"""
+
+    name = "memory"
+
+    def __init__(self, max_analyses: int = 100):
+        self.max_analyses = max_analyses
+        self._snapshots: Dict[str, Dict[str, Any]] = {}
+        self._events: Dict[str, List[Dict[str, Any]]] = {}
+        self._updated: Dict[str, float] = {}
+        self._cond = threading.Condition()
+
+    def _touch_locked(self, analysis_id: str):
+        self._updated[analysis_id] = time.time()
+        while len(self._updated) > self.max_analyses:
+            oldest = min(self._updated, key=self._updated.get)
+            for table in (self._updated, self._snapshots, self._events):
+                table.pop(oldest, None)
+
+    def save_snapshot(self, analysis_id: str, data: Dict[str, Any]):
+        with self._cond:
+            self._snapshots[analysis_id] = copy.deepcopy(data)
+            self._touch_locked(analysis_id)
+
+    def load_snapshot(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        with self._cond:
+            snapshot = self._snapshots.get(analysis_id)
+            return copy.deepcopy(snapshot) if snapshot is not None else None
+
+    def append_event(self, analysis_id: str, delta: Dict[str, Any]) -> int:
+        with self._cond:
+            events = self._events.setdefault(analysis_id, [])
+            events.append(dict(delta))
+            self._touch_locked(analysis_id)
+            self._cond.notify_all()
+            return len(events)
+
+    def read_events(self, analysis_id: str, after: Any = None, timeout: float = 0) -> List[Tuple[int, Dict[str, Any]]]:
+        after = after or 0
+        with self._cond:
+            if timeout > 0:
+                self._cond.wait_for(lambda: len(self._events.get(analysis_id, ())) > after, timeout)
+            events = self._events.get(analysis_id, [])[after:]
+            return [(after + i + 1, dict(delta)) for i, delta in enumerate(events)]
+
+    def latest_analysis_id(self) -> Optional[str]:
+        with self._cond:
+            return max(self._updated, key=self._updated.get) if self._updated else None
+
+
+class FileProgressStore(ProgressStore):
+    """
+    文件存储：快照为 progress_{id}.json（原子替换），增量事件追加到 progress_{id}.events.jsonl，
+    cursor 为已读取到的字节偏移
+    """
+
+    name = "file"
+
+    def __init__(self, data_dir: str = "./data", poll_interval: float = 0.1):
+        self.data_dir = Path(data_dir)
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+
+    def snapshot_path(self, analysis_id: str) -> Path:
+        return self.data_dir / f"progress_{analysis_id}.json"
+
+    def events_path(self, analysis_id: str) -> Path:
+        return self.data_dir / f"progress_{analysis_id}.events.jsonl"
+
+    def save_snapshot(self, analysis_id: str, data: Dict[str, Any]):
+        path = self.snapshot_path(analysis_id)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def load_snapshot(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        path = self.snapshot_path(analysis_id)
+        if not path.exists():
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def append_event(self, analysis_id: str, delta: Dict[str, Any]) -> int:
+        line = (json.dumps(delta, ensure_ascii=False) + "\n").encode('utf-8')
+        with self._lock:
+            with open(self.events_path(analysis_id), 'ab') as f:
+                f.write(line)
+                return f.tell()
+
+    def _read_from(self, analysis_id: str, offset: int) -> List[Tuple[int, Dict[str, Any]]]:
+        path = self.events_path(analysis_id)
+        if not path.exists():
+            return []
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            chunk = f.read()
+        events = []
+        for raw in chunk.split(b"\n")[:-1]:  # 只取完整的行，写了一半的行留给下次读取
+            offset += len(raw) + 1
+            if raw.strip():
+                events.append((offset, json.loads(raw.decode('utf-8'))))
+        return events
+
+    def read_events(self, analysis_id: str, after: Any = None, timeout: float = 0) -> List[Tuple[int, Dict[str, Any]]]:
+        deadline = time.monotonic() + timeout
+        while True:
+            events = self._read_from(analysis_id, after or 0)
+            if events or time.monotonic() >= deadline:
+                return events
+            time.sleep(min(self.poll_interval, max(0.0, deadline - time.monotonic())))
+
+    def latest_analysis_id(self) -> Optional[str]:
+        if not self.data_dir.exists():
+            return None
+        progress_files = list(self.data_dir.glob("progress_*.json"))
+        if not progress_files:
+            return None
+        # 按修改时间排序，获取最新的；从文件名提取analysis_id
+        latest_file = max(progress_files, key=lambda f: f.stat().st_mtime)
+        return latest_file.name[len("progress_"):-len(".json")]
+
+
+class RedisProgressStore(ProgressStore):
+    """
+    Redis存储：快照为 progress:{id}（带过期时间），增量事件写入 Stream progress_events:{id}，
+    读取方用 XREAD BLOCK 等待新事件；progress_index 有序集合按更新时间记录分析ID
+    """
+
+    name = "redis"
+    INDEX_KEY = "progress_index"
+
+    def __init__(self, client, ttl: int = 3600, max_events: int = 2000):
+        self.client = client
+        self.ttl = ttl
+        self.max_events = max_events
+
+    @staticmethod
+    def snapshot_key(analysis_id: str) -> str:
+        return f"progress:{analysis_id}"
+
+    @staticmethod
+    def events_key(analysis_id: str) -> str:
+        return f"progress_events:{analysis_id}"
+
+    def save_snapshot(self, analysis_id: str, data: Dict[str, Any]):
+        now = time.time()
+        pipe = self.client.pipeline(transaction=False)
+        pipe.setex(self.snapshot_key(analysis_id), self.ttl, json.dumps(data, ensure_ascii=False))
+        pipe.zadd(self.INDEX_KEY, {analysis_id: now})
+        pipe.zremrangebyscore(self.INDEX_KEY, 0, now - self.ttl)
+        pipe.execute()
+
+    def load_snapshot(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        data = self.client.get(self.snapshot_key(analysis_id))
+        return json.loads(data) if data else None
+
+    def append_event(self, analysis_id: str, delta: Dict[str, Any]) -> str:
+        key = self.events_key(analysis_id)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.xadd(key, {"data": json.dumps(delta, ensure_ascii=False)}, maxlen=self.max_events, approximate=True)
+        pipe.expire(key, self.ttl)
+        event_id, _ = pipe.execute()
+        return event_id
+
+    def read_events(self, analysis_id: str, after: Any = None, timeout: float = 0) -> List[Tuple[str, Dict[str, Any]]]:
+        block = int(timeout * 1000) if timeout > 0 else None
+        response = self.client.xread({self.events_key(analysis_id): after or "0"}, block=block)
+        events = []
+        for _, entries in response or []:
+            for event_id, fields in entries:
+                events.append((event_id, json.loads(fields["data"])))
+        return events
+
+    def latest_analysis_id(self) -> Optional[str]:
+        latest = self.client.zrevrange(self.INDEX_KEY, 0, 0)
+        return latest[0] if latest else None
+
+
+# 全局连接池与存储实例
+_redis_pool = None
+_redis_pool_lock = threading.Lock()
+_progress_store: Optional[ProgressStore] = None
+_store_lock = threading.Lock()
+
+
+def get_redis_connection_pool():
+    """
+    按 REDIS_HOST/REDIS_PORT/REDIS_PASSWORD/REDIS_DB 创建的共享连接池。
+    阻塞读取进度会在等待期间占用连接，连接用尽时按 PROGRESS_REDIS_POOL_TIMEOUT 排队等待归还，而不是直接报错
+    """
+    global _redis_pool
+    if _redis_pool is None:
+        with _redis_pool_lock:
+            if _redis_pool is None:
+                _redis_pool = redis.BlockingConnectionPool(
+                    host=os.getenv('REDIS_HOST', 'localhost'),
+                    port=int(os.getenv('REDIS_PORT', 6379)),
+                    password=os.getenv('REDIS_PASSWORD') or None,
+                    db=int(os.getenv('REDIS_DB', 0)),
+                    decode_responses=True,
+                    max_connections=int(os.getenv('PROGRESS_REDIS_MAX_CONNECTIONS', '20')),
+                    timeout=float(os.getenv('PROGRESS_REDIS_POOL_TIMEOUT', '30')),
+                )
+    return _redis_pool
+
+
+def _create_redis_store() -> Optional[RedisProgressStore]:
+    if not REDIS_AVAILABLE:
+        logger.warning("📊 [进度存储] redis 未安装，无法使用Redis存储")
+        return None
+    try:
+        client = redis.Redis(connection_pool=get_redis_connection_pool())
+        client.ping()
+        return RedisProgressStore(client, ttl=int(os.getenv('PROGRESS_TTL', '3600')))
+    except Exception as e:
+        logger.warning(f"📊 [进度存储] Redis连接失败，使用文件存储: {e}")
+        return None
+
+
+def _create_progress_store() -> ProgressStore:
+    backend = os.getenv('PROGRESS_BACKEND', 'auto').lower()
+    if backend == 'memory':
+        return MemoryProgressStore()
+    if backend == 'redis' or (backend == 'auto' and os.getenv('REDIS_ENABLED', 'false').lower() == 'true'):
+        store = _create_redis_store()
+        if store is not None:
+            return store
+    return FileProgressStore()
+
+
+def get_progress_store() -> ProgressStore:
+    """
+    获取全局进度存储，由 PROGRESS_BACKEND 选择：
+    memory（进程内）、file、redis，auto（默认）在 REDIS_ENABLED=true 且可连接时使用Redis，否则使用文件
+    """
+    global _progress_store
+    if _progress_store is None:
+        with _store_lock:
+            if _progress_store is None:
+                _progress_store = _create_progress_store()
+                logger.info(f"📊 [进度存储] 使用{_progress_store.name}存储")
+    return _progress_store
+
+
+def apply_events(state: Dict[str, Any], events: List[Tuple[Any, Dict[str, Any]]]) -> Dict[str, Any]:
+    """把增量事件依次合并到状态中，并更新状态中的cursor"""
+    for cursor, delta in events:
+        state.update(delta)
+        state[CURSOR_FIELD] = cursor
+    return state
+
+
+def load_progress(analysis_id: str, store: Optional[ProgressStore] = None) -> Optional[Dict[str, Any]]:
+    """快照 + 快照之后的增量事件 = 最新的完整状态；CURSOR_FIELD 字段可用于之后的增量读取"""
+    store = store or get_progress_store()
+    snapshot = store.load_snapshot(analysis_id)
+    events = store.read_events(analysis_id, (snapshot or {}).get(CURSOR_FIELD))
+    if snapshot is None and not events:
+        return None
+    return apply_events(snapshot or {'analysis_id': analysis_id}, events)
+
+
+def wait_for_progress_update(analysis_id: str, cursor: Any = None, timeout: float = 3.0,
+                             min_interval: float = 0.5, store: Optional[ProgressStore] = None) -> bool:
+    """
+    等待 cursor 之后出现新的进度事件，有新事件时尽快返回True，超时返回False。
+    先等待 min_interval 秒，把连续的多条消息合并为一次页面刷新
+    """
+    store = store or get_progress_store()
+    time.sleep(min(min_interval, timeout))
+    return bool(store.read_events(analysis_id, cursor, timeout=max(0.0, timeout - min_interval)))
+
+
+def follow_progress(analysis_id: str, timeout: float = 1800, poll_timeout: float = 5.0,
+                    store: Optional[ProgressStore] = None) -> Iterator[Dict[str, Any]]:
+    """
+    依次产出进度状态：先产出当前完整状态，之后每收到一批增量事件产出一次更新后的状态，
+    直到分析完成/失败或超时。完成时重新加载快照以包含分析结果
+    """
+    store = store or get_progress_store()
+    state = load_progress(analysis_id, store)
+    if state is None:
+        return
+    yield state
+
+    deadline = time.monotonic() + timeout
+    while state.get('status') not in TERMINAL_STATUSES:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        events = store.read_events(analysis_id, state.get(CURSOR_FIELD), timeout=min(poll_timeout, remaining))
+        if not events:
+            continue
+        apply_events(state, events)
+        if state.get('status') in TERMINAL_STATUSES:
+            state = load_progress(analysis_id, store) or state
+        yield state
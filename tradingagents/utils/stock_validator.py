@@ -444,8 +444,15 @@ class StockDataPreparer:
             # 1. 获取基本信息
             logger.debug(f"📊 [港股数据] 获取{formatted_code}基本信息...")
             from tradingagents.dataflows.interface import get_hk_stock_info_unified
+            from tradingagents.dataflows.security_master import get_security_master
 
-            stock_info = get_hk_stock_info_unified(formatted_code)
+            # 证券主数据有记录时不再走网络
+            security_master = get_security_master()
+            record = security_master.lookup(formatted_code)
+            if record is not None and record['market'] == 'hk':
+                stock_info = f"公司名称: {record['name']}"
+            else:
+                stock_info = get_hk_stock_info_unified(formatted_code)
 
             if stock_info and "❌" not in stock_info and "未找到" not in stock_info:
                 # 解析股票名称 - 支持多种格式
@@ -453,6 +460,12 @@ class StockDataPreparer:
 
                 if stock_name and stock_name != "未知":
                     has_basic_info = True
+                    # 所有数据源失败时返回的占位信息（如 "港股0700.HK"）不写入证券主数据
+                    is_placeholder = stock_name.startswith('港股') or (
+                        isinstance(stock_info, dict) and stock_info.get('source') in ('fallback', 'error'))
+                    if record is None and stock_name != formatted_code and not is_placeholder:
+                        security_master.upsert([{'code': formatted_code, 'name': stock_name,
+                                                 'exchange': 'HKEX'}], source='hk_stock_info')
                     logger.info(f"✅ [港股数据] 基本信息获取成功: {formatted_code} - {stock_name}")
                     cache_status += "基本信息已缓存; "
                 else:
@@ -605,6 +618,11 @@ class StockDataPreparer:
         stock_name = formatted_code  # 美股通常使用代码作为名称
         cache_status = ""
 
+        from tradingagents.dataflows.security_master import get_security_master
+        record = get_security_master().lookup(formatted_code)
+        if record is not None and record['market'] == 'us':
+            stock_name = record['name']
+
         try:
             # 1. 获取历史数据（美股通常直接通过历史数据验证股票是否存在）
             logger.debug(f"📊 [美股数据] 获取{formatted_code}历史数据 ({start_date_str} 到 {end_date_str})...")
@@ -1,13 +1,16 @@
 #!/usr/bin/env python3
 """
 异步进度显示组件
-支持定时刷新，从Redis或文件获取进度状态
+加载一次完整进度后增量读取新的进度事件，有新进度时立即刷新
 """
 
 import streamlit as st
 import time
 from typing import Optional, Dict, Any
 from web.utils.async_progress_tracker import get_progress_by_id, format_time
+from tradingagents.utils.progress_store import (
+    CURSOR_FIELD, apply_events, get_progress_store, wait_for_progress_update
+)
 
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
@@ -32,20 +35,25 @@ class AsyncProgressDisplay:
         # 初始化状态
         self.last_update = 0
         self.is_completed = False
+        self.progress_data: Optional[Dict[str, Any]] = None
         
         logger.info(f"📊 [异步显示] 初始化: {analysis_id}, 刷新间隔: {refresh_interval}s")
     
     def update_display(self) -> bool:
         """更新显示，返回是否需要继续刷新"""
         current_time = time.time()
-        
-        # 检查是否需要刷新
-        if current_time - self.last_update < self.refresh_interval and not self.is_completed:
-            return not self.is_completed
-        
-        # 获取进度数据
-        progress_data = get_progress_by_id(self.analysis_id)
-        
+
+        # 首次加载完整进度，之后只读取新的增量事件
+        if self.progress_data is None:
+            self.progress_data = get_progress_by_id(self.analysis_id)
+        else:
+            events = get_progress_store().read_events(self.analysis_id, self.progress_data.get(CURSOR_FIELD))
+            apply_events(self.progress_data, events)
+            if events and self.progress_data.get('status') in ['completed', 'failed']:
+                # 完成后重新加载快照以获取分析结果
+                self.progress_data = get_progress_by_id(self.analysis_id) or self.progress_data
+        progress_data = self.progress_data
+
         if not progress_data:
             self.status_text.error("❌ 无法获取分析进度，请检查分析是否正在运行")
             return False
@@ -59,7 +67,12 @@ class AsyncProgressDisplay:
         self.is_completed = status in ['completed', 'failed']
         
         return not self.is_completed
-    
+
+    def wait_for_update(self, timeout: float) -> bool:
+        """等待新的进度事件，有新进度时提前返回"""
+        cursor = self.progress_data.get(CURSOR_FIELD) if self.progress_data else None
+        return wait_for_progress_update(self.analysis_id, cursor, timeout=timeout)
+
     def _render_progress(self, progress_data: Dict[str, Any]):
         """渲染进度显示"""
         try:
@@ -184,8 +197,8 @@ def auto_refresh_progress(display: AsyncProgressDisplay, max_duration: float = 1
             # 分析完成或失败，停止刷新
             break
         
-        # 等待刷新间隔
-        time.sleep(display.refresh_interval)
+        # 等待新的进度事件，最多等待一个刷新间隔
+        display.wait_for_update(display.refresh_interval)
     
     logger.info(f"📊 [异步显示] 自动刷新结束: {display.analysis_id}")
 
@@ -293,8 +306,8 @@ def streamlit_auto_refresh_progress(analysis_id: str, refresh_interval: int = 2)
             default_value = st.session_state.get(auto_refresh_key, True)  # 默认为True
             auto_refresh = st.checkbox("🔄 自动刷新", value=default_value, key=auto_refresh_key)
             if auto_refresh and status == 'running':  # 只在运行时自动刷新
-                import time
-                time.sleep(3)  # 等待3秒
+                # 有新进度时立即刷新，最多等待3秒
+                wait_for_progress_update(analysis_id, progress_data.get(CURSOR_FIELD), timeout=3)
                 st.rerun()
             elif auto_refresh and status in ['completed', 'failed']:
                 # 分析完成后自动关闭自动刷新
@@ -429,8 +442,8 @@ def display_static_progress(analysis_id: str) -> bool:
                 default_value = st.session_state.get(auto_refresh_key, True)  # 默认为True
                 auto_refresh = st.checkbox("🔄 自动刷新", value=default_value, key=auto_refresh_key)
                 if auto_refresh and status == 'running':  # 只在运行时自动刷新
-                    import time
-                    time.sleep(3)  # 等待3秒
+                    # 有新进度时立即刷新，最多等待3秒
+                    wait_for_progress_update(analysis_id, progress_data.get(CURSOR_FIELD), timeout=3)
                     st.rerun()
                 elif auto_refresh and status in ['completed', 'failed']:
                     # 分析完成后自动关闭自动刷新
@@ -489,8 +502,8 @@ def display_static_progress_with_controls(analysis_id: str, show_refresh_control
                 default_value = st.session_state.get(auto_refresh_key, True)  # 默认为True
                 auto_refresh = st.checkbox("🔄 自动刷新", value=default_value, key=auto_refresh_key)
                 if auto_refresh and status == 'running':  # 只在运行时自动刷新
-                    import time
-                    time.sleep(3)  # 等待3秒
+                    # 有新进度时立即刷新，最多等待3秒
+                    wait_for_progress_update(analysis_id, None, timeout=3)
                     st.rerun()
                 elif auto_refresh and status in ['completed', 'failed']:
                     # 分析完成后自动关闭自动刷新
@@ -598,8 +611,8 @@ def display_static_progress_with_controls(analysis_id: str, show_refresh_control
             default_value = st.session_state.get(auto_refresh_key, True)  # 默认为True
             auto_refresh = st.checkbox("🔄 自动刷新", value=default_value, key=auto_refresh_key)
             if auto_refresh and status == 'running':  # 只在运行时自动刷新
-                import time
-                time.sleep(3)  # 等待3秒
+                # 有新进度时立即刷新，最多等待3秒
+                wait_for_progress_update(analysis_id, progress_data.get(CURSOR_FIELD), timeout=3)
                 st.rerun()
             elif auto_refresh and status in ['completed', 'failed']:
                 # 分析完成后自动关闭自动刷新
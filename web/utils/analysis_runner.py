@@ -217,7 +217,7 @@ def run_stock_analysis(stock_symbol, analysis_date, analysts, research_depth, ll
 
     try:
         # 导入必要的模块
-        from tradingagents.graph.trading_graph import TradingAgentsGraph
+        from tradingagents.graph.graph_pool import get_graph_pool
         from tradingagents.default_config import DEFAULT_CONFIG
 
         # 创建配置
@@ -448,18 +448,21 @@ def run_stock_analysis(stock_symbol, analysis_date, analysts, research_depth, ll
 
         logger.debug(f"🔍 [RUNNER DEBUG] 最终传递给分析引擎的股票代码: '{formatted_symbol}'")
 
-        # 初始化交易图
+        # 初始化交易图：从实例池借出相同配置下已编译的图，没有时新建
         update_progress("🔧 初始化分析引擎...")
-        graph = TradingAgentsGraph(analysts, config=config, debug=False)
-
-        # 执行分析
-        update_progress(f"📊 开始分析 {formatted_symbol} 股票，这可能需要几分钟时间...")
-        logger.debug(f"🔍 [RUNNER DEBUG] ===== 调用graph.propagate =====")
-        logger.debug(f"🔍 [RUNNER DEBUG] 传递给graph.propagate的参数:")
-        logger.debug(f"🔍 [RUNNER DEBUG]   symbol: '{formatted_symbol}'")
-        logger.debug(f"🔍 [RUNNER DEBUG]   date: '{analysis_date}'")
-
-        state, decision = graph.propagate(formatted_symbol, analysis_date)
+        checkout_timeout = float(os.getenv("GRAPH_POOL_CHECKOUT_TIMEOUT", "30"))
+        with get_graph_pool().checkout(
+                analysts, config, debug=False, timeout=checkout_timeout, build_on_timeout=True,
+                on_wait=lambda: update_progress(
+                    f"⏳ 相同配置的分析正在运行，最多等待{checkout_timeout:.0f}秒复用分析引擎...")) as graph:
+            # 执行分析
+            update_progress(f"📊 开始分析 {formatted_symbol} 股票，这可能需要几分钟时间...")
+            logger.debug(f"🔍 [RUNNER DEBUG] ===== 调用graph.propagate =====")
+            logger.debug(f"🔍 [RUNNER DEBUG] 传递给graph.propagate的参数:")
+            logger.debug(f"🔍 [RUNNER DEBUG]   symbol: '{formatted_symbol}'")
+            logger.debug(f"🔍 [RUNNER DEBUG]   date: '{analysis_date}'")
+
+            state, decision = graph.propagate(formatted_symbol, analysis_date)
 
         # 调试信息
         logger.debug(f"🔍 [DEBUG] 分析完成，decision类型: {type(decision)}")
@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 """
 异步进度跟踪器
-支持Redis和文件两种存储方式，前端定时轮询获取进度
+进度以增量事件追加到进度存储（Redis Stream、文件追加日志或进程内存储），完整快照按最小间隔合并写入，
+前端加载快照后增量读取新事件
 """
 
 import json
@@ -10,12 +11,20 @@ import os
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 import threading
-from pathlib import Path
 
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
+from tradingagents.utils.progress_store import (
+    CURSOR_FIELD, FileProgressStore, ProgressStore, get_progress_store, load_progress
+)
 logger = get_logger('async_progress')
 
+# 每条进度消息写入增量事件的字段；steps、raw_results 等较大的字段只写入快照
+DELTA_FIELDS = (
+    'status', 'current_step', 'progress_percentage', 'current_step_name', 'current_step_description',
+    'elapsed_time', 'remaining_time', 'last_message', 'last_update'
+)
+
 def safe_serialize(obj):
     """安全序列化对象，处理不可序列化的类型"""
     # 特殊处理LangChain消息对象
@@ -72,7 +81,13 @@ def safe_serialize(obj):
 class AsyncProgressTracker:
     """异步进度跟踪器"""
     
-    def __init__(self, analysis_id: str, analysts: List[str], research_depth: int, llm_provider: str):
+    def __init__(self, analysis_id: str, analysts: List[str], research_depth: int, llm_provider: str,
+                 store: Optional[ProgressStore] = None, min_write_interval: Optional[float] = None):
+        """
+        Args:
+            store: 进度存储，默认使用全局存储（PROGRESS_BACKEND）
+            min_write_interval: 完整快照的最小写入间隔（秒），默认读取 PROGRESS_MIN_WRITE_INTERVAL
+        """
         self.analysis_id = analysis_id
         self.analysts = analysts
         self.research_depth = research_depth
@@ -102,19 +117,16 @@ class AsyncProgressTracker:
             'steps': self.analysis_steps
         }
         
-        # 尝试初始化Redis，失败则使用文件
-        self.redis_client = None
-        self.use_redis = self._init_redis()
-        
-        if not self.use_redis:
-            # 使用文件存储
-            self.progress_file = f"./data/progress_{analysis_id}.json"
-            os.makedirs(os.path.dirname(self.progress_file), exist_ok=True)
-        
+        self.store = store or get_progress_store()
+        if min_write_interval is None:
+            min_write_interval = float(os.getenv('PROGRESS_MIN_WRITE_INTERVAL', '1.0'))
+        self.min_write_interval = min_write_interval
+        self._last_snapshot_time = 0.0
+
         # 保存初始状态
-        self._save_progress()
-        
-        logger.info(f"📊 [异步进度] 初始化完成: {analysis_id}, 存储方式: {'Redis' if self.use_redis else '文件'}")
+        self._save_progress(force=True)
+
+        logger.info(f"📊 [异步进度] 初始化完成: {analysis_id}, 存储方式: {self.store.name}")
 
         # 注册到日志系统进行自动进度更新
         try:
@@ -142,51 +154,6 @@ class AsyncProgressTracker:
         except Exception as e:
             print(f"❌ [进度集成] 跟踪器注册异常: {e}")
     
-    def _init_redis(self) -> bool:
-        """初始化Redis连接"""
-        try:
-            # 首先检查REDIS_ENABLED环境变量
-            redis_enabled_raw = os.getenv('REDIS_ENABLED', 'false')
-            redis_enabled = redis_enabled_raw.lower()
-            logger.info(f"🔍 [Redis检查] REDIS_ENABLED原值='{redis_enabled_raw}' -> 处理后='{redis_enabled}'")
-
-            if redis_enabled != 'true':
-                logger.info(f"📊 [异步进度] Redis已禁用，使用文件存储")
-                return False
-
-            import redis
-
-            # 从环境变量获取Redis配置
-            redis_host = os.getenv('REDIS_HOST', 'localhost')
-            redis_port = int(os.getenv('REDIS_PORT', 6379))
-            redis_password = os.getenv('REDIS_PASSWORD', None)
-            redis_db = int(os.getenv('REDIS_DB', 0))
-
-            # 创建Redis连接
-            if redis_password:
-                self.redis_client = redis.Redis(
-                    host=redis_host,
-                    port=redis_port,
-                    password=redis_password,
-                    db=redis_db,
-                    decode_responses=True
-                )
-            else:
-                self.redis_client = redis.Redis(
-                    host=redis_host,
-                    port=redis_port,
-                    db=redis_db,
-                    decode_responses=True
-                )
-
-            # 测试连接
-            self.redis_client.ping()
-            logger.info(f"📊 [异步进度] Redis连接成功: {redis_host}:{redis_port}")
-            return True
-        except Exception as e:
-            logger.warning(f"📊 [异步进度] Redis连接失败，使用文件存储: {e}")
-            return False
-    
     def _generate_dynamic_steps(self) -> List[Dict]:
         """根据分析师数量和研究深度动态生成分析步骤"""
         steps = [
@@ -500,61 +467,41 @@ class AsyncProgressTracker:
 
         return remaining
     
-    def _save_progress(self):
-        """保存进度到存储"""
+    def _save_progress(self, force: bool = False):
+        """
+        追加一个增量事件，并按最小间隔合并写入完整快照；
+        被合并掉的快照不会丢失状态，读取方会在快照之上应用之后的增量事件。force 时立即写入快照
+        """
         try:
-            current_step_name = self.progress_data.get('current_step_name', '未知')
-            progress_pct = self.progress_data.get('progress_percentage', 0)
-            status = self.progress_data.get('status', 'running')
-
-            if self.use_redis:
-                # 保存到Redis（安全序列化）
-                key = f"progress:{self.analysis_id}"
-                safe_data = safe_serialize(self.progress_data)
-                data_json = json.dumps(safe_data, ensure_ascii=False)
-                self.redis_client.setex(key, 3600, data_json)  # 1小时过期
-
-                logger.info(f"📊 [Redis写入] {self.analysis_id} -> {status} | {current_step_name} | {progress_pct:.1f}%")
-                logger.debug(f"📊 [Redis详情] 键: {key}, 数据大小: {len(data_json)} 字节")
-            else:
-                # 保存到文件（安全序列化）
-                safe_data = safe_serialize(self.progress_data)
-                with open(self.progress_file, 'w', encoding='utf-8') as f:
-                    json.dump(safe_data, f, ensure_ascii=False, indent=2)
-
-                logger.info(f"📊 [文件写入] {self.analysis_id} -> {status} | {current_step_name} | {progress_pct:.1f}%")
-                logger.debug(f"📊 [文件详情] 路径: {self.progress_file}")
-
+            self._write_progress(force)
         except Exception as e:
             logger.error(f"📊 [异步进度] 保存失败: {e}")
+            if isinstance(self.store, FileProgressStore):
+                return
             # 尝试备用存储方式
             try:
-                if self.use_redis:
-                    # Redis失败，尝试文件存储
-                    logger.warning(f"📊 [异步进度] Redis保存失败，尝试文件存储")
-                    backup_file = f"./data/progress_{self.analysis_id}.json"
-                    os.makedirs(os.path.dirname(backup_file), exist_ok=True)
-                    safe_data = safe_serialize(self.progress_data)
-                    with open(backup_file, 'w', encoding='utf-8') as f:
-                        json.dump(safe_data, f, ensure_ascii=False, indent=2)
-                    logger.info(f"📊 [备用存储] 文件保存成功: {backup_file}")
-                else:
-                    # 文件存储失败，尝试简化数据
-                    logger.warning(f"📊 [异步进度] 文件保存失败，尝试简化数据")
-                    simplified_data = {
-                        'analysis_id': self.analysis_id,
-                        'status': self.progress_data.get('status', 'unknown'),
-                        'progress_percentage': self.progress_data.get('progress_percentage', 0),
-                        'last_message': str(self.progress_data.get('last_message', '')),
-                        'last_update': self.progress_data.get('last_update', time.time())
-                    }
-                    backup_file = f"./data/progress_{self.analysis_id}.json"
-                    with open(backup_file, 'w', encoding='utf-8') as f:
-                        json.dump(simplified_data, f, ensure_ascii=False, indent=2)
-                    logger.info(f"📊 [备用存储] 简化数据保存成功: {backup_file}")
+                logger.warning(f"📊 [异步进度] {self.store.name}保存失败，改用文件存储")
+                self.store = FileProgressStore()
+                self._write_progress(force=True)
             except Exception as backup_e:
                 logger.error(f"📊 [异步进度] 备用存储也失败: {backup_e}")
-    
+
+    def _write_progress(self, force: bool):
+        delta = {key: self.progress_data[key] for key in DELTA_FIELDS if key in self.progress_data}
+        self.progress_data[CURSOR_FIELD] = self.store.append_event(self.analysis_id, safe_serialize(delta))
+
+        now = time.time()
+        if not force and now - self._last_snapshot_time < self.min_write_interval:
+            logger.debug(f"📊 [进度事件] {self.analysis_id} -> {delta.get('status')} | {delta.get('progress_percentage', 0):.1f}%")
+            return
+
+        self.store.save_snapshot(self.analysis_id, safe_serialize(self.progress_data))
+        self._last_snapshot_time = now
+        current_step_name = self.progress_data.get('current_step_name', '未知')
+        progress_pct = self.progress_data.get('progress_percentage', 0)
+        status = self.progress_data.get('status', 'running')
+        logger.debug(f"📊 [{self.store.name}写入] {self.analysis_id} -> {status} | {current_step_name} | {progress_pct:.1f}%")
+
     def get_progress(self) -> Dict[str, Any]:
         """获取当前进度"""
         return self.progress_data.copy()
@@ -575,7 +522,7 @@ class AsyncProgressTracker:
                 logger.warning(f"📊 [异步进度] 结果序列化失败: {e}")
                 self.progress_data['raw_results'] = str(results)  # 最后的fallback
 
-        self._save_progress()
+        self._save_progress(force=True)
         logger.info(f"📊 [异步进度] 分析完成: {self.analysis_id}")
 
         # 从日志系统注销
@@ -590,7 +537,7 @@ class AsyncProgressTracker:
         self.progress_data['status'] = 'failed'
         self.progress_data['last_message'] = f"分析失败: {error_message}"
         self.progress_data['last_update'] = time.time()
-        self._save_progress()
+        self._save_progress(force=True)
         logger.error(f"📊 [异步进度] 分析失败: {self.analysis_id}, 错误: {error_message}")
 
         # 从日志系统注销
@@ -601,53 +548,14 @@ class AsyncProgressTracker:
             pass
 
 def get_progress_by_id(analysis_id: str) -> Optional[Dict[str, Any]]:
-    """根据分析ID获取进度"""
+    """根据分析ID获取最新的完整进度（快照 + 之后的增量事件）"""
     try:
-        # 检查REDIS_ENABLED环境变量
-        redis_enabled = os.getenv('REDIS_ENABLED', 'false').lower() == 'true'
-
-        # 如果Redis启用，先尝试Redis
-        if redis_enabled:
-            try:
-                import redis
-
-                # 从环境变量获取Redis配置
-                redis_host = os.getenv('REDIS_HOST', 'localhost')
-                redis_port = int(os.getenv('REDIS_PORT', 6379))
-                redis_password = os.getenv('REDIS_PASSWORD', None)
-                redis_db = int(os.getenv('REDIS_DB', 0))
-
-                # 创建Redis连接
-                if redis_password:
-                    redis_client = redis.Redis(
-                        host=redis_host,
-                        port=redis_port,
-                        password=redis_password,
-                        db=redis_db,
-                        decode_responses=True
-                    )
-                else:
-                    redis_client = redis.Redis(
-                        host=redis_host,
-                        port=redis_port,
-                        db=redis_db,
-                        decode_responses=True
-                    )
-
-                key = f"progress:{analysis_id}"
-                data = redis_client.get(key)
-                if data:
-                    return json.loads(data)
-            except Exception as e:
-                logger.debug(f"📊 [异步进度] Redis读取失败: {e}")
-
-        # 尝试文件
-        progress_file = f"./data/progress_{analysis_id}.json"
-        if os.path.exists(progress_file):
-            with open(progress_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-
-        return None
+        store = get_progress_store()
+        progress = load_progress(analysis_id, store)
+        if progress is None and not isinstance(store, FileProgressStore):
+            # 跟踪器写入失败时会改用文件存储
+            progress = load_progress(analysis_id, FileProgressStore())
+        return progress
     except Exception as e:
         logger.error(f"📊 [异步进度] 获取进度失败: {analysis_id}, 错误: {e}")
         return None
@@ -667,81 +575,13 @@ def format_time(seconds: float) -> str:
 def get_latest_analysis_id() -> Optional[str]:
     """获取最新的分析ID"""
     try:
-        # 检查REDIS_ENABLED环境变量
-        redis_enabled = os.getenv('REDIS_ENABLED', 'false').lower() == 'true'
-
-        # 如果Redis启用，先尝试从Redis获取
-        if redis_enabled:
-            try:
-                import redis
-
-                # 从环境变量获取Redis配置
-                redis_host = os.getenv('REDIS_HOST', 'localhost')
-                redis_port = int(os.getenv('REDIS_PORT', 6379))
-                redis_password = os.getenv('REDIS_PASSWORD', None)
-                redis_db = int(os.getenv('REDIS_DB', 0))
-
-                # 创建Redis连接
-                if redis_password:
-                    redis_client = redis.Redis(
-                        host=redis_host,
-                        port=redis_port,
-                        password=redis_password,
-                        db=redis_db,
-                        decode_responses=True
-                    )
-                else:
-                    redis_client = redis.Redis(
-                        host=redis_host,
-                        port=redis_port,
-                        db=redis_db,
-                        decode_responses=True
-                    )
-
-                # 获取所有progress键
-                keys = redis_client.keys("progress:*")
-                if not keys:
-                    return None
-
-                # 获取每个键的数据，找到最新的
-                latest_time = 0
-                latest_id = None
-
-                for key in keys:
-                    try:
-                        data = redis_client.get(key)
-                        if data:
-                            progress_data = json.loads(data)
-                            last_update = progress_data.get('last_update', 0)
-                            if last_update > latest_time:
-                                latest_time = last_update
-                                # 从键名中提取analysis_id (去掉"progress:"前缀)
-                                latest_id = key.replace('progress:', '')
-                    except Exception:
-                        continue
-
-                if latest_id:
-                    logger.info(f"📊 [恢复分析] 找到最新分析ID: {latest_id}")
-                    return latest_id
-
-            except Exception as e:
-                logger.debug(f"📊 [恢复分析] Redis查找失败: {e}")
-
-        # 如果Redis失败或未启用，尝试从文件查找
-        data_dir = Path("data")
-        if data_dir.exists():
-            progress_files = list(data_dir.glob("progress_*.json"))
-            if progress_files:
-                # 按修改时间排序，获取最新的
-                latest_file = max(progress_files, key=lambda f: f.stat().st_mtime)
-                # 从文件名提取analysis_id
-                filename = latest_file.name
-                if filename.startswith("progress_") and filename.endswith(".json"):
-                    analysis_id = filename[9:-5]  # 去掉前缀和后缀
-                    logger.debug(f"📊 [恢复分析] 从文件找到最新分析ID: {analysis_id}")
-                    return analysis_id
-
-        return None
+        store = get_progress_store()
+        analysis_id = store.latest_analysis_id()
+        if analysis_id is None and not isinstance(store, FileProgressStore):
+            analysis_id = FileProgressStore().latest_analysis_id()
+        if analysis_id:
+            logger.info(f"📊 [恢复分析] 找到最新分析ID: {analysis_id}")
+        return analysis_id
     except Exception as e:
         logger.error(f"📊 [恢复分析] 获取最新分析ID失败: {e}")
         return None